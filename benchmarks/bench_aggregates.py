@@ -0,0 +1,94 @@
+"""Grouped aggregates against the naive get_state loop over every hub.
+
+Run with ``uv run python -m benchmarks.bench_aggregates --dwellings 20000``.
+"""
+
+import argparse
+import time
+from collections import Counter
+
+from src.aggregates import GroupBy
+from src.device import DeviceType
+from src.device_manager import DeviceManager
+from src.dwelling_manager import DwellingManager
+from src.hub import Hub
+
+DEVICE_TYPES = list(DeviceType)
+
+
+def build_fleet(dwellings: int, per_hub: int, columnar: bool):
+    """Builds dwellings with a hub of mixed devices each."""
+    device_manager = DeviceManager(columnar=columnar)
+    dwelling_manager = DwellingManager()
+    for d in range(dwellings):
+        hub = Hub(f"hub_{d}")
+        dwelling_manager.create_dwelling(f"home_{d}").install_hub(hub)
+        for i in range(per_hub):
+            device_type = DEVICE_TYPES[i % len(DEVICE_TYPES)]
+            hub.add_device(
+                device_manager.create_device(device_type, f"{d}_{i}", "Device")
+            )
+    return device_manager, dwelling_manager
+
+
+def naive(dwelling_manager: DwellingManager) -> tuple:
+    """Computes the reference numbers with get_state loops."""
+    hubs = [
+        (dwelling.get_dwelling_id(), hub)
+        for dwelling in dwelling_manager.list_dwellings()
+        if (hub := dwelling.get_hub()) is not None
+    ]
+    setpoints = {}
+    for dwelling_id, hub in hubs:
+        temperatures = [
+            device.get_state()["temperature"]
+            for device in hub.list_devices()
+            if device.get_device_type() is DeviceType.THERMOSTAT
+        ]
+        setpoints[dwelling_id] = sum(temperatures) / len(temperatures)
+    modes: Counter = Counter()
+    locks = unlocked = 0
+    for _, hub in hubs:
+        for device in hub.list_devices():
+            state = device.get_state()
+            if "mode" in state:
+                modes[state["mode"]] += 1
+            if "is_locked" in state:
+                locks += 1
+                unlocked += state["is_locked"] == "UNLOCKED"
+    return setpoints, modes, unlocked / locks
+
+
+def batched(device_manager: DeviceManager, dwelling_manager: DwellingManager):
+    """Computes the same numbers with the aggregate API."""
+    setpoints = dwelling_manager.aggregate("temperature", group_by=GroupBy.DWELLING)
+    modes = device_manager.histogram("mode")
+    unlocked = 1 - device_manager.aggregate("locked")[None].mean
+    return setpoints, modes, unlocked
+
+
+def timed(function, *args) -> float:
+    """Returns the seconds a call takes."""
+    start = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    """Runs the benchmark and prints the time of each strategy."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--dwellings", type=int, default=20_000)
+    parser.add_argument("--per-hub", type=int, default=12)
+    args = parser.parse_args()
+
+    print(f"{'backend':<10}{'naive ms':>10}{'aggregate ms':>14}")
+    for columnar in (False, True):
+        devices, dwellings = build_fleet(args.dwellings, args.per_hub, columnar)
+        slow = timed(naive, dwellings)
+        fast = timed(batched, devices, dwellings)
+        label = "columnar" if columnar else "objects"
+        print(f"{label:<10}{slow * 1e3:>10.0f}{fast * 1e3:>14.0f}")
+
+
+if __name__ == "__main__":
+    main()
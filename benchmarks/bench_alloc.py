@@ -0,0 +1,85 @@
+"""Bytes per device and per-toggle allocation churn for each device type.
+
+Run with ``uv run python -m benchmarks.bench_alloc --devices 100000``.
+"""
+
+import argparse
+import gc
+import time
+import tracemalloc
+
+from src.device import DeviceType
+from src.device_manager import DeviceManager
+from src.dwelling import Dwelling
+from src.hub import Hub
+
+
+def bytes_per_device(device_type: DeviceType, devices: int) -> float:
+    """Returns the traced bytes held per device of a type."""
+    manager = DeviceManager()
+    ids = [f"{device_type.value}_{i}" for i in range(devices)]
+    gc.collect()
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    for device_id in ids:
+        manager.create_device(device_type, device_id, "Device")
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return (after - before) / devices
+
+
+def bytes_per_object(factory, count: int) -> float:
+    """Returns the traced bytes held per object built by a factory."""
+    gc.collect()
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    objects = [factory(i) for i in range(count)]
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del objects
+    return (after - before) / count - 8  # exclude the list slot
+
+
+def toggle_cost(device_type: DeviceType, toggles: int, **kwargs) -> tuple[float, float]:
+    """Returns transient bytes allocated and nanoseconds per update_state call."""
+    manager = DeviceManager()
+    device = manager.create_device(device_type, "device_1", "Device")
+    device.update_state(**kwargs)
+    gc.collect()
+    tracemalloc.start()
+    churn = 0
+    for _ in range(toggles):
+        tracemalloc.reset_peak()
+        current, _ = tracemalloc.get_traced_memory()
+        device.update_state(**kwargs)
+        _, peak = tracemalloc.get_traced_memory()
+        churn += peak - current
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    for _ in range(toggles):
+        device.update_state(**kwargs)
+    elapsed = time.perf_counter() - start
+    return churn / toggles, elapsed / toggles * 1e9
+
+
+def main() -> None:
+    """Runs the benchmark and prints a table per device type."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--devices", type=int, default=100_000)
+    parser.add_argument("--toggles", type=int, default=10_000)
+    args = parser.parse_args()
+
+    print(f"{'type':<12}{'B/device':>10}{'B/toggle':>10}{'ns/toggle':>11}")
+    for device_type in DeviceType:
+        size = bytes_per_device(device_type, args.devices)
+        churn, latency = toggle_cost(device_type, args.toggles)
+        print(f"{device_type.value:<12}{size:>10.1f}{churn:>10.1f}{latency:>11.1f}")
+    hub_size = bytes_per_object(lambda i: Hub(f"hub_{i}"), args.devices)
+    dwelling_size = bytes_per_object(lambda i: Dwelling(f"home_{i}"), args.devices)
+    print(f"{'hub':<12}{hub_size:>10.1f}")
+    print(f"{'dwelling':<12}{dwelling_size:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Command throughput of AsyncHub against a plain update_state loop.
+
+Run with ``uv run python -m benchmarks.bench_async_hub --devices 20000``.
+"""
+
+import argparse
+import asyncio
+import time
+
+from src.async_hub import AsyncHub
+from src.device import DeviceType
+from src.device_manager import DeviceManager
+from src.hub import Hub
+
+
+def build_hub(devices: int) -> Hub:
+    """Returns a hub with the given number of dimmers paired."""
+    manager = DeviceManager()
+    hub = Hub("hub_1")
+    for i in range(devices):
+        hub.add_device(manager.create_device(DeviceType.DIMMER, f"dimmer_{i}", "D"))
+    return hub
+
+
+def sync_rate(hub: Hub, commands: list) -> float:
+    """Returns commands per second applied with direct update_state calls."""
+    devices = hub.get_paired_devices()
+    start = time.perf_counter()
+    for device_id, kwargs in commands:
+        devices[device_id].update_state(**kwargs)
+    return len(commands) / (time.perf_counter() - start)
+
+
+def async_rate(hub: Hub, commands: list, queue_size: int) -> float:
+    """Returns commands per second applied through AsyncHub.submit_many."""
+
+    async def run() -> float:
+        async_hub = AsyncHub(hub, queue_size=queue_size)
+        start = time.perf_counter()
+        await async_hub.submit_many(commands)
+        return time.perf_counter() - start
+
+    return len(commands) / asyncio.run(run())
+
+
+def main() -> None:
+    """Runs the benchmark and prints commands per second for each path."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--devices", type=int, default=20_000)
+    parser.add_argument("--commands-per-device", type=int, default=5)
+    parser.add_argument("--queue-size", type=int, default=64)
+    args = parser.parse_args()
+
+    hub = build_hub(args.devices)
+    commands = [
+        (f"dimmer_{i}", {"brightness": level})
+        for level in range(args.commands_per_device)
+        for i in range(args.devices)
+    ]
+    print(f"{'path':<10}{'commands/s':>14}")
+    print(f"{'sync':<10}{sync_rate(hub, commands):>14,.0f}")
+    print(f"{'async':<10}{async_rate(hub, commands, args.queue_size):>14,.0f}")
+
+
+if __name__ == "__main__":
+    main()
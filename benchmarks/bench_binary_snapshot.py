@@ -0,0 +1,86 @@
+"""Cold start of a memory-mapped fleet snapshot versus rebuilding objects.
+
+Run with ``uv run python -m benchmarks.bench_binary_snapshot --devices 1000000``.
+"""
+
+import argparse
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from src.binary_snapshot import MappedFleet, write_binary_snapshot
+from src.device import DeviceType
+from src.device_manager import DeviceManager
+from src.dwelling_manager import DwellingManager
+from src.hub import Hub
+
+DEVICE_TYPES = list(DeviceType)
+DEVICES_PER_HUB = 20
+
+
+def build_fleet(devices: int) -> tuple[DeviceManager, DwellingManager]:
+    """Creates dwellings with a hub each and pairs the devices to them."""
+    device_manager = DeviceManager()
+    dwelling_manager = DwellingManager()
+    for first in range(0, devices, DEVICES_PER_HUB):
+        hub = Hub(f"hub_{first}")
+        dwelling_manager.create_dwelling(f"home_{first}").install_hub(hub)
+        for i in range(first, min(first + DEVICES_PER_HUB, devices)):
+            device_type = DEVICE_TYPES[i % len(DEVICE_TYPES)]
+            hub.add_device(
+                device_manager.create_device(device_type, f"device_{i}", "Device")
+            )
+    return device_manager, dwelling_manager
+
+
+def main() -> None:
+    """Runs the benchmark and prints startup and read latencies."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--devices", type=int, default=1_000_000)
+    parser.add_argument("--reads", type=int, default=100_000)
+    args = parser.parse_args()
+
+    device_manager, dwelling_manager = build_fleet(args.devices)
+    rng = random.Random(3)
+    sample = [f"device_{rng.randrange(args.devices)}" for _ in range(args.reads)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / "fleet.snap"
+        start = time.perf_counter()
+        write_binary_snapshot(path, device_manager, dwelling_manager)
+        write_time = time.perf_counter() - start
+        size = path.stat().st_size
+        del device_manager, dwelling_manager
+
+        start = time.perf_counter()
+        fleet = MappedFleet(path)
+        first = fleet.get_state("device_0")
+        startup = time.perf_counter() - start
+        assert first["device_id"] == "device_0"
+
+        start = time.perf_counter()
+        for device_id in sample:
+            fleet.get_state(device_id)
+        reads = time.perf_counter() - start
+
+        start = time.perf_counter()
+        fleet.list_hub_devices(f"hub_{DEVICES_PER_HUB * (args.devices // 40)}")
+        hub_read = time.perf_counter() - start
+
+        start = time.perf_counter()
+        fleet.load()
+        rebuild = time.perf_counter() - start
+        fleet.close()
+
+    print(f"devices:                     {args.devices}")
+    print(f"snapshot size:               {size / 2**20:10.1f} MiB")
+    print(f"snapshot write:              {write_time:10.2f} s")
+    print(f"mapped startup + first read: {startup * 1000:10.2f} ms")
+    print(f"mapped get_state:            {reads / args.reads * 1e6:10.2f} us")
+    print(f"mapped hub listing:          {hub_read * 1e6:10.2f} us")
+    print(f"full object rebuild:         {rebuild:10.2f} s")
+
+
+if __name__ == "__main__":
+    main()
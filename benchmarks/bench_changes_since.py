@@ -0,0 +1,58 @@
+"""Dashboard poll cost: full get_state sweep against changes_since deltas.
+
+Run with ``uv run python -m benchmarks.bench_changes_since --devices 200000``.
+"""
+
+import argparse
+import random
+import time
+
+from src.device import DeviceType
+from src.device_manager import DeviceManager
+
+
+def main() -> None:
+    """Runs the benchmark and prints the time of each poll strategy."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--devices", type=int, default=200_000)
+    parser.add_argument("--churn", type=float, default=0.01)
+    args = parser.parse_args()
+
+    manager = DeviceManager()
+    types = list(DeviceType)
+    for i in range(args.devices):
+        manager.create_device(types[i % len(types)], f"device_{i}", "Device")
+    devices = manager.list_devices()
+    changed = random.Random(0).sample(devices, int(args.devices * args.churn))
+
+    start = time.perf_counter()
+    for device in devices:
+        device.get_state()
+    cold = time.perf_counter() - start
+
+    version = manager.changes_since(0).version
+    for device in changed:
+        device.update_state(brightness=10, temperature=70)
+
+    start = time.perf_counter()
+    for device in devices:
+        device.get_state()
+    warm = time.perf_counter() - start
+
+    for device in changed:
+        device.update_state(brightness=20, temperature=71)
+    start = time.perf_counter()
+    delta = manager.changes_since(version)
+    for device in delta.changed:
+        device.get_state()
+    incremental = time.perf_counter() - start
+
+    print(f"{'poll':<28}{'ms':>10}")
+    print(f"{'full sweep, uncached':<28}{cold * 1e3:>10.1f}")
+    print(f"{'full sweep, cached':<28}{warm * 1e3:>10.1f}")
+    label = f"changes_since ({len(delta.changed)} dev)"
+    print(f"{label:<28}{incremental * 1e3:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Sharded fleet scaling: batched update throughput per worker process count.
+
+Run with ``uv run python -m benchmarks.bench_cluster --dwellings 50000``.
+Scaling is bounded by the cores available and by the router ceiling, the
+rate at which the routing process alone can route and pickle calls. The
+in-process row is the single-process baseline without any IPC.
+"""
+
+import argparse
+import os
+import time
+from typing import List
+
+from src.cluster import Call, FleetRouter
+from src.device import DeviceType
+from src.device_manager import DeviceManager
+from src.dwelling_manager import DwellingManager
+from src.workload import FleetLayout, build_fleet
+
+
+def setup_calls(layout: FleetLayout) -> List[Call]:
+    """Returns the calls creating and pairing every device of a layout."""
+    calls = []
+    for dwelling in range(layout.dwellings):
+        dwelling_id = layout.get_dwelling_id(dwelling)
+        calls.append(Call("create_dwelling", (dwelling_id,)))
+        for slot in range(layout.devices_per_dwelling):
+            device_type = layout.get_device_type(dwelling, slot)
+            device_id = layout.get_device_id(dwelling, slot)
+            calls.append(
+                Call("create_device", (dwelling_id, device_type, device_id, "D", {}))
+            )
+            calls.append(Call("pair", (device_id,)))
+    return calls
+
+
+def update_calls(layout: FleetLayout, rounds: int) -> List[Call]:
+    """Returns brightness and temperature updates of every dimmer and thermostat."""
+    calls = []
+    for level in range(rounds):
+        for dwelling in range(layout.dwellings):
+            for slot in range(layout.devices_per_dwelling):
+                device_type = layout.get_device_type(dwelling, slot)
+                if device_type in (DeviceType.DIMMER, DeviceType.THERMOSTAT):
+                    kwargs = {"brightness": level, "temperature": 60 + level}
+                    device_id = layout.get_device_id(dwelling, slot)
+                    calls.append(Call("update_state", (device_id, kwargs)))
+    return calls
+
+
+def main() -> None:
+    """Runs the benchmark and prints throughput per shard count."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--dwellings", type=int, default=50_000)
+    parser.add_argument("--rounds", type=int, default=4)
+    parser.add_argument("--batch", type=int, default=20_000)
+    parser.add_argument("--shards", type=int, nargs="+")
+    args = parser.parse_args()
+
+    cores = os.cpu_count() or 1
+    counts = args.shards or sorted({1, 2, 4, cores} | {8, 16} & set(range(cores + 1)))
+    layout = FleetLayout(args.dwellings)
+    updates = update_calls(layout, args.rounds)
+
+    devices, dwellings = DeviceManager(), DwellingManager()
+    build_fleet(layout, devices, dwellings)
+    update_state = devices.update_state
+    start = time.perf_counter()
+    for _, (device_id, kwargs) in updates:
+        update_state(device_id, **kwargs)
+    baseline = len(updates) / (time.perf_counter() - start)
+
+    print(f"cores: {cores}, devices: {len(layout):,}, updates: {len(updates):,}")
+    print(
+        f"{'shards':<12}{'setup ops/s':>14}{'update ops/s':>14}{'speedup':>10}"
+        f"{'router ceiling':>16}"
+    )
+    print(f"{'in-process':<12}{'':>14}{baseline:>14,.0f}")
+    single = None
+    for shards in counts:
+        with FleetRouter(shards) as router:
+            setup = setup_calls(layout)
+            start = time.perf_counter()
+            for i in range(0, len(setup), args.batch):
+                router.run_batch(setup[i : i + args.batch], raises=True)
+            setup_rate = len(setup) / (time.perf_counter() - start)
+            start = time.perf_counter()
+            cpu = time.process_time()
+            for i in range(0, len(updates), args.batch):
+                router.run_batch(updates[i : i + args.batch], raises=True)
+            rate = len(updates) / (time.perf_counter() - start)
+            # The router process alone caps throughput however many shards run
+            ceiling = len(updates) / (time.process_time() - cpu)
+        single = single or rate
+        print(
+            f"{shards:<12}{setup_rate:>14,.0f}{rate:>14,.0f}{rate / single:>9.2f}x"
+            f"{ceiling:>16,.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
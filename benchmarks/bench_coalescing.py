@@ -0,0 +1,114 @@
+"""Slider and setpoint bursts applied directly versus through a coalescer.
+
+Run with ``uv run python -m benchmarks.bench_coalescing --devices 10000``.
+Every device gets a burst of commands spread over a second of virtual
+time, as a user dragging a slider sends them, while an observer stands
+in for forwarding each state change.
+"""
+
+import argparse
+import random
+import time
+from typing import Dict, List, Tuple
+
+from src.coalescing import CommandCoalescer
+from src.device import AnyDeviceType, Device, DeviceObserver, DeviceType
+from src.device_manager import DeviceManager
+from src.scheduler import VirtualClock
+
+Command = Tuple[float, str, dict]
+
+
+class Forwarder(DeviceObserver):
+    """Counts the state changes that would be forwarded."""
+
+    __slots__ = ("forwarded",)
+
+    def __init__(self) -> None:
+        """Initializes the count."""
+        self.forwarded = 0
+
+    def on_state_change(self, device: Device) -> None:
+        """Counts a forwarded change."""
+        self.forwarded += 1
+
+
+def burst_commands(devices: int, rate: int, seed: int) -> List[Command]:
+    """Returns a second of interleaved slider commands, in time order."""
+    rng = random.Random(seed)
+    commands = []
+    for i in range(devices):
+        if i % 2:
+            device_id, attribute, values = f"thermo_{i}", "temperature", (60, 80)
+        else:
+            device_id, attribute, values = f"dimmer_{i}", "brightness", (0, 100)
+        for step in range(rate):
+            at = (step + rng.random()) / rate
+            commands.append((at, device_id, {attribute: rng.randint(*values)}))
+    commands.sort(key=lambda command: command[0])
+    return commands
+
+
+def build(devices: int) -> Tuple[DeviceManager, Forwarder]:
+    """Returns a fleet of dimmers and thermostats and its forwarder."""
+    device_manager = DeviceManager()
+    for i in range(devices):
+        if i % 2:
+            device_manager.create_device(DeviceType.THERMOSTAT, f"thermo_{i}", "T")
+        else:
+            device_manager.create_device(DeviceType.DIMMER, f"dimmer_{i}", "D")
+    forwarder = Forwarder()
+    device_manager.add_observer(forwarder)
+    return device_manager, forwarder
+
+
+def main() -> None:
+    """Runs the benchmark and prints applied and forwarded counts per mode."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--devices", type=int, default=10_000)
+    parser.add_argument("--rate", type=int, default=40, help="commands per second")
+    parser.add_argument("--window", type=float, default=0.1, help="seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    commands = burst_commands(args.devices, args.rate, args.seed)
+
+    device_manager, forwarder = build(args.devices)
+    devices = {d.get_device_id(): d for d in device_manager.list_devices()}
+    start = time.perf_counter()
+    for _, device_id, kwargs in commands:
+        devices[device_id].update_state(**kwargs)
+    direct_seconds = time.perf_counter() - start
+    direct_forwarded = forwarder.forwarded
+
+    device_manager, forwarder = build(args.devices)
+    clock = VirtualClock()
+    windows: Dict[AnyDeviceType, float] = {
+        DeviceType.DIMMER: args.window,
+        DeviceType.THERMOSTAT: args.window,
+    }
+    coalescer = CommandCoalescer(device_manager, windows, clock)
+    submit, flush_due = coalescer.submit, coalescer.flush_due
+    start = time.perf_counter()
+    for at, device_id, kwargs in commands:
+        clock.now = at
+        flush_due()
+        submit(device_id, **kwargs)
+    coalescer.flush()
+    coalesced_seconds = time.perf_counter() - start
+    stats = coalescer.get_stats()
+
+    print(f"commands: {len(commands):,}, window: {args.window * 1000:.0f} ms")
+    print(f"{'mode':<12}{'ops/s':>14}{'forwarded':>12}{'absorbed':>12}")
+    print(
+        f"{'direct':<12}{len(commands) / direct_seconds:>14,.0f}"
+        f"{direct_forwarded:>12,}{0:>12,}"
+    )
+    print(
+        f"{'coalesced':<12}{len(commands) / coalesced_seconds:>14,.0f}"
+        f"{forwarder.forwarded:>12,}{stats.absorbed:>12,}"
+    )
+
+
+if __name__ == "__main__":
+    main()
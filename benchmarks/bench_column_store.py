@@ -0,0 +1,91 @@
+"""Memory and scan-time comparison of the object and columnar backends.
+
+Run with ``uv run python -m benchmarks.bench_column_store --devices 1000000``.
+"""
+
+import argparse
+import gc
+import time
+import tracemalloc
+
+from src.device import DeviceType
+from src.device_manager import DeviceManager
+from src.devices.lock import LockStateRepr
+from src.hub import Hub
+
+DEVICE_TYPES = (
+    DeviceType.SWITCH,
+    DeviceType.DIMMER,
+    DeviceType.LOCK,
+    DeviceType.THERMOSTAT,
+)
+
+
+def build_fleet(devices: int, columnar: bool) -> tuple[DeviceManager, int]:
+    """Builds a fleet and returns it with the bytes it allocated."""
+    gc.collect()
+    tracemalloc.start()
+    manager = DeviceManager(columnar=columnar)
+    hub = Hub("hub_1")
+    for i in range(devices):
+        device_type = DEVICE_TYPES[i % len(DEVICE_TYPES)]
+        device = manager.create_device(device_type, f"{device_type.value}_{i}", "Device")
+        if i % 3 == 0:
+            hub.add_device(device)
+        if device_type is DeviceType.LOCK and i % 5 == 0:
+            device.update_state()
+    # The hub only exists to pair devices, drop it so the views it holds are freed
+    del hub
+    gc.collect()
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return manager, allocated
+
+
+def scan_objects(manager: DeviceManager) -> int:
+    """Counts paired, locked locks the way callers do today."""
+    locked = LockStateRepr.LOCKED.name
+    return sum(
+        1
+        for device in manager.list_devices()
+        if device.get_state().get("is_locked") == locked and device.get_paired()
+    )
+
+
+def scan_columns(manager: DeviceManager) -> int:
+    """Counts paired, locked locks straight from the columns."""
+    store = manager.get_store()
+    assert store is not None
+    return store.count(DeviceType.LOCK, is_paired=True, active=True)
+
+
+def timed(func, *args) -> tuple[float, int]:
+    """Returns the wall time of a call and its result."""
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+def main() -> None:
+    """Runs the benchmark and prints the comparison."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--devices", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    objects, object_bytes = build_fleet(args.devices, columnar=False)
+    object_scan, object_count = timed(scan_objects, objects)
+    del objects
+
+    columns, column_bytes = build_fleet(args.devices, columnar=True)
+    column_scan, column_count = timed(scan_columns, columns)
+    assert object_count == column_count
+
+    print(f"devices:            {args.devices}")
+    print(f"object memory:      {object_bytes / args.devices:8.1f} B/device")
+    print(f"columnar memory:    {column_bytes / args.devices:8.1f} B/device")
+    print(f"object scan:        {object_scan * 1000:8.1f} ms")
+    print(f"columnar scan:      {column_scan * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Multi-threaded device ingest, one global lock against lock striping.
+
+Run with ``uv run python -m benchmarks.bench_concurrent_ingest --devices 400000``.
+On a free-threaded build (python3.13t) the striped manager can scale with
+threads, with the GIL both variants are bound to one core.
+"""
+
+import argparse
+import sys
+import threading
+import time
+from typing import Callable
+
+from src.device import DeviceType
+from src.device_manager import DeviceManager
+
+
+def ingest_rate(create: Callable[[str], None], devices: int, threads: int) -> float:
+    """Returns devices created per second with the work split over threads."""
+    per_thread = devices // threads
+    barrier = threading.Barrier(threads + 1)
+
+    def worker(index: int) -> None:
+        ids = [f"device_{index}_{i}" for i in range(per_thread)]
+        barrier.wait()
+        for device_id in ids:
+            create(device_id)
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for thread in workers:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in workers:
+        thread.join()
+    return per_thread * threads / (time.perf_counter() - start)
+
+
+def global_lock_creator() -> Callable[[str], None]:
+    """Returns a create function serialized by a single lock."""
+    manager = DeviceManager()
+    lock = threading.Lock()
+
+    def create(device_id: str) -> None:
+        with lock:
+            manager.create_device(DeviceType.SWITCH, device_id, "Switch")
+
+    return create
+
+
+def striped_creator() -> Callable[[str], None]:
+    """Returns a create function of a concurrent, lock-striped manager."""
+    manager = DeviceManager(concurrent=True)
+
+    def create(device_id: str) -> None:
+        manager.create_device(DeviceType.SWITCH, device_id, "Switch")
+
+    return create
+
+
+def main() -> None:
+    """Runs the benchmark and prints creates per second per thread count."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--devices", type=int, default=400_000)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    gil = getattr(sys, "_is_gil_enabled", lambda: True)()
+    print(f"python {sys.version.split()[0]}, GIL {'enabled' if gil else 'disabled'}")
+    print(f"{'threads':>8}{'global lock/s':>16}{'striped/s':>14}")
+    for threads in args.threads:
+        single = ingest_rate(global_lock_creator(), args.devices, threads)
+        striped = ingest_rate(striped_creator(), args.devices, threads)
+        print(f"{threads:>8}{single:>16,.0f}{striped:>14,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Cost and memory of idempotent updates under millions of commands.
+
+Run with ``uv run python -m benchmarks.bench_dedup --commands 3000000``.
+Commands arrive at --per-hour on a virtual clock and a share of them are
+retries of recent ones. Memory is what the run allocated and still
+holds, mostly the dedup cache, sampled every million commands; it levels
+off once entries expire.
+"""
+
+import argparse
+import random
+import time
+import tracemalloc
+from typing import List, Tuple
+
+from src.dedup import DedupCache
+from src.device import DeviceType
+from src.device_manager import DeviceManager, DeviceSpec
+from src.scheduler import VirtualClock
+
+
+def commands(
+    count: int, devices: int, retries: float, seed: int
+) -> List[Tuple[str, str]]:
+    """Returns (device ID, command ID) pairs, retries repeating a recent command."""
+    rng = random.Random(seed)
+    pairs: List[Tuple[str, str]] = []
+    for i in range(count):
+        if pairs and rng.random() < retries:
+            pairs.append(pairs[max(0, i - rng.randint(1, 1000))])
+        else:
+            pairs.append((f"switch_{rng.randrange(devices)}", f"cmd-{i}"))
+    return pairs
+
+
+def main() -> None:
+    """Runs the benchmark and prints throughput and cache memory."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--commands", type=int, default=3_000_000)
+    parser.add_argument("--devices", type=int, default=100_000)
+    parser.add_argument("--per-hour", type=int, default=3_000_000)
+    parser.add_argument("--retries", type=float, default=0.05)
+    parser.add_argument("--ttl", type=float, default=300.0)
+    parser.add_argument("--capacity", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    device_manager = DeviceManager()
+    device_manager.create_devices(
+        DeviceSpec(DeviceType.SWITCH, f"switch_{i}", "S", {})
+        for i in range(args.devices)
+    )
+    pairs = commands(args.commands, args.devices, args.retries, args.seed)
+    step = 3600 / args.per_hour
+
+    update_state = device_manager.update_state
+    start = time.perf_counter()
+    for device_id, _ in pairs:
+        update_state(device_id)
+    plain = len(pairs) / (time.perf_counter() - start)
+
+    def run(sample: bool) -> float:
+        clock = VirtualClock()
+        cache = DedupCache(args.capacity, args.ttl, clock)
+        device_manager.set_dedup_cache(cache)
+        start = time.perf_counter()
+        for i, (device_id, command_id) in enumerate(pairs, start=1):
+            clock.now += step
+            update_state(device_id, command_id)
+            if sample and i % 1_000_000 == 0:
+                traced = tracemalloc.get_traced_memory()[0]
+                print(f"{i:>12,}{len(cache):>14,}{traced / 2**20:>14,.1f}")
+        rate = len(pairs) / (time.perf_counter() - start)
+        if not sample:
+            print(f"hits: {cache.get_stats().hits:,}, ttl: {args.ttl:.0f} s")
+        return rate
+
+    deduped = run(sample=False)
+    print(f"{'update_state':<28}{plain:>14,.0f} ops/s")
+    print(f"{'update_state, command ID':<28}{deduped:>14,.0f} ops/s")
+    print(f"{'commands':>12}{'entries':>14}{'traced MB':>14}")
+    tracemalloc.start()
+    run(sample=True)
+    tracemalloc.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Reconciling a cloud fleet with its hubs by full dump versus digest tree.
+
+Run with ``uv run python -m benchmarks.bench_digest --dwellings 20000``.
+Two equal fleets stand in for the cloud copy and the physical hubs,
+then --diverged devices change on the hub side only. The dump compares
+every get_state, the digest walk fetches and compares child digests
+only under nodes that differ.
+"""
+
+import argparse
+import random
+import time
+from typing import Tuple
+
+from src.device_manager import DeviceManager
+from src.digest import FleetDigest
+from src.dwelling_manager import DwellingManager
+from src.workload import FleetLayout, build_fleet
+
+
+def build(
+    layout: FleetLayout, levels: int, fanout: int
+) -> Tuple[DeviceManager, FleetDigest]:
+    """Returns the device manager and digest of a fleet built from a layout."""
+    device_manager = DeviceManager()
+    dwelling_manager = DwellingManager()
+    build_fleet(layout, device_manager, dwelling_manager)
+    return device_manager, FleetDigest(device_manager, dwelling_manager, levels, fanout)
+
+
+def main() -> None:
+    """Runs the benchmark and prints the cost of each reconciliation."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--dwellings", type=int, default=20_000)
+    parser.add_argument("--devices-per-dwelling", type=int, default=5)
+    parser.add_argument("--diverged", type=int, default=5)
+    parser.add_argument("--levels", type=int, default=2)
+    parser.add_argument("--fanout", type=int, default=64)
+    parser.add_argument("--updates", type=int, default=200_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    layout = FleetLayout(args.dwellings, args.devices_per_dwelling)
+    cloud_devices, cloud = build(layout, args.levels, args.fanout)
+    hub_devices, hubs = build(layout, args.levels, args.fanout)
+    rng = random.Random(args.seed)
+    device_ids = [
+        layout.get_device_id(dwelling, slot)
+        for dwelling in range(args.dwellings)
+        for slot in range(args.devices_per_dwelling)
+    ]
+    for device_id in rng.sample(device_ids, args.diverged):
+        device = hub_devices.get_device(device_id)
+        assert device is not None
+        device.unpair()
+
+    start = time.perf_counter()
+    get_cloud, get_hub = cloud_devices.get_device, hub_devices.get_device
+    dumped = []
+    for device_id in device_ids:
+        cloud_device, hub_device = get_cloud(device_id), get_hub(device_id)
+        if (
+            cloud_device is None
+            or hub_device is None
+            or cloud_device.get_state() != hub_device.get_state()
+        ):
+            dumped.append(device_id)
+    dump_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    divergence = cloud.reconcile(hubs.get_children)
+    digest_seconds = time.perf_counter() - start
+    assert divergence.device_ids == sorted(dumped)
+
+    print(f"devices: {len(device_ids):,}, diverged: {len(dumped)}")
+    print(f"{'method':<12}{'ms':>10}{'fetches':>10}{'compared':>12}")
+    print(
+        f"{'full dump':<12}{dump_seconds * 1000:>10.1f}"
+        f"{1:>10,}{len(device_ids):>12,}"
+    )
+    print(
+        f"{'digest':<12}{digest_seconds * 1000:>10.2f}"
+        f"{divergence.nodes:>10,}{divergence.compared:>12,}"
+    )
+
+    # Cost the digest adds to every state change
+    targets = [rng.choice(device_ids) for _ in range(args.updates)]
+    update_state = cloud_devices.update_state
+    rates = []
+    for tracked in (True, False):
+        if not tracked:
+            cloud.close()
+        start = time.perf_counter()
+        for device_id in targets:
+            update_state(device_id)
+        rates.append(len(targets) / (time.perf_counter() - start))
+    print(f"{'update_state, digest':<28}{rates[0]:>14,.0f} ops/s")
+    print(f"{'update_state':<28}{rates[1]:>14,.0f} ops/s")
+
+
+if __name__ == "__main__":
+    main()
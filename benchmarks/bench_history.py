@@ -0,0 +1,111 @@
+"""Recording cost, memory and query speed of the per-device state history.
+
+Run with ``uv run python -m benchmarks.bench_history --devices 100000``.
+Random switch toggles and thermostat setpoints arrive one per
+millisecond of virtual time. Memory is what the history allocated,
+measured with tracemalloc over the recording pass.
+"""
+
+import argparse
+import random
+import time
+import tracemalloc
+from typing import List, Tuple
+
+from src.device import DeviceType
+from src.device_manager import DeviceManager, DeviceSpec
+from src.history import StateHistory
+from src.scheduler import VirtualClock
+
+
+def build(devices: int) -> DeviceManager:
+    """Returns a fleet of half switches and half thermostats."""
+    device_manager = DeviceManager()
+    device_manager.create_devices(
+        DeviceSpec(DeviceType.THERMOSTAT, f"thermo_{i}", "T", {})
+        if i % 2
+        else DeviceSpec(DeviceType.SWITCH, f"switch_{i}", "S", {})
+        for i in range(devices)
+    )
+    return device_manager
+
+
+def commands(count: int, devices: int, seed: int) -> List[Tuple[str, dict]]:
+    """Returns random (device ID, kwargs) commands."""
+    rng = random.Random(seed)
+    result = []
+    for _ in range(count):
+        i = rng.randrange(devices)
+        if i % 2:
+            result.append((f"thermo_{i}", {"temperature": rng.randint(60, 80)}))
+        else:
+            result.append((f"switch_{i}", {}))
+    return result
+
+
+def main() -> None:
+    """Runs the benchmark and prints update, memory and query figures."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--devices", type=int, default=100_000)
+    parser.add_argument("--commands", type=int, default=1_000_000)
+    parser.add_argument("--capacity", type=int, default=64)
+    parser.add_argument("--queries", type=int, default=200_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    trace = commands(args.commands, args.devices, args.seed)
+    device_manager = build(args.devices)
+    update_state = device_manager.update_state
+    start = time.perf_counter()
+    for device_id, kwargs in trace:
+        update_state(device_id, **kwargs)
+    plain = len(trace) / (time.perf_counter() - start)
+
+    def record(traced: bool) -> Tuple[StateHistory, VirtualClock, float]:
+        """Returns a history of the trace, its clock and the rate or memory."""
+        device_manager = build(args.devices)
+        update_state = device_manager.update_state
+        clock = VirtualClock()
+        if traced:
+            tracemalloc.start()
+        history = StateHistory(device_manager, args.capacity, clock=clock)
+        start = time.perf_counter()
+        for device_id, kwargs in trace:
+            clock.now += 0.001
+            update_state(device_id, **kwargs)
+        if not traced:
+            return history, clock, len(trace) / (time.perf_counter() - start)
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        return history, clock, memory
+
+    recorded = record(traced=False)[2]
+    history, clock, traced = record(traced=True)
+    retained = history.get_retained()
+
+    rng = random.Random(args.seed)
+    end = clock.now
+    targets = [
+        (f"thermo_{i}" if i % 2 else f"switch_{i}", rng.uniform(0, end))
+        for i in (rng.randrange(args.devices) for _ in range(args.queries))
+    ]
+    state_at = history.state_at
+    start = time.perf_counter()
+    for device_id, at in targets:
+        state_at(device_id, at)
+    queries = len(targets) / (time.perf_counter() - start)
+    start = time.perf_counter()
+    history.replay(end / 2)
+    replay_seconds = time.perf_counter() - start
+
+    print(f"devices: {args.devices:,}, retained transitions: {retained:,}")
+    print(f"{'update_state':<28}{plain:>14,.0f} ops/s")
+    print(f"{'update_state, history':<28}{recorded:>14,.0f} ops/s")
+    print(f"{'state_at':<28}{queries:>14,.0f} ops/s")
+    print(f"{'replay fleet':<28}{replay_seconds * 1000:>14,.1f} ms")
+    print(f"{'history memory':<28}{traced / 2**20:>14,.1f} MB")
+    print(f"{'bytes per transition':<28}{traced / retained:>14,.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Instrumentation overhead: never enabled, enabled, and disabled again.
+
+Run with ``uv run python -m benchmarks.bench_instrumentation --devices 200000``.
+"""
+
+import argparse
+import gc
+import time
+from typing import Dict, List
+
+from src.device import DeviceType
+from src.device_manager import DeviceManager
+from src.metrics import Metrics
+
+
+def workload(devices: int) -> Dict[str, float]:
+    """Returns the seconds taken by create, update_state and get_state."""
+    manager = DeviceManager()
+    types = list(DeviceType)
+    timings = {}
+
+    start = time.perf_counter()
+    for i in range(devices):
+        manager.create_device(types[i % len(types)], f"device_{i}", "Device")
+    timings["create"] = time.perf_counter() - start
+
+    fleet = manager.list_devices()
+    start = time.perf_counter()
+    for device in fleet:
+        device.update_state(brightness=10, temperature=70)
+    timings["update_state"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for device in fleet:
+        device.get_state()
+    timings["get_state"] = time.perf_counter() - start
+    return timings
+
+
+def main() -> None:
+    """Runs the benchmark and prints the time of each mode."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--devices", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    # Rounds interleave the modes so drift hits each alike; the best run counts
+    metrics = Metrics()
+    runs: Dict[str, List[Dict[str, float]]] = {"off": [], "on": [], "disabled": []}
+    for _ in range(args.repeat):
+        gc.collect()
+        runs["off"].append(workload(args.devices))
+        metrics.enable()
+        gc.collect()
+        runs["on"].append(workload(args.devices))
+        metrics.disable()
+        gc.collect()
+        runs["disabled"].append(workload(args.devices))
+        metrics.reset()
+    best = {
+        mode: {op: min(run[op] for run in mode_runs) for op in mode_runs[0]}
+        for mode, mode_runs in runs.items()
+    }
+
+    print(
+        f"{'operation':<14}{'off ms':>10}{'on ms':>10}{'on +%':>8}"
+        f"{'disabled ms':>13}{'disabled +%':>13}"
+    )
+    for operation, seconds in best["off"].items():
+        on, off = best["on"][operation], best["disabled"][operation]
+        print(
+            f"{operation:<14}{seconds * 1e3:>10.1f}{on * 1e3:>10.1f}"
+            f"{on / seconds - 1:>8.0%}{off * 1e3:>13.1f}{off / seconds - 1:>13.0%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Full listing copies versus cursor pages and streamed JSONL exports.
+
+Run with ``uv run python -m benchmarks.bench_listing --devices 1000000``.
+Exports write to the null device, peak bytes are the tracemalloc
+peak above the fleet itself.
+"""
+
+import argparse
+import json
+import os
+import time
+import tracemalloc
+from typing import Callable, Tuple
+
+from src.device import DeviceType
+from src.device_manager import DeviceManager, DeviceSpec
+
+TYPES = list(DeviceType)
+
+
+def measure(run: Callable[[], object]) -> Tuple[float, int]:
+    """Returns the seconds of one run and the peak traced bytes of another."""
+    start = time.perf_counter()
+    run()
+    seconds = time.perf_counter() - start
+    tracemalloc.start()
+    run()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return seconds, peak
+
+
+def main() -> None:
+    """Runs the benchmark and prints time and peak memory per listing style."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--devices", type=int, default=1_000_000)
+    parser.add_argument("--page-size", type=int, default=1024)
+    parser.add_argument("--columnar", action="store_true")
+    args = parser.parse_args()
+
+    manager = DeviceManager(columnar=args.columnar)
+    manager.create_devices(
+        DeviceSpec(TYPES[i % len(TYPES)], f"device_{i}", "D", {})
+        for i in range(args.devices)
+    )
+    manager.list_page(1)  # Starts the creation order outside the measurements
+
+    def copy_all() -> None:
+        for device in manager.list_devices():
+            device.get_device_id()
+
+    def iterate() -> None:
+        for device in manager.iter_devices(args.page_size):
+            device.get_device_id()
+
+    def export_copy() -> None:
+        states = [device.get_state() for device in manager.list_devices()]
+        with open(os.devnull, "w") as file:
+            file.write("".join(json.dumps(state) + "\n" for state in states))
+
+    def export_stream() -> None:
+        with open(os.devnull, "w") as file:
+            manager.export_states(file)
+
+    print(f"devices: {args.devices:,}, page size: {args.page_size:,}")
+    print(f"{'listing':<24}{'seconds':>10}{'peak MB':>10}")
+    for name, run in [
+        ("list_devices", copy_all),
+        ("iter_devices", iterate),
+        ("export, list of states", export_copy),
+        ("export_states", export_stream),
+    ]:
+        seconds, peak = measure(run)
+        print(f"{name:<24}{seconds:>10.3f}{peak / 2**20:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""Write throughput and recovery time of the write-ahead log and snapshots.
+
+Run with ``uv run python -m benchmarks.bench_persistence --devices 1000000``.
+"""
+
+import argparse
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from src.device import DeviceType
+from src.device_manager import DeviceManager
+from src.devices.thermostat import ThermostatStateRepr
+from src.dwelling_manager import DwellingManager
+from src.hub import Hub
+from src.persistence import FleetPersistence
+
+DEVICE_TYPES = list(DeviceType)
+DEVICES_PER_HUB = 20
+
+
+def build_fleet(
+    device_manager: DeviceManager, dwelling_manager: DwellingManager, devices: int
+) -> list:
+    """Creates dwellings with a hub each and pairs the devices to them."""
+    fleet = []
+    for first in range(0, devices, DEVICES_PER_HUB):
+        hub = Hub(f"hub_{first}")
+        dwelling_manager.create_dwelling(f"home_{first}").install_hub(hub)
+        for i in range(first, min(first + DEVICES_PER_HUB, devices)):
+            device_type = DEVICE_TYPES[i % len(DEVICE_TYPES)]
+            device = device_manager.create_device(device_type, f"device_{i}", "Device")
+            hub.add_device(device)
+            fleet.append(device)
+    return fleet
+
+
+def mutate(fleet: list, mutations: int, seed: int = 7) -> float:
+    """Applies random state changes and returns the elapsed time."""
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    for _ in range(mutations):
+        device = fleet[rng.randrange(len(fleet))]
+        device_type = device.get_device_type()
+        if device_type is DeviceType.DIMMER:
+            device.update_state(brightness=rng.randrange(101))
+        elif device_type is DeviceType.THERMOSTAT:
+            device.update_state(mode=ThermostatStateRepr.HEAT, temperature=68.5)
+        else:
+            device.update_state()
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    """Runs the benchmark and prints throughput and recovery times."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--devices", type=int, default=1_000_000)
+    parser.add_argument("--mutations", type=int, default=2_000_000)
+    parser.add_argument("--fsync-each", type=int, default=2_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        # Baseline without persistence
+        fleet = build_fleet(DeviceManager(), DwellingManager(), args.devices)
+        in_memory = mutate(fleet, args.mutations)
+        del fleet
+
+        # Every record fsynced on its own
+        strict = FleetPersistence(
+            Path(directory) / "strict",
+            DeviceManager(),
+            DwellingManager(),
+            group_size=1,
+            fsync_interval=0.0,
+        )
+        fleet = build_fleet(
+            strict.get_device_manager(), strict.get_dwelling_manager(), 100
+        )
+        fsync_each = mutate(fleet, args.fsync_each)
+        strict.close()
+        del fleet
+
+        # Group commit, periodic snapshots bound the log left to replay
+        path = Path(directory) / "grouped"
+        persistence = FleetPersistence(path, DeviceManager(), DwellingManager())
+        start = time.perf_counter()
+        fleet = build_fleet(
+            persistence.get_device_manager(),
+            persistence.get_dwelling_manager(),
+            args.devices,
+        )
+        build_time = time.perf_counter() - start
+        grouped = mutate(fleet, args.mutations)
+        persistence.close()
+        del fleet, persistence
+        log_size = (path / "wal.jsonl").stat().st_size
+
+        start = time.perf_counter()
+        recovered = FleetPersistence.recover(path)
+        from_log = time.perf_counter() - start
+
+        start = time.perf_counter()
+        recovered.checkpoint()
+        checkpoint_time = time.perf_counter() - start
+        recovered.close()
+        del recovered
+
+        start = time.perf_counter()
+        FleetPersistence.recover(path).close()
+        from_snapshot = time.perf_counter() - start
+
+    print(f"devices: {args.devices}, mutations: {args.mutations}")
+    print(f"in-memory updates:        {args.mutations / in_memory:>12,.0f} ops/s")
+    print(f"logged, group commit:     {args.mutations / grouped:>12,.0f} ops/s")
+    print(f"logged, fsync per record: {args.fsync_each / fsync_each:>12,.0f} ops/s")
+    print(f"logged fleet build:       {build_time:>12.2f} s")
+    print(f"log tail size:            {log_size / 2**20:>12.1f} MiB")
+    print(f"recovery, snapshot + log: {from_log:>12.2f} s")
+    print(f"checkpoint:               {checkpoint_time:>12.2f} s")
+    print(f"recovery, snapshot only:  {from_snapshot:>12.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Throughput of bulk provisioning from JSONL and CSV manifests.
+
+Run with ``uv run python -m benchmarks.bench_provisioning --rows 1000000``.
+"""
+
+import argparse
+import csv
+import json
+import tempfile
+import time
+from pathlib import Path
+
+from src.device import DeviceType
+from src.device_manager import DeviceManager
+from src.provisioning import provision_file, read_manifest
+
+FIELDS = ["type", "device_id", "name", "brightness", "temperature", "pin_code"]
+
+
+def manifest_rows(rows: int):
+    """Yields a mixed fleet of manifest records."""
+    for i in range(rows):
+        kind = i % 4
+        if kind == 0:
+            yield {"type": "switch", "device_id": f"switch_{i}", "name": "Light"}
+        elif kind == 1:
+            yield {"type": "dimmer", "device_id": f"dimmer_{i}", "name": "Dimmer", "brightness": 40}
+        elif kind == 2:
+            yield {"type": "lock", "device_id": f"lock_{i}", "name": "Door", "pin_code": "1234"}
+        else:
+            yield {"type": "thermostat", "device_id": f"thermo_{i}", "name": "Heat", "temperature": 70.5}
+
+
+def write_manifests(directory: Path, rows: int) -> tuple[Path, Path]:
+    """Writes the same fleet as a JSONL and a CSV manifest."""
+    jsonl_path = directory / "fleet.jsonl"
+    csv_path = directory / "fleet.csv"
+    with open(jsonl_path, "w", encoding="utf-8") as jsonl_file:
+        for record in manifest_rows(rows):
+            jsonl_file.write(json.dumps(record) + "\n")
+    with open(csv_path, "w", encoding="utf-8", newline="") as csv_file:
+        writer = csv.DictWriter(csv_file, FIELDS)
+        writer.writeheader()
+        writer.writerows(manifest_rows(rows))
+    return jsonl_path, csv_path
+
+
+def per_call_baseline(path: Path) -> float:
+    """Loads a manifest with one unchecked create_device call per row."""
+    manager = DeviceManager()
+    start = time.perf_counter()
+    for _, record in read_manifest(path):
+        record = dict(record)
+        device_type = DeviceType(record.pop("type"))
+        manager.create_device(device_type, record.pop("device_id"), record.pop("name"), **record)
+    return time.perf_counter() - start
+
+
+def bulk(path: Path, columnar: bool) -> float:
+    """Loads a manifest through the validating bulk loader."""
+    manager = DeviceManager(columnar=columnar)
+    start = time.perf_counter()
+    report = provision_file(manager, path)
+    elapsed = time.perf_counter() - start
+    assert not report.errors
+    return elapsed
+
+
+def main() -> None:
+    """Runs the benchmark and prints rows per second for each loader."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        jsonl_path, csv_path = write_manifests(Path(directory), args.rows)
+        results = {
+            "jsonl per-call create_device": per_call_baseline(jsonl_path),
+            "jsonl provision_file": bulk(jsonl_path, columnar=False),
+            "jsonl provision_file columnar": bulk(jsonl_path, columnar=True),
+            "csv provision_file": bulk(csv_path, columnar=False),
+            "csv provision_file columnar": bulk(csv_path, columnar=True),
+        }
+
+    print(f"rows: {args.rows}")
+    for label, elapsed in results.items():
+        print(f"{label:<32}{args.rows / elapsed:>12,.0f} rows/s")
+
+
+if __name__ == "__main__":
+    main()
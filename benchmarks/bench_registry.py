@@ -0,0 +1,121 @@
+"""Process startup with eager versus lazy device drivers as the catalog grows.
+
+Run with ``uv run python -m benchmarks.bench_registry --types 4 12 24 48``.
+Each catalog is made of generated driver modules registered through
+config. Eager startup imports every driver, as a hard-coded class map
+does; lazy startup, as in a CLI or worker, creates one device of one
+type and imports only its driver.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+# A driver with the import-time weight of a real one: a state enum, a
+# lookup table and a handful of methods to compile
+DRIVER_TEMPLATE = '''
+from enum import Enum
+from typing import Any, Dict
+
+from src.device import CustomDeviceType, Device
+
+Mode = Enum("Mode", [f"MODE_{{i}}" for i in range(64)])
+CODES = {{mode.name: mode.value for mode in Mode}}
+
+
+class Driver{index}(Device):
+    """Generated driver {index}."""
+
+    __slots__ = ("_mode", "_level")
+
+    DEVICE_TYPE = CustomDeviceType("type_{index}")
+
+    def __init__(self, device_id: str, name: str, level: int = 0) -> None:
+        super().__init__(device_id, name)
+        self._mode = Mode.MODE_0
+        self._level = level
+
+    def update_state(self, mode: str | None = None, level: int | None = None) -> None:
+        if mode is not None:
+            self._mode = Mode[mode]
+        if level is not None:
+            self._level = max(0, min(level, 100))
+        self._notify_state_change()
+
+    def load_state(self, state: Dict[str, Any]) -> None:
+        self._mode = Mode[state["mode"]]
+        self._level = state["level"]
+        self._notify_state_change()
+
+    def _build_state(self) -> Dict[str, Any]:
+        state = super()._build_state()
+        state.update({{"mode": self._mode.name, "level": self._level}})
+        return state
+'''
+
+STARTUP = """
+import json, sys
+from src.device import CustomDeviceType
+from src.device_manager import DEVICE_CLASSES, DeviceManager
+DEVICE_CLASSES.load_config(json.loads(sys.argv[1]))
+if sys.argv[2] == "eager":
+    list(DEVICE_CLASSES.values())
+DeviceManager().create_device(CustomDeviceType("type_0"), "d", "D")
+"""
+
+
+def write_catalog(root: Path, types: int) -> Dict[str, str]:
+    """Writes a package of generated drivers and returns its config."""
+    package = root / f"catalog_{types}"
+    package.mkdir()
+    (package / "__init__.py").write_text("")
+    config = {}
+    for index in range(types):
+        (package / f"driver_{index}.py").write_text(DRIVER_TEMPLATE.format(index=index))
+        config[f"type_{index}"] = f"{package.name}.driver_{index}:Driver{index}"
+    return config
+
+
+def startup_seconds(mode: str, config: Dict[str, str], env: Dict[str, str]) -> float:
+    """Returns the wall time of one fresh interpreter starting up."""
+    start = time.perf_counter()
+    subprocess.run(
+        [sys.executable, "-c", STARTUP, json.dumps(config), mode], env=env, check=True
+    )
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    """Runs the benchmark and prints median startup time per catalog size."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--types", type=int, nargs="+", default=[4, 12, 24, 48])
+    parser.add_argument("--runs", type=int, default=9)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        root = Path(directory)
+        env = dict(os.environ)
+        env["PYTHONPATH"] = os.pathsep.join([os.getcwd(), directory])
+        # Bytecode is written on the first run, time warm starts only
+        env.pop("PYTHONDONTWRITEBYTECODE", None)
+        print(f"{'types':<8}{'eager ms':>12}{'lazy ms':>12}{'saved ms':>12}")
+        for types in args.types:
+            config = write_catalog(root, types)
+            medians: List[float] = []
+            for mode in ("eager", "lazy"):
+                startup_seconds(mode, config, env)
+                runs = [startup_seconds(mode, config, env) for _ in range(args.runs)]
+                medians.append(statistics.median(runs) * 1000)
+            eager, lazy = medians
+            print(f"{types:<8}{eager:>12.1f}{lazy:>12.1f}{eager - lazy:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
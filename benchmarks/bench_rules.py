@@ -0,0 +1,63 @@
+"""Rules engine cost per state change with hundreds of thousands of rules.
+
+Run with ``uv run python -m benchmarks.bench_rules --rules 300000``.
+"""
+
+import argparse
+import time
+
+from src.device import DeviceType
+from src.device_manager import DeviceManager
+from src.dwelling_manager import DwellingManager
+from src.hub import Hub
+from src.rules import Action, RulesEngine, Trigger
+
+
+def main() -> None:
+    """Runs the benchmark and prints update throughput with and without rules."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rules", type=int, default=300_000)
+    parser.add_argument("--updates", type=int, default=200_000)
+    args = parser.parse_args()
+
+    devices = DeviceManager()
+    dwellings = DwellingManager()
+    # A lock and a switch per dwelling, one rule per lock
+    for i in range(args.rules):
+        hub = Hub(f"hub_{i}")
+        dwellings.create_dwelling(f"home_{i}").install_hub(hub)
+        hub.add_device(devices.create_device(DeviceType.LOCK, f"lock_{i}", "L"))
+        hub.add_device(devices.create_device(DeviceType.SWITCH, f"switch_{i}", "S"))
+    locks = [devices.get_device(f"lock_{i % args.rules}") for i in range(args.updates)]
+    switches = [
+        devices.get_device(f"switch_{i % args.rules}") for i in range(args.updates)
+    ]
+
+    def run(targets) -> float:
+        start = time.perf_counter()
+        for device in targets:
+            device.update_state()
+        return args.updates / (time.perf_counter() - start)
+
+    plain = run(switches)
+    engine = RulesEngine(devices, dwellings)
+    start = time.perf_counter()
+    for i in range(args.rules):
+        engine.add_rule(
+            Trigger("is_locked", "LOCKED", device_id=f"lock_{i}"),
+            [Action({}, device_type=DeviceType.SWITCH, where={"state": "ON"})],
+        )
+    compile_rate = args.rules / (time.perf_counter() - start)
+    unmatched = run(switches)
+    matched = run(locks)
+
+    print(f"rules                        {len(engine.list_rules()):>12,}")
+    print(f"add_rule (rules/s)           {compile_rate:>12,.0f}")
+    print(f"updates without engine (/s)  {plain:>12,.0f}")
+    print(f"updates, no rule (/s)        {unmatched:>12,.0f}")
+    print(f"updates, rule checked (/s)   {matched:>12,.0f}")
+    print(f"rules fired                  {engine.get_stats().fired:>12,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Scheduler tick cost: a day of minute ticks over a large schedule.
+
+Run with ``uv run python -m benchmarks.bench_scheduler --jobs 1000000``.
+"""
+
+import argparse
+import random
+import time
+
+from src.device import DeviceType
+from src.device_manager import DeviceManager
+from src.scheduler import DAY, Scheduler, VirtualClock
+
+
+def main() -> None:
+    """Runs the benchmark and prints scheduling and tick times."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--jobs", type=int, default=1_000_000)
+    parser.add_argument("--devices", type=int, default=100_000)
+    args = parser.parse_args()
+
+    manager = DeviceManager()
+    for i in range(args.devices):
+        manager.create_device(DeviceType.DIMMER, f"dimmer_{i}", "Dimmer")
+    clock = VirtualClock()
+    scheduler = Scheduler(manager, clock)
+    rng = random.Random(0)
+
+    start = time.perf_counter()
+    for i in range(args.jobs):
+        scheduler.schedule_every(
+            f"dimmer_{i % args.devices}",
+            rng.uniform(0, DAY),
+            DAY,
+            {"brightness": i % 100},
+        )
+    scheduling = time.perf_counter() - start
+
+    # Ticks with nothing due show the cost does not grow with the schedule
+    start = time.perf_counter()
+    for _ in range(1_000):
+        scheduler.run_due(clock() - 1)
+    idle = (time.perf_counter() - start) / 1_000
+
+    slowest = dispatched = 0.0
+    start = time.perf_counter()
+    for _ in range(24 * 60):
+        tick = time.perf_counter()
+        dispatched += scheduler.run_due(clock.advance(60))
+        slowest = max(slowest, time.perf_counter() - tick)
+    day = time.perf_counter() - start
+
+    print(f"jobs scheduled          {args.jobs:>12,}")
+    print(f"schedule (jobs/s)       {args.jobs / scheduling:>12,.0f}")
+    print(f"idle tick (us)          {idle * 1e6:>12.2f}")
+    print(f"dispatched in a day     {dispatched:>12,.0f}")
+    print(f"dispatch (jobs/s)       {dispatched / day:>12,.0f}")
+    print(f"slowest minute tick (ms){slowest * 1e3:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""Memory and throughput of the thermostat telemetry store.
+
+Run with ``uv run python -m benchmarks.bench_telemetry --thermostats 100000``.
+"""
+
+import argparse
+import gc
+import random
+import time
+import tracemalloc
+
+from src.telemetry import TelemetryStore, Tier
+
+
+def main() -> None:
+    """Runs the benchmark and prints memory, ingest rate and query times."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--thermostats", type=int, default=100_000)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--interval", type=float, default=5.0)
+    args = parser.parse_args()
+
+    ids = [f"thermo_{i}" for i in range(args.thermostats)]
+    rng = random.Random(0)
+    gc.collect()
+    tracemalloc.start()
+    store = TelemetryStore()
+    for device_id in ids:
+        store.record(device_id, 0, 70)
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    record = store.record
+    start = time.perf_counter()
+    for round_ in range(1, args.rounds + 1):
+        timestamp = round_ * args.interval
+        for device_id in ids:
+            record(device_id, timestamp, 65 + rng.random() * 10)
+    elapsed = time.perf_counter() - start
+    samples = args.rounds * args.thermostats
+
+    sample = ids[:: max(1, args.thermostats // 1000)]
+    start = time.perf_counter()
+    store.query(sample, 0, args.rounds * args.interval)
+    raw_query = time.perf_counter() - start
+    start = time.perf_counter()
+    store.query(sample, tier=Tier.MINUTE)
+    tier_query = time.perf_counter() - start
+
+    print(f"bytes per thermostat    {allocated / args.thermostats:>12.0f}")
+    print(f"total MB                {allocated / 2**20:>12.1f}")
+    print(f"samples/s               {samples / elapsed:>12,.0f}")
+    print(f"raw query, {len(sample)} devices  {raw_query * 1e3:>8.1f} ms")
+    print(f"minute query, {len(sample)} dev   {tier_query * 1e3:>8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Load tool: builds a synthetic fleet and replays a command trace against it.
+
+Fleets and generated traces are fully determined by their sizes, mixes and
+seeds, so runs are reproducible. A trace can be written to a JSONL file
+and replayed later, streamed rather than held in memory.
+
+Run with ``uv run python -m benchmarks.load --dwellings 100000 --commands 2000000``,
+``--mix switch=4 dimmer=2 lock=1 thermostat=1`` to change the fleet,
+``--write-trace trace.jsonl`` to save the trace and ``--trace trace.jsonl``
+to replay a saved one.
+"""
+
+import argparse
+import time
+from typing import Dict, List
+
+from src.device import DeviceType
+from src.device_manager import DeviceManager
+from src.dwelling_manager import DwellingManager
+from src.workload import (
+    FleetLayout,
+    build_fleet,
+    generate_trace,
+    get_peak_rss,
+    read_trace,
+    replay,
+    write_trace,
+)
+
+
+def parse_mix(pairs: List[str]) -> Dict[DeviceType, float]:
+    """Parses type=share pairs into a fleet mix."""
+    mix = {}
+    for pair in pairs:
+        type_value, _, share = pair.partition("=")
+        try:
+            mix[DeviceType(type_value)] = float(share)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"Invalid mix entry {pair!r}") from None
+    return mix
+
+
+def main() -> None:
+    """Builds the fleet, replays the trace and prints throughput and memory."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--dwellings", type=int, default=100_000)
+    parser.add_argument("--devices-per-dwelling", type=int, default=5)
+    parser.add_argument("--mix", nargs="+", help="type=share pairs, e.g. lock=1")
+    parser.add_argument("--commands", type=int, default=2_000_000)
+    parser.add_argument("--window", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--write-trace", help="write the generated trace here first")
+    parser.add_argument("--trace", help="replay this JSONL trace instead")
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix) if args.mix else None
+    layout = FleetLayout(args.dwellings, args.devices_per_dwelling, mix, args.seed)
+    devices, dwellings = DeviceManager(), DwellingManager()
+    start = time.perf_counter()
+    created = build_fleet(layout, devices, dwellings, seed=args.seed)
+    build_seconds = time.perf_counter() - start
+    fleet_rss = get_peak_rss()
+
+    trace_path = args.trace
+    if args.write_trace:
+        commands = generate_trace(layout, args.commands, seed=args.seed)
+        write_trace(args.write_trace, commands)
+        trace_path = args.write_trace
+    if trace_path:
+        commands = read_trace(trace_path)
+    else:
+        commands = generate_trace(layout, args.commands, seed=args.seed)
+    report = replay(commands, devices, dwellings, args.window)
+
+    print(f"devices                      {created:>14,}")
+    print(f"fleet build (devices/s)      {created / build_seconds:>14,.0f}")
+    print(f"peak RSS after build (MB)    {fleet_rss / 2**20:>14,.1f}")
+    print(f"commands replayed            {report.ops:>14,}")
+    print(f"errors                       {report.errors:>14,}")
+    print(f"overall (ops/s)              {report.ops_per_second:>14,.0f}")
+    print(f"median window (ops/s)        {report.get_median_rate():>14,.0f}")
+    print(f"sustained, worst window      {report.get_sustained_rate():>14,.0f}")
+    print(f"peak RSS (MB)                {report.peak_rss_bytes / 2**20:>14,.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+"""Scale benchmark suite for the device-management core.
+
+Times create, pair, install, update_state per device type, get_state,
+list and delete at each fleet size, reporting throughput, p50/p99 latency
+and peak traced memory. Results can be saved as JSON and compared against
+a saved baseline, exiting non-zero when a metric regresses.
+
+Run with ``uv run python -m benchmarks.suite --output results.json`` and
+later ``uv run python -m benchmarks.suite --compare results.json``.
+"""
+
+import argparse
+import gc
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from array import array
+from typing import Any, Callable, Dict, Iterable, List
+
+from src.device import AnyDeviceType, Device, DeviceType
+from src.device_manager import DeviceManager
+from src.dwelling_manager import DwellingManager
+from src.hub import Hub
+
+DEVICES_PER_HUB = 100
+LIST_CALLS = 5
+
+# Metrics compared against a baseline and whether higher values are better
+COMPARED = {"throughput": True, "p99_us": False, "peak_bytes": False}
+# Tail latencies of sub-microsecond calls are noisy, so they get more slack
+LATENCY_METRICS = ("p99_us",)
+
+UPDATES: Dict[DeviceType, Dict[str, Any]] = {
+    DeviceType.SWITCH: {},
+    DeviceType.DIMMER: {"brightness": 40},
+    DeviceType.LOCK: {},
+    DeviceType.THERMOSTAT: {"temperature": 70},
+}
+
+
+def measure(operation: str, size: int, calls: Iterable[Callable[[], Any]]) -> dict:
+    """Times each call and returns the throughput and latency percentiles."""
+    latencies = array("q")
+    clock = time.perf_counter_ns
+    start = clock()
+    for call in calls:
+        before = clock()
+        call()
+        latencies.append(clock() - before)
+    elapsed = (clock() - start) / 1e9
+    ordered = sorted(latencies)
+    return {
+        "size": size,
+        "operation": operation,
+        "ops": len(ordered),
+        "seconds": elapsed,
+        "throughput": len(ordered) / elapsed if elapsed else 0.0,
+        "p50_us": ordered[len(ordered) // 2] / 1e3 if ordered else 0.0,
+        "p99_us": ordered[min(len(ordered) - 1, len(ordered) * 99 // 100)] / 1e3
+        if ordered
+        else 0.0,
+    }
+
+
+def device_specs(size: int) -> List[tuple]:
+    """Returns (type, ID) pairs cycling through every device type."""
+    types = list(DeviceType)
+    return [(types[i % len(types)], f"device_{i}") for i in range(size)]
+
+
+def build_fleet(specs: List[tuple]) -> tuple:
+    """Creates, pairs and installs a fleet without timing it."""
+    devices = DeviceManager()
+    dwellings = DwellingManager()
+    for first in range(0, len(specs), DEVICES_PER_HUB):
+        hub = Hub(f"hub_{first // DEVICES_PER_HUB}")
+        dwellings.create_dwelling(f"home_{first // DEVICES_PER_HUB}").install_hub(hub)
+        for device_type, device_id in specs[first : first + DEVICES_PER_HUB]:
+            hub.add_device(devices.create_device(device_type, device_id, "Device"))
+    return devices, dwellings
+
+
+def peak_memory(specs: List[tuple]) -> int:
+    """Returns the peak traced bytes of building a fleet."""
+    gc.collect()
+    tracemalloc.start()
+    fleet = build_fleet(specs)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del fleet
+    return peak
+
+
+def run_size(size: int) -> List[dict]:
+    """Runs every operation at one fleet size."""
+    specs = device_specs(size)
+    manager = DeviceManager()
+    dwellings = DwellingManager()
+    results = [
+        measure(
+            "create",
+            size,
+            (
+                lambda t=device_type, i=device_id: manager.create_device(t, i, "Device")
+                for device_type, device_id in specs
+            ),
+        )
+    ]
+    results[0]["peak_bytes"] = peak_memory(specs)
+
+    devices = manager.list_devices()
+    hubs = [Hub(f"hub_{i}") for i in range(0, size, DEVICES_PER_HUB)]
+    results.append(
+        measure(
+            "pair",
+            size,
+            (
+                lambda d=device, h=hubs[i // DEVICES_PER_HUB]: h.add_device(d)
+                for i, device in enumerate(devices)
+            ),
+        )
+    )
+    results.append(
+        measure(
+            "install",
+            size,
+            (
+                lambda h=hub: dwellings.create_dwelling(h.get_hub_id()).install_hub(h)
+                for hub in hubs
+            ),
+        )
+    )
+
+    by_type: Dict[AnyDeviceType, List[Device]] = {t: [] for t in DeviceType}
+    for device in devices:
+        by_type[device.get_device_type()].append(device)
+    for device_type, kwargs in UPDATES.items():
+        results.append(
+            measure(
+                f"update_state.{device_type.value}",
+                size,
+                (
+                    lambda d=device: d.update_state(**kwargs)
+                    for device in by_type[device_type]
+                ),
+            )
+        )
+
+    results.append(measure("get_state", size, (d.get_state for d in devices)))
+    results.append(
+        measure("list", size, (manager.list_devices for _ in range(LIST_CALLS)))
+    )
+    results.append(
+        measure(
+            "delete",
+            size,
+            (lambda i=device_id: manager.delete_device(i) for _, device_id in specs),
+        )
+    )
+    return results
+
+
+def compare(
+    current: List[dict],
+    baseline: List[dict],
+    threshold: float,
+    latency_threshold: float,
+) -> List[str]:
+    """Returns a line per metric that regressed beyond its threshold."""
+    previous = {(r["size"], r["operation"]): r for r in baseline}
+    regressions = []
+    for result in current:
+        old = previous.get((result["size"], result["operation"]))
+        if old is None:
+            continue
+        for metric, higher_is_better in COMPARED.items():
+            if metric not in result or not old.get(metric):
+                continue
+            change = result[metric] / old[metric] - 1
+            limit = latency_threshold if metric in LATENCY_METRICS else threshold
+            if (-change if higher_is_better else change) > limit:
+                regressions.append(
+                    f"{result['operation']} @ {result['size']}: {metric} "
+                    f"{old[metric]:,.1f} -> {result[metric]:,.1f} ({change:+.0%})"
+                )
+    return regressions
+
+
+def print_table(results: List[dict]) -> None:
+    """Prints the results as a table."""
+    print(
+        f"{'size':>9} {'operation':<24}{'ops/s':>13}{'p50 us':>10}{'p99 us':>10}"
+        f"{'peak MB':>10}"
+    )
+    for r in results:
+        peak = f"{r['peak_bytes'] / 2**20:>10.1f}" if "peak_bytes" in r else ""
+        print(
+            f"{r['size']:>9} {r['operation']:<24}{r['throughput']:>13,.0f}"
+            f"{r['p50_us']:>10.2f}{r['p99_us']:>10.2f}{peak}"
+        )
+
+
+def main() -> None:
+    """Runs the suite, saves or compares the results."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[1_000, 100_000, 1_000_000]
+    )
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="baseline JSON file to compare against")
+    parser.add_argument(
+        "--results", help="compare this results file instead of running the suite"
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.15,
+        help="relative throughput or memory change flagged (default 0.15)",
+    )
+    parser.add_argument(
+        "--latency-threshold",
+        type=float,
+        default=0.5,
+        help="relative p99 latency change flagged (default 0.5)",
+    )
+    args = parser.parse_args()
+
+    if args.results:
+        with open(args.results) as file:
+            results = json.load(file)["results"]
+    else:
+        results = []
+        for size in args.sizes:
+            results.extend(run_size(size))
+            gc.collect()
+    print_table(results)
+
+    if args.output:
+        report = {
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "results": results,
+        }
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)["results"]
+        regressions = compare(
+            results, baseline, args.threshold, args.latency_threshold
+        )
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+        print("No regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+from bisect import bisect_right
+from collections import Counter
+from enum import Enum
+from itertools import compress, repeat
+from operator import attrgetter, eq, methodcaller
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Sequence, Tuple
+
+from src.column_store import MODE_CODES, ColumnStore
+from src.device import AnyDeviceType, Device, DeviceType
+from src.devices.lock import LOCKED, UNLOCKED
+from src.devices.switch import OFF_SWITCH, ON_SWITCH
+from src.devices.thermostat import THERMOSTAT_MODES
+
+
+class GroupBy(Enum):
+    """Keys aggregates can be grouped by."""
+
+    TYPE = "type"  # Device type
+    HUB = "hub"  # Hub ID
+    DWELLING = "dwelling"  # Dwelling ID
+
+
+class Attribute(NamedTuple):
+    """A device attribute aggregates can be computed over."""
+
+    device_type: AnyDeviceType | None  # Type carrying it, None for every type
+    read: Callable[[Iterable[Device]], List[Any]]  # Reads it from devices or views
+    column: str  # Column holding it in a ColumnStore
+    numeric: bool  # Whether it supports sum/mean/min/max
+
+
+def _calling(method: str, convert: Callable[[Any], Any] | None = None):
+    """Returns a reader mapping a getter, and a conversion, over devices."""
+    getter = methodcaller(method)
+    if convert is None:
+        return lambda devices: list(map(getter, devices))
+    return lambda devices: list(map(convert, map(getter, devices)))
+
+
+def _state_lookup(table: Dict[Any, Any]):
+    """Returns a reader translating the shared state objects of devices."""
+    get_state = attrgetter("state")
+    return lambda devices: list(map(table.__getitem__, map(get_state, devices)))
+
+
+_MODE_NAMES = [mode.name for mode in MODE_CODES]
+_device_type_of = attrgetter("DEVICE_TYPE")
+
+# Readers map C-level getters over whole groups instead of a loop per device.
+# Booleans read as 0/1, so their mean is the share of devices where they hold.
+ATTRIBUTES: Dict[str, Attribute] = {
+    "brightness": Attribute(
+        DeviceType.DIMMER, _calling("get_brightness"), "brightness", True
+    ),
+    "temperature": Attribute(
+        DeviceType.THERMOSTAT, _calling("get_temperature"), "temperature", True
+    ),
+    "mode": Attribute(
+        DeviceType.THERMOSTAT,
+        _state_lookup({THERMOSTAT_MODES[mode]: mode.name for mode in MODE_CODES}),
+        "mode",
+        False,
+    ),
+    "locked": Attribute(
+        DeviceType.LOCK, _state_lookup({LOCKED: 1, UNLOCKED: 0}), "active", True
+    ),
+    "on": Attribute(
+        DeviceType.SWITCH, _state_lookup({ON_SWITCH: 1, OFF_SWITCH: 0}), "active", True
+    ),
+    "paired": Attribute(None, _calling("get_paired", int), "paired", True),
+}
+
+Groups = Iterable[Tuple[Any, List[Any]]]
+
+
+class Summary(NamedTuple):
+    """Count, sum, mean, min and max of a group of values."""
+
+    count: int  # type: ignore[assignment]
+    total: float
+    mean: float
+    min: float
+    max: float
+
+
+def get_attribute(attribute: str) -> Attribute:
+    """Returns an attribute by name, raising ValueError if unknown."""
+    try:
+        return ATTRIBUTES[attribute]
+    except KeyError:
+        raise ValueError(f"Unknown attribute: {attribute}") from None
+
+
+def device_values(
+    devices: Iterable[Device], attribute: Attribute, device_type: AnyDeviceType | None
+) -> List[Any]:
+    """Reads an attribute from the devices of a type, or of every type."""
+    device_type = device_type or attribute.device_type
+    if device_type is not None:
+        devices = list(devices)
+        types = map(_device_type_of, devices)
+        devices = compress(devices, map(eq, types, repeat(device_type)))
+    return attribute.read(devices)
+
+
+def store_values(
+    store: ColumnStore, attribute: Attribute, device_type: AnyDeviceType | None
+) -> List[Any]:
+    """Reads an attribute straight from the columns of a store."""
+    values = store.get_column(attribute.column, device_type or attribute.device_type)
+    if attribute.column == "mode":
+        return [_MODE_NAMES[code] for code in values]
+    return values
+
+
+def device_groups(
+    devices: Iterable[Device], attribute: Attribute, by_type: bool
+) -> Groups:
+    """Yields the values of one group, or of one group per device type."""
+    devices = list(devices)
+    if not by_type:
+        yield None, device_values(devices, attribute, None)
+        return
+    types = [attribute.device_type] if attribute.device_type else list(DeviceType)
+    for device_type in types:
+        yield device_type, device_values(devices, attribute, device_type)
+
+
+def store_groups(store: ColumnStore, attribute: Attribute, by_type: bool) -> Groups:
+    """Yields store values as one group, or as one group per device type."""
+    if not by_type:
+        yield None, store_values(store, attribute, None)
+        return
+    types = [attribute.device_type] if attribute.device_type else list(DeviceType)
+    for device_type in types:
+        yield device_type, store_values(store, attribute, device_type)
+
+
+def summarize(groups: Groups, attribute: Attribute) -> Dict[Any, Summary]:
+    """Summarizes every non-empty group of numeric values."""
+    if not attribute.numeric:
+        raise ValueError("Categorical attributes only support histograms")
+    summaries: Dict[Any, Summary] = {}
+    for key, values in groups:
+        if values:
+            total = sum(values)
+            summaries[key] = Summary(
+                len(values), total, total / len(values), min(values), max(values)
+            )
+    return summaries
+
+
+def histogram(
+    groups: Groups, bins: Sequence[float] | None = None
+) -> Dict[Any, Dict[Any, int]]:
+    """Counts the values of every non-empty group.
+
+    Without bins each distinct value is counted. With sorted bin edges,
+    values are counted per [edge, next edge) keyed by the lower edge, the
+    last edge closes the final bin and values outside the edges are skipped.
+    """
+    histograms: Dict[Any, Dict[Any, int]] = {}
+    for key, values in groups:
+        if not values:
+            continue
+        if bins is None:
+            histograms[key] = dict(Counter(values))
+            continue
+        counts = [0] * (len(bins) - 1)
+        last = len(counts) - 1
+        for value in values:
+            position = bisect_right(bins, value) - 1
+            if position == last + 1 and value == bins[-1]:
+                position = last
+            if 0 <= position <= last:
+                counts[position] += 1
+        histograms[key] = dict(zip(bins, counts))
+    return histograms
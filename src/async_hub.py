@@ -0,0 +1,201 @@
+import asyncio
+from collections import deque
+from typing import Any, Deque, Dict, Iterable, List, Tuple
+
+from src.dedup import DedupCache
+from src.hub import Hub
+
+# A queued command: update_state kwargs and the future reporting its outcome
+_Command = Tuple[Dict[str, Any], "asyncio.Future[None]"]
+
+
+class _Lane:
+    """Command queue and worker of one device."""
+
+    __slots__ = ("queue", "task", "pending")
+
+    def __init__(self, queue_size: int) -> None:
+        """Initializes an idle lane."""
+        self.queue: asyncio.Queue[_Command] = asyncio.Queue(queue_size)
+        self.task: asyncio.Task[None] | None = None  # Worker draining the queue
+        self.pending = 0  # Commands submitted and not yet applied
+
+
+class AsyncHub:
+    """Asyncio front end that applies commands to the devices of a hub.
+
+    Commands for one device run in submission order, commands for
+    different devices interleave. Each device queue holds at most
+    queue_size commands and at most max_in_flight commands are
+    outstanding overall; submitters wait when either bound is reached.
+    Devices without queued commands hold no queue or task.
+    """
+
+    def __init__(
+        self,
+        hub: Hub,
+        queue_size: int = 64,
+        max_in_flight: int = 10_000,
+        dedup_cache: DedupCache | None = None,
+    ) -> None:
+        """Initializes the front end over a hub.
+
+        The dedup cache remembers command IDs, one with default bounds is
+        created on the first command ID otherwise.
+        """
+        self._hub = hub
+        self._queue_size = queue_size
+        self._lanes: Dict[str, _Lane] = {}  # Lanes of devices with pending commands
+        self._free = max_in_flight  # In-flight slots not taken
+        # Submitters waiting for a slot, oldest first. asyncio.Semaphore scans
+        # its waiters on every release, which turns large backlogs quadratic.
+        self._waiters: Deque[asyncio.Future[None]] = deque()
+        self._commands = dedup_cache  # Command ID to device ID and outcome future
+
+    def get_hub(self) -> Hub:
+        """Returns the hub the commands are applied through."""
+        return self._hub
+
+    async def submit(
+        self, device_id: str, command_id: str | None = None, **kwargs
+    ) -> None:
+        """Queues an update_state command and waits until it has been applied.
+
+        With a command ID, a retry of a command that is queued or was
+        applied recently waits for the original and shares its outcome
+        instead of applying again. Failed commands are forgotten, so their
+        later retries run.
+        """
+        commands = self._commands
+        if command_id is not None:
+            if commands is None:
+                commands = self._commands = DedupCache()
+            original = commands.get(command_id)
+            if original is not None:
+                original_device_id, original_done = original
+                if original_device_id != device_id:
+                    raise ValueError(
+                        f"Command {command_id!r} was already used for "
+                        f"{original_device_id}"
+                    )
+                # Shielded, so a cancelled retry leaves the original be
+                await asyncio.shield(original_done)
+                return
+        if device_id not in self._hub.get_paired_devices():
+            raise ValueError(f"Unknown device: {device_id}")
+        lane = self._lanes.get(device_id)
+        if lane is None:
+            lane = self._lanes[device_id] = _Lane(self._queue_size)
+        # Counted before waiting, so the lane outlives an idle worker meanwhile
+        lane.pending += 1
+        done: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        if command_id is not None:
+            commands.put(command_id, (device_id, done))  # type: ignore[union-attr]
+        try:
+            try:
+                await self._acquire()
+                try:
+                    await lane.queue.put((kwargs, done))
+                except BaseException:
+                    self._release()
+                    raise
+            except BaseException:
+                self._settle(device_id, lane)
+                raise
+        except BaseException:
+            if command_id is not None:
+                # Never queued: forget it and release the retries waiting on it
+                commands.discard(command_id)  # type: ignore[union-attr]
+                done.cancel()
+            raise
+        if lane.task is None:
+            lane.task = asyncio.create_task(self._drain(device_id, lane))
+        if command_id is None:
+            await done
+            return
+        try:
+            # Shielded, as a queued command is applied even if its submitter leaves
+            await asyncio.shield(done)
+        except Exception:
+            commands.discard(command_id)  # type: ignore[union-attr]
+            raise
+
+    async def submit_many(
+        self,
+        commands: Iterable[Tuple[str, Dict[str, Any]]],
+        return_exceptions: bool = False,
+    ) -> List[Any]:
+        """Submits (device_id, kwargs) commands together, like asyncio.gather."""
+        return await asyncio.gather(
+            *(self.submit(device_id, **kwargs) for device_id, kwargs in commands),
+            return_exceptions=return_exceptions,
+        )
+
+    async def join(self) -> None:
+        """Waits until every submitted command has been applied."""
+        while self._lanes:
+            tasks = [lane.task for lane in self._lanes.values() if lane.task]
+            if tasks:
+                await asyncio.gather(*tasks)
+            else:
+                await asyncio.sleep(0)
+
+    def get_pending(self) -> int:
+        """Returns the number of commands not yet applied."""
+        return sum(lane.pending for lane in self._lanes.values())
+
+    async def _drain(self, device_id: str, lane: _Lane) -> None:
+        """Applies the queued commands of a device one at a time."""
+        queue = lane.queue
+        while True:
+            try:
+                kwargs, done = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                lane.task = None
+                return
+            device = self._hub.get_paired_devices().get(device_id)
+            try:
+                if device is None:
+                    raise ValueError(f"Unknown device: {device_id}")
+                device.update_state(**kwargs)
+            except Exception as error:
+                if not done.cancelled():
+                    done.set_exception(error)
+            else:
+                if not done.cancelled():
+                    done.set_result(None)
+            self._release()
+            self._settle(device_id, lane)
+            # Let other devices and blocked submitters run between commands
+            await asyncio.sleep(0)
+
+    async def _acquire(self) -> None:
+        """Takes an in-flight slot, waiting in line when none is free."""
+        if self._free and not self._waiters:
+            self._free -= 1
+            return
+        slot: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        self._waiters.append(slot)
+        try:
+            await slot
+        except BaseException:
+            # A cancelled slot is skipped by _release, a granted one passed on
+            if not slot.cancelled():
+                self._release()
+            raise
+
+    def _release(self) -> None:
+        """Hands an in-flight slot to the oldest waiter, or frees it."""
+        waiters = self._waiters
+        while waiters:
+            slot = waiters.popleft()
+            if not slot.done():
+                slot.set_result(None)
+                return
+        self._free += 1
+
+    def _settle(self, device_id: str, lane: _Lane) -> None:
+        """Counts a command as finished and drops the lane once it is idle."""
+        lane.pending -= 1
+        if lane.pending == 0 and self._lanes.get(device_id) is lane:
+            del self._lanes[device_id]
@@ -0,0 +1,501 @@
+import mmap
+import os
+import struct
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+from src.column_store import MODE_CODES, TYPE_CODES
+from src.device import AnyDeviceType, Device, DeviceType
+from src.device_manager import DEVICE_CLASSES, DeviceManager
+from src.devices.lock import LockStateRepr
+from src.devices.switch import SwitchStateRepr
+from src.devices.thermostat import ThermostatStateRepr
+from src.dwelling import Dwelling
+from src.dwelling_manager import DwellingManager
+from src.hub import Hub
+
+MAGIC = b"DMSNAP"
+VERSION = 1
+
+# magic, version, device/hub/member/dwelling counts, section offsets
+_HEADER = struct.Struct("<6sHIIIIQQQQQ")
+# id offset and length, the sort key every table starts with
+_KEY = struct.Struct("<IH")
+# id, name and pin strings, type, flags, brightness, mode, temperature
+_DEVICE = struct.Struct("<IHIHIHBBiBd")
+# id string, first member and member count
+_HUB = struct.Struct("<IHII")
+# device index of a hub member
+_MEMBER = struct.Struct("<I")
+# id string, occupancy, hub index or -1
+_DWELLING = struct.Struct("<IHBi")
+
+_PAIRED = 1  # Device flag bits
+_ACTIVE = 2
+_HAS_PIN = 4
+_PIN_WITHHELD = 8  # Pin code set but left out of the string table
+
+_CODE_OF_TYPE: Dict[AnyDeviceType, int] = {
+    device_type: code for code, device_type in enumerate(TYPE_CODES)
+}
+_CODE_OF_MODE = {mode.name: code for code, mode in enumerate(MODE_CODES)}
+
+
+class _Strings:
+    """String table under construction, deduplicating repeated values."""
+
+    def __init__(self) -> None:
+        """Initializes an empty table."""
+        self._chunks: List[bytes] = []
+        self._offsets: Dict[str, Tuple[int, int]] = {}
+        self._size = 0
+
+    def add(self, value: str) -> Tuple[int, int]:
+        """Returns the offset and length of a string, adding it if new."""
+        found = self._offsets.get(value)
+        if found is None:
+            encoded = value.encode()
+            found = self._offsets[value] = (self._size, len(encoded))
+            self._chunks.append(encoded)
+            self._size += len(encoded)
+        return found
+
+    def to_bytes(self) -> bytes:
+        """Returns the encoded table."""
+        return b"".join(self._chunks)
+
+
+def write_binary_snapshot(
+    path: str | Path,
+    device_manager: DeviceManager,
+    dwelling_manager: DwellingManager,
+    hubs: Iterable[Hub] = (),
+    include_secrets: bool = False,
+) -> None:
+    """Writes devices, hubs and dwellings to a mappable snapshot file.
+
+    Hubs installed in the dwellings are included, together with any extra
+    hubs passed in. Lock pin codes are written in plaintext only with
+    include_secrets, otherwise locks built from the snapshot have none.
+    """
+    strings = _Strings()
+
+    devices = sorted(
+        device_manager.list_devices(), key=lambda d: d.get_device_id().encode()
+    )
+    index_of = {device.get_device_id(): i for i, device in enumerate(devices)}
+    device_table = bytearray()
+    for device in devices:
+        device_table += _pack_device(device, strings, include_secrets)
+
+    all_hubs = {hub.get_hub_id(): hub for hub in hubs}
+    for dwelling in dwelling_manager.list_dwellings():
+        hub = dwelling.get_hub()
+        if hub is not None:
+            all_hubs[hub.get_hub_id()] = hub
+    hub_ids = sorted(all_hubs, key=str.encode)
+    hub_index = {hub_id: i for i, hub_id in enumerate(hub_ids)}
+    hub_table = bytearray()
+    member_table = bytearray()
+    members = 0
+    for hub_id in hub_ids:
+        paired = [
+            index_of[device_id]
+            for device_id in all_hubs[hub_id].get_paired_devices()
+            if device_id in index_of
+        ]
+        hub_table += _HUB.pack(*strings.add(hub_id), members, len(paired))
+        for index in paired:
+            member_table += _MEMBER.pack(index)
+        members += len(paired)
+
+    dwellings = sorted(
+        dwelling_manager.list_dwellings(), key=lambda d: d.get_dwelling_id().encode()
+    )
+    dwelling_table = bytearray()
+    for dwelling in dwellings:
+        hub = dwelling.get_hub()
+        dwelling_table += _DWELLING.pack(
+            *strings.add(dwelling.get_dwelling_id()),
+            dwelling.get_is_occupied(),
+            -1 if hub is None else hub_index[hub.get_hub_id()],
+        )
+
+    string_table = strings.to_bytes()
+    devices_at = _HEADER.size
+    hubs_at = devices_at + len(device_table)
+    members_at = hubs_at + len(hub_table)
+    dwellings_at = members_at + len(member_table)
+    strings_at = dwellings_at + len(dwelling_table)
+    header = _HEADER.pack(
+        MAGIC,
+        VERSION,
+        len(devices),
+        len(hub_ids),
+        members,
+        len(dwellings),
+        devices_at,
+        hubs_at,
+        members_at,
+        dwellings_at,
+        strings_at,
+    )
+
+    path = Path(path)
+    pending = path.with_name(path.name + ".tmp")
+    with open(pending, "wb") as snapshot:
+        for section in (header, device_table, hub_table, member_table, dwelling_table):
+            snapshot.write(section)
+        snapshot.write(string_table)
+        snapshot.flush()
+        os.fsync(snapshot.fileno())
+    os.replace(pending, path)
+
+
+def _pack_device(device: Device, strings: _Strings, include_secrets: bool) -> bytes:
+    """Packs a device record, adding its strings to the table."""
+    device_type = device.get_device_type()
+    code = _CODE_OF_TYPE.get(device_type)
+    if code is None:
+        raise ValueError(f"Binary snapshots do not support {device_type.value}")
+    state = device.get_state()
+    flags = _PAIRED if state["is_paired"] else 0
+    pin_code = device.get_config().get("pin_code")
+    pin = (0, 0)
+    if pin_code is not None:
+        flags |= _HAS_PIN
+        if include_secrets:
+            pin = strings.add(pin_code)
+        else:
+            flags |= _PIN_WITHHELD
+    brightness = state.get("brightness", 0)
+    if not (
+        isinstance(brightness, (int, float))
+        and float(brightness).is_integer()
+        and 0 <= brightness <= 255
+    ):
+        raise ValueError(
+            f"Brightness {brightness!r} of {device.get_device_id()} "
+            "is not a whole number from 0 to 255"
+        )
+    if state.get("state") == SwitchStateRepr.ON.name:
+        flags |= _ACTIVE
+    if state.get("is_locked") == LockStateRepr.LOCKED.name:
+        flags |= _ACTIVE
+    return _DEVICE.pack(
+        *strings.add(device.get_device_id()),
+        *strings.add(device.get_name()),
+        *pin,
+        code,
+        flags,
+        int(brightness),
+        _CODE_OF_MODE[state.get("mode", ThermostatStateRepr.OFF.name)],
+        state.get("temperature", 0.0),
+    )
+
+
+class MappedFleet:
+    """Read-mostly fleet served straight from a memory-mapped snapshot.
+
+    Opening maps the file and reads the header only. Reads are answered
+    from the mapped buffer; get_device, get_hub and get_dwelling build
+    Python objects on demand for callers that want to modify them, and
+    later reads of those objects see their changes.
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        """Maps a snapshot file and validates its header."""
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._map) < _HEADER.size:
+            self.close()
+            raise ValueError("Not a fleet snapshot")
+        (
+            magic,
+            version,
+            self._device_count,
+            self._hub_count,
+            self._member_count,
+            self._dwelling_count,
+            self._devices_at,
+            self._hubs_at,
+            self._members_at,
+            self._dwellings_at,
+            self._strings_at,
+        ) = _HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError("Not a fleet snapshot")
+        if version != VERSION:
+            self.close()
+            raise ValueError(f"Unsupported snapshot version {version}")
+        self._devices: Dict[str, Device] = {}  # Materialized devices
+        self._hubs: Dict[str, Hub] = {}  # Materialized hubs
+        self._dwellings: Dict[str, Dwelling] = {}  # Materialized dwellings
+
+    def close(self) -> None:
+        """Unmaps the snapshot."""
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self) -> "MappedFleet":
+        """Returns the fleet for use in a with block."""
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        """Unmaps the snapshot at the end of a with block."""
+        self.close()
+
+    def __len__(self) -> int:
+        """Returns the number of devices in the snapshot."""
+        return self._device_count
+
+    def get_state(self, device_id: str) -> Dict[str, Any]:
+        """Returns the state of a device, as Device.get_state would."""
+        device = self._devices.get(device_id)
+        if device is not None:
+            return device.get_state()
+        index = self._find(
+            self._devices_at, self._device_count, _DEVICE.size, device_id
+        )
+        if index < 0:
+            raise KeyError(device_id)
+        return self._device_state(index)
+
+    def list_device_ids(self) -> Iterator[str]:
+        """Iterates over the device IDs in the snapshot, in sorted order."""
+        for index in range(self._device_count):
+            yield self._string(self._devices_at + index * _DEVICE.size)
+
+    def list_hub_devices(self, hub_id: str) -> List[str]:
+        """Lists the IDs of the devices paired to a hub."""
+        hub = self._hubs.get(hub_id)
+        if hub is not None:
+            return list(hub.get_paired_devices())
+        index = self._find(self._hubs_at, self._hub_count, _HUB.size, hub_id)
+        if index < 0:
+            raise KeyError(hub_id)
+        return [
+            self._string(self._devices_at + member * _DEVICE.size)
+            for member in self._hub_members(index)
+        ]
+
+    def get_dwelling_state(self, dwelling_id: str) -> Dict[str, Any]:
+        """Returns the occupancy and hub ID of a dwelling."""
+        dwelling = self._dwellings.get(dwelling_id)
+        if dwelling is not None:
+            hub = dwelling.get_hub()
+            return {
+                "dwelling_id": dwelling_id,
+                "is_occupied": dwelling.get_is_occupied(),
+                "hub_id": None if hub is None else hub.get_hub_id(),
+            }
+        index = self._find(
+            self._dwellings_at, self._dwelling_count, _DWELLING.size, dwelling_id
+        )
+        if index < 0:
+            raise KeyError(dwelling_id)
+        _, _, occupied, hub = _DWELLING.unpack_from(
+            self._map, self._dwellings_at + index * _DWELLING.size
+        )
+        hub_id = None if hub < 0 else self._string(self._hubs_at + hub * _HUB.size)
+        return {
+            "dwelling_id": dwelling_id,
+            "is_occupied": bool(occupied),
+            "hub_id": hub_id,
+        }
+
+    def get_device(self, device_id: str) -> Device | None:
+        """Returns a device object to modify, building it on first use."""
+        device = self._devices.get(device_id)
+        if device is None:
+            index = self._find(
+                self._devices_at, self._device_count, _DEVICE.size, device_id
+            )
+            if index >= 0:
+                device = self._build_device(index)
+        return device
+
+    def get_hub(self, hub_id: str) -> Hub | None:
+        """Returns a hub object to modify, building it and its devices on first use."""
+        hub = self._hubs.get(hub_id)
+        if hub is None:
+            index = self._find(self._hubs_at, self._hub_count, _HUB.size, hub_id)
+            if index >= 0:
+                hub = self._build_hub(index)
+        return hub
+
+    def get_dwelling(self, dwelling_id: str) -> Dwelling | None:
+        """Returns a dwelling object to modify, building it on first use."""
+        dwelling = self._dwellings.get(dwelling_id)
+        if dwelling is not None:
+            return dwelling
+        index = self._find(
+            self._dwellings_at, self._dwelling_count, _DWELLING.size, dwelling_id
+        )
+        if index < 0:
+            return None
+        _, _, occupied, hub_index = _DWELLING.unpack_from(
+            self._map, self._dwellings_at + index * _DWELLING.size
+        )
+        dwelling = self._dwellings[dwelling_id] = Dwelling(dwelling_id)
+        if occupied:
+            dwelling.set_occupancy()
+        if hub_index >= 0:
+            hub_id = self._string(self._hubs_at + hub_index * _HUB.size)
+            dwelling.install_hub(self._hubs.get(hub_id) or self._build_hub(hub_index))
+        return dwelling
+
+    def load(
+        self,
+        device_manager: DeviceManager | None = None,
+        dwelling_manager: DwellingManager | None = None,
+    ) -> Tuple[DeviceManager, DwellingManager]:
+        """Builds the whole fleet into managers, for callers that need all objects."""
+        device_manager = device_manager or DeviceManager()
+        dwelling_manager = dwelling_manager or DwellingManager()
+        for index in range(self._device_count):
+            device_id = self._string(self._devices_at + index * _DEVICE.size)
+            device = self._devices.get(device_id)
+            if device is None:
+                device_type = TYPE_CODES[self._device_code(index)]
+                state = self._device_state(index)
+                config = self._device_config(index)
+            else:
+                device_type = device.get_device_type()
+                state = device.get_state()
+                config = device.get_config()
+            created = device_manager.create_device(
+                device_type, device_id, state["name"], **config
+            )
+            created.load_state(state)
+
+        hubs: Dict[str, Hub] = {}
+        for index in range(self._hub_count):
+            hub_id = self._string(self._hubs_at + index * _HUB.size)
+            hub = hubs[hub_id] = Hub(hub_id)
+            for device_id in self.list_hub_devices(hub_id):
+                device = device_manager.get_device(device_id)
+                if device is not None:
+                    hub.add_device(device)
+
+        for index in range(self._dwelling_count):
+            dwelling_id = self._string(self._dwellings_at + index * _DWELLING.size)
+            state = self.get_dwelling_state(dwelling_id)
+            dwelling = dwelling_manager.create_dwelling(dwelling_id)
+            if state["is_occupied"]:
+                dwelling.set_occupancy()
+            if state["hub_id"] is not None:
+                dwelling.install_hub(hubs[state["hub_id"]])
+        return device_manager, dwelling_manager
+
+    def _device_code(self, index: int) -> int:
+        """Returns the type code of a mapped device record."""
+        record_at = self._devices_at + index * _DEVICE.size
+        return _DEVICE.unpack_from(self._map, record_at)[6]
+
+    def _find(self, table_at: int, count: int, size: int, key: str) -> int:
+        """Binary searches a table sorted by its ID string, -1 if absent."""
+        wanted = key.encode()
+        mapped = self._map
+        strings_at = self._strings_at
+        low, high = 0, count
+        while low < high:
+            middle = (low + high) // 2
+            offset, length = _KEY.unpack_from(mapped, table_at + middle * size)
+            start = strings_at + offset
+            if mapped[start : start + length] < wanted:
+                low = middle + 1
+            else:
+                high = middle
+        if low < count:
+            offset, length = _KEY.unpack_from(mapped, table_at + low * size)
+            start = strings_at + offset
+            if mapped[start : start + length] == wanted:
+                return low
+        return -1
+
+    def _string(self, record_at: int) -> str:
+        """Decodes the ID string a record starts with."""
+        offset, length = _KEY.unpack_from(self._map, record_at)
+        start = self._strings_at + offset
+        return self._map[start : start + length].decode()
+
+    def _text(self, offset: int, length: int) -> str:
+        """Decodes a string from the string table."""
+        start = self._strings_at + offset
+        return self._map[start : start + length].decode()
+
+    def _hub_members(self, index: int) -> Iterator[int]:
+        """Iterates over the device indexes of a hub."""
+        _, _, first, count = _HUB.unpack_from(
+            self._map, self._hubs_at + index * _HUB.size
+        )
+        members_at = self._members_at
+        for member in range(first, first + count):
+            yield _MEMBER.unpack_from(self._map, members_at + member * _MEMBER.size)[0]
+
+    def _device_state(self, index: int) -> Dict[str, Any]:
+        """Builds the state dict of a mapped device record."""
+        (
+            id_offset,
+            id_length,
+            name_offset,
+            name_length,
+            _,
+            _,
+            code,
+            flags,
+            brightness,
+            mode,
+            temperature,
+        ) = _DEVICE.unpack_from(self._map, self._devices_at + index * _DEVICE.size)
+        state: Dict[str, Any] = {
+            "device_id": self._text(id_offset, id_length),
+            "name": self._text(name_offset, name_length),
+            "is_paired": bool(flags & _PAIRED),
+        }
+        device_type = TYPE_CODES[code]
+        active = bool(flags & _ACTIVE)
+        if device_type is DeviceType.SWITCH:
+            switched = SwitchStateRepr.ON if active else SwitchStateRepr.OFF
+            state["state"] = switched.name
+        elif device_type is DeviceType.DIMMER:
+            state["brightness"] = brightness
+        elif device_type is DeviceType.LOCK:
+            locked = LockStateRepr.LOCKED if active else LockStateRepr.UNLOCKED
+            state["is_locked"] = locked.name
+            state["pin_code_set"] = bool(flags & _HAS_PIN)
+        else:
+            state["temperature"] = temperature
+            state["mode"] = MODE_CODES[mode].name
+        return state
+
+    def _device_config(self, index: int) -> Dict[str, Any]:
+        """Returns the constructor kwargs of a mapped device record."""
+        record = _DEVICE.unpack_from(self._map, self._devices_at + index * _DEVICE.size)
+        if not record[7] & _HAS_PIN or record[7] & _PIN_WITHHELD:
+            return {}
+        return {"pin_code": self._text(record[4], record[5])}
+
+    def _build_device(self, index: int) -> Device:
+        """Builds and remembers the device object of a mapped record."""
+        state = self._device_state(index)
+        device = DEVICE_CLASSES[TYPE_CODES[self._device_code(index)]](
+            state["device_id"], state["name"], **self._device_config(index)
+        )
+        device.load_state(state)
+        if state["is_paired"]:
+            device.pair()
+        self._devices[state["device_id"]] = device
+        return device
+
+    def _build_hub(self, index: int) -> Hub:
+        """Builds and remembers a hub object with its device objects."""
+        hub_id = self._string(self._hubs_at + index * _HUB.size)
+        hub = self._hubs[hub_id] = Hub(hub_id)
+        for member in self._hub_members(index):
+            device_id = self._string(self._devices_at + member * _DEVICE.size)
+            device = self._devices.get(device_id) or self._build_device(member)
+            hub.add_device(device)
+        return hub
@@ -0,0 +1,89 @@
+from typing import Dict, Iterable, List, NamedTuple
+
+from src.device import Device, DeviceObserver, next_version
+
+
+class Changes(NamedTuple):
+    """Devices changed and removed after a version, oldest first.
+
+    With resync set, the version was too old for the deletions since to be
+    known: changed holds every device and the client replaces its copy.
+    """
+
+    version: int  # Version to pass to the next changes_since call
+    changed: List[Device]
+    removed: List[str]  # IDs of devices deleted or removed since
+    resync: bool = False
+
+
+class ChangeLog(DeviceObserver):
+    """Devices ordered by their last change, so deltas cost only the churn.
+
+    Deletions are remembered up to max_removed of them. Clients polling
+    from before the oldest forgotten one get a full resync instead.
+    """
+
+    __slots__ = ("_changed", "_removed", "_max_removed", "_horizon")
+
+    def __init__(
+        self, devices: Iterable[Device] = (), max_removed: int = 65_536
+    ) -> None:
+        """Initializes the log with the devices that already exist."""
+        if max_removed < 1:
+            raise ValueError("max_removed must be positive")
+        # Device ID to device, moved to the end on every change
+        self._changed: Dict[str, Device] = {
+            device.get_device_id(): device
+            for device in sorted(devices, key=lambda device: device.get_version())
+        }
+        self._removed: Dict[str, int] = {}  # Deleted device ID to its version
+        self._max_removed = max_removed
+        self._horizon = 0  # Version of the newest forgotten deletion
+
+    def on_device_created(self, device: Device) -> None:
+        """Records a created device."""
+        self._removed.pop(device.get_device_id(), None)
+        self._touch(device)
+
+    def on_device_deleted(self, device: Device) -> None:
+        """Records a deleted device."""
+        device_id = device.get_device_id()
+        self._changed.pop(device_id, None)
+        self._removed.pop(device_id, None)
+        self._removed[device_id] = next_version()
+        if len(self._removed) > self._max_removed:
+            oldest = next(iter(self._removed))
+            self._horizon = self._removed.pop(oldest)
+
+    def on_state_change(self, device: Device) -> None:
+        """Records a state change."""
+        self._touch(device)
+
+    def on_pair_change(self, device: Device) -> None:
+        """Records a paired status change."""
+        self._touch(device)
+
+    def changes_since(self, version: int) -> Changes:
+        """Returns the devices changed and deleted after a version."""
+        if version < self._horizon:
+            return Changes(next_version(), list(self._changed.values()), [], True)
+        # Both dicts are in version order, so walk back from the newest entry
+        changed: List[Device] = []
+        for device in reversed(self._changed.values()):
+            if device.get_version() <= version:
+                break
+            changed.append(device)
+        removed: List[str] = []
+        for device_id, removed_at in reversed(self._removed.items()):
+            if removed_at <= version:
+                break
+            removed.append(device_id)
+        changed.reverse()
+        removed.reverse()
+        return Changes(next_version(), changed, removed)
+
+    def _touch(self, device: Device) -> None:
+        """Moves a device to the newest end of the log."""
+        device_id = device.get_device_id()
+        self._changed.pop(device_id, None)
+        self._changed[device_id] = device
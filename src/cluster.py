@@ -0,0 +1,407 @@
+import multiprocessing
+import os
+import pickle
+import zlib
+from multiprocessing.connection import Connection
+from multiprocessing.process import BaseProcess
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from src.aggregates import GroupBy, Summary
+from src.device import DeviceType
+from src.device_manager import DeviceManager
+from src.dwelling_manager import DwellingManager
+from src.hub import Hub
+
+# Calls routed by the dwelling ID in their first argument, all others by device ID
+_DWELLING_ROUTED = frozenset(("create_dwelling", "create_device", "set_occupancy"))
+
+
+class Call(NamedTuple):
+    """A router operation and its positional arguments, for batches."""
+
+    op: str  # Name of a FleetRouter per-dwelling or per-device method
+    args: Tuple[Any, ...]
+
+
+class _Failure(NamedTuple):
+    """An exception raised by a shard, sent back in place of a result."""
+
+    error: Exception
+
+
+class FleetShard:
+    """The dwellings, hubs and devices of one shard, run in a worker process."""
+
+    def __init__(self) -> None:
+        """Initializes empty managers."""
+        self.devices = DeviceManager()
+        self.dwellings = DwellingManager()
+
+    def create_dwelling(self, dwelling_id: str, hub_id: str) -> None:
+        """Creates a dwelling with a hub installed."""
+        self.dwellings.create_dwelling(dwelling_id).install_hub(Hub(hub_id))
+
+    def create_device(
+        self,
+        dwelling_id: str,
+        device_type: DeviceType,
+        device_id: str,
+        name: str,
+        kwargs: Dict[str, Any],
+    ) -> None:
+        """Creates a device belonging to a dwelling of the shard."""
+        if self.dwellings.get_dwelling(dwelling_id) is None:
+            raise ValueError(f"Unknown dwelling: {dwelling_id}")
+        self.devices.create_device(device_type, device_id, name, **kwargs)
+
+    def pair(self, device_id: str, dwelling_id: str) -> None:
+        """Adds a device to the hub of its dwelling."""
+        dwelling = self.dwellings.get_dwelling(dwelling_id)
+        hub = None if dwelling is None else dwelling.get_hub()
+        if hub is None:
+            raise ValueError(f"Dwelling has no hub: {dwelling_id}")
+        hub.add_device(self._device(device_id))
+
+    def update_state(
+        self, device_id: str, kwargs: Dict[str, Any], command_id: str | None = None
+    ) -> None:
+        """Updates the state of a device, once per command ID if one is given."""
+        self.devices.update_state(device_id, command_id, **kwargs)
+
+    def get_state(self, device_id: str) -> Dict[str, Any]:
+        """Returns the state of a device."""
+        return self._device(device_id).get_state()
+
+    def set_occupancy(self, dwelling_id: str, occupied: bool) -> None:
+        """Sets a dwelling occupied or vacant."""
+        dwelling = self.dwellings.get_dwelling(dwelling_id)
+        if dwelling is None:
+            raise ValueError(f"Unknown dwelling: {dwelling_id}")
+        if occupied:
+            dwelling.set_occupancy()
+        else:
+            dwelling.reset_occupancy()
+
+    def query(self, filters: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Returns the states of the devices matching the filters."""
+        return [device.get_state() for device in self.devices.query(**filters)]
+
+    def aggregate(
+        self, attribute: str, group_by: Optional[GroupBy]
+    ) -> Dict[Any, Summary]:
+        """Aggregates over every device, or per hub or dwelling."""
+        if group_by in (None, GroupBy.TYPE):
+            return self.devices.aggregate(attribute, group_by)
+        return self.dwellings.aggregate(attribute, group_by)
+
+    def histogram(
+        self,
+        attribute: str,
+        bins: Optional[Sequence[float]],
+        group_by: Optional[GroupBy],
+    ) -> Dict[Any, Dict[Any, int]]:
+        """Counts values over every device, or per hub or dwelling."""
+        if group_by in (None, GroupBy.TYPE):
+            return self.devices.histogram(attribute, bins, group_by)
+        return self.dwellings.histogram(attribute, bins, group_by)
+
+    def count_devices(self) -> int:
+        """Returns the number of devices of the shard."""
+        return len(self.devices.list_devices())
+
+    def _device(self, device_id: str):
+        """Returns a device, raising ValueError if unknown."""
+        device = self.devices.get_device(device_id)
+        if device is None:
+            raise ValueError(f"Unknown device: {device_id}")
+        return device
+
+
+def _serve(connection: Connection) -> None:
+    """Runs batches of shard calls received on a pipe until told to stop."""
+    shard = FleetShard()
+    while True:
+        batch = connection.recv()
+        if batch is None:
+            break
+        results = []
+        for op, args in batch:
+            try:
+                results.append(getattr(shard, op)(*args))
+            except Exception as error:  # Reported to the caller, the shard lives on
+                results.append(_Failure(_portable(error)))
+        connection.send(results)
+    connection.close()
+
+
+def _portable(error: Exception) -> Exception:
+    """Returns an exception that survives the pipe, the original if it pickles."""
+    try:
+        pickle.loads(pickle.dumps(error))
+    except Exception:
+        return RuntimeError(f"{type(error).__name__}: {error}")
+    return error
+
+
+def _merge_summaries(first: Summary, second: Summary) -> Summary:
+    """Combines the summaries of two disjoint groups."""
+    count = first.count + second.count
+    total = first.total + second.total
+    return Summary(
+        count,
+        total,
+        total / count,
+        min(first.min, second.min),
+        max(first.max, second.max),
+    )
+
+
+class FleetRouter:
+    """Splits dwellings and their devices across worker processes.
+
+    A dwelling lives on the shard picked by a stable hash of its ID, and
+    its devices follow it, so each shard runs its own managers free of the
+    others' GIL. Calls go to the owning shard; queries and aggregates fan
+    out and merge. A round trip costs far more than an operation, so
+    throughput comes from run_batch(), which sends each shard its part of
+    a batch at once and lets all shards work in parallel.
+    """
+
+    def __init__(self, shards: int | None = None) -> None:
+        """Starts one worker process per shard, one per core by default."""
+        if shards is None:
+            shards = os.cpu_count() or 1
+        if shards < 1:
+            raise ValueError("Shard count must be positive")
+        self._connections: List[Connection] = []
+        self._processes: List[BaseProcess] = []
+        context = multiprocessing.get_context()
+        for _ in range(shards):
+            parent, child = context.Pipe()
+            process = context.Process(target=_serve, args=(child,), daemon=True)
+            process.start()
+            child.close()
+            self._connections.append(parent)
+            self._processes.append(process)
+        # Device ID to its shard and dwelling, set once its shard created it
+        self._device_homes: Dict[str, Tuple[int, str]] = {}
+
+    def get_shard_count(self) -> int:
+        """Returns the number of shards."""
+        return len(self._connections)
+
+    def shard_of(self, dwelling_id: str) -> int:
+        """Returns the shard owning a dwelling."""
+        return zlib.crc32(dwelling_id.encode()) % len(self._connections)
+
+    def create_dwelling(self, dwelling_id: str, hub_id: str | None = None) -> None:
+        """Creates a dwelling with a hub, named after it unless given."""
+        self.run_batch([Call("create_dwelling", (dwelling_id, hub_id))], raises=True)
+
+    def create_device(
+        self,
+        dwelling_id: str,
+        device_type: DeviceType,
+        device_id: str,
+        name: str,
+        **kwargs,
+    ) -> None:
+        """Creates a device on the shard of its dwelling."""
+        args = (dwelling_id, device_type, device_id, name, kwargs)
+        self.run_batch([Call("create_device", args)], raises=True)
+
+    def pair(self, device_id: str) -> None:
+        """Adds a device to the hub of its dwelling."""
+        self.run_batch([Call("pair", (device_id,))], raises=True)
+
+    def update_state(
+        self, device_id: str, command_id: str | None = None, **kwargs
+    ) -> None:
+        """Updates the state of a device, once per command ID if one is given.
+
+        A device always lives on the same shard, so the dedup cache of
+        that shard sees every retry of its commands.
+        """
+        args = (device_id, kwargs, command_id)
+        self.run_batch([Call("update_state", args)], raises=True)
+
+    def get_state(self, device_id: str) -> Dict[str, Any]:
+        """Returns the state of a device."""
+        return self.run_batch([Call("get_state", (device_id,))], raises=True)[0]
+
+    def set_occupancy(self, dwelling_id: str, occupied: bool = True) -> None:
+        """Sets a dwelling occupied or vacant."""
+        self.run_batch([Call("set_occupancy", (dwelling_id, occupied))], raises=True)
+
+    def run_batch(self, calls: Iterable[Call], raises: bool = False) -> List[Any]:
+        """Runs calls on their shards in parallel, returns results in call order.
+
+        Calls on one shard run in order. A failed call yields the exception
+        it raised in its place, or raises it when raises is set. Calls the
+        router cannot route yield a ValueError.
+        """
+        if not self._connections:
+            raise ValueError("Router is closed")
+        batches: List[List[Tuple[str, tuple]]] = [[] for _ in self._connections]
+        positions: List[List[int]] = [[] for _ in self._connections]
+        unrouted: Dict[int, ValueError] = {}
+        # Homes of the devices the batch creates, by device ID and by position
+        pending: Dict[str, Tuple[int, str]] = {}
+        created: Dict[int, str] = {}
+        count = 0
+        for position, (op, args) in enumerate(calls):
+            count = position + 1
+            try:
+                shard, args = self._route(op, args, pending)
+            except ValueError as error:
+                if raises:
+                    raise
+                unrouted[position] = error
+                continue
+            if op == "create_device":
+                created[position] = args[2]
+            batches[shard].append((op, args))
+            positions[shard].append(position)
+        results = self._exchange(batches)
+        ordered: List[Any] = [None] * count
+        for position, error in unrouted.items():
+            ordered[position] = error
+        for shard_positions, shard_results in zip(positions, results):
+            for position, result in zip(shard_positions, shard_results):
+                ordered[position] = result
+        for position, device_id in created.items():
+            if not isinstance(ordered[position], _Failure):
+                self._device_homes[device_id] = pending[device_id]
+        for position, result in enumerate(ordered):
+            if isinstance(result, _Failure):
+                if raises:
+                    raise result.error
+                ordered[position] = result.error
+        return ordered
+
+    def query(
+        self,
+        device_type: Optional[DeviceType] = None,
+        is_paired: Optional[bool] = None,
+        state: Optional[str] = None,
+        name_prefix: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """Returns the states of matching devices, shard by shard."""
+        filters = {
+            "device_type": device_type,
+            "is_paired": is_paired,
+            "state": state,
+            "name_prefix": name_prefix,
+        }
+        merged: List[Dict[str, Any]] = []
+        for states in self._fan_out("query", (filters,)):
+            merged.extend(states)
+        return merged
+
+    def aggregate(
+        self, attribute: str, group_by: Optional[GroupBy] = None
+    ) -> Dict[Any, Summary]:
+        """Returns an aggregate over every shard, merged per group.
+
+        Without group_by or by type it covers all devices; by hub or
+        dwelling it covers installed devices.
+        """
+        merged: Dict[Any, Summary] = {}
+        for summaries in self._fan_out("aggregate", (attribute, group_by)):
+            for key, summary in summaries.items():
+                previous = merged.get(key)
+                merged[key] = (
+                    summary if previous is None else _merge_summaries(previous, summary)
+                )
+        return merged
+
+    def histogram(
+        self,
+        attribute: str,
+        bins: Optional[Sequence[float]] = None,
+        group_by: Optional[GroupBy] = None,
+    ) -> Dict[Any, Dict[Any, int]]:
+        """Returns value counts over every shard, summed per group."""
+        merged: Dict[Any, Dict[Any, int]] = {}
+        for histograms in self._fan_out("histogram", (attribute, bins, group_by)):
+            for key, counts in histograms.items():
+                target = merged.setdefault(key, {})
+                for value, count in counts.items():
+                    target[value] = target.get(value, 0) + count
+        return merged
+
+    def count_devices(self) -> int:
+        """Returns the number of devices over every shard."""
+        return sum(self._fan_out("count_devices", ()))
+
+    def close(self) -> None:
+        """Stops the worker processes."""
+        for connection in self._connections:
+            try:
+                connection.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+            connection.close()
+        for process in self._processes:
+            process.join()
+        self._connections = []
+        self._processes = []
+
+    def __enter__(self) -> "FleetRouter":
+        """Returns the router for use in a with block."""
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        """Stops the worker processes when the with block ends."""
+        self.close()
+
+    def _route(
+        self, op: str, args: tuple, pending: Dict[str, Tuple[int, str]]
+    ) -> Tuple[int, tuple]:
+        """Returns the shard of a call and the arguments the shard takes.
+
+        Devices a create_device call routes are added to pending, so later
+        calls of the same batch reach them.
+        """
+        if op in _DWELLING_ROUTED:
+            dwelling_id = args[0]
+            shard = self.shard_of(dwelling_id)
+            if op == "create_dwelling":
+                hub_id = args[1] if len(args) > 1 else None
+                return shard, (dwelling_id, hub_id or f"hub_{dwelling_id}")
+            if op == "create_device":
+                device_id = args[2]
+                home = pending.get(device_id) or self._device_homes.get(device_id)
+                if home is not None and home[1] != dwelling_id:
+                    raise ValueError(
+                        f"Device {device_id} already exists in dwelling {home[1]}"
+                    )
+                pending[device_id] = (shard, dwelling_id)
+            return shard, args
+        home = pending.get(args[0]) or self._device_homes.get(args[0])
+        if home is None:
+            raise ValueError(f"Unknown device: {args[0]}")
+        shard, dwelling_id = home
+        if op == "pair":
+            return shard, (args[0], dwelling_id)
+        return shard, args
+
+    def _fan_out(self, op: str, args: tuple) -> List[Any]:
+        """Runs one call on every shard and returns each result."""
+        results = self._exchange([[(op, args)] for _ in self._connections])
+        failures = [r[0] for r in results if isinstance(r[0], _Failure)]
+        if failures:
+            raise failures[0].error
+        return [shard_results[0] for shard_results in results]
+
+    def _exchange(self, batches: List[List[Tuple[str, tuple]]]) -> List[List[Any]]:
+        """Sends every non-empty batch first, then collects the replies."""
+        if not self._connections:
+            raise ValueError("Router is closed")
+        for connection, batch in zip(self._connections, batches):
+            if batch:
+                connection.send(batch)
+        return [
+            connection.recv() if batch else []
+            for connection, batch in zip(self._connections, batches)
+        ]
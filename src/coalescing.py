@@ -0,0 +1,238 @@
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, FrozenSet, Mapping, NamedTuple, Tuple
+
+from src.device import AnyDeviceType, DeviceType
+from src.device_manager import DeviceManager
+from src.devices.thermostat import THERMOSTAT_MODES
+from src.metrics import PREFIX
+
+# Attributes of which only the last written value matters, per device type.
+# Switch and lock updates toggle, so every one of them counts.
+LAST_WRITER_WINS: Dict[AnyDeviceType, FrozenSet[str]] = {
+    DeviceType.DIMMER: frozenset({"brightness"}),
+    DeviceType.THERMOSTAT: frozenset({"mode", "temperature"}),
+}
+
+
+class CoalescerStats(NamedTuple):
+    """Command counts of a coalescer, for one device type or all of them."""
+
+    submitted: int  # Commands received
+    applied: int  # update_state calls made
+    absorbed: int  # Commands merged into a pending one instead of applied
+    dropped: int  # Pending commands of devices deleted before their flush
+    failed: int  # Pending commands whose update_state raised
+
+
+class _Counts:
+    """Mutable command counts of one device type."""
+
+    __slots__ = ("submitted", "applied", "absorbed", "dropped", "failed")
+
+    def __init__(self) -> None:
+        """Initializes zero counts."""
+        self.submitted = 0
+        self.applied = 0
+        self.absorbed = 0
+        self.dropped = 0
+        self.failed = 0
+
+
+class _Pending(NamedTuple):
+    """A held command, its kwargs merged into as later ones arrive."""
+
+    due: float
+    device_type: AnyDeviceType
+    kwargs: Dict[str, Any]
+
+
+class CommandCoalescer:
+    """Merges bursts of update_state commands into one call per window.
+
+    A command of a configured type that only writes last-writer-wins
+    attributes is held for the window of its type, and later commands for
+    the same device merge into it, the last value of each attribute
+    winning. Any other command is applied at once, after the pending one
+    of its device, so per-device order is kept. Each type queues in due
+    order, so flushing costs time in proportion to the devices flushed.
+    A held command that fails in update_state is forgotten and counted,
+    so it cannot hold up the commands queued behind it.
+    """
+
+    def __init__(
+        self,
+        device_manager: DeviceManager,
+        windows: Mapping[AnyDeviceType, float],
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """Initializes a coalescer holding commands for a window per type.
+
+        The clock returns seconds and must not go back; pass a
+        VirtualClock to flush without waiting.
+        """
+        for device_type, window in windows.items():
+            if device_type not in LAST_WRITER_WINS:
+                raise ValueError(f"Commands of {device_type.value} cannot be merged")
+            if window <= 0:
+                raise ValueError("Windows must be positive")
+        self._device_manager = device_manager
+        self._windows = dict(windows)
+        self._clock = clock
+        self._pending: Dict[str, _Pending] = {}  # Device ID to its held command
+        # Per type, (due, device ID) in due order, flushed ones left behind
+        self._queues: Dict[AnyDeviceType, Deque[Tuple[float, str]]] = {
+            device_type: deque() for device_type in windows
+        }
+        self._counts: Dict[AnyDeviceType, _Counts] = {}
+
+    def submit(self, device_id: str, **kwargs) -> bool:
+        """Queues or applies an update_state command, returns whether it waits.
+
+        Should the held command of the device fail on the way, its error
+        propagates and this command is not taken.
+        """
+        pending = self._pending.get(device_id)
+        if pending is not None and kwargs:
+            # Bursts mostly land here, merged without looking the device up
+            if kwargs.keys() <= LAST_WRITER_WINS[pending.device_type]:
+                _check(kwargs)
+                pending.kwargs.update(kwargs)
+                counts = self._counts[pending.device_type]
+                counts.submitted += 1
+                counts.absorbed += 1
+                return True
+        device = self._device_manager.get_device(device_id)
+        if device is None:
+            raise ValueError(f"Unknown device {device_id!r}")
+        device_type = device.DEVICE_TYPE
+        counts = self._counts.get(device_type)
+        if counts is None:
+            counts = self._counts[device_type] = _Counts()
+        if pending is not None:
+            self._apply(device_id)  # Goes first, so per-device order is kept
+        window = self._windows.get(device_type)
+        if (
+            window is None
+            or not kwargs
+            or not kwargs.keys() <= LAST_WRITER_WINS[device_type]
+        ):
+            counts.submitted += 1
+            device.update_state(**kwargs)
+            counts.applied += 1
+            return False
+        _check(kwargs)
+        counts.submitted += 1
+        due = self._clock() + window
+        self._pending[device_id] = _Pending(due, device_type, dict(kwargs))
+        self._queues[device_type].append((due, device_id))
+        return True
+
+    def flush_due(self, now: float | None = None) -> int:
+        """Applies every pending command due by now, returns how many.
+
+        An error raised by update_state propagates once the failed command
+        is forgotten; those not yet applied stay pending for the next flush.
+        """
+        if now is None:
+            now = self._clock()
+        pending = self._pending
+        applied = 0
+        for queue in self._queues.values():
+            while queue and queue[0][0] <= now:
+                due, device_id = queue.popleft()
+                entry = pending.get(device_id)
+                if entry is not None and entry.due == due:
+                    applied += self._apply(device_id)
+        return applied
+
+    def flush(self, device_id: str | None = None) -> int:
+        """Applies the pending command of a device, or all of them, now."""
+        if device_id is None:
+            return sum(self._apply(device_id) for device_id in list(self._pending))
+        if device_id not in self._pending:
+            return 0
+        return self._apply(device_id)
+
+    def next_due(self) -> float | None:
+        """Returns when the earliest pending command is due, or None if idle."""
+        pending = self._pending
+        earliest = None
+        for queue in self._queues.values():
+            while queue:
+                due, device_id = queue[0]
+                entry = pending.get(device_id)
+                if entry is not None and entry.due == due:
+                    if earliest is None or due < earliest:
+                        earliest = due
+                    break
+                queue.popleft()  # Flushed early
+        return earliest
+
+    def get_stats(self, device_type: AnyDeviceType | None = None) -> CoalescerStats:
+        """Returns the command counts of a device type, or of all types."""
+        if device_type is not None:
+            counts = [self._counts.get(device_type, _Counts())]
+        else:
+            counts = list(self._counts.values())
+        return CoalescerStats(
+            sum(c.submitted for c in counts),
+            sum(c.applied for c in counts),
+            sum(c.absorbed for c in counts),
+            sum(c.dropped for c in counts),
+            sum(c.failed for c in counts),
+        )
+
+    def export_prometheus(self) -> str:
+        """Returns the command counts in the Prometheus text exposition format."""
+        name = f"{PREFIX}_coalesced_commands_total"
+        lines = [
+            f"# HELP {name} Commands by what the coalescer did with them.",
+            f"# TYPE {name} counter",
+        ]
+        for device_type in sorted(self._counts, key=lambda t: t.value):
+            stats = self.get_stats(device_type)
+            for outcome in ("applied", "absorbed", "dropped", "failed"):
+                labels = f'device_type="{device_type.value}",outcome="{outcome}"'
+                lines.append(f"{name}{{{labels}}} {getattr(stats, outcome)}")
+        return "\n".join(lines) + "\n"
+
+    def __len__(self) -> int:
+        """Returns the number of devices with a pending command."""
+        return len(self._pending)
+
+    def _apply(self, device_id: str) -> int:
+        """Applies and forgets the held command of a device, returns 1 if applied."""
+        _, device_type, kwargs = self._pending.pop(device_id)
+        device = self._device_manager.get_device(device_id)
+        counts = self._counts[device_type]
+        # Deleted, or re-created as another type, since the command came in
+        if device is None or device.DEVICE_TYPE != device_type:
+            counts.dropped += 1
+            return 0
+        try:
+            device.update_state(**kwargs)
+        except Exception:
+            counts.failed += 1
+            raise
+        counts.applied += 1
+        return 1
+
+
+def _check(kwargs: Dict[str, Any]) -> None:
+    """Raises ValueError for values update_state would reject.
+
+    Checked on submit, as a merged command may never reach update_state.
+    """
+    mode = kwargs.get("mode")
+    if mode is not None and mode not in THERMOSTAT_MODES:
+        raise ValueError("Invalid mode")
+    brightness = kwargs.get("brightness")
+    if brightness is not None and not (
+        isinstance(brightness, int)
+        or (isinstance(brightness, float) and brightness.is_integer())
+    ):
+        raise ValueError(f"Invalid brightness {brightness!r}")
+    temperature = kwargs.get("temperature")
+    if temperature is not None and not isinstance(temperature, (int, float)):
+        raise ValueError(f"Invalid temperature {temperature!r}")
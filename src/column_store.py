@@ -0,0 +1,444 @@
+from array import array
+from itertools import compress, repeat
+from operator import eq, ne
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from src.device import (
+    NO_OBSERVERS,
+    AnyDeviceType,
+    Device,
+    DeviceObserver,
+    DeviceType,
+    State,
+    next_version,
+)
+from src.devices.dimmer import DimmerDefaults
+from src.devices.lock import LOCKED, UNLOCKED, LockStateRepr
+from src.devices.switch import OFF_SWITCH, ON_SWITCH, SwitchStateRepr
+from src.devices.thermostat import THERMOSTAT_MODES, ThermostatStateRepr
+
+# Packed type codes, the position in this tuple is the stored code
+TYPE_CODES = (
+    DeviceType.SWITCH,
+    DeviceType.DIMMER,
+    DeviceType.LOCK,
+    DeviceType.THERMOSTAT,
+)
+_CODE_OF_TYPE: Dict[AnyDeviceType, int] = {
+    device_type: code for code, device_type in enumerate(TYPE_CODES)
+}
+_FREE_ROW = -1
+_GENERATION_MASK = 0xFFFFFFFF  # Generations wrap within their unsigned int column
+
+# Packed thermostat modes, the position in this tuple is the stored code
+MODE_CODES = (
+    ThermostatStateRepr.OFF,
+    ThermostatStateRepr.HEAT,
+    ThermostatStateRepr.COOL,
+)
+_CODE_OF_MODE = {mode: code for code, mode in enumerate(MODE_CODES)}
+
+_SWITCH, _DIMMER, _LOCK, _THERMOSTAT = range(len(TYPE_CODES))
+
+# Column names accepted by get_column, mapped to their attributes
+_COLUMNS = {
+    "paired": "_paired",
+    "active": "_active",
+    "brightness": "_brightness",
+    "temperature": "_temperature",
+    "mode": "_mode",
+}
+
+
+class ColumnStore:
+    """Array-backed storage for devices, one packed column per attribute."""
+
+    def __init__(self) -> None:
+        """Initializes an empty column store."""
+        self._types = array("b")  # Type code per row, -1 for free rows
+        self._paired = array("b")  # Paired flag
+        self._active = array("b")  # Switch ON / lock LOCKED bit
+        self._brightness = array("b")  # Dimmer brightness
+        self._temperature = array("d")  # Thermostat temperature
+        self._mode = array("b")  # Thermostat mode code
+        self._versions = array("q")  # Version of the last change
+        self._generations = array("I")  # Bumped on delete, so stale views fail
+        self._ids: List[Optional[str]] = []  # Device ID per row
+        self._names: List[Optional[str]] = []  # Device name per row
+        self._pin_codes: Dict[int, str] = {}  # Sparse lock pin codes by row
+        self._rows: Dict[str, int] = {}  # Device ID to row index
+        self._free: List[int] = []  # Rows released by deletions
+        self._observers: Tuple[DeviceObserver, ...] = NO_OBSERVERS  # Change observers
+
+    def insert(
+        self, device_type: AnyDeviceType, device_id: str, name: str, **kwargs
+    ) -> "DeviceView":
+        """Stores a new device and returns a view over it."""
+        code = _CODE_OF_TYPE.get(device_type)
+        if code is None:
+            raise ValueError(f"Columnar storage does not support {device_type.value}")
+        if device_id in self._rows:
+            self.delete(device_id)
+
+        brightness = 0
+        temperature = 0.0
+        pin_code = None
+        if code == _DIMMER:
+            brightness = _clamp_brightness(
+                kwargs.get("brightness", DimmerDefaults.DEFAULT_BRIGTHNESS.value)
+            )
+        elif code == _THERMOSTAT:
+            temperature = kwargs.get("temperature", 72)
+        elif code == _LOCK:
+            pin_code = kwargs.get("pin_code")
+
+        if self._free:
+            row = self._free.pop()
+            self._types[row] = code
+            self._paired[row] = 0
+            self._active[row] = 0
+            self._brightness[row] = brightness
+            self._temperature[row] = temperature
+            self._mode[row] = 0
+            self._versions[row] = next_version()
+            self._ids[row] = device_id
+            self._names[row] = name
+        else:
+            row = len(self._types)
+            self._types.append(code)
+            self._paired.append(0)
+            self._active.append(0)
+            self._brightness.append(brightness)
+            self._temperature.append(temperature)
+            self._mode.append(0)
+            self._versions.append(next_version())
+            self._generations.append(0)
+            self._ids.append(device_id)
+            self._names.append(name)
+
+        if pin_code is not None:
+            self._pin_codes[row] = pin_code
+        self._rows[device_id] = row
+        return DeviceView(self, row, device_id)
+
+    def delete(self, device_id: str) -> None:
+        """Releases the row of a device, if present."""
+        row = self._rows.pop(device_id, None)
+        if row is None:
+            return
+        self._types[row] = _FREE_ROW
+        self._generations[row] = (self._generations[row] + 1) & _GENERATION_MASK
+        self._ids[row] = None
+        self._names[row] = None
+        self._pin_codes.pop(row, None)
+        self._free.append(row)
+
+    def get(self, device_id: str) -> Optional["DeviceView"]:
+        """Returns a view over a device, or None if absent."""
+        row = self._rows.get(device_id)
+        if row is None:
+            return None
+        return DeviceView(self, row, device_id)
+
+    def get_state(self, device_id: str) -> Dict[str, Any]:
+        """Returns the state of a device without creating a view."""
+        return self._row_state(self._rows[device_id])
+
+    def iter_states(self) -> Iterator[Dict[str, Any]]:
+        """Yields the state of every stored device without creating views."""
+        row_state = self._row_state
+        for row in self._rows.values():
+            yield row_state(row)
+
+    def list_views(self) -> List["DeviceView"]:
+        """Lists views over all stored devices."""
+        return [
+            DeviceView(self, row, device_id) for device_id, row in self._rows.items()
+        ]
+
+    def count(
+        self,
+        device_type: Optional[AnyDeviceType] = None,
+        is_paired: Optional[bool] = None,
+        active: Optional[bool] = None,
+    ) -> int:
+        """Counts devices matching the filters by scanning the columns."""
+        code = None if device_type is None else _CODE_OF_TYPE.get(device_type)
+        if device_type is not None and code is None:
+            return 0  # Types the store does not support have no rows
+        if code is not None and is_paired is None and active is None:
+            return self._types.count(code)
+
+        paired = None if is_paired is None else int(is_paired)
+        state = None if active is None else int(active)
+        total = 0
+        for t, p, s in zip(self._types, self._paired, self._active):
+            if t == _FREE_ROW or (code is not None and t != code):
+                continue
+            if (paired is None or p == paired) and (state is None or s == state):
+                total += 1
+        return total
+
+    def get_column(
+        self, column: str, device_type: Optional[AnyDeviceType] = None
+    ) -> List[Any]:
+        """Returns the raw values of a column, optionally for one device type."""
+        data = getattr(self, _COLUMNS[column])
+        if device_type is None:
+            return list(compress(data, map(ne, self._types, repeat(_FREE_ROW))))
+        code = _CODE_OF_TYPE.get(device_type)
+        if code is None:
+            return []
+        return list(compress(data, map(eq, self._types, repeat(code))))
+
+    def add_observer(self, observer: DeviceObserver) -> None:
+        """Registers an observer for changes of any stored device."""
+        self._observers = self._observers + (observer,)
+
+    def remove_observer(self, observer: DeviceObserver) -> None:
+        """Unregisters an observer of the stored devices."""
+        self._observers = tuple(o for o in self._observers if o is not observer)
+
+    def __len__(self) -> int:
+        """Returns the number of stored devices."""
+        return len(self._rows)
+
+    def __contains__(self, device_id: object) -> bool:
+        """Checks whether a device is stored."""
+        return device_id in self._rows
+
+    def _row_state(self, row: int) -> Dict[str, Any]:
+        """Builds the state dict of a row, matching Device.get_state."""
+        state: Dict[str, Any] = {
+            "device_id": self._ids[row],
+            "name": self._names[row],
+            "is_paired": bool(self._paired[row]),
+        }
+        code = self._types[row]
+        if code == _SWITCH:
+            state["state"] = _switch_repr(self._active[row])
+        elif code == _DIMMER:
+            state["brightness"] = self._brightness[row]
+        elif code == _LOCK:
+            state["is_locked"] = _lock_repr(self._active[row])
+            state["pin_code_set"] = row in self._pin_codes
+        elif code == _THERMOSTAT:
+            state["temperature"] = self._temperature[row]
+            state["mode"] = MODE_CODES[self._mode[row]].name
+        return state
+
+
+class DeviceView:
+    """Lightweight proxy exposing the Device API over a column store row.
+
+    A view remembers the generation of its row, so it fails once its
+    device is deleted, even if a device with the same ID reuses the row.
+    """
+
+    __slots__ = ("_store", "_row", "_device_id", "_generation")
+
+    def __init__(self, store: ColumnStore, row: int, device_id: str) -> None:
+        """Initializes a view over a row of the store."""
+        self._store = store
+        self._row = row
+        self._device_id = device_id
+        self._generation = store._generations[row]
+
+    def _check(self) -> int:
+        """Returns the row, failing if the device has since been deleted."""
+        if self._store._generations[self._row] != self._generation:
+            raise KeyError(self._device_id)
+        return self._row
+
+    def get_device_type(self) -> DeviceType:
+        """Returns the device type."""
+        return TYPE_CODES[self._store._types[self._check()]]
+
+    @property
+    def DEVICE_TYPE(self) -> DeviceType:  # noqa: N802 - mirrors Device.DEVICE_TYPE
+        """Returns the device type, like the Device class constant."""
+        return self.get_device_type()
+
+    def get_device_id(self) -> str:
+        """Returns the device ID."""
+        return self._device_id
+
+    def get_name(self) -> str:
+        """Returns the device name."""
+        return self._store._names[self._check()]  # type: ignore[return-value]
+
+    def get_paired(self) -> bool:
+        """Returns the paired status."""
+        return bool(self._store._paired[self._check()])
+
+    @property
+    def state(self) -> State:
+        """Returns the shared state object a device object would hold."""
+        store = self._store
+        row = self._check()
+        code = store._types[row]
+        if code == _SWITCH:
+            return ON_SWITCH if store._active[row] else OFF_SWITCH
+        if code == _LOCK:
+            return LOCKED if store._active[row] else UNLOCKED
+        if code == _THERMOSTAT:
+            return THERMOSTAT_MODES[MODE_CODES[store._mode[row]]]
+        raise AttributeError("state")
+
+    def pair(self) -> None:
+        """Pairs the device."""
+        row = self._check()
+        self._store._paired[row] = 1
+        self._store._versions[row] = next_version()
+        for observer in self._store._observers:
+            observer.on_pair_change(self)  # type: ignore[arg-type]
+
+    def unpair(self) -> None:
+        """Unpairs the device."""
+        row = self._check()
+        self._store._paired[row] = 0
+        self._store._versions[row] = next_version()
+        for observer in self._store._observers:
+            observer.on_pair_change(self)  # type: ignore[arg-type]
+
+    def get_state(self) -> Dict[str, Any]:
+        """Returns the current state of the device."""
+        return self._store._row_state(self._check())
+
+    def get_version(self) -> int:
+        """Returns the version of the last change to the device."""
+        return self._store._versions[self._check()]
+
+    def get_brightness(self) -> int:
+        """Returns the brightness of a dimmer."""
+        return self._store._brightness[self._check()]
+
+    def get_temperature(self) -> float:
+        """Returns the current temperature of a thermostat."""
+        return self._store._temperature[self._check()]
+
+    def is_pin_code(self) -> bool:
+        """Checks if a lock has a pin code."""
+        return self._check() in self._store._pin_codes
+
+    def verify_pin_code(self, pin_code: str) -> bool:
+        """Verifies the pin code for a lock."""
+        return self._store._pin_codes.get(self._check()) == pin_code
+
+    def update_state(self, **kwargs) -> None:
+        """Updates the state of the device, mirroring the device classes."""
+        store = self._store
+        row = self._check()
+        code = store._types[row]
+        if code == _SWITCH:
+            store._active[row] ^= 1
+        elif code == _DIMMER:
+            brightness = kwargs.get("brightness")
+            if brightness is None:
+                return
+            store._brightness[row] = _clamp_brightness(brightness)
+        elif code == _LOCK:
+            if store._active[row] and row in store._pin_codes:
+                pin_code = kwargs.get("pin_code")
+                if not pin_code or store._pin_codes[row] != pin_code:
+                    raise ValueError("Incorrect PIN code")
+            store._active[row] ^= 1
+        elif code == _THERMOSTAT:
+            temperature = kwargs.get("temperature")
+            if temperature is not None:
+                store._temperature[row] = temperature
+            mode = kwargs.get("mode")
+            if mode is not None:
+                if mode not in _CODE_OF_MODE:
+                    if temperature is not None:
+                        self._notify_state_change()
+                    raise ValueError("Invalid mode")
+                store._mode[row] = _CODE_OF_MODE[mode]
+            elif temperature is None:
+                return
+        self._notify_state_change()
+
+    def load_state(self, state: Dict[str, Any]) -> None:
+        """Sets the device to a state previously returned by get_state."""
+        store = self._store
+        row = self._check()
+        code = store._types[row]
+        if code == _SWITCH:
+            store._active[row] = state["state"] == SwitchStateRepr.ON.name
+        elif code == _DIMMER:
+            store._brightness[row] = _clamp_brightness(state["brightness"])
+        elif code == _LOCK:
+            store._active[row] = state["is_locked"] == LockStateRepr.LOCKED.name
+        elif code == _THERMOSTAT:
+            store._temperature[row] = state["temperature"]
+            store._mode[row] = _CODE_OF_MODE[ThermostatStateRepr[state["mode"]]]
+        self._notify_state_change()
+
+    def get_config(self) -> Dict[str, Any]:
+        """Returns the constructor kwargs that get_state does not cover."""
+        pin_code = self._store._pin_codes.get(self._check())
+        return {} if pin_code is None else {"pin_code": pin_code}
+
+    def _notify_state_change(self) -> None:
+        """Notifies the store observers that update_state changed the device."""
+        self._store._versions[self._row] = next_version()
+        for observer in self._store._observers:
+            observer.on_state_change(self)  # type: ignore[arg-type]
+
+    def __eq__(self, other: object) -> bool:
+        """Views are equal when they point at the same stored device."""
+        if not isinstance(other, DeviceView):
+            return NotImplemented
+        return (
+            self._store is other._store
+            and self._row == other._row
+            and self._generation == other._generation
+        )
+
+    def __hash__(self) -> int:
+        """Hashes the view by its device ID and row."""
+        return hash((self._device_id, self._row))
+
+    def __repr__(self) -> str:
+        """Representation of the object"""
+        store = self._store
+        row = self._check()
+        code = store._types[row]
+        if code == _SWITCH:
+            return f"{self._device_id} is {_switch_repr(store._active[row])}"
+        if code == _DIMMER:
+            return f"{self._device_id} brightness is at {store._brightness[row]}"
+        if code == _LOCK:
+            return f"{self._device_id} is {_lock_repr(store._active[row])}"
+        mode = MODE_CODES[store._mode[row]].name
+        return f"{self._device_id} is in {mode} mode at {store._temperature[row]}F"
+
+
+# Views expose the full Device API, so they pass isinstance checks against it
+Device.register(DeviceView)
+
+
+def _clamp_brightness(brightness: int) -> int:
+    """Clamps a brightness value into the dimmer range.
+
+    Whole floats are stored as ints, other values raise ValueError.
+    """
+    if not isinstance(brightness, int):
+        if not (isinstance(brightness, float) and brightness.is_integer()):
+            raise ValueError(f"Invalid brightness {brightness!r}")
+        brightness = int(brightness)
+    return max(
+        DimmerDefaults.MIN_BRIGTHNESS.value,
+        min(brightness, DimmerDefaults.MAX_BRIGTHNESS.value),
+    )
+
+
+def _switch_repr(active: int) -> str:
+    """Returns the switch state name for an active bit."""
+    return SwitchStateRepr.ON.name if active else SwitchStateRepr.OFF.name
+
+
+def _lock_repr(active: int) -> str:
+    """Returns the lock state name for an active bit."""
+    return LockStateRepr.LOCKED.name if active else LockStateRepr.UNLOCKED.name
+
@@ -0,0 +1,76 @@
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Callable, NamedTuple, Tuple
+
+
+class DedupStats(NamedTuple):
+    """Lookup and eviction counts of a dedup cache."""
+
+    hits: int  # Lookups of a remembered command
+    misses: int  # Lookups of an unknown or expired command
+    evictions: int  # Entries dropped for age or capacity
+
+
+class DedupCache:
+    """Results of recent commands by command ID, bounded in count and age.
+
+    Every entry lives for the same ttl, so insertion order is expiry
+    order: expired and surplus entries are evicted from the oldest end as
+    new ones come in, keeping lookups and inserts O(1) and memory flat at
+    capacity entries however many commands pass through.
+    """
+
+    def __init__(
+        self,
+        capacity: int = 1_000_000,
+        ttl: float = 300.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """Initializes an empty cache keeping entries for ttl seconds."""
+        if capacity < 1 or ttl <= 0:
+            raise ValueError("Capacity and ttl must be positive")
+        self._capacity = capacity
+        self._ttl = ttl
+        self._clock = clock
+        # Command ID to its expiry time and result, oldest first
+        self._entries: OrderedDict[str, Tuple[float, Any]] = OrderedDict()
+        self._lock = Lock()  # Held by put, so writer threads can share the cache
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, command_id: str) -> Any | None:
+        """Returns the result remembered for a command, or None if unknown."""
+        entry = self._entries.get(command_id)
+        if entry is not None and entry[0] > self._clock():
+            self._hits += 1
+            return entry[1]
+        self._misses += 1
+        return None
+
+    def put(self, command_id: str, result: Any) -> None:
+        """Remembers the result of a command, evicting expired and surplus ones."""
+        with self._lock:
+            now = self._clock()
+            entries = self._entries
+            entries[command_id] = (now + self._ttl, result)
+            entries.move_to_end(command_id)
+            capacity = self._capacity
+            # Stops at the entry just put at the latest, which has not expired
+            while len(entries) > capacity or entries[next(iter(entries))][0] <= now:
+                entries.popitem(last=False)
+                self._evictions += 1
+
+    def discard(self, command_id: str) -> None:
+        """Forgets a command, so its next submission runs."""
+        with self._lock:
+            self._entries.pop(command_id, None)
+
+    def get_stats(self) -> DedupStats:
+        """Returns the lookup and eviction counts so far."""
+        return DedupStats(self._hits, self._misses, self._evictions)
+
+    def __len__(self) -> int:
+        """Returns the number of entries held, unevicted expired ones included."""
+        return len(self._entries)
@@ -1,10 +1,13 @@
 from abc import ABC, abstractmethod
 from enum import Enum
-from typing import Dict, Any
+from itertools import count
+from typing import Dict, Any, NamedTuple, Tuple
 
 
 class State(ABC):
-    pass
+    """Base class for immutable, shared device states."""
+
+    __slots__ = ()
 
 
 class DeviceType(Enum):
@@ -15,21 +18,97 @@ class DeviceType(Enum):
     LOCK = "lock"  # Lock device type
     THERMOSTAT = "thermostat"  # Thermostat device type
 
+    # Members are singletons, so the identity hash is valid and, unlike the
+    # Python-level Enum.__hash__, costs nothing on hot dict lookups
+    __hash__ = object.__hash__
+
+
+class CustomDeviceType(NamedTuple):
+    """Device type registered at runtime instead of listed in DeviceType."""
+
+    value: str  # Type name, as in manifests and snapshots
+
+
+# Device type of any device, built-in or registered
+AnyDeviceType = DeviceType | CustomDeviceType
+
+
+class DeviceObserver:
+    """Receives device change notifications, subclasses override what they need."""
+
+    __slots__ = ()
+
+    def on_device_created(self, device: "Device") -> None:
+        """Called after a device manager creates a device."""
+
+    def on_device_deleted(self, device: "Device") -> None:
+        """Called after a device manager deletes a device."""
+
+    def on_state_change(self, device: "Device") -> None:
+        """Called after update_state changed the device."""
+
+    def on_pair_change(self, device: "Device") -> None:
+        """Called after the device was paired or unpaired."""
+
+
+# Shared empty observer tuple, so unobserved devices allocate nothing
+NO_OBSERVERS: Tuple[DeviceObserver, ...] = ()
+
+# Fleet-wide version counter: every change takes the next value, so versions of
+# different devices and hubs compare and a single number marks a poll
+next_version = count(1).__next__
+
 
 class Device(ABC):
     """Abstract base class for devices."""
+
+    __slots__ = (
+        "_device_id",
+        "_name",
+        "_is_paired",
+        "_observers",
+        "_state_cache",
+        "_version",
+    )
+
+    # Type of the concrete device class
+    DEVICE_TYPE: AnyDeviceType
+
     def __init__(self, device_id: str, name: str, **kwargs) -> None:
         """Initializes a device."""
         self._device_id = device_id  # Unique device ID
         self._name = name  # Device name
         self._is_paired = False  # Paired status
+        self._observers = NO_OBSERVERS  # Observers notified of changes
+        self._state_cache: Dict[str, Any] | None = None  # Last built state
+        self._version = next_version()  # Version of the last change
 
     @abstractmethod
     def update_state(self, **kwargs) -> None:
         """Updates the state of the device."""
 
+    @abstractmethod
+    def load_state(self, state: Dict[str, Any]) -> None:
+        """Sets the device to a state previously returned by get_state."""
+
+    def get_config(self) -> Dict[str, Any]:
+        """Returns the constructor kwargs that get_state does not cover."""
+        return {}
+
     def get_state(self) -> Dict[str, Any]:
         """Returns the current state of the device."""
+        state = self._state_cache
+        if state is None:
+            state = self._state_cache = self._build_state()
+        # Copying the cached dict is far cheaper than building it again
+        return state.copy()
+
+    def get_version(self) -> int:
+        """Returns the version of the last change to the device."""
+        return self._version
+
+    def _build_state(self) -> Dict[str, Any]:
+        """Builds the state dict, subclasses add their own keys."""
         state = {
             "device_id": self._device_id,  # Device ID
             "name": self._name,  # Device name
@@ -37,6 +116,10 @@ class Device(ABC):
         }
         return state
 
+    def get_device_type(self) -> AnyDeviceType:
+        """Returns the device type."""
+        return self.DEVICE_TYPE
+
     def get_device_id(self) -> str:
         """Returns the device ID."""
         return self._device_id
@@ -52,7 +135,32 @@ class Device(ABC):
     def pair(self) -> None:
         """Pairs the device."""
         self._is_paired = True
+        self._changed()
+        for observer in self._observers:
+            observer.on_pair_change(self)
 
     def unpair(self) -> None:
         """Unpairs the device."""
         self._is_paired = False
+        self._changed()
+        for observer in self._observers:
+            observer.on_pair_change(self)
+
+    def add_observer(self, observer: DeviceObserver) -> None:
+        """Registers an observer for changes of this device."""
+        self._observers = self._observers + (observer,)
+
+    def remove_observer(self, observer: DeviceObserver) -> None:
+        """Unregisters an observer of this device."""
+        self._observers = tuple(o for o in self._observers if o is not observer)
+
+    def _changed(self) -> None:
+        """Drops the cached state and advances the version."""
+        self._state_cache = None
+        self._version = next_version()
+
+    def _notify_state_change(self) -> None:
+        """Notifies observers that update_state changed the device."""
+        self._changed()
+        for observer in self._observers:
+            observer.on_state_change(self)
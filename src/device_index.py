@@ -0,0 +1,143 @@
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Set
+
+from src.device import AnyDeviceType, Device, DeviceObserver
+
+
+def get_state_name(device: Device) -> Optional[str]:
+    """Returns the switch/lock state or thermostat mode name of a device."""
+    state = getattr(device, "state", None)
+    return None if state is None else state.__repr__()
+
+
+def matches(
+    device: Device,
+    device_type: Optional[AnyDeviceType] = None,
+    is_paired: Optional[bool] = None,
+    state: Optional[str] = None,
+    name_prefix: Optional[str] = None,
+) -> bool:
+    """Checks a single device against the query filters."""
+    if device_type is not None and device.get_device_type() != device_type:
+        return False
+    if is_paired is not None and device.get_paired() != is_paired:
+        return False
+    if state is not None and get_state_name(device) != state:
+        return False
+    if name_prefix is not None and not device.get_name().startswith(name_prefix):
+        return False
+    return True
+
+
+class DeviceIndex(DeviceObserver):
+    """Secondary indexes over device type, paired status, state and name."""
+
+    __slots__ = (
+        "_by_type",
+        "_by_paired",
+        "_by_state",
+        "_state_of",
+        "_by_name",
+        "_sorted_names",
+        "_names_dirty",
+    )
+
+    def __init__(self) -> None:
+        """Initializes empty indexes."""
+        self._by_type: Dict[AnyDeviceType, Set[str]] = {}  # Type to IDs, on demand
+        self._by_paired: Dict[bool, Set[str]] = {True: set(), False: set()}
+        self._by_state: Dict[str, Set[str]] = {}  # State or mode name to IDs
+        self._state_of: Dict[str, str] = {}  # Indexed state name per device
+        self._by_name: Dict[str, Set[str]] = {}  # Device name to IDs
+        self._sorted_names: List[str] = []  # Distinct names, sorted lazily
+        self._names_dirty = False  # Whether the sorted names need a rebuild
+
+    def on_device_created(self, device: Device) -> None:
+        """Adds a device to every index."""
+        device_id = device.get_device_id()
+        self._by_type.setdefault(device.get_device_type(), set()).add(device_id)
+        self._by_paired[device.get_paired()].add(device_id)
+        self._set_state(device_id, get_state_name(device))
+
+        name = device.get_name()
+        ids = self._by_name.get(name)
+        if ids is None:
+            self._by_name[name] = {device_id}
+            self._names_dirty = True
+        else:
+            ids.add(device_id)
+
+    def on_device_deleted(self, device: Device) -> None:
+        """Removes a device from every index."""
+        device_id = device.get_device_id()
+        self._by_type.get(device.get_device_type(), set()).discard(device_id)
+        self._by_paired[True].discard(device_id)
+        self._by_paired[False].discard(device_id)
+        self._set_state(device_id, None)
+
+        name = device.get_name()
+        ids = self._by_name.get(name)
+        if ids is not None:
+            ids.discard(device_id)
+            if not ids:
+                # The stale entry in the sorted names is skipped on lookup
+                del self._by_name[name]
+
+    def on_state_change(self, device: Device) -> None:
+        """Moves a device to the set of its new state."""
+        self._set_state(device.get_device_id(), get_state_name(device))
+
+    def on_pair_change(self, device: Device) -> None:
+        """Moves a device to the set of its new paired status."""
+        device_id = device.get_device_id()
+        is_paired = device.get_paired()
+        self._by_paired[not is_paired].discard(device_id)
+        self._by_paired[is_paired].add(device_id)
+
+    def query(
+        self,
+        device_type: Optional[AnyDeviceType] = None,
+        is_paired: Optional[bool] = None,
+        state: Optional[str] = None,
+        name_prefix: Optional[str] = None,
+    ) -> List[str]:
+        """Returns the IDs of devices matching every given filter."""
+        candidates: List[Set[str]] = []
+        if device_type is not None:
+            candidates.append(self._by_type.get(device_type, set()))
+        if is_paired is not None:
+            candidates.append(self._by_paired[is_paired])
+        if state is not None:
+            candidates.append(self._by_state.get(state, set()))
+        if name_prefix is not None:
+            candidates.append(set(self._prefix_ids(name_prefix)))
+        if not candidates:
+            return [i for ids in self._by_type.values() for i in ids]
+
+        # Walk the smallest set and probe the others, so cost follows the result
+        candidates.sort(key=len)
+        smallest, others = candidates[0], candidates[1:]
+        return [i for i in smallest if all(i in ids for ids in others)]
+
+    def _set_state(self, device_id: str, state: Optional[str]) -> None:
+        """Records the indexed state of a device, None removes it."""
+        previous = self._state_of.get(device_id)
+        if previous == state:
+            return
+        if previous is not None:
+            self._by_state[previous].discard(device_id)
+            del self._state_of[device_id]
+        if state is not None:
+            self._by_state.setdefault(state, set()).add(device_id)
+            self._state_of[device_id] = state
+
+    def _prefix_ids(self, prefix: str) -> Iterable[str]:
+        """Yields the IDs of devices whose name starts with the prefix."""
+        if self._names_dirty:
+            self._sorted_names = sorted(self._by_name)
+            self._names_dirty = False
+        names = self._sorted_names
+        position = bisect_left(names, prefix)
+        while position < len(names) and names[position].startswith(prefix):
+            yield from self._by_name.get(names[position], ())
+            position += 1
@@ -1,38 +1,384 @@
-from typing import Dict, List
+from enum import Enum
+from pathlib import Path
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    TextIO,
+    Tuple,
+)
 
-from src.device import Device, DeviceType
-from src.devices.dimmer import Dimmer
-from src.devices.lock import Lock
-from src.devices.switch import Switch
-from src.devices.thermostat import Thermostat
+from src.aggregates import (
+    Groups,
+    GroupBy,
+    Summary,
+    device_groups,
+    get_attribute,
+    histogram,
+    store_groups,
+    summarize,
+)
+from src.change_log import ChangeLog, Changes
+from src.column_store import ColumnStore
+from src.dedup import DedupCache
+from src.device import NO_OBSERVERS, AnyDeviceType, Device, DeviceObserver
+from src.device_index import DeviceIndex, matches
+from src.registry import DeviceRegistry
+from src.sharded import ShardedDict
+from src.streaming import CreationOrder, Page, write_jsonl
+
+# Device class per type, each driver imported on the first create of its type
+DEVICE_CLASSES = DeviceRegistry()
+_LOADED_CLASSES = DEVICE_CLASSES.get_loaded()
+
+
+class DeviceSpec(NamedTuple):
+    """Arguments of a single create_device call."""
+
+    device_type: AnyDeviceType
+    device_id: str
+    name: str
+    kwargs: Dict[str, Any]
 
 
 class DeviceManager:
     """Manages a collection of devices."""
 
-    def __init__(self) -> None:
-        """Initializes a device manager."""
-        self._devices: Dict[str, Device] = {}
+    def __init__(
+        self, columnar: bool = False, indexed: bool = False, concurrent: bool = False
+    ) -> None:
+        """Initializes a device manager.
+
+        With columnar set, devices live in a packed ColumnStore and are
+        handed out as lightweight views instead of full Device objects.
+        With indexed set, a DeviceIndex is maintained to answer query().
+        With concurrent set, devices live in a ShardedDict and creates and
+        deletes lock only the shard of their ID, so writer threads can share
+        the manager. Observers are then called from those threads.
+        """
+        if concurrent and (columnar or indexed):
+            raise ValueError("Concurrent mode supports neither columnar nor indexed")
+        self._devices: Dict[str, Device] | ShardedDict[str, Device] = (
+            ShardedDict() if concurrent else {}
+        )
+        self._concurrent = concurrent
+        self._store: ColumnStore | None = ColumnStore() if columnar else None
+        self._observers: Tuple[DeviceObserver, ...] = NO_OBSERVERS
+        self._index: DeviceIndex | None = None
+        self._change_log: ChangeLog | None = None  # Set up by changes_since
+        self._creation_order: CreationOrder | None = None  # Set up by list_page
+        # Created up front, so racing first commands cannot each make their own
+        self._commands = DedupCache()  # Command ID to device ID and version
+        if indexed:
+            self._index = DeviceIndex()
+            self.add_observer(self._index)
 
     def create_device(
-        self, device_type: DeviceType, device_id: str, name: str, **kwargs
+        self, device_type: AnyDeviceType, device_id: str, name: str, **kwargs
     ) -> Device:
         """Create a device and adds it to the collection."""
-        device_classes = {
-            DeviceType.SWITCH: Switch,
-            DeviceType.DIMMER: Dimmer,
-            DeviceType.LOCK: Lock,
-            DeviceType.THERMOSTAT: Thermostat,
-        }
-        device = device_classes[device_type](device_id, name, **kwargs)
-        self._devices[device_id] = device
-        return device
+        if self._concurrent:
+            # Holds the shard so a racing create of the same ID cannot interleave
+            with self._devices.lock_for(device_id):  # type: ignore[union-attr]
+                return self._create_device(device_type, device_id, name, **kwargs)
+        return self._create_device(device_type, device_id, name, **kwargs)
+
+    def _create_device(
+        self, device_type: AnyDeviceType, device_id: str, name: str, **kwargs
+    ) -> Device:
+        """Creates a device without taking its shard lock."""
+        if self._store is not None:
+            if self._observers and device_id in self._store:
+                self.delete_device(device_id)
+            device = self._store.insert(device_type, device_id, name, **kwargs)
+        else:
+            if device_id in self._devices:
+                self.delete_device(device_id)
+            cls = _LOADED_CLASSES.get(device_type) or DEVICE_CLASSES[device_type]
+            device = cls(device_id, name, **kwargs)
+            device._observers = self._observers
+            self._devices[device_id] = device
+        for observer in self._observers:
+            observer.on_device_created(device)  # type: ignore[arg-type]
+        return device  # type: ignore[return-value]
+
+    def create_devices(self, specs: Iterable[DeviceSpec]) -> List[Device]:
+        """Creates a batch of devices and adds them to the collection."""
+        if self._observers:
+            return [
+                self.create_device(device_type, device_id, name, **kwargs)
+                for device_type, device_id, name, kwargs in specs
+            ]
+        if self._store is not None:
+            insert = self._store.insert
+            return [  # type: ignore[return-value]
+                insert(device_type, device_id, name, **kwargs)
+                for device_type, device_id, name, kwargs in specs
+            ]
+        loaded = _LOADED_CLASSES
+        if self._concurrent:
+            created = [
+                (loaded.get(device_type) or DEVICE_CLASSES[device_type])(
+                    device_id, name, **kwargs
+                )
+                for device_type, device_id, name, kwargs in specs
+            ]
+            self._devices.update(  # type: ignore[call-arg]
+                (device.get_device_id(), device) for device in created
+            )
+            return created
+        devices = self._devices
+        created = []
+        for device_type, device_id, name, kwargs in specs:
+            cls = loaded.get(device_type) or DEVICE_CLASSES[device_type]
+            device = cls(device_id, name, **kwargs)
+            devices[device_id] = device
+            created.append(device)
+        return created
 
     def delete_device(self, device_id: str) -> None:
         """Create a device from the collection."""
-        if device_id in self._devices:
+        if self._concurrent:
+            with self._devices.lock_for(device_id):  # type: ignore[union-attr]
+                self._delete_device(device_id)
+        else:
+            self._delete_device(device_id)
+
+    def _delete_device(self, device_id: str) -> None:
+        """Deletes a device without taking its shard lock."""
+        device = self.get_device(device_id)
+        if device is None:
+            return
+        for observer in self._observers:
+            observer.on_device_deleted(device)
+        if self._store is not None:
+            self._store.delete(device_id)
+        else:
             del self._devices[device_id]
+            # A deleted device may live on in a hub, stop reporting its changes
+            if device._observers is self._observers:
+                device._observers = NO_OBSERVERS
+            else:
+                for observer in self._observers:
+                    device.remove_observer(observer)
+
+    def get_device(self, device_id: str) -> Device | None:
+        """Returns a device from the collection, or None if absent."""
+        if self._store is not None:
+            return self._store.get(device_id)  # type: ignore[return-value]
+        return self._devices.get(device_id)
+
+    def update_state(
+        self, device_id: str, command_id: str | None = None, **kwargs
+    ) -> int:
+        """Updates the state of a device, returns the version of the change.
+
+        With a command ID the update is idempotent: a command already
+        applied, within the bounds of the dedup cache, is not applied again
+        and returns its original version. Failed commands are not remembered,
+        so their retries run.
+        """
+        if command_id is None:
+            device = self._get_existing(device_id)
+            device.update_state(**kwargs)
+            return device.get_version()
+        if self._concurrent:
+            # Duplicates of a command act on one device, its shard serializes them
+            with self._devices.lock_for(device_id):  # type: ignore[union-attr]
+                return self._update_once(device_id, command_id, kwargs)
+        return self._update_once(device_id, command_id, kwargs)
+
+    def _update_once(
+        self, device_id: str, command_id: str, kwargs: Dict[str, Any]
+    ) -> int:
+        """Applies a command unless the dedup cache remembers it."""
+        commands = self._commands
+        seen = commands.get(command_id)
+        if seen is not None:
+            seen_device_id, version = seen
+            if seen_device_id != device_id:
+                raise ValueError(
+                    f"Command {command_id!r} was already used for {seen_device_id}"
+                )
+            return version
+        device = self._get_existing(device_id)
+        device.update_state(**kwargs)
+        version = device.get_version()
+        commands.put(command_id, (device_id, version))
+        return version
+
+    def set_dedup_cache(self, cache: DedupCache) -> None:
+        """Replaces the cache remembering applied command IDs."""
+        self._commands = cache
+
+    def get_dedup_cache(self) -> DedupCache:
+        """Returns the cache of applied command IDs."""
+        return self._commands
+
+    def _get_existing(self, device_id: str) -> Device:
+        """Returns a device, raising ValueError if absent."""
+        device = self.get_device(device_id)
+        if device is None:
+            raise ValueError(f"Unknown device: {device_id}")
+        return device
 
     def list_devices(self) -> List[Device]:
         """Lists all devices from the collection."""
+        if self._store is not None:
+            return self._store.list_views()  # type: ignore[return-value]
         return list(self._devices.values())
+
+    def list_page(self, limit: int = 100, cursor: str | None = None) -> Page:
+        """Returns up to limit devices in creation order and the next cursor.
+
+        Cursors stay valid while devices are created and deleted: deleted
+        devices are skipped, and devices created after a page was served
+        come on later pages. The first call starts tracking creation order,
+        devices that existed then keep their current order.
+        """
+        if self._creation_order is None:
+            if self._concurrent:
+                raise ValueError("list_page is not supported in concurrent mode")
+            self._creation_order = CreationOrder(
+                device.get_device_id() for device in self.list_devices()
+            )
+            self.add_observer(self._creation_order)
+        device_ids, next_cursor = self._creation_order.page(cursor, limit)
+        get_device = self.get_device
+        return Page([get_device(device_id) for device_id in device_ids], next_cursor)
+
+    def iter_devices(self, page_size: int = 1024) -> Iterator[Device]:
+        """Yields every device without copying the collection.
+
+        Devices are fetched a page at a time, so the collection may change
+        between steps with the same guarantees as list_page, though a device
+        deleted after its page was fetched is still yielded. In concurrent
+        mode this walks a snapshot of the devices instead.
+        """
+        if self._concurrent:
+            yield from self._devices.values()
+            return
+        cursor = None
+        while True:
+            devices, cursor = self.list_page(page_size, cursor)
+            yield from devices
+            if cursor is None:
+                return
+
+    def export_states(self, target: str | Path | TextIO) -> int:
+        """Streams the state of every device to JSONL, returns how many.
+
+        States are encoded one at a time as they are read, so the export
+        holds no copy of the collection or its states.
+        """
+        if self._store is not None:
+            return write_jsonl(self._store.iter_states(), target)
+        return write_jsonl((d.get_state() for d in self._devices.values()), target)
+
+    def query(
+        self,
+        device_type: Optional[AnyDeviceType] = None,
+        is_paired: Optional[bool] = None,
+        state: Optional[str | Enum] = None,
+        name_prefix: Optional[str] = None,
+    ) -> List[Device]:
+        """Returns the devices matching every given filter.
+
+        The state filter takes a switch or lock state or a thermostat mode,
+        as a name or a *StateRepr member. Without an index this scans.
+        """
+        if isinstance(state, Enum):
+            state = state.name
+        if self._index is None:
+            return [
+                device
+                for device in self.list_devices()
+                if matches(device, device_type, is_paired, state, name_prefix)
+            ]
+        get_device = self.get_device
+        return [
+            get_device(device_id)  # type: ignore[misc]
+            for device_id in self._index.query(
+                device_type, is_paired, state, name_prefix
+            )
+        ]
+
+    def aggregate(
+        self, attribute: str, group_by: Optional[GroupBy] = None
+    ) -> Dict[Any, Summary]:
+        """Returns count, sum, mean, min and max of a numeric attribute.
+
+        Without group_by the one summary is keyed None, GroupBy.TYPE keys
+        them by device type. Columnar managers read the columns directly.
+        """
+        return summarize(
+            self._attribute_groups(attribute, group_by), get_attribute(attribute)
+        )
+
+    def histogram(
+        self,
+        attribute: str,
+        bins: Optional[Sequence[float]] = None,
+        group_by: Optional[GroupBy] = None,
+    ) -> Dict[Any, Dict[Any, int]]:
+        """Returns value counts of an attribute, per bin if edges are given."""
+        return histogram(self._attribute_groups(attribute, group_by), bins)
+
+    def _attribute_groups(self, attribute: str, group_by: Optional[GroupBy]) -> Groups:
+        """Returns the attribute values of the devices, grouped."""
+        if group_by not in (None, GroupBy.TYPE):
+            raise ValueError("Device managers only group by device type")
+        spec = get_attribute(attribute)
+        by_type = group_by is GroupBy.TYPE
+        if self._store is not None:
+            return store_groups(self._store, spec, by_type)
+        return device_groups(self._devices.values(), spec, by_type)
+
+    def changes_since(self, version: int) -> Changes:
+        """Returns the devices changed and deleted after a version.
+
+        Pass 0 for every device, then the returned version on each poll.
+        The first call starts a change log, so later polls cost only the
+        churn; deletions are reported from that first call on. A poll from
+        before the deletions the log still holds gets a resync.
+        """
+        if self._change_log is None:
+            if self._concurrent:
+                raise ValueError("changes_since is not supported in concurrent mode")
+            self._change_log = ChangeLog(self.list_devices())
+            self.add_observer(self._change_log)
+        return self._change_log.changes_since(version)
+
+    def add_observer(self, observer: DeviceObserver) -> None:
+        """Registers an observer for changes of every managed device."""
+        previous = self._observers
+        self._observers = previous + (observer,)
+        if self._store is not None:
+            self._store.add_observer(observer)
+        for device in self._devices.values():
+            # Devices share the manager tuple unless they have observers of their own
+            if device._observers is previous:
+                device._observers = self._observers
+            else:
+                device.add_observer(observer)
+
+    def remove_observer(self, observer: DeviceObserver) -> None:
+        """Unregisters an observer of the managed devices."""
+        previous = self._observers
+        self._observers = tuple(o for o in previous if o is not observer)
+        if self._store is not None:
+            self._store.remove_observer(observer)
+        for device in self._devices.values():
+            if device._observers is previous:
+                device._observers = self._observers
+            else:
+                device.remove_observer(observer)
+
+    def get_store(self) -> ColumnStore | None:
+        """Returns the column store backing the manager, if columnar."""
+        return self._store
@@ -1,7 +1,7 @@
 from enum import Enum
 from typing import Dict, Any, Optional
 
-from src.device import Device
+from src.device import Device, DeviceType
 
 
 class DimmerDefaults(Enum):
@@ -15,6 +15,10 @@ class DimmerDefaults(Enum):
 class Dimmer(Device):
     """Represents a dimmer device"""
 
+    __slots__ = ("_brightness",)
+
+    DEVICE_TYPE = DeviceType.DIMMER
+
     def __init__(
         self,
         device_id: str,
@@ -33,10 +37,20 @@ class Dimmer(Device):
             DimmerDefaults.MIN_BRIGTHNESS.value,
             min(brightness, DimmerDefaults.MAX_BRIGTHNESS.value),
         )
+        self._notify_state_change()
+
+    def load_state(self, state: Dict[str, Any]) -> None:
+        """Sets the dimmer to a state previously returned by get_state"""
+        self._brightness = state["brightness"]
+        self._notify_state_change()
+
+    def get_brightness(self) -> int:
+        """Returns the brightness of the dimmer device"""
+        return self._brightness
 
-    def get_state(self) -> Dict[str, Any]:
-        """Returns the current state of the dimmer device"""
-        state = super().get_state()
+    def _build_state(self) -> Dict[str, Any]:
+        """Builds the current state of the dimmer device"""
+        state = super()._build_state()
         state.update({"brightness": self._brightness})
         return state
 
@@ -2,18 +2,20 @@ from abc import ABC, abstractmethod
 from enum import Enum
 from typing import Dict, Any, Optional
 
-from src.device import Device, State
+from src.device import Device, DeviceType, State
 
 
 class ILock(Device):
     """Interface for lock devices."""
 
+    __slots__ = ("state", "_pin_code")
+
     def __init__(
             self, device_id: str, name: str, pin_code: Optional[str] = None
     ) -> None:
         """Initializes a lock device."""
         super().__init__(device_id, name)
-        self.state: LockState = Unlocked()
+        self.state: LockState = UNLOCKED
         self._pin_code: Optional[str] = pin_code
 
     @abstractmethod
@@ -35,13 +37,28 @@ class LockStateRepr(Enum):
 class Lock(ILock):
     """Implementation of a lock device."""
 
+    __slots__ = ()
+
+    DEVICE_TYPE = DeviceType.LOCK
+
     def update_state(self, pin_code: Optional[str] = None, **kwargs) -> None:
         """Updates the state of the lock."""
         self.state.toggle(self, pin_code)
+        self._notify_state_change()
+
+    def load_state(self, state: Dict[str, Any]) -> None:
+        """Sets the lock to a state previously returned by get_state."""
+        is_locked = state["is_locked"] == LockStateRepr.LOCKED.name
+        self.state = LOCKED if is_locked else UNLOCKED
+        self._notify_state_change()
+
+    def get_config(self) -> Dict[str, Any]:
+        """Returns the pin code, which get_state does not expose."""
+        return {} if self._pin_code is None else {"pin_code": self._pin_code}
 
-    def get_state(self) -> Dict[str, Any]:
-        """Returns the current state of the lock."""
-        state = super().get_state()
+    def _build_state(self) -> Dict[str, Any]:
+        """Builds the current state of the lock."""
+        state = super()._build_state()
         state.update(
             {
                 "is_locked": self.state.__repr__(),
@@ -66,6 +83,8 @@ class Lock(ILock):
 class LockState(State):
     """Abstract base class for lock states."""
 
+    __slots__ = ()
+
     @abstractmethod
     def toggle(self, lock: Lock, pin_code: Optional[str] = None) -> None:
         """Toggles the lock state."""
@@ -74,15 +93,17 @@ class LockState(State):
 class Locked(LockState):
     """Locked state for the lock."""
 
+    __slots__ = ()
+
     def toggle(self, lock: Lock, pin_code: Optional[str] = None) -> None:
         """Toggles the lock to unlocked state."""
         if lock.is_pin_code():
             if pin_code and lock.verify_pin_code(pin_code):
-                lock.state = Unlocked()
+                lock.state = UNLOCKED
             else:
                 raise ValueError("Incorrect PIN code")
         else:
-            lock.state = Unlocked()
+            lock.state = UNLOCKED
 
     def __repr__(self) -> str:
         """Returns a string representation of the object."""
@@ -92,10 +113,17 @@ class Locked(LockState):
 class Unlocked(LockState):
     """Unlocked state for the lock."""
 
+    __slots__ = ()
+
     def toggle(self, lock: Lock, pin_code: Optional[str] = None) -> None:
         """Toggles the lock to locked state."""
-        lock.state = Locked()
+        lock.state = LOCKED
 
     def __repr__(self) -> str:
         """Returns a string representation of the object."""
         return f"{LockStateRepr.UNLOCKED.name}"
+
+
+# Shared state instances, states carry no data so every lock reuses them
+LOCKED = Locked()
+UNLOCKED = Unlocked()
@@ -2,7 +2,7 @@ from abc import ABC, abstractmethod
 from enum import Enum
 from typing import Dict, Any
 
-from src.device import Device, State
+from src.device import Device, DeviceType, State
 
 
 class SwitchStateRepr(Enum):
@@ -14,18 +14,30 @@ class SwitchStateRepr(Enum):
 
 class Switch(Device):
     """Implementation of a switch device."""
+
+    __slots__ = ("state",)
+
+    DEVICE_TYPE = DeviceType.SWITCH
+
     def __init__(self, device_id: str, name: str) -> None:
         """Initializes a switch device."""
         super().__init__(device_id, name)
-        self.state: SwitchState = OffSwitch()
+        self.state: SwitchState = OFF_SWITCH
 
     def update_state(self, **kwargs) -> None:
         """Updates the state of the switch."""
         self.state.toggle(self)
+        self._notify_state_change()
 
-    def get_state(self) -> Dict[str, Any]:
-        """Returns the current state of the switch."""
-        state = super().get_state()
+    def load_state(self, state: Dict[str, Any]) -> None:
+        """Sets the switch to a state previously returned by get_state."""
+        is_on = state["state"] == SwitchStateRepr.ON.name
+        self.state = ON_SWITCH if is_on else OFF_SWITCH
+        self._notify_state_change()
+
+    def _build_state(self) -> Dict[str, Any]:
+        """Builds the current state of the switch."""
+        state = super()._build_state()
         state.update({"state": self.state.__repr__()})
         return state
 
@@ -37,6 +49,8 @@ class Switch(Device):
 class SwitchState(State):
     """Abstract base class for switch states."""
 
+    __slots__ = ()
+
     @abstractmethod
     def toggle(self, switch: Switch) -> None:
         """Toggles the switch state."""
@@ -46,9 +60,11 @@ class SwitchState(State):
 class OnSwitch(SwitchState):
     """On state for the switch."""
 
+    __slots__ = ()
+
     def toggle(self, switch: Switch) -> None:
         """Toggles the switch to off state."""
-        switch.state = OffSwitch()
+        switch.state = OFF_SWITCH
 
     def __repr__(self):
         """Representation of the object"""
@@ -58,10 +74,17 @@ class OnSwitch(SwitchState):
 class OffSwitch(SwitchState):
     """Off state for the switch."""
 
+    __slots__ = ()
+
     def toggle(self, switch: Switch) -> None:
         """Toggles the switch to on state."""
-        switch.state = OnSwitch()
+        switch.state = ON_SWITCH
 
     def __repr__(self):
         """Representation of the object"""
         return f"{SwitchStateRepr.OFF.name}"
+
+
+# Shared state instances, states carry no data so every switch reuses them
+ON_SWITCH = OnSwitch()
+OFF_SWITCH = OffSwitch()
@@ -2,12 +2,14 @@ from abc import abstractmethod, ABC
 from enum import Enum
 from typing import Dict, Any, Optional
 
-from src.device import Device, State
+from src.device import Device, DeviceType, State
 
 
 class IThermostat(Device):
     """Interface for thermostat devices."""
 
+    __slots__ = ()
+
     @abstractmethod
     def get_temperature(self) -> float:
         """Returns the current temperature of the thermostat."""
@@ -25,10 +27,14 @@ class ThermostatStateRepr(Enum):
 class ThermostatState(State):
     """Abstract base class for thermostat states."""
 
+    __slots__ = ()
+
 
 class HeatMode(ThermostatState):
     """Heat mode for the thermostat."""
 
+    __slots__ = ()
+
     def __repr__(self):
         """Representation of the object"""
         return f"{ThermostatStateRepr.HEAT.name}"
@@ -37,6 +43,8 @@ class HeatMode(ThermostatState):
 class CoolMode(ThermostatState):
     """Cool mode for the thermostat."""
 
+    __slots__ = ()
+
     def __repr__(self):
         """Representation of the object"""
         return f"{ThermostatStateRepr.COOL.name}"
@@ -45,24 +53,37 @@ class CoolMode(ThermostatState):
 class OffMode(ThermostatState):
     """Off mode for the thermostat."""
 
+    __slots__ = ()
+
     def __repr__(self):
         """Representation of the object"""
         return f"{ThermostatStateRepr.OFF.name}"
 
 
+# Shared mode instances, modes carry no data so every thermostat reuses them
+HEAT_MODE = HeatMode()
+COOL_MODE = CoolMode()
+OFF_MODE = OffMode()
+
+THERMOSTAT_MODES: Dict[ThermostatStateRepr, ThermostatState] = {
+    ThermostatStateRepr.HEAT: HEAT_MODE,
+    ThermostatStateRepr.COOL: COOL_MODE,
+    ThermostatStateRepr.OFF: OFF_MODE,
+}
+
+
 class Thermostat(IThermostat):
     """Implementation of a thermostat device."""
 
+    __slots__ = ("_temperature", "state")
+
+    DEVICE_TYPE = DeviceType.THERMOSTAT
+
     def __init__(self, device_id: str, name: str, temperature: float = 72) -> None:
         """Initializes a thermostat device."""
         super().__init__(device_id, name)
         self._temperature = temperature
-        self.state = OffMode()
-        self._modes = {
-            ThermostatStateRepr.HEAT: HeatMode(),
-            ThermostatStateRepr.COOL: CoolMode(),
-            ThermostatStateRepr.OFF: OffMode(),
-        }
+        self.state: ThermostatState = OFF_MODE
 
     def update_state(
         self,
@@ -75,16 +96,27 @@ class Thermostat(IThermostat):
             self._temperature = temperature
 
         if mode is not None:
-            if mode in self._modes:
-                state = self._modes[mode]
+            if mode in THERMOSTAT_MODES:
+                state = THERMOSTAT_MODES[mode]
                 if state is not None:
                     self.state = state
             else:
+                if temperature is not None:
+                    self._notify_state_change()
                 raise ValueError("Invalid mode")
 
-    def get_state(self) -> Dict[str, Any]:
-        """Returns the current state of the thermostat."""
-        state = super().get_state()
+        if temperature is not None or mode is not None:
+            self._notify_state_change()
+
+    def load_state(self, state: Dict[str, Any]) -> None:
+        """Sets the thermostat to a state previously returned by get_state."""
+        self._temperature = state["temperature"]
+        self.state = THERMOSTAT_MODES[ThermostatStateRepr[state["mode"]]]
+        self._notify_state_change()
+
+    def _build_state(self) -> Dict[str, Any]:
+        """Builds the current state of the thermostat."""
+        state = super()._build_state()
         state.update({"temperature": self._temperature, "mode": self.state.__repr__()})
         return state
 
@@ -0,0 +1,250 @@
+import json
+import zlib
+from hashlib import blake2b
+from threading import Lock
+from types import MappingProxyType
+from typing import Any, Callable, Dict, List, Mapping, NamedTuple, Tuple
+
+from src.device import Device, DeviceObserver
+from src.device_manager import DeviceManager
+from src.dwelling import Dwelling, DwellingObserver
+from src.dwelling_manager import DwellingManager
+from src.hub import Hub, HubObserver
+
+# Keys from the root down to a node: bucket digits, dwelling ID, hub ID
+Path = Tuple[str, ...]
+
+_MODULUS = 1 << 128  # Digests are 128-bit and node digests sum modulo this
+_DIGEST_BYTES = 16
+_EMPTY: Mapping[str, int] = MappingProxyType({})
+_encode = json.JSONEncoder(sort_keys=True, separators=(",", ":")).encode
+
+
+def digest_state(state: Mapping[str, Any]) -> int:
+    """Returns the 128-bit digest of a device state, as from get_state."""
+    data = _encode(state).encode()
+    return int.from_bytes(blake2b(data, digest_size=_DIGEST_BYTES).digest(), "big")
+
+
+def _bind(key: str, digest: int | None) -> int:
+    """Returns what a child adds to its parent digest, 0 if absent."""
+    if digest is None:
+        return 0
+    data = key.encode() + b"\0" + digest.to_bytes(_DIGEST_BYTES, "big")
+    return int.from_bytes(blake2b(data, digest_size=_DIGEST_BYTES).digest(), "big")
+
+
+class Divergence(NamedTuple):
+    """Outcome of reconciling two digest trees."""
+
+    device_ids: List[str]  # Devices differing or present on one side only
+    nodes: int  # Nodes whose children were fetched from each side
+    compared: int  # Child digests compared
+
+
+class FleetDigest(DeviceObserver, HubObserver, DwellingObserver):
+    """Merkle tree over the states of the devices paired to installed hubs.
+
+    Devices are the leaves, under their hub, under its dwelling, under
+    levels of buckets picked by a hash of the dwelling ID so that no node
+    holds more than fanout buckets. A node digest is the sum of the hashes
+    of each child key with its digest, so moving a device or installing
+    its devices under another hub ID changes every ancestor. A state
+    change, pair or unpair updates the path to the root with two hashes
+    and one addition per level. Two trees built with the same levels and
+    fanout reconcile by descending only into children whose digests
+    differ. A device deleted from the manager but left in its hub keeps
+    the digest it was deleted with.
+    """
+
+    __slots__ = (
+        "_device_manager",
+        "_dwelling_manager",
+        "_levels",
+        "_fanout",
+        "_nodes",
+        "_root",
+        "_device_paths",
+        "_hub_paths",
+        "_lock",
+    )
+
+    def __init__(
+        self,
+        device_manager: DeviceManager,
+        dwelling_manager: DwellingManager,
+        levels: int = 2,
+        fanout: int = 64,
+    ) -> None:
+        """Initializes the tree from the installed hubs, observing both managers."""
+        if levels < 0 or fanout < 2 or fanout**levels > 1 << 32:
+            raise ValueError("Buckets need a fanout of 2 to 2**32 over their levels")
+        self._device_manager = device_manager
+        self._dwelling_manager = dwelling_manager
+        self._levels = levels
+        self._fanout = fanout
+        self._nodes: Dict[Path, Dict[str, int]] = {}  # Non-empty node to children
+        self._root = 0
+        self._device_paths: Dict[str, Path] = {}  # Device ID to its hub node
+        self._hub_paths: Dict[str, Path] = {}  # Hub ID to its node
+        self._lock = Lock()  # Held while a path is updated, for concurrent managers
+        device_manager.add_observer(self)
+        dwelling_manager.add_observer(self)
+        for dwelling in dwelling_manager.list_dwellings():
+            if dwelling.get_hub() is not None:
+                self.on_hub_installed(dwelling, None)
+
+    def close(self) -> None:
+        """Stops observing the managers and the hubs."""
+        self._device_manager.remove_observer(self)
+        self._dwelling_manager.remove_observer(self)
+        for dwelling in self._dwelling_manager.list_dwellings():
+            hub = dwelling.get_hub()
+            if hub is not None:
+                hub.remove_observer(self)
+
+    def get_root(self) -> int:
+        """Returns the digest of the whole fleet."""
+        return self._root
+
+    def get_digest(self, path: Path = ()) -> int:
+        """Returns the digest of a node, 0 if it holds no devices."""
+        if not path:
+            return self._root
+        return self._nodes.get(path[:-1], _EMPTY).get(path[-1], 0)
+
+    def get_children(self, path: Path = ()) -> Mapping[str, int]:
+        """Returns the digests of the children of a node by key."""
+        children = self._nodes.get(path)
+        return _EMPTY if children is None else MappingProxyType(children)
+
+    def get_hub_path(self, hub_id: str) -> Path | None:
+        """Returns the path of an installed hub, or None."""
+        return self._hub_paths.get(hub_id)
+
+    def get_dwelling_path(self, dwelling_id: str) -> Path:
+        """Returns the path of a dwelling, whether or not it holds devices."""
+        return self._buckets(dwelling_id) + (dwelling_id,)
+
+    def reconcile(
+        self,
+        remote_children: Callable[[Path], Mapping[str, int]],
+        path: Path = (),
+    ) -> Divergence:
+        """Returns the devices under a node whose digests differ from a remote's.
+
+        remote_children is the get_children of the other tree, or a call
+        fetching it. Children with equal digests are skipped whole, so
+        the work grows with the number of divergent devices times the
+        depth rather than with the fleet.
+        """
+        hub_depth = self._levels + 2
+        device_ids: List[str] = []
+        nodes = compared = 0
+        pending = [path]
+        while pending:
+            path = pending.pop()
+            local = self.get_children(path)
+            remote = remote_children(path)
+            nodes += 1
+            for key in local.keys() | remote.keys():
+                compared += 1
+                if local.get(key) != remote.get(key):
+                    if len(path) == hub_depth:
+                        device_ids.append(key)
+                    else:
+                        pending.append(path + (key,))
+        # A device that moved differs under both its old and its new hub
+        return Divergence(sorted(set(device_ids)), nodes, compared)
+
+    def on_state_change(self, device: Device) -> None:
+        """Rehashes a device of an installed hub."""
+        device_id = device.get_device_id()
+        path = self._device_paths.get(device_id)
+        if path is not None:
+            self._apply(path, device_id, digest_state(device.get_state()))
+
+    def on_pair_change(self, device: Device) -> None:
+        """Rehashes a device whose pairing changed."""
+        self.on_state_change(device)
+
+    def on_hub_installed(self, dwelling: Dwelling, previous: Hub | None) -> None:
+        """Moves the devices of a dwelling from its old hub to its new one."""
+        if previous is not None:
+            self._untrack_hub(previous)
+        hub = dwelling.get_hub()
+        if hub is None:
+            return
+        hub_id = hub.get_hub_id()
+        dwelling_path = self.get_dwelling_path(dwelling.get_dwelling_id())
+        self._hub_paths[hub_id] = dwelling_path + (hub_id,)
+        hub.add_observer(self)
+        for device in hub.iter_devices():
+            self.on_device_added(hub, device)
+
+    def on_device_added(self, hub: Hub, device: Device) -> None:
+        """Hashes a device into its hub, moving it from any previous one."""
+        device_id = device.get_device_id()
+        path = self._hub_paths[hub.get_hub_id()]
+        previous = self._device_paths.get(device_id)
+        if previous is not None and previous != path:
+            self._apply(previous, device_id, None)
+        self._device_paths[device_id] = path
+        self._apply(path, device_id, digest_state(device.get_state()))
+
+    def on_device_removed(self, hub: Hub, device: Device) -> None:
+        """Drops a device, unless it has since moved to another hub."""
+        device_id = device.get_device_id()
+        path = self._hub_paths.get(hub.get_hub_id())
+        if path is not None and self._device_paths.get(device_id) == path:
+            del self._device_paths[device_id]
+            self._apply(path, device_id, None)
+
+    def _untrack_hub(self, hub: Hub) -> None:
+        """Drops a replaced hub and the devices still under it."""
+        hub.remove_observer(self)
+        path = self._hub_paths.pop(hub.get_hub_id(), None)
+        if path is None:
+            return
+        for device_id in list(self._nodes.get(path, _EMPTY)):
+            del self._device_paths[device_id]
+            self._apply(path, device_id, None)
+
+    def _buckets(self, dwelling_id: str) -> Path:
+        """Returns the bucket keys of a dwelling, spreading dwellings evenly."""
+        code = zlib.crc32(dwelling_id.encode())
+        fanout = self._fanout
+        keys = []
+        for _ in range(self._levels):
+            code, digit = divmod(code, fanout)
+            keys.append(format(digit, "x"))
+        return tuple(keys)
+
+    def _apply(self, hub_path: Path, device_id: str, digest: int | None) -> None:
+        """Sets or, given None, removes a device digest and updates its ancestors."""
+        with self._lock:
+            nodes = self._nodes
+            leaf = nodes.get(hub_path)
+            if digest is None and (leaf is None or device_id not in leaf):
+                return
+            path, key, new = hub_path, device_id, digest
+            old = None if leaf is None else leaf.get(device_id)
+            while True:
+                # Set the digest of child key in the node at path, old to new
+                if new is None:
+                    node = nodes[path]
+                    del node[key]
+                else:
+                    node = nodes.setdefault(path, {})
+                    node[key] = new
+                delta = (_bind(key, new) - _bind(key, old)) % _MODULUS
+                if not node:
+                    # Empty nodes are pruned, so both sides list the same keys
+                    del nodes[path]
+                if not path:
+                    self._root = (self._root + delta) % _MODULUS
+                    return
+                parent_path, parent_key = path[:-1], path[-1]
+                old = nodes.get(parent_path, _EMPTY).get(parent_key)
+                new = None if not node else ((old or 0) + delta) % _MODULUS
+                path, key = parent_path, parent_key
@@ -1,26 +1,61 @@
+from typing import Tuple
+
 from src.hub import Hub
 
 
+class DwellingObserver:
+    """Receives dwelling change notifications, subclasses override what they need."""
+
+    __slots__ = ()
+
+    def on_dwelling_created(self, dwelling: "Dwelling") -> None:
+        """Called after a dwelling manager creates a dwelling."""
+
+    def on_hub_installed(self, dwelling: "Dwelling", previous: Hub | None) -> None:
+        """Called after a hub was installed, with the hub it replaced."""
+
+    def on_occupancy_change(self, dwelling: "Dwelling") -> None:
+        """Called after the dwelling was set occupied or vacant."""
+
+
 class Dwelling:
     """Represents a dwelling with devices."""
 
+    __slots__ = ("_dwelling_id", "_is_occupied", "_hub", "_observers")
+
     def __init__(self, dwelling_id: str) -> None:
         """Initializes a dwelling."""
         self._dwelling_id = dwelling_id  # Unique dwelling ID
         self._is_occupied = False  # Dwelling occupancy status
         self._hub: Hub | None = None  # Hub associated with the dwelling
+        self._observers: Tuple[DwellingObserver, ...] = ()  # Change observers
 
     def install_hub(self, hub: Hub) -> None:
         """Adds a hub to the dwelling."""
+        previous = self._hub
         self._hub = hub
+        for observer in self._observers:
+            observer.on_hub_installed(self, previous)
+
+    def add_observer(self, observer: DwellingObserver) -> None:
+        """Registers an observer for changes of the dwelling."""
+        self._observers = self._observers + (observer,)
+
+    def remove_observer(self, observer: DwellingObserver) -> None:
+        """Unregisters an observer of the dwelling."""
+        self._observers = tuple(o for o in self._observers if o is not observer)
 
     def set_occupancy(self) -> None:
         """Sets the dwelling as occupied."""
         self._is_occupied = True
+        for observer in self._observers:
+            observer.on_occupancy_change(self)
 
     def reset_occupancy(self) -> None:
         """Sets the dwelling as vacant."""
         self._is_occupied = False
+        for observer in self._observers:
+            observer.on_occupancy_change(self)
 
     def get_dwelling_id(self) -> str:
         """Returns the Unique dwelling ID."""
@@ -1,21 +1,165 @@
-from typing import Dict, List
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
 
-from src.dwelling import Dwelling
+from src.aggregates import (
+    Groups,
+    GroupBy,
+    Summary,
+    device_groups,
+    device_values,
+    get_attribute,
+    histogram,
+    summarize,
+)
+from src.device import Device
+from src.dwelling import Dwelling, DwellingObserver
+from src.sharded import ShardedDict
+from src.streaming import CreationOrder, Page
+from src.topology import Location, TopologyIndex
 
 
 class DwellingManager:
     """Manages a collection of dwellings."""
 
-    def __init__(self) -> None:
-        """Initializes a dwelling collection."""
-        self._dwellings: Dict[str, Dwelling] = {}
+    def __init__(self, concurrent: bool = False) -> None:
+        """Initializes a dwelling collection.
+
+        With concurrent set, dwellings live in a ShardedDict so writer
+        threads can share the manager. Observers are then called from them.
+        """
+        self._dwellings: Dict[str, Dwelling] | ShardedDict[str, Dwelling] = (
+            ShardedDict() if concurrent else {}
+        )
+        self._topology = TopologyIndex()  # Device to hub to dwelling index
+        self._observers: Tuple[DwellingObserver, ...] = (self._topology,)
+        self._concurrent = concurrent
+        self._creation_order: CreationOrder | None = None  # Set up by list_page
 
     def create_dwelling(self, dwelling_id: str) -> Dwelling:
         """Creates a dwelling and adds it to the collection."""
         dwelling = Dwelling(dwelling_id)
+        dwelling._observers = self._observers
         self._dwellings[dwelling_id] = dwelling
+        for observer in self._observers:
+            observer.on_dwelling_created(dwelling)
         return dwelling
 
+    def get_dwelling(self, dwelling_id: str) -> Dwelling | None:
+        """Returns a dwelling from the collection, or None if absent."""
+        return self._dwellings.get(dwelling_id)
+
     def list_dwellings(self) -> List[Dwelling]:
         """Lists all dwellings from the collection."""
         return list(self._dwellings.values())
+
+    def list_page(self, limit: int = 100, cursor: str | None = None) -> Page:
+        """Returns up to limit dwellings in creation order and the next cursor.
+
+        Cursors stay valid while dwellings are created, and a dwelling
+        created again is served again on a later page.
+        """
+        if self._creation_order is None:
+            if self._concurrent:
+                raise ValueError("list_page is not supported in concurrent mode")
+            self._creation_order = CreationOrder(self._dwellings.keys())
+            self.add_observer(self._creation_order)
+        dwelling_ids, next_cursor = self._creation_order.page(cursor, limit)
+        dwellings = self._dwellings
+        return Page([dwellings[key] for key in dwelling_ids], next_cursor)
+
+    def iter_dwellings(self, page_size: int = 1024) -> Iterator[Dwelling]:
+        """Yields every dwelling without copying the collection.
+
+        Dwellings are fetched a page at a time, so they may be created
+        between steps. In concurrent mode this walks a snapshot instead.
+        """
+        if self._concurrent:
+            yield from self._dwellings.values()
+            return
+        cursor = None
+        while True:
+            dwellings, cursor = self.list_page(page_size, cursor)
+            yield from dwellings
+            if cursor is None:
+                return
+
+    def locate(self, device_id: str) -> Location | None:
+        """Returns the hub and dwelling a device is installed in, or None."""
+        return self._topology.locate(device_id)
+
+    def devices_in_dwelling(self, dwelling_id: str) -> List[Device]:
+        """Lists the devices paired to the hub of a dwelling."""
+        dwelling = self._dwellings.get(dwelling_id)
+        if dwelling is None:
+            return []
+        hub = dwelling.get_hub()
+        return [] if hub is None else hub.list_devices()
+
+    def aggregate(
+        self, attribute: str, group_by: Optional[GroupBy] = GroupBy.DWELLING
+    ) -> Dict[Any, Summary]:
+        """Returns count, sum, mean, min and max of a numeric attribute.
+
+        Covers the devices of installed hubs, keyed by dwelling ID, hub ID,
+        device type, or None for one summary over every dwelling.
+        """
+        return summarize(
+            self._attribute_groups(attribute, group_by), get_attribute(attribute)
+        )
+
+    def histogram(
+        self,
+        attribute: str,
+        bins: Optional[Sequence[float]] = None,
+        group_by: Optional[GroupBy] = GroupBy.DWELLING,
+    ) -> Dict[Any, Dict[Any, int]]:
+        """Returns value counts of an attribute, per bin if edges are given."""
+        return histogram(self._attribute_groups(attribute, group_by), bins)
+
+    def get_topology(self) -> TopologyIndex:
+        """Returns the reverse topology index of the managed dwellings."""
+        return self._topology
+
+    def add_observer(self, observer: DwellingObserver) -> None:
+        """Registers an observer for changes of every managed dwelling."""
+        previous = self._observers
+        self._observers = previous + (observer,)
+        for dwelling in self._dwellings.values():
+            # Dwellings share the manager tuple unless they have observers of their own
+            if dwelling._observers is previous:
+                dwelling._observers = self._observers
+            else:
+                dwelling.add_observer(observer)
+
+    def remove_observer(self, observer: DwellingObserver) -> None:
+        """Unregisters an observer of the managed dwellings."""
+        previous = self._observers
+        self._observers = tuple(o for o in previous if o is not observer)
+        for dwelling in self._dwellings.values():
+            if dwelling._observers is previous:
+                dwelling._observers = self._observers
+            else:
+                dwelling.remove_observer(observer)
+
+    def _attribute_groups(self, attribute: str, group_by: Optional[GroupBy]) -> Groups:
+        """Returns the attribute values of installed devices, grouped."""
+        spec = get_attribute(attribute)
+        hubs = [
+            (dwelling, hub)
+            for dwelling in self._dwellings.values()
+            if (hub := dwelling.get_hub()) is not None
+        ]
+        if group_by is None or group_by is GroupBy.TYPE:
+            devices = [
+                device
+                for _, hub in hubs
+                for device in hub.get_paired_devices().values()
+            ]
+            return device_groups(devices, spec, group_by is GroupBy.TYPE)
+        by_hub = group_by is GroupBy.HUB
+        return (
+            (
+                hub.get_hub_id() if by_hub else dwelling.get_dwelling_id(),
+                device_values(hub.get_paired_devices().values(), spec, None),
+            )
+            for dwelling, hub in hubs
+        )
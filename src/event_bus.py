@@ -0,0 +1,249 @@
+import time
+from enum import Enum
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, NamedTuple, Optional
+
+from src.device import AnyDeviceType, Device, DeviceObserver
+from src.device_manager import DeviceManager
+from src.dwelling import Dwelling, DwellingObserver
+from src.dwelling_manager import DwellingManager
+
+
+class EventKind(Enum):
+    """Kinds of change published on the bus."""
+
+    CREATED = "created"  # A device manager created a device
+    DELETED = "deleted"  # A device manager deleted a device
+    STATE = "state"  # update_state changed a device
+    PAIR = "pair"  # A device was paired or unpaired
+    OCCUPANCY = "occupancy"  # A dwelling was set occupied or vacant
+
+
+class Event(NamedTuple):
+    """A published change with the state it left behind."""
+
+    kind: EventKind
+    source_id: str  # Device ID, or dwelling ID for occupancy events
+    device_type: AnyDeviceType | None  # None for occupancy events
+    hub_id: str | None  # Hub of the device or dwelling, if known
+    dwelling_id: str | None  # Dwelling of the device, if known
+    state: Dict[str, Any]  # get_state() of the device, or dwelling occupancy
+    timestamp: float  # Clock reading of the last change the event covers
+    merged: int  # Number of changes coalesced into the event
+
+
+Callback = Callable[[Event], None]
+
+
+class Subscription(NamedTuple):
+    """A subscriber and the filters its events must match."""
+
+    callback: Callback
+    kinds: FrozenSet[EventKind] | None
+    device_type: AnyDeviceType | None
+    hub_id: str | None
+    dwelling_id: str | None
+
+
+class _Pending:
+    """State changes of one device held back for coalescing."""
+
+    __slots__ = ("deadline", "device", "timestamp", "merged")
+
+    def __init__(self, deadline: float, device: Device, timestamp: float) -> None:
+        """Initializes the entry for a first change."""
+        self.deadline = deadline  # Clock reading the event is due at
+        self.device = device
+        self.timestamp = timestamp  # Clock reading of the last change
+        self.merged = 1
+
+
+class EventBus(DeviceObserver, DwellingObserver):
+    """Publishes device and dwelling changes to filtered subscribers.
+
+    With a coalesce_window, state changes of a device are held back and
+    published as one event with the final state once the window since the
+    first of them has passed. Due events go out on the next change or on
+    poll(); other events of the device flush its pending state first.
+    Hub and dwelling filters rely on the dwelling manager topology.
+    """
+
+    def __init__(
+        self,
+        device_manager: DeviceManager | None = None,
+        dwelling_manager: DwellingManager | None = None,
+        coalesce_window: float = 0.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """Initializes the bus and subscribes it to the given managers."""
+        self._device_manager = device_manager
+        self._dwelling_manager = dwelling_manager
+        self._coalesce_window = coalesce_window
+        self._clock = clock
+        self._subscriptions: List[Subscription] = []
+        # Held back state changes by device ID, in deadline order
+        self._pending: Dict[str, _Pending] = {}
+        if device_manager is not None:
+            device_manager.add_observer(self)
+        if dwelling_manager is not None:
+            dwelling_manager.add_observer(self)
+
+    def subscribe(
+        self,
+        callback: Callback,
+        kinds: Optional[Iterable[EventKind]] = None,
+        device_type: Optional[AnyDeviceType] = None,
+        hub_id: Optional[str] = None,
+        dwelling_id: Optional[str] = None,
+    ) -> Subscription:
+        """Registers a callback for the events matching every given filter."""
+        subscription = Subscription(
+            callback,
+            None if kinds is None else frozenset(kinds),
+            device_type,
+            hub_id,
+            dwelling_id,
+        )
+        # Copied on write, so callbacks may subscribe while an event is published
+        self._subscriptions = self._subscriptions + [subscription]
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """Removes a subscription, ignoring unknown ones."""
+        self._subscriptions = [s for s in self._subscriptions if s is not subscription]
+
+    def poll(self) -> None:
+        """Publishes the coalesced state events whose window has passed."""
+        now = self._clock()
+        pending = self._pending
+        while pending:
+            device_id, entry = next(iter(pending.items()))
+            if entry.deadline > now:
+                return
+            del pending[device_id]
+            self._publish_pending(entry)
+
+    def flush(self) -> None:
+        """Publishes every held back state event now."""
+        pending = self._pending
+        while pending:
+            device_id, entry = next(iter(pending.items()))
+            del pending[device_id]
+            self._publish_pending(entry)
+
+    def get_pending(self) -> int:
+        """Returns the number of devices with held back state events."""
+        return len(self._pending)
+
+    def close(self) -> None:
+        """Publishes held back events and detaches from the managers."""
+        self.flush()
+        if self._device_manager is not None:
+            self._device_manager.remove_observer(self)
+        if self._dwelling_manager is not None:
+            self._dwelling_manager.remove_observer(self)
+
+    def on_device_created(self, device: Device) -> None:
+        """Publishes a created device."""
+        self._publish_device(EventKind.CREATED, device, self._clock())
+
+    def on_device_deleted(self, device: Device) -> None:
+        """Publishes a deleted device, after its held back state."""
+        self._flush_device(device.get_device_id())
+        self._publish_device(EventKind.DELETED, device, self._clock())
+
+    def on_state_change(self, device: Device) -> None:
+        """Publishes a state change, or holds it back for coalescing."""
+        now = self._clock()
+        if self._coalesce_window <= 0:
+            self._publish_device(EventKind.STATE, device, now)
+            return
+        device_id = device.get_device_id()
+        entry = self._pending.get(device_id)
+        if entry is not None:
+            # The state is already overwritten, so an overdue entry covers this
+            # change too and goes out with the other due ones below
+            entry.timestamp = now
+            entry.merged += 1
+        if self._pending:
+            self.poll()
+        if entry is None:
+            deadline = now + self._coalesce_window
+            self._pending[device_id] = _Pending(deadline, device, now)
+
+    def on_pair_change(self, device: Device) -> None:
+        """Publishes a paired status change, after the held back state."""
+        self._flush_device(device.get_device_id())
+        self._publish_device(EventKind.PAIR, device, self._clock())
+
+    def on_occupancy_change(self, dwelling: Dwelling) -> None:
+        """Publishes a dwelling set occupied or vacant."""
+        if not self._subscriptions:
+            return
+        hub = dwelling.get_hub()
+        dwelling_id = dwelling.get_dwelling_id()
+        event = Event(
+            EventKind.OCCUPANCY,
+            dwelling_id,
+            None,
+            None if hub is None else hub.get_hub_id(),
+            dwelling_id,
+            {"dwelling_id": dwelling_id, "is_occupied": dwelling.get_is_occupied()},
+            self._clock(),
+            1,
+        )
+        self._publish(event)
+
+    def _flush_device(self, device_id: str) -> None:
+        """Publishes the held back state event of a device, if any."""
+        entry = self._pending.pop(device_id, None)
+        if entry is not None:
+            self._publish_pending(entry)
+
+    def _publish_pending(self, entry: _Pending) -> None:
+        """Publishes a coalesced state event with the current device state."""
+        self._publish_device(
+            EventKind.STATE, entry.device, entry.timestamp, entry.merged
+        )
+
+    def _publish_device(
+        self, kind: EventKind, device: Device, timestamp: float, merged: int = 1
+    ) -> None:
+        """Builds a device event and hands it to the matching subscribers."""
+        if not self._subscriptions:
+            return
+        hub_id = dwelling_id = None
+        if self._dwelling_manager is not None:
+            location = self._dwelling_manager.locate(device.get_device_id())
+            if location is not None:
+                hub_id = location.hub.get_hub_id()
+                dwelling_id = location.dwelling.get_dwelling_id()
+        event = Event(
+            kind,
+            device.get_device_id(),
+            device.get_device_type(),
+            hub_id,
+            dwelling_id,
+            device.get_state(),
+            timestamp,
+            merged,
+        )
+        self._publish(event)
+
+    def _publish(self, event: Event) -> None:
+        """Calls every subscriber whose filters the event matches."""
+        for subscription in self._subscriptions:
+            if subscription.kinds is not None and event.kind not in subscription.kinds:
+                continue
+            if (
+                subscription.device_type is not None
+                and event.device_type != subscription.device_type
+            ):
+                continue
+            if subscription.hub_id is not None and event.hub_id != subscription.hub_id:
+                continue
+            if (
+                subscription.dwelling_id is not None
+                and event.dwelling_id != subscription.dwelling_id
+            ):
+                continue
+            subscription.callback(event)
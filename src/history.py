@@ -0,0 +1,310 @@
+import time
+from array import array
+from bisect import bisect_right
+from operator import itemgetter
+from typing import Any, Callable, Dict, List, NamedTuple, Tuple
+
+from src.column_store import MODE_CODES, TYPE_CODES
+from src.device import AnyDeviceType, Device, DeviceObserver, DeviceType
+from src.device_manager import DeviceManager
+from src.devices.lock import LockStateRepr
+from src.devices.switch import SwitchStateRepr
+
+_PAIRED = 1  # Entry flag bits, the thermostat mode code sits above them
+_ACTIVE = 2
+_HAS_PIN = 4
+_DELETED = 8
+_MODE_SHIFT = 4
+
+_CODE_OF_MODE = {mode.name: code for code, mode in enumerate(MODE_CODES)}
+_RECORDED_TYPES = frozenset(TYPE_CODES)
+
+
+class Transition(NamedTuple):
+    """A recorded change of a device state."""
+
+    at: float  # Clock time of the change
+    state: Dict[str, Any] | None  # State from then on, None once deleted
+
+
+class _Ring:
+    """Packed transitions of one device, oldest first from start.
+
+    The arrays grow up to the retention capacity and then wrap, so
+    entry i sits at (start + i) % len(times). Names are kept apart, as
+    the rare renames of a device recreated under its ID.
+    """
+
+    __slots__ = (
+        "device_type",
+        "device_id",
+        "name",
+        "renames",
+        "times",
+        "flags",
+        "values",
+        "start",
+        "count",
+    )
+
+    def __init__(self, device_type: AnyDeviceType, device_id: str, name: str) -> None:
+        """Initializes an empty ring."""
+        self.device_type = device_type
+        self.device_id = device_id
+        self.name = name  # Latest name
+        self.renames: List[Tuple[float, str]] | None = None  # (from, name), if any
+        self.times = array("d")  # Clock time of each entry
+        self.flags = array("B")  # Flag bits and mode code
+        self.values = array("d")  # Dimmer brightness or thermostat temperature
+        self.start = 0  # Slot of the oldest entry
+        self.count = 0  # Entries retained
+
+    def slot(self, index: int) -> int:
+        """Returns the array slot of the entry at an index."""
+        return (self.start + index) % len(self.times)
+
+    def bisect(self, at: float, inclusive: bool = True) -> int:
+        """Returns the number of entries before, or with inclusive at, a time."""
+        times, start, size = self.times, self.start, len(self.times)
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            entry = times[(start + middle) % size]
+            if entry < at or (inclusive and entry == at):
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def append(self, at: float, flags: int, value: float, capacity: int) -> None:
+        """Adds an entry, overwriting the oldest one once at capacity."""
+        times = self.times
+        size = len(times)
+        if self.count == size and size < capacity:
+            if self.start:
+                # Unwrap, so the new entry can go at the end
+                self.times = times = times[self.start :] + times[: self.start]
+                self.flags = self.flags[self.start :] + self.flags[: self.start]
+                self.values = self.values[self.start :] + self.values[: self.start]
+                self.start = 0
+            times.append(at)
+            self.flags.append(flags)
+            self.values.append(value)
+            self.count += 1
+            return
+        slot = (self.start + self.count) % size
+        times[slot] = at
+        self.flags[slot] = flags
+        self.values[slot] = value
+        if self.count == size:
+            self.start = (self.start + 1) % size
+        else:
+            self.count += 1
+
+    def drop_before(self, cutoff: float) -> None:
+        """Drops entries superseded before a time, keeping the state at it."""
+        while self.count > 1 and self.times[self.slot(1)] <= cutoff:
+            self.start = self.slot(1)
+            self.count -= 1
+
+    def rename(self, at: float, name: str) -> None:
+        """Records the name of the device from a time on."""
+        renames = self.renames
+        if renames is None:
+            renames = self.renames = [(float("-inf"), self.name)]
+        renames.append((at, name))
+        self.name = name
+        # Names in force only before the oldest entry are no longer needed
+        while len(renames) > 1 and renames[1][0] <= self.times[self.start]:
+            del renames[0]
+
+    def name_at(self, at: float) -> str:
+        """Returns the name the device had at a time."""
+        renames = self.renames
+        if renames is None:
+            return self.name
+        return renames[bisect_right(renames, at, key=itemgetter(0)) - 1][1]
+
+    def state(self, index: int) -> Dict[str, Any] | None:
+        """Unpacks the state of the entry at an index, None for a deletion."""
+        slot = self.slot(index)
+        flags = self.flags[slot]
+        if flags & _DELETED:
+            return None
+        state: Dict[str, Any] = {
+            "device_id": self.device_id,
+            "name": self.name_at(self.times[slot]),
+            "is_paired": bool(flags & _PAIRED),
+        }
+        device_type = self.device_type
+        active = bool(flags & _ACTIVE)
+        if device_type == DeviceType.SWITCH:
+            switched = SwitchStateRepr.ON if active else SwitchStateRepr.OFF
+            state["state"] = switched.name
+        elif device_type == DeviceType.DIMMER:
+            state["brightness"] = int(self.values[slot])
+        elif device_type == DeviceType.LOCK:
+            locked = LockStateRepr.LOCKED if active else LockStateRepr.UNLOCKED
+            state["is_locked"] = locked.name
+            state["pin_code_set"] = bool(flags & _HAS_PIN)
+        else:
+            temperature = self.values[slot]
+            state["temperature"] = (
+                int(temperature) if temperature.is_integer() else temperature
+            )
+            state["mode"] = MODE_CODES[flags >> _MODE_SHIFT].name
+        return state
+
+
+def _pack(state: Dict[str, Any]) -> Tuple[int, float]:
+    """Returns the flags and value of an entry recording a device state."""
+    flags = _PAIRED if state["is_paired"] else 0
+    if state.get("state") == SwitchStateRepr.ON.name:
+        flags |= _ACTIVE
+    if state.get("is_locked") == LockStateRepr.LOCKED.name:
+        flags |= _ACTIVE
+    if state.get("pin_code_set"):
+        flags |= _HAS_PIN
+    if "mode" in state:
+        flags |= _CODE_OF_MODE[state["mode"]] << _MODE_SHIFT
+        return flags, state["temperature"]
+    return flags, state.get("brightness", 0)
+
+
+class StateHistory(DeviceObserver):
+    """Bounded history of the state transitions of every managed device.
+
+    Each device keeps its transitions in packed arrays, a flags byte and
+    a value per entry next to the time, used as a ring of at most
+    capacity entries. Updates that leave the packed state unchanged are
+    not recorded. With max_age, entries superseded longer ago than that
+    are dropped as new ones come in. Queries binary search the times.
+    Switches, dimmers, locks and thermostats are recorded, other device
+    types are not.
+    """
+
+    __slots__ = ("_device_manager", "_capacity", "_max_age", "_clock", "_rings")
+
+    def __init__(
+        self,
+        device_manager: DeviceManager,
+        capacity: int = 256,
+        max_age: float | None = None,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        """Initializes the history with the current states, observing the manager."""
+        if capacity < 1 or (max_age is not None and max_age <= 0):
+            raise ValueError("Capacity and max_age must be positive")
+        self._device_manager = device_manager
+        self._capacity = capacity
+        self._max_age = max_age
+        self._clock = clock
+        self._rings: Dict[str, _Ring] = {}  # Device ID to its transitions
+        for device in device_manager.iter_devices():
+            self.on_device_created(device)
+        device_manager.add_observer(self)
+
+    def close(self) -> None:
+        """Stops observing the manager, keeping what was recorded."""
+        self._device_manager.remove_observer(self)
+
+    def state_at(self, device_id: str, at: float) -> Dict[str, Any] | None:
+        """Returns the state of a device at a time, None if unknown or deleted."""
+        ring = self._rings.get(device_id)
+        if ring is None:
+            return None
+        index = ring.bisect(at) - 1
+        return None if index < 0 else ring.state(index)
+
+    def transitions(self, device_id: str, start: float, end: float) -> List[Transition]:
+        """Returns the transitions of a device from start up to but excluding end."""
+        ring = self._rings.get(device_id)
+        if ring is None:
+            return []
+        first = ring.bisect(start, inclusive=False)
+        last = ring.bisect(end, inclusive=False)
+        return [
+            Transition(ring.times[ring.slot(index)], ring.state(index))
+            for index in range(first, last)
+        ]
+
+    def replay(self, at: float) -> Dict[str, Dict[str, Any]]:
+        """Returns the state of every device that existed at a time, by ID."""
+        states = {}
+        for device_id, ring in self._rings.items():
+            index = ring.bisect(at) - 1
+            if index >= 0:
+                state = ring.state(index)
+                if state is not None:
+                    states[device_id] = state
+        return states
+
+    def rebuild(self, at: float) -> DeviceManager:
+        """Returns a new manager holding the devices as they were at a time.
+
+        Lock pin codes are not recorded, so rebuilt locks have none.
+        """
+        device_manager = DeviceManager()
+        for device_id, state in self.replay(at).items():
+            ring = self._rings[device_id]
+            device = device_manager.create_device(
+                ring.device_type, device_id, state["name"]
+            )
+            device.load_state(state)
+            if state["is_paired"]:
+                device.pair()
+        return device_manager
+
+    def get_retained(self) -> int:
+        """Returns the number of transitions held across devices."""
+        return sum(ring.count for ring in self._rings.values())
+
+    def on_device_created(self, device: Device) -> None:
+        """Starts the history of a device, anew if its type changed."""
+        device_type = device.get_device_type()
+        if device_type not in _RECORDED_TYPES:
+            return
+        device_id = device.get_device_id()
+        name = device.get_name()
+        ring = self._rings.get(device_id)
+        if ring is None or ring.device_type != device_type:
+            ring = self._rings[device_id] = _Ring(device_type, device_id, name)
+        self._record(ring, *_pack(device.get_state()), name)
+
+    def on_device_deleted(self, device: Device) -> None:
+        """Records the deletion of a device."""
+        ring = self._rings.get(device.get_device_id())
+        if ring is not None:
+            self._record(ring, _DELETED, 0)
+
+    def on_state_change(self, device: Device) -> None:
+        """Records a state change."""
+        ring = self._rings.get(device.get_device_id())
+        if ring is not None:
+            self._record(ring, *_pack(device.get_state()))
+
+    def on_pair_change(self, device: Device) -> None:
+        """Records a paired status change."""
+        self.on_state_change(device)
+
+    def _record(
+        self, ring: _Ring, flags: int, value: float, name: str | None = None
+    ) -> None:
+        """Appends an entry unless it repeats the latest one, renaming on the way."""
+        now = self._clock()
+        renamed = name is not None and name != ring.name
+        if ring.count:
+            latest = ring.slot(ring.count - 1)
+            if (
+                ring.flags[latest] == flags
+                and ring.values[latest] == value
+                and not renamed
+            ):
+                return
+            # Keeps the times sorted should the clock step back
+            now = max(now, ring.times[latest])
+        ring.append(now, flags, value, self._capacity)
+        if self._max_age is not None:
+            ring.drop_before(now - self._max_age)
+        if renamed and name is not None:
+            ring.rename(now, name)
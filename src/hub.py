@@ -1,34 +1,103 @@
-from typing import Dict, List
+from types import MappingProxyType
+from typing import Dict, Iterator, List, Mapping, Tuple
 
-from src.device import Device
+from src.change_log import Changes
+from src.device import Device, next_version
+
+
+class HubObserver:
+    """Receives hub membership notifications, subclasses override what they need."""
+
+    __slots__ = ()
+
+    def on_device_added(self, hub: "Hub", device: Device) -> None:
+        """Called after a device was added to the hub."""
+
+    def on_device_removed(self, hub: "Hub", device: Device) -> None:
+        """Called after a device was removed from the hub."""
 
 
 class Hub:
     """Represents a hub."""
 
+    __slots__ = ("_hub_id", "_paired_devices", "_observers", "_version", "_removed")
+
     def __init__(self, hub_id: str) -> None:
         """Initializes a hub."""
         self._hub_id = hub_id
         self._paired_devices: Dict[str, Device] = {}
+        self._observers: Tuple[HubObserver, ...] = ()  # Membership observers
+        self._version = next_version()  # Version of the last membership change
+        # Removed device ID to its version, allocated on the first removal
+        self._removed: Dict[str, int] | None = None
 
     def add_device(self, device: Device) -> None:
         """Adds a device to the hub."""
+        device_id = device.get_device_id()
+        self._paired_devices[device_id] = device
+        self._version = next_version()
+        if self._removed is not None:
+            self._removed.pop(device_id, None)
+        for observer in self._observers:
+            observer.on_device_added(self, device)
+        # Paired last, so pairing observers can already locate the device
         device.pair()
-        self._paired_devices[device.get_device_id()] = device
 
     def remove_device(self, device_id: str) -> None:
         """Removes a device from the hub."""
         if device_id in self._paired_devices:
-            self._paired_devices[device_id].unpair()
-            del self._paired_devices[device_id]
+            device = self._paired_devices.pop(device_id)
+            self._version = next_version()
+            if self._removed is None:
+                self._removed = {}
+            self._removed[device_id] = self._version
+            device.unpair()
+            for observer in self._observers:
+                observer.on_device_removed(self, device)
+
+    def add_observer(self, observer: HubObserver) -> None:
+        """Registers an observer for devices added to or removed from the hub."""
+        self._observers = self._observers + (observer,)
+
+    def remove_observer(self, observer: HubObserver) -> None:
+        """Unregisters an observer of the hub."""
+        self._observers = tuple(o for o in self._observers if o is not observer)
 
     def list_devices(self) -> List[Device]:
         """Lists all devices from the hub."""
         return list(self._paired_devices.values())
 
-    def get_paired_devices(self) -> Dict[str, Device]:
-        """Gets all devices paired to the hub."""
-        return self._paired_devices
+    def iter_devices(self) -> Iterator[Device]:
+        """Yields the devices of the hub, tolerating changes while iterating.
+
+        Hubs hold few devices, so this walks a snapshot of them.
+        """
+        yield from tuple(self._paired_devices.values())
+
+    def get_paired_devices(self) -> Mapping[str, Device]:
+        """Gets a read-only live view of the devices paired to the hub."""
+        return MappingProxyType(self._paired_devices)
+
+    def get_version(self) -> int:
+        """Returns the version of the last change to the hub or its devices."""
+        devices = self._paired_devices.values()
+        return max(self._version, max((d.get_version() for d in devices), default=0))
+
+    def changes_since(self, version: int) -> Changes:
+        """Returns the paired devices changed and the devices removed after a version.
+
+        Hubs hold few devices, so this checks each of them.
+        """
+        changed = sorted(
+            (d for d in self._paired_devices.values() if d.get_version() > version),
+            key=lambda device: device.get_version(),
+        )
+        removed = [
+            device_id
+            for device_id, removed_at in (self._removed or {}).items()
+            if removed_at > version
+        ]
+        return Changes(next_version(), changed, removed)
 
     def get_hub_id(self) -> str:
         """Returns the hub ID."""
@@ -0,0 +1,298 @@
+import time
+from bisect import bisect_left
+from functools import wraps
+from inspect import isgeneratorfunction
+from typing import Any, Callable, Dict, List, NamedTuple, Tuple, Type
+
+from src.column_store import DeviceView
+from src.device import AnyDeviceType, Device
+from src.device_manager import DEVICE_CLASSES, DeviceManager
+from src.dwelling_manager import DwellingManager
+from src.hub import Hub
+
+# Upper bucket bounds in seconds, from a microsecond to a second
+LATENCY_BUCKETS: Tuple[float, ...] = (
+    1e-6,
+    2.5e-6,
+    5e-6,
+    1e-5,
+    2.5e-5,
+    5e-5,
+    1e-4,
+    2.5e-4,
+    5e-4,
+    1e-3,
+    2.5e-3,
+    5e-3,
+    1e-2,
+    2.5e-2,
+    5e-2,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+)
+_BOUNDS_NS = [round(bound * 1e9) for bound in LATENCY_BUCKETS]
+
+PREFIX = "devicemanager"  # Prometheus metric name prefix
+
+# Finds the device type an instrumented call acts on from its arguments
+TypeOf = Callable[[tuple, dict], AnyDeviceType | None]
+
+
+class OperationStats(NamedTuple):
+    """Call count and latency histogram of one operation and device type."""
+
+    count: int  # type: ignore[assignment]  # Calls, failed ones included
+    errors: int  # Calls that raised
+    total_seconds: float  # Summed latency
+    buckets: Dict[float, int]  # Upper bound to cumulative count, inf included
+
+
+class _Histogram:
+    """Latency counts per bucket, kept in nanoseconds."""
+
+    __slots__ = ("counts", "total", "errors")
+
+    def __init__(self) -> None:
+        """Initializes empty counts, the last bucket holds overflows."""
+        self.counts = [0] * (len(_BOUNDS_NS) + 1)
+        self.total = 0
+        self.errors = 0
+
+    def stats(self) -> OperationStats:
+        """Returns the counts as cumulative buckets."""
+        buckets: Dict[float, int] = {}
+        running = 0
+        for bound, count in zip(LATENCY_BUCKETS + (float("inf"),), self.counts):
+            running += count
+            buckets[bound] = running
+        return OperationStats(running, self.errors, self.total / 1e9, buckets)
+
+
+def _type_of_self(args: tuple, kwargs: dict) -> AnyDeviceType | None:
+    """Returns the type of the device a method is called on."""
+    return args[0].DEVICE_TYPE
+
+
+def _type_of_argument(args: tuple, kwargs: dict) -> AnyDeviceType | None:
+    """Returns the device type passed to create_device."""
+    return args[1] if len(args) > 1 else kwargs.get("device_type")
+
+
+def _type_of_device(args: tuple, kwargs: dict) -> AnyDeviceType | None:
+    """Returns the type of the device passed to a hub."""
+    device = args[1] if len(args) > 1 else kwargs.get("device")
+    return getattr(device, "DEVICE_TYPE", None)
+
+
+def _public_methods(cls: type) -> List[str]:
+    """Lists the public methods a class defines itself."""
+    return [
+        name
+        for name, value in vars(cls).items()
+        if not name.startswith("_") and callable(value)
+    ]
+
+
+def _targets() -> List[Tuple[type, str, TypeOf | None]]:
+    """Lists every instrumented class, method and device type lookup."""
+    targets: List[Tuple[type, str, TypeOf | None]] = []
+    for cls in (DeviceManager, DwellingManager, Hub):
+        for name in _public_methods(cls):
+            type_of = None
+            if (cls, name) == (DeviceManager, "create_device"):
+                type_of = _type_of_argument
+            elif (cls, name) == (Hub, "add_device"):
+                type_of = _type_of_device
+            targets.append((cls, name, type_of))
+    targets.append((Device, "get_state", _type_of_self))
+    # Only drivers imported so far, later ones are wrapped as they load
+    for cls in list(DEVICE_CLASSES.get_loaded().values()) + [DeviceView]:
+        if "update_state" in vars(cls):
+            targets.append((cls, "update_state", _type_of_self))
+    targets.append((DeviceView, "get_state", _type_of_self))
+    return targets
+
+
+class Metrics:
+    """Opt-in call counters and latency histograms of the core operations.
+
+    Enabling wraps the public methods of DeviceManager, DwellingManager and
+    Hub, plus device update_state and get_state, at class level; disabling
+    puts the original methods back, so a disabled process pays nothing.
+    Drivers not imported yet are wrapped when they load, not imported.
+    Generator methods such as iter_devices are timed over the steps of
+    their iteration, recorded as one call once it ends or is closed.
+    Only one Metrics can be enabled at a time. Counts are not locked, so
+    concurrent writers may lose the odd increment.
+    """
+
+    _enabled: "Metrics | None" = None  # The instance currently instrumenting
+
+    def __init__(self) -> None:
+        """Initializes empty metrics."""
+        # Operation to device type to histogram, the inner dicts are held by wrappers
+        self._histograms: Dict[str, Dict[AnyDeviceType | None, _Histogram]] = {}
+        self._originals: List[Tuple[type, str, Callable[..., Any]]] = []
+
+    def enable(self) -> None:
+        """Starts recording every instrumented call."""
+        if Metrics._enabled is self:
+            return
+        if Metrics._enabled is not None:
+            raise ValueError("Another Metrics instance is already enabled")
+        for cls, name, type_of in _targets():
+            self._instrument(cls, name, type_of)
+        DEVICE_CLASSES.add_load_callback(self._on_class_loaded)
+        Metrics._enabled = self
+
+    def disable(self) -> None:
+        """Stops recording and restores the original methods."""
+        if Metrics._enabled is not self:
+            return
+        DEVICE_CLASSES.remove_load_callback(self._on_class_loaded)
+        for cls, name, method in reversed(self._originals):
+            setattr(cls, name, method)
+        self._originals.clear()
+        Metrics._enabled = None
+
+    def is_enabled(self) -> bool:
+        """Returns whether calls are being recorded."""
+        return Metrics._enabled is self
+
+    def reset(self) -> None:
+        """Drops everything recorded so far."""
+        for by_type in self._histograms.values():
+            by_type.clear()
+
+    def snapshot(self) -> Dict[str, Dict[AnyDeviceType | None, OperationStats]]:
+        """Returns the stats of every called operation, per device type.
+
+        Operations are named Class.method; calls not tied to a single
+        device type are keyed by None.
+        """
+        snapshot: Dict[str, Dict[AnyDeviceType | None, OperationStats]] = {}
+        for operation in sorted(self._histograms):
+            by_type = self._histograms[operation]
+            for device_type in sorted(by_type, key=_type_order):
+                stats = by_type[device_type].stats()
+                snapshot.setdefault(operation, {})[device_type] = stats
+        return snapshot
+
+    def export_prometheus(self) -> str:
+        """Returns the metrics in the Prometheus text exposition format."""
+        seconds = f"{PREFIX}_operation_seconds"
+        errors = f"{PREFIX}_operation_errors_total"
+        lines = [
+            f"# HELP {seconds} Latency of instrumented operations.",
+            f"# TYPE {seconds} histogram",
+        ]
+        error_lines = [
+            f"# HELP {errors} Instrumented calls that raised.",
+            f"# TYPE {errors} counter",
+        ]
+        for operation, by_type in self.snapshot().items():
+            for device_type, stats in by_type.items():
+                labels = f'operation="{operation}"'
+                if device_type is not None:
+                    labels += f',device_type="{device_type.value}"'
+                for bound, count in stats.buckets.items():
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f'{seconds}_bucket{{{labels},le="{le}"}} {count}')
+                lines.append(f"{seconds}_sum{{{labels}}} {stats.total_seconds!r}")
+                lines.append(f"{seconds}_count{{{labels}}} {stats.count}")
+                error_lines.append(f"{errors}{{{labels}}} {stats.errors}")
+        return "\n".join(lines + error_lines) + "\n"
+
+    def _on_class_loaded(self, cls: Type[Device]) -> None:
+        """Wraps update_state of a driver loaded while enabled."""
+        if "update_state" not in vars(cls):
+            return
+        if any(c is cls and n == "update_state" for c, n, _ in self._originals):
+            return  # Loaded again, already wrapped
+        self._instrument(cls, "update_state", _type_of_self)
+
+    def _instrument(self, cls: type, name: str, type_of: TypeOf | None) -> None:
+        """Replaces a method with its recording wrapper, keeping the original."""
+        method = vars(cls)[name]
+        self._originals.append((cls, name, method))
+        setattr(cls, name, self._wrap(f"{cls.__name__}.{name}", method, type_of))
+
+    def _wrap(
+        self, operation: str, method: Callable[..., Any], type_of: TypeOf | None
+    ) -> Callable[..., Any]:
+        """Returns a method recording its latency and failures."""
+        clock = time.perf_counter_ns
+        bounds = _BOUNDS_NS
+        by_type = self._histograms.setdefault(operation, {})
+        by_self = type_of is _type_of_self
+
+        def histogram_of(args: tuple, kwargs: dict) -> _Histogram:
+            device_type = type_of(args, kwargs) if type_of else None
+            histogram = by_type.get(device_type)
+            if histogram is None:
+                histogram = by_type[device_type] = _Histogram()
+            return histogram
+
+        if isgeneratorfunction(method):
+
+            @wraps(method)
+            def timed_steps(*args, **kwargs):
+                # Only the steps count, not the caller's work between them
+                steps = method(*args, **kwargs)
+                elapsed = 0
+                failed = False
+                try:
+                    while True:
+                        start = clock()
+                        try:
+                            item = next(steps)
+                        except StopIteration:
+                            elapsed += clock() - start
+                            return
+                        except BaseException:
+                            elapsed += clock() - start
+                            failed = True
+                            raise
+                        elapsed += clock() - start
+                        yield item
+                finally:
+                    steps.close()
+                    histogram = histogram_of(args, kwargs)
+                    histogram.counts[bisect_left(bounds, elapsed)] += 1
+                    histogram.total += elapsed
+                    histogram.errors += failed
+
+            return timed_steps
+
+        @wraps(method)
+        def timed(*args, **kwargs):
+            start = clock()
+            try:
+                result = method(*args, **kwargs)
+            except BaseException:
+                elapsed = clock() - start
+                histogram = histogram_of(args, kwargs)
+                histogram.counts[bisect_left(bounds, elapsed)] += 1
+                histogram.total += elapsed
+                histogram.errors += 1
+                raise
+            elapsed = clock() - start
+            if by_self:
+                # Device methods dominate, so their lookup is inlined
+                histogram = by_type.get(args[0].DEVICE_TYPE)
+                if histogram is None:
+                    histogram = histogram_of(args, kwargs)
+            else:
+                histogram = histogram_of(args, kwargs)
+            histogram.counts[bisect_left(bounds, elapsed)] += 1
+            histogram.total += elapsed
+            return result
+
+        return timed
+
+
+def _type_order(device_type: AnyDeviceType | None) -> str:
+    """Orders device types by value, untyped calls first."""
+    return "" if device_type is None else device_type.value
@@ -0,0 +1,560 @@
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Mapping, Set
+
+from src.device import Device, DeviceObserver
+from src.device_manager import DEVICE_CLASSES, DeviceManager
+from src.dwelling import Dwelling, DwellingObserver
+from src.dwelling_manager import DwellingManager
+from src.hub import Hub, HubObserver
+
+SNAPSHOT_FILE = "snapshot.jsonl"
+LOG_FILE = "wal.jsonl"
+PREVIOUS_LOG_FILE = "wal.prev.jsonl"  # Log rotated out by a running checkpoint
+
+# get_state keys shared by all devices, the rest is the type-specific state
+_BASE_STATE_KEYS = ("device_id", "name", "is_paired")
+# get_config keys holding secrets, left out unless persist_secrets is set
+_SECRET_CONFIG_KEYS = ("pin_code",)
+
+_encode_json = json.JSONEncoder(separators=(",", ":")).encode
+_decode_json = json.JSONDecoder().decode
+
+
+class WriteAheadLog:
+    """Append-only JSON lines log with group commit and batched fsync.
+
+    Appended records are buffered and written as one group once group_size
+    records are pending or fsync_interval seconds have passed since the
+    last fsync, which then follows. A background timer syncs records left
+    pending when appends stop, so a crash loses at most the records of
+    the last fsync_interval seconds. sync() writes and fsyncs at once.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        group_size: int = 512,
+        fsync_interval: float = 0.05,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """Opens a log for appending, creating it if needed."""
+        self._path = Path(path)
+        self._file = open(self._path, "ab")
+        self._buffer: List[bytes] = []  # Encoded records of the pending group
+        self._group_size = group_size
+        self._fsync_interval = fsync_interval
+        self._clock = clock
+        self._last_fsync = clock()
+        self._unsynced = False  # Whether written groups await an fsync
+        self._lock = threading.Lock()  # Shared with the sync timer thread
+        self._timer: threading.Timer | None = None  # Pending background sync
+
+    def append(self, record: Dict[str, Any]) -> None:
+        """Buffers a record, writing the group once it is full or has waited."""
+        line = _encode_json(record).encode() + b"\n"
+        with self._lock:
+            self._buffer.append(line)
+            if (
+                len(self._buffer) >= self._group_size
+                or self._clock() - self._last_fsync >= self._fsync_interval
+            ):
+                self._flush()
+            self._arm_timer()
+
+    def flush(self) -> None:
+        """Writes pending records and fsyncs if the interval has elapsed."""
+        with self._lock:
+            self._flush()
+            self._arm_timer()
+
+    def sync(self) -> None:
+        """Writes and fsyncs every pending record."""
+        with self._lock:
+            self._sync()
+
+    def rotate(self, target: str | Path) -> None:
+        """Moves every record to the end of another log, leaving this one empty."""
+        target = Path(target)
+        with self._lock:
+            self._sync()
+            if not target.exists():
+                self._file.close()
+                os.replace(self._path, target)
+                self._file = open(self._path, "ab")
+                _fsync_directory(self._path.parent)
+                return
+            # Left by a checkpoint that did not finish, its records still count
+            with open(self._path, "rb") as source, open(target, "ab") as sink:
+                sink.write(source.read())
+                sink.flush()
+                os.fsync(sink.fileno())
+            self._file.seek(0)
+            self._file.truncate()
+            self._fsync()
+
+    def close(self) -> None:
+        """Syncs and closes the log."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            self._sync()
+            self._file.close()
+
+    def _flush(self) -> None:
+        """Writes pending records and fsyncs if the interval has elapsed."""
+        if self._buffer:
+            self._file.write(b"".join(self._buffer))
+            self._file.flush()
+            self._buffer.clear()
+            self._unsynced = True
+        if self._unsynced:
+            if self._clock() - self._last_fsync >= self._fsync_interval:
+                self._fsync()
+
+    def _sync(self) -> None:
+        """Writes and fsyncs every pending record, holding the lock."""
+        self._flush()
+        if self._unsynced:
+            self._fsync()
+
+    def _arm_timer(self) -> None:
+        """Schedules a background sync while records are pending."""
+        if self._timer is None and (self._buffer or self._unsynced):
+            self._timer = threading.Timer(self._fsync_interval, self._on_timer)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _on_timer(self) -> None:
+        """Syncs the records still pending once the interval has passed."""
+        with self._lock:
+            if self._timer is None:
+                return  # Cancelled by close
+            self._timer = None
+            self._sync()
+
+    def _fsync(self) -> None:
+        """Forces written records to stable storage."""
+        os.fsync(self._file.fileno())
+        self._last_fsync = self._clock()
+        self._unsynced = False
+
+    @staticmethod
+    def replay(path: str | Path) -> Iterator[Dict[str, Any]]:
+        """Yields the records of a log, truncating a torn tail left by a crash."""
+        path = Path(path)
+        if not path.exists():
+            return
+        valid = 0
+        with open(path, "rb") as log:
+            for line in log:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    record = _decode_json(line.decode())
+                except ValueError:
+                    break
+                valid += len(line)
+                yield record
+        if valid < path.stat().st_size:
+            with open(path, "r+b") as log:
+                log.truncate(valid)
+
+
+class FleetPersistence(DeviceObserver, HubObserver, DwellingObserver):
+    """Durable log of every fleet mutation, compacted into periodic snapshots.
+
+    Hubs are tracked once installed in a managed dwelling or passed to
+    track_hub(). Use recover() to reopen a fleet from its directory.
+    Secrets such as lock pin codes are written in plaintext only with
+    persist_secrets, otherwise their records note the pin as withheld.
+    Records are numbered and appended under one lock, so observer calls
+    may come from the threads of a concurrent manager.
+    """
+
+    def __init__(
+        self,
+        directory: str | Path,
+        device_manager: DeviceManager,
+        dwelling_manager: DwellingManager,
+        group_size: int = 512,
+        fsync_interval: float = 0.05,
+        snapshot_every: int = 1_000_000,
+        initial_checkpoint: bool = True,
+        persist_secrets: bool = False,
+    ) -> None:
+        """Starts persisting the managers, snapshotting their current state."""
+        self._directory = Path(directory)
+        self._directory.mkdir(parents=True, exist_ok=True)
+        self._device_manager = device_manager
+        self._dwelling_manager = dwelling_manager
+        self._hubs: Dict[str, Hub] = {}  # Tracked hubs by ID
+        self._seq = 0  # Sequence number of the last logged record
+        self._since_snapshot = 0  # Records logged since the last snapshot
+        self._snapshot_every = snapshot_every
+        self._persist_secrets = persist_secrets
+        self._lock = threading.Lock()  # Held to number and append a record
+        self._checkpoint_lock = threading.Lock()  # Held by a running checkpoint
+        self._log = WriteAheadLog(
+            self._directory / LOG_FILE, group_size, fsync_interval
+        )
+
+        for dwelling in dwelling_manager.list_dwellings():
+            hub = dwelling.get_hub()
+            if hub is not None:
+                self._watch_hub(hub)
+        device_manager.add_observer(self)
+        dwelling_manager.add_observer(self)
+        if initial_checkpoint:
+            self.checkpoint()
+
+    @classmethod
+    def recover(
+        cls,
+        directory: str | Path,
+        device_manager: DeviceManager | None = None,
+        dwelling_manager: DwellingManager | None = None,
+        pin_codes: Mapping[str, str] | None = None,
+        **options,
+    ) -> "FleetPersistence":
+        """Rebuilds the fleet from the latest snapshot plus the log after it.
+
+        Locks whose pin codes were withheld get theirs from pin_codes, by
+        device ID; ValueError is raised if any is missing, rather than
+        bringing such a lock back without its pin.
+        """
+        directory = Path(directory)
+        device_manager = device_manager or DeviceManager()
+        dwelling_manager = dwelling_manager or DwellingManager()
+        hubs: Dict[str, Hub] = {}
+        pin_codes = pin_codes or {}
+        unpinned: Set[str] = set()  # Locks recovered without their pin code
+
+        def apply(record: Dict[str, Any]) -> None:
+            """Replays a record onto the managers."""
+            _apply(record, device_manager, dwelling_manager, hubs, pin_codes, unpinned)
+
+        seq = 0
+        snapshot = directory / SNAPSHOT_FILE
+        if snapshot.exists():
+            with open(snapshot, "rb") as lines:
+                seq = _decode_json(lines.readline().decode())["seq"]
+                for line in lines:
+                    apply(_decode_json(line.decode()))
+        for name in (PREVIOUS_LOG_FILE, LOG_FILE):
+            for record in WriteAheadLog.replay(directory / name):
+                if record["seq"] > seq:
+                    apply(record)
+                    seq = record["seq"]
+        if unpinned:
+            missing = ", ".join(sorted(unpinned))
+            raise ValueError(f"Pin codes were withheld for {missing}")
+
+        persistence = cls(
+            directory,
+            device_manager,
+            dwelling_manager,
+            initial_checkpoint=False,
+            **options,
+        )
+        persistence._seq = seq
+        for hub in hubs.values():
+            persistence._watch_hub(hub)
+        return persistence
+
+    def get_device_manager(self) -> DeviceManager:
+        """Returns the persisted device manager."""
+        return self._device_manager
+
+    def get_dwelling_manager(self) -> DwellingManager:
+        """Returns the persisted dwelling manager."""
+        return self._dwelling_manager
+
+    def get_hub(self, hub_id: str) -> Hub | None:
+        """Returns a tracked hub, or None if absent."""
+        return self._hubs.get(hub_id)
+
+    def list_hubs(self) -> List[Hub]:
+        """Lists the tracked hubs."""
+        return list(self._hubs.values())
+
+    def track_hub(self, hub: Hub) -> None:
+        """Starts persisting a hub that is not installed in a dwelling."""
+        if self._hubs.get(hub.get_hub_id()) is not hub:
+            self._watch_hub(hub)
+            self._append(_hub_record(hub))
+
+    def checkpoint(self) -> None:
+        """Writes a compacted snapshot atomically and empties the log."""
+        with self._checkpoint_lock:
+            self._checkpoint()
+
+    def _checkpoint(self) -> None:
+        """Writes a snapshot, holding the checkpoint lock.
+
+        The log is rotated out first, so records appended meanwhile go to
+        a fresh log and are replayed over the snapshot, which may already
+        hold their changes; the rotated log goes once the snapshot is in
+        place. Only the rotation holds the append lock, as the snapshot
+        reads the managers, whose own locks may be held by appending threads.
+        """
+        previous = self._directory / PREVIOUS_LOG_FILE
+        with self._lock:
+            seq = self._seq
+            self._log.rotate(previous)
+            self._since_snapshot = 0
+        snapshot = self._directory / SNAPSHOT_FILE
+        pending = snapshot.with_name(SNAPSHOT_FILE + ".tmp")
+        with open(pending, "wb") as lines:
+            write = lines.write
+            write(_encode_json({"seq": seq}).encode() + b"\n")
+            for device in self._device_manager.list_devices():
+                record = _create_record(device, self._persist_secrets)
+                write(_encode_json(record).encode() + b"\n")
+            for hub in list(self._hubs.values()):
+                write(_encode_json(_hub_record(hub)).encode() + b"\n")
+            for dwelling in self._dwelling_manager.list_dwellings():
+                hub = dwelling.get_hub()
+                record = {
+                    "op": "dwelling",
+                    "id": dwelling.get_dwelling_id(),
+                    "occupied": dwelling.get_is_occupied(),
+                    "hub": None if hub is None else hub.get_hub_id(),
+                }
+                write(_encode_json(record).encode() + b"\n")
+            lines.flush()
+            os.fsync(lines.fileno())
+        os.replace(pending, snapshot)
+        _fsync_directory(self._directory)
+        # Records at or below the snapshot seq are skipped if the unlink is lost
+        previous.unlink()
+
+    def sync(self) -> None:
+        """Makes every logged mutation durable."""
+        self._log.sync()
+
+    def close(self) -> None:
+        """Stops persisting and closes the log."""
+        self._device_manager.remove_observer(self)
+        self._dwelling_manager.remove_observer(self)
+        for hub in self._hubs.values():
+            hub.remove_observer(self)
+        self._log.close()
+
+    def on_device_created(self, device: Device) -> None:
+        """Logs a created device with its configuration and state."""
+        self._append(_create_record(device, self._persist_secrets))
+
+    def on_device_deleted(self, device: Device) -> None:
+        """Logs a deleted device."""
+        self._append({"op": "delete", "id": device.get_device_id()})
+
+    def on_state_change(self, device: Device) -> None:
+        """Logs the resulting state, so replay does not depend on toggles."""
+        self._append(
+            {"op": "state", "id": device.get_device_id(), "state": _type_state(device)}
+        )
+
+    def on_pair_change(self, device: Device) -> None:
+        """Logs a paired status change, whichever hub it came through."""
+        self._append(
+            {"op": "pair", "id": device.get_device_id(), "paired": device.get_paired()}
+        )
+
+    def on_device_added(self, hub: Hub, device: Device) -> None:
+        """Logs a device added to a tracked hub."""
+        self._append(
+            {"op": "hub_add", "hub": hub.get_hub_id(), "id": device.get_device_id()}
+        )
+
+    def on_device_removed(self, hub: Hub, device: Device) -> None:
+        """Logs a device removed from a tracked hub."""
+        self._append(
+            {"op": "hub_remove", "hub": hub.get_hub_id(), "id": device.get_device_id()}
+        )
+
+    def on_dwelling_created(self, dwelling: Dwelling) -> None:
+        """Logs a created dwelling."""
+        self._append({"op": "dwelling", "id": dwelling.get_dwelling_id()})
+
+    def on_hub_installed(self, dwelling: Dwelling, previous: Hub | None) -> None:
+        """Logs a hub installation, tracking the hub if it is new."""
+        hub = dwelling.get_hub()
+        if hub is None:
+            return
+        self.track_hub(hub)
+        self._append(
+            {
+                "op": "install",
+                "dwelling": dwelling.get_dwelling_id(),
+                "hub": hub.get_hub_id(),
+            }
+        )
+
+    def on_occupancy_change(self, dwelling: Dwelling) -> None:
+        """Logs a dwelling occupancy change."""
+        self._append(
+            {
+                "op": "occupancy",
+                "id": dwelling.get_dwelling_id(),
+                "occupied": dwelling.get_is_occupied(),
+            }
+        )
+
+    def _watch_hub(self, hub: Hub) -> None:
+        """Subscribes to the membership changes of a hub, once."""
+        if self._hubs.get(hub.get_hub_id()) is hub:
+            return
+        self._hubs[hub.get_hub_id()] = hub
+        hub.add_observer(self)
+
+    def _append(self, record: Dict[str, Any]) -> None:
+        """Logs a record under the next sequence number."""
+        with self._lock:
+            self._seq += 1
+            record["seq"] = self._seq
+            self._log.append(record)
+            self._since_snapshot += 1
+            due = self._since_snapshot >= self._snapshot_every
+        # Skipped while another checkpoint runs, which covers this record
+        if due and self._checkpoint_lock.acquire(blocking=False):
+            try:
+                self._checkpoint()
+            finally:
+                self._checkpoint_lock.release()
+
+
+def _type_state(device: Device) -> Dict[str, Any]:
+    """Returns the type-specific part of the device state."""
+    state = device.get_state()
+    for key in _BASE_STATE_KEYS:
+        del state[key]
+    return state
+
+
+def _hub_record(hub: Hub) -> Dict[str, Any]:
+    """Returns the record that recreates a hub and its paired devices."""
+    devices = list(hub.get_paired_devices())
+    return {"op": "hub", "id": hub.get_hub_id(), "devices": devices}
+
+
+def _create_record(device: Device, persist_secrets: bool) -> Dict[str, Any]:
+    """Returns the record that recreates a device."""
+    config = device.get_config()
+    withheld = False
+    if not persist_secrets:
+        for key in _SECRET_CONFIG_KEYS:
+            withheld = config.pop(key, None) is not None or withheld
+    record = {
+        "op": "create",
+        "type": device.get_device_type().value,
+        "id": device.get_device_id(),
+        "name": device.get_name(),
+        "config": config,
+        "state": _type_state(device),
+        "paired": device.get_paired(),
+    }
+    if withheld:
+        record["withheld"] = True
+    return record
+
+
+def _apply(
+    record: Dict[str, Any],
+    device_manager: DeviceManager,
+    dwelling_manager: DwellingManager,
+    hubs: Dict[str, Hub],
+    pin_codes: Mapping[str, str],
+    unpinned: Set[str],
+) -> None:
+    """Replays a snapshot or log record onto the managers.
+
+    Devices created with a withheld pin code take theirs from pin_codes
+    and are added to unpinned if it has none.
+    """
+    op = record["op"]
+    if op == "state":
+        device = device_manager.get_device(record["id"])
+        if device is not None:
+            device.load_state(record["state"])
+    elif op == "create":
+        device_id = record["id"]
+        config = record["config"]
+        unpinned.discard(device_id)
+        if record.get("withheld"):
+            if device_id in pin_codes:
+                config = {**config, "pin_code": pin_codes[device_id]}
+            else:
+                unpinned.add(device_id)
+        device = device_manager.create_device(
+            DEVICE_CLASSES.parse(record["type"]), device_id, record["name"], **config
+        )
+        device.load_state(record["state"])
+        if record.get("paired"):
+            device.pair()
+    elif op == "pair":
+        device = device_manager.get_device(record["id"])
+        if device is not None:
+            if record["paired"]:
+                device.pair()
+            else:
+                device.unpair()
+    elif op == "delete":
+        unpinned.discard(record["id"])
+        device_manager.delete_device(record["id"])
+    elif op in ("hub_add", "hub_remove"):
+        hub = _get_hub(hubs, record["hub"])
+        if op == "hub_remove":
+            hub.remove_device(record["id"])
+        else:
+            device = device_manager.get_device(record["id"])
+            if device is not None:
+                hub.add_device(device)
+    elif op == "hub":
+        hub = _get_hub(hubs, record["id"])
+        for device_id in record["devices"]:
+            device = device_manager.get_device(device_id)
+            if device is not None:
+                hub.add_device(device)
+    elif op == "dwelling":
+        dwelling = dwelling_manager.create_dwelling(record["id"])
+        if record.get("occupied"):
+            dwelling.set_occupancy()
+        if record.get("hub") is not None:
+            dwelling.install_hub(_get_hub(hubs, record["hub"]))
+    elif op == "install":
+        dwelling = dwelling_manager.get_dwelling(record["dwelling"])
+        if dwelling is not None:
+            dwelling.install_hub(_get_hub(hubs, record["hub"]))
+    elif op == "occupancy":
+        dwelling = dwelling_manager.get_dwelling(record["id"])
+        if dwelling is not None:
+            if record["occupied"]:
+                dwelling.set_occupancy()
+            else:
+                dwelling.reset_occupancy()
+    else:
+        raise ValueError(f"Unknown record {op!r}")
+
+
+def _get_hub(hubs: Dict[str, Hub], hub_id: str) -> Hub:
+    """Returns a recovered hub, creating it on first reference."""
+    hub = hubs.get(hub_id)
+    if hub is None:
+        hub = hubs[hub_id] = Hub(hub_id)
+    return hub
+
+
+def _fsync_directory(directory: Path) -> None:
+    """Makes a rename inside a directory durable, where the OS supports it."""
+    if not hasattr(os, "O_DIRECTORY"):
+        return
+    descriptor = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(descriptor)
+    finally:
+        os.close(descriptor)
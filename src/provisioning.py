@@ -0,0 +1,128 @@
+import csv
+import json
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+from src.device import AnyDeviceType
+from src.device_manager import DEVICE_CLASSES, DeviceManager, DeviceSpec
+from src.registry import DeviceSchema
+
+# Columns every manifest row carries, all other columns are device kwargs
+TYPE_FIELD = "type"
+ID_FIELD = "device_id"
+NAME_FIELD = "name"
+# Key a reader sets on a record it could not decode
+_ERROR_FIELD = "__error__"
+
+_decode_json = json.JSONDecoder().decode
+
+# A manifest row paired with its 1-based line number in the source
+ManifestRow = Tuple[int, Dict[str, Any]]
+
+
+def get_schema(device_type: AnyDeviceType) -> DeviceSchema:
+    """Returns the cached schema of a device type."""
+    return DEVICE_CLASSES.get_schema(device_type)
+
+
+@dataclass
+class RowError:
+    """A manifest row that could not be provisioned."""
+
+    line: int
+    message: str
+
+
+@dataclass
+class ProvisioningReport:
+    """Outcome of a provisioning run."""
+
+    created: int = 0
+    errors: List[RowError] = field(default_factory=list)
+
+
+def parse_row(record: Dict[str, Any]) -> DeviceSpec:
+    """Validates a manifest record and turns it into a DeviceSpec."""
+    kwargs = dict(record)
+    try:
+        type_value = kwargs.pop(TYPE_FIELD)
+        device_id = kwargs.pop(ID_FIELD)
+        name = kwargs.pop(NAME_FIELD)
+    except KeyError as error:
+        raise ValueError(f"Missing field {error.args[0]!r}") from None
+    if not device_id:
+        raise ValueError(f"Missing field {ID_FIELD!r}")
+    if not isinstance(type_value, str):
+        raise ValueError(f"Unknown device type {type_value!r}")
+    device_type = DEVICE_CLASSES.parse(type_value)
+    if kwargs:
+        kwargs = get_schema(device_type).validate(kwargs)
+    return DeviceSpec(device_type, str(device_id), str(name), kwargs)
+
+
+def read_jsonl(path: str | Path) -> Iterator[ManifestRow]:
+    """Lazily yields the records of a JSONL manifest."""
+    with open(path, encoding="utf-8") as manifest:
+        for line_number, line in enumerate(manifest, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = _decode_json(line)
+            except json.JSONDecodeError as error:
+                record = {_ERROR_FIELD: f"Malformed JSON: {error.msg}"}
+            if not isinstance(record, dict):
+                record = {_ERROR_FIELD: "Expected a JSON object"}
+            yield line_number, record
+
+
+def read_csv(path: str | Path) -> Iterator[ManifestRow]:
+    """Lazily yields the records of a CSV manifest with a header row."""
+    with open(path, encoding="utf-8", newline="") as manifest:
+        reader = csv.DictReader(manifest)
+        for record in reader:
+            if None in record:
+                record = {_ERROR_FIELD: "Too many columns"}
+            yield reader.line_num, record
+
+
+def read_manifest(path: str | Path) -> Iterator[ManifestRow]:
+    """Lazily yields the records of a manifest, picking the reader by suffix."""
+    suffix = Path(path).suffix.lower()
+    if suffix in (".jsonl", ".ndjson"):
+        return read_jsonl(path)
+    if suffix == ".csv":
+        return read_csv(path)
+    raise ValueError(f"Unsupported manifest format {suffix!r}")
+
+
+def provision(
+    device_manager: DeviceManager,
+    rows: Iterable[ManifestRow],
+    chunk_size: int = 10_000,
+) -> ProvisioningReport:
+    """Creates devices from manifest rows in chunks, collecting row errors."""
+    report = ProvisioningReport()
+    chunk: List[DeviceSpec] = []
+    for line, record in rows:
+        if _ERROR_FIELD in record:
+            report.errors.append(RowError(line, record[_ERROR_FIELD]))
+            continue
+        try:
+            chunk.append(parse_row(record))
+        except ValueError as error:
+            report.errors.append(RowError(line, str(error)))
+            continue
+        if len(chunk) >= chunk_size:
+            report.created += len(device_manager.create_devices(chunk))
+            chunk = []
+    if chunk:
+        report.created += len(device_manager.create_devices(chunk))
+    return report
+
+
+def provision_file(
+    device_manager: DeviceManager, path: str | Path, chunk_size: int = 10_000
+) -> ProvisioningReport:
+    """Streams a JSONL or CSV manifest into the device manager."""
+    return provision(device_manager, read_manifest(path), chunk_size)
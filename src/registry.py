@@ -0,0 +1,224 @@
+import importlib
+import typing
+from importlib.metadata import entry_points
+from typing import Any, Callable, Dict, Iterator, List, Mapping, Type
+
+from src.device import AnyDeviceType, CustomDeviceType, Device, DeviceType
+
+# Entry point group other distributions register device types under, as
+# name = "package.module:Class"
+ENTRY_POINT_GROUP = "devicemanager.device_types"
+
+# Drivers of the built-in types, imported on first use like any other
+BUILTIN_TARGETS: Dict[AnyDeviceType, str] = {
+    DeviceType.SWITCH: "src.devices.switch:Switch",
+    DeviceType.DIMMER: "src.devices.dimmer:Dimmer",
+    DeviceType.LOCK: "src.devices.lock:Lock",
+    DeviceType.THERMOSTAT: "src.devices.thermostat:Thermostat",
+}
+
+_BUILTIN_BY_VALUE = {device_type.value: device_type for device_type in DeviceType}
+
+
+class DeviceSchema:
+    """Accepted kwargs of a device type, derived once from its constructor."""
+
+    __slots__ = ("_device_type", "_fields")
+
+    def __init__(self, device_type: AnyDeviceType, cls: Type[Device]) -> None:
+        """Initializes the schema from the constructor signature of the class."""
+        self._device_type = device_type
+        hints = typing.get_type_hints(cls.__init__)
+        self._fields: Dict[str, Callable[[Any], Any]] = {
+            name: _converter(hint)
+            for name, hint in hints.items()
+            if name not in ("device_id", "name", "return")
+        }
+
+    def get_fields(self) -> List[str]:
+        """Returns the names of the accepted kwargs."""
+        return list(self._fields)
+
+    def validate(self, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        """Returns the kwargs converted to their declared types."""
+        validated = {}
+        for key, value in kwargs.items():
+            # Empty cells belong to columns of other device types
+            if value is None or value == "":
+                continue
+            convert = self._fields.get(key)
+            if convert is None:
+                raise ValueError(
+                    f"Unknown field {key!r} for {self._device_type.value}"
+                )
+            try:
+                validated[key] = convert(value)
+            except (TypeError, ValueError, OverflowError):
+                raise ValueError(f"Invalid value {value!r} for {key!r}") from None
+        return validated
+
+
+class DeviceRegistry(Mapping[AnyDeviceType, Type[Device]]):
+    """Device classes per type, imported from their modules on first use.
+
+    Types are registered as "module:Class" targets, so a process imports
+    only the drivers it creates devices of. Entry points are scanned the
+    first time a type or the whole catalog is asked for and not found.
+    """
+
+    def __init__(self, targets: Mapping[AnyDeviceType, str] = BUILTIN_TARGETS) -> None:
+        """Initializes a registry with targets per device type."""
+        self._targets: Dict[AnyDeviceType, str] = {}
+        self._classes: Dict[AnyDeviceType, Type[Device]] = {}  # Imported so far
+        self._schemas: Dict[AnyDeviceType, DeviceSchema] = {}
+        self._load_callbacks: List[Callable[[Type[Device]], None]] = []
+        self._entry_points_loaded = False
+        for device_type, target in targets.items():
+            self.register(device_type, target)
+
+    def register(self, device_type: AnyDeviceType | str, target: str | type) -> None:
+        """Registers the class of a device type, or its "module:Class" path."""
+        device_type = self._type_of(device_type)
+        if isinstance(target, type):
+            self._check_class(device_type, target)
+            self._loaded(device_type, target)
+            target = f"{target.__module__}:{target.__qualname__}"
+        else:
+            module, _, name = target.partition(":")
+            if not module or not name:
+                raise ValueError(f"Invalid target {target!r}, expected module:Class")
+            self._classes.pop(device_type, None)
+        self._targets[device_type] = target
+        self._schemas.pop(device_type, None)
+
+    def unregister(self, device_type: AnyDeviceType | str) -> None:
+        """Removes a device type, if registered."""
+        device_type = self._type_of(device_type)
+        self._targets.pop(device_type, None)
+        self._classes.pop(device_type, None)
+        self._schemas.pop(device_type, None)
+
+    def load_config(self, config: Mapping[str, str]) -> None:
+        """Registers device types from a mapping of type names to targets."""
+        for name, target in config.items():
+            self.register(name, target)
+
+    def load_entry_points(self, group: str = ENTRY_POINT_GROUP) -> None:
+        """Registers the device types installed distributions declare."""
+        self._entry_points_loaded = True
+        for entry_point in entry_points(group=group):
+            device_type = self._type_of(entry_point.name)
+            # Explicit registrations take precedence over installed ones
+            if device_type not in self._targets:
+                self.register(device_type, entry_point.value)
+
+    def parse(self, value: str) -> AnyDeviceType:
+        """Returns the registered device type of a name, raising ValueError."""
+        device_type = self._type_of(value)
+        if device_type not in self._targets and not self._entry_points_loaded:
+            self.load_entry_points()
+        if device_type not in self._targets:
+            raise ValueError(f"Unknown device type {value!r}")
+        return device_type
+
+    def get_loaded(self) -> Dict[AnyDeviceType, Type[Device]]:
+        """Returns the live map of classes imported so far, for hot paths."""
+        return self._classes
+
+    def add_load_callback(self, callback: Callable[[Type[Device]], None]) -> None:
+        """Registers a function called with each device class as it is loaded."""
+        self._load_callbacks.append(callback)
+
+    def remove_load_callback(self, callback: Callable[[Type[Device]], None]) -> None:
+        """Unregisters a load callback, if registered."""
+        if callback in self._load_callbacks:
+            self._load_callbacks.remove(callback)
+
+    def get_schema(self, device_type: AnyDeviceType) -> DeviceSchema:
+        """Returns the kwargs schema of a device type, prepared once."""
+        schema = self._schemas.get(device_type)
+        if schema is None:
+            schema = DeviceSchema(device_type, self[device_type])
+            self._schemas[device_type] = schema
+        return schema
+
+    def __getitem__(self, device_type: AnyDeviceType) -> Type[Device]:
+        """Returns the class of a device type, importing it on first use."""
+        cls = self._classes.get(device_type)
+        if cls is not None:
+            return cls
+        target = self._targets.get(device_type)
+        if target is None and not self._entry_points_loaded:
+            self.load_entry_points()
+            target = self._targets.get(device_type)
+        if target is None:
+            raise KeyError(device_type)
+        module, _, name = target.partition(":")
+        cls = getattr(importlib.import_module(module), name)
+        self._check_class(device_type, cls)
+        self._loaded(device_type, cls)
+        return cls
+
+    def __iter__(self) -> Iterator[AnyDeviceType]:
+        """Iterates over every registered device type."""
+        if not self._entry_points_loaded:
+            self.load_entry_points()
+        return iter(list(self._targets))
+
+    def __len__(self) -> int:
+        """Returns the number of registered device types."""
+        if not self._entry_points_loaded:
+            self.load_entry_points()
+        return len(self._targets)
+
+    def __contains__(self, device_type: object) -> bool:
+        """Checks whether a device type is registered, without importing it."""
+        if device_type not in self._targets and not self._entry_points_loaded:
+            self.load_entry_points()
+        return device_type in self._targets
+
+    def _loaded(self, device_type: AnyDeviceType, cls: Type[Device]) -> None:
+        """Stores a loaded class and tells the load callbacks."""
+        self._classes[device_type] = cls
+        for callback in self._load_callbacks:
+            callback(cls)
+
+    @staticmethod
+    def _type_of(device_type: AnyDeviceType | str) -> AnyDeviceType:
+        """Returns the device type of a name, built-in members for their values."""
+        if isinstance(device_type, (DeviceType, CustomDeviceType)):
+            return device_type
+        return _BUILTIN_BY_VALUE.get(device_type) or CustomDeviceType(device_type)
+
+    @staticmethod
+    def _check_class(device_type: AnyDeviceType, cls: Any) -> None:
+        """Raises ValueError unless a class is the device class of a type."""
+        if not (isinstance(cls, type) and issubclass(cls, Device)):
+            raise ValueError(f"{cls!r} is not a Device subclass")
+        if cls.DEVICE_TYPE != device_type:
+            raise ValueError(
+                f"{cls.__name__} is of type {cls.DEVICE_TYPE.value}, "
+                f"not {device_type.value}"
+            )
+
+
+def _converter(hint: Any) -> Callable[[Any], Any]:
+    """Returns a converter for a type hint, unwrapping Optional."""
+    args = [arg for arg in typing.get_args(hint) if arg is not type(None)]
+    target = args[0] if args else hint
+    if target is int:
+        return _to_int
+    if target is float:
+        return float
+    if target is str:
+        return str
+    return lambda value: value
+
+
+def _to_int(value: Any) -> int:
+    """Converts a value to int, rejecting floats with a fraction."""
+    if isinstance(value, str):
+        return int(value)
+    if isinstance(value, bool) or int(value) != value:
+        raise ValueError(value)
+    return int(value)
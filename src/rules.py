@@ -0,0 +1,320 @@
+from enum import Enum
+from itertools import count
+from typing import Any, Dict, Iterable, List, NamedTuple, Set, Tuple
+
+from src.device import AnyDeviceType, Device, DeviceObserver
+from src.device_manager import DeviceManager
+from src.dwelling import Dwelling, DwellingObserver
+from src.dwelling_manager import DwellingManager
+
+OCCUPANCY = "is_occupied"  # Trigger attribute of dwelling occupancy
+
+_ANY = object()  # Index key of triggers firing on any new value
+_MISSING = object()  # Last value of an attribute never seen
+
+
+class Trigger(NamedTuple):
+    """A change that fires a rule.
+
+    Device triggers name a state attribute of a device, or of every device
+    of a type, optionally only inside one dwelling. Occupancy triggers use
+    the OCCUPANCY attribute and an optional dwelling ID.
+    """
+
+    attribute: str  # get_state() key, or OCCUPANCY
+    value: Any = None  # Value it must become, None for any new value
+    device_id: str | None = None
+    device_type: AnyDeviceType | None = None
+    dwelling_id: str | None = None
+
+
+class Action(NamedTuple):
+    """An update_state call a rule makes.
+
+    Without a device ID it targets the devices of a type, or of every
+    type, in the dwelling the trigger happened in. Where filters targets
+    by their current state, so toggling devices only flip the ones needed.
+    """
+
+    kwargs: Dict[str, Any]  # Passed to update_state
+    device_id: str | None = None
+    device_type: AnyDeviceType | None = None
+    where: Dict[str, Any] | None = None  # get_state() values targets must have
+
+
+class Rule(NamedTuple):
+    """A trigger and the actions it runs."""
+
+    rule_id: int
+    trigger: Trigger
+    actions: Tuple[Action, ...]
+
+
+class RuleStats(NamedTuple):
+    """Counters of the rules engine."""
+
+    fired: int  # Rules whose actions ran
+    suppressed: int  # Firings skipped by loop or cascade protection
+    failed: int  # Action calls that raised ValueError
+
+
+# Attribute to value (or _ANY) to the rules it fires
+_AttributeIndex = Dict[str, Dict[Any, List[Rule]]]
+
+
+def _discard(index: Dict[Any, Dict[Any, List[Rule]]], key: Any, rule: Rule) -> None:
+    """Removes a rule from an index by key then value, deleting emptied buckets."""
+    by_value = index[key]
+    value = _ANY if rule.trigger.value is None else rule.trigger.value
+    bucket = by_value[value]
+    bucket.remove(rule)
+    if not bucket:
+        del by_value[value]
+        if not by_value:
+            del index[key]
+
+
+def _normalize(value: Any) -> Any:
+    """Compares enums by name, as get_state() reports them."""
+    return value.name if isinstance(value, Enum) else value
+
+
+class RulesEngine(DeviceObserver, DwellingObserver):
+    """Runs actions when device states or dwelling occupancy change.
+
+    Rules are indexed by device ID or type, then attribute, then value, so
+    a change only looks at the rules that can match it, and changes of
+    devices without rules cost a pair of dict lookups. Triggers fire on a
+    change to a value, not on every update keeping it; the first update of
+    a device created before the engine counts as a change. Actions run inside
+    the change that fired them; each rule fires at most once per cascade
+    and cascades stop at max_depth, so rules cannot loop.
+    """
+
+    def __init__(
+        self,
+        device_manager: DeviceManager,
+        dwelling_manager: DwellingManager,
+        max_depth: int = 8,
+    ) -> None:
+        """Initializes an engine with no rules, observing both managers."""
+        if max_depth < 1:
+            raise ValueError("Maximum depth must be positive")
+        self._device_manager = device_manager
+        self._dwelling_manager = dwelling_manager
+        self._max_depth = max_depth
+        self._rules: Dict[int, Rule] = {}
+        self._by_device: Dict[str, _AttributeIndex] = {}
+        self._by_type: Dict[AnyDeviceType, _AttributeIndex] = {}
+        # Dwelling ID, or None for every dwelling, to value to rules
+        self._by_dwelling: Dict[str | None, Dict[Any, List[Rule]]] = {}
+        self._last: Dict[str, Dict[str, Any]] = {}  # Last watched values per device
+        self._occupancy: Dict[str, bool] = {}  # Last occupancy per dwelling
+        self._next_id = count(1).__next__
+        self._depth = 0  # Nesting of the cascade being run
+        self._fired_in_cascade: Set[int] = set()
+        self._fired = self._suppressed = self._failed = 0
+        device_manager.add_observer(self)
+        dwelling_manager.add_observer(self)
+
+    def add_rule(self, trigger: Trigger, actions: Iterable[Action]) -> Rule:
+        """Compiles a rule into the index and returns it."""
+        trigger = trigger._replace(value=_normalize(trigger.value))
+        actions = tuple(
+            action._replace(where={k: _normalize(v) for k, v in action.where.items()})
+            if action.where
+            else action
+            for action in actions
+        )
+        rule = Rule(self._next_id(), trigger, actions)
+        self._bucket(rule.trigger).append(rule)
+        self._rules[rule.rule_id] = rule
+        return rule
+
+    def remove_rule(self, rule_id: int) -> bool:
+        """Removes a rule, returns whether it existed."""
+        rule = self._rules.pop(rule_id, None)
+        if rule is None:
+            return False
+        trigger = rule.trigger
+        if trigger.attribute == OCCUPANCY:
+            _discard(self._by_dwelling, trigger.dwelling_id, rule)
+            return True
+        if trigger.device_id is not None:
+            attributes = self._by_device[trigger.device_id]
+            _discard(attributes, trigger.attribute, rule)
+            if not attributes:
+                del self._by_device[trigger.device_id]
+        elif trigger.device_type is not None:
+            attributes = self._by_type[trigger.device_type]
+            _discard(attributes, trigger.attribute, rule)
+            if not attributes:
+                del self._by_type[trigger.device_type]
+        return True
+
+    def get_rule(self, rule_id: int) -> Rule | None:
+        """Returns a rule, or None if absent."""
+        return self._rules.get(rule_id)
+
+    def list_rules(self) -> List[Rule]:
+        """Lists all rules."""
+        return list(self._rules.values())
+
+    def get_stats(self) -> RuleStats:
+        """Returns how many rules fired, were suppressed or failed."""
+        return RuleStats(self._fired, self._suppressed, self._failed)
+
+    def close(self) -> None:
+        """Stops observing the managers."""
+        self._device_manager.remove_observer(self)
+        self._dwelling_manager.remove_observer(self)
+
+    def on_state_change(self, device: Device) -> None:
+        """Fires the rules of the attributes the change gave new values."""
+        device_id = device.get_device_id()
+        by_device = self._by_device.get(device_id)
+        by_type = self._by_type.get(device.DEVICE_TYPE)
+        if not by_device and not by_type:
+            return
+        changed = self._watched_changes(device)
+        matched: List[Rule] = []
+        for index in (by_device, by_type):
+            if not index:
+                continue
+            for attribute, value in changed.items():
+                by_value = index.get(attribute)
+                if by_value:
+                    matched.extend(by_value.get(value, ()))
+                    matched.extend(by_value.get(_ANY, ()))
+        if not matched:
+            return
+        location = self._dwelling_manager.locate(device_id)
+        dwelling = None if location is None else location.dwelling
+        self._run(
+            [
+                rule
+                for rule in matched
+                if rule.trigger.dwelling_id is None
+                or (
+                    dwelling is not None
+                    and dwelling.get_dwelling_id() == rule.trigger.dwelling_id
+                )
+            ],
+            dwelling,
+        )
+
+    def on_occupancy_change(self, dwelling: Dwelling) -> None:
+        """Fires the occupancy rules of a dwelling whose occupancy changed."""
+        if not self._by_dwelling:
+            return
+        dwelling_id = dwelling.get_dwelling_id()
+        value = dwelling.get_is_occupied()
+        if self._occupancy.get(dwelling_id) is value:
+            return
+        self._occupancy[dwelling_id] = value
+        matched: List[Rule] = []
+        for key in (dwelling_id, None):
+            by_value = self._by_dwelling.get(key)
+            if by_value:
+                matched.extend(by_value.get(value, ()))
+                matched.extend(by_value.get(_ANY, ()))
+        if matched:
+            self._run(matched, dwelling)
+
+    def on_device_created(self, device: Device) -> None:
+        """Records the starting values of watched attributes of a new device."""
+        self._last.pop(device.get_device_id(), None)
+        if device.get_device_id() in self._by_device or (
+            device.DEVICE_TYPE in self._by_type
+        ):
+            self._watched_changes(device)
+
+    def on_dwelling_created(self, dwelling: Dwelling) -> None:
+        """Records the starting occupancy of a new dwelling."""
+        self._occupancy[dwelling.get_dwelling_id()] = dwelling.get_is_occupied()
+
+    def on_device_deleted(self, device: Device) -> None:
+        """Forgets the last values of a deleted device."""
+        self._last.pop(device.get_device_id(), None)
+
+    def _watched_changes(self, device: Device) -> Dict[str, Any]:
+        """Records the watched attributes of a device, returns those that changed."""
+        device_id = device.get_device_id()
+        by_device = self._by_device.get(device_id)
+        by_type = self._by_type.get(device.DEVICE_TYPE)
+        if by_device and by_type:
+            attributes: Iterable[str] = by_device.keys() | by_type.keys()
+        else:
+            attributes = (by_device or by_type or {}).keys()
+        state = device.get_state()
+        last = self._last.setdefault(device_id, {})
+        changed: Dict[str, Any] = {}
+        for attribute in attributes:
+            value = state.get(attribute)
+            if last.get(attribute, _MISSING) != value:
+                last[attribute] = changed[attribute] = value
+        return changed
+
+    def _bucket(self, trigger: Trigger) -> List[Rule]:
+        """Returns the index list a trigger belongs in, creating it if needed."""
+        value = _ANY if trigger.value is None else trigger.value
+        if trigger.attribute == OCCUPANCY:
+            by_value = self._by_dwelling.setdefault(trigger.dwelling_id, {})
+        else:
+            if trigger.device_id is not None:
+                attributes = self._by_device.setdefault(trigger.device_id, {})
+            elif trigger.device_type is not None:
+                attributes = self._by_type.setdefault(trigger.device_type, {})
+            else:
+                raise ValueError("Device triggers need a device ID or device type")
+            by_value = attributes.setdefault(trigger.attribute, {})
+        return by_value.setdefault(value, [])
+
+    def _run(self, rules: List[Rule], dwelling: Dwelling | None) -> None:
+        """Runs the actions of rules, guarding against loops and deep cascades."""
+        if self._depth >= self._max_depth:
+            self._suppressed += len(rules)
+            return
+        outermost = self._depth == 0
+        self._depth += 1
+        try:
+            for rule in rules:
+                if rule.rule_id in self._fired_in_cascade:
+                    self._suppressed += 1
+                    continue
+                self._fired_in_cascade.add(rule.rule_id)
+                self._fired += 1
+                for action in rule.actions:
+                    for device in self._targets(action, dwelling):
+                        try:
+                            device.update_state(**action.kwargs)
+                        except ValueError:
+                            self._failed += 1
+        finally:
+            self._depth -= 1
+            if outermost:
+                self._fired_in_cascade.clear()
+
+    def _targets(self, action: Action, dwelling: Dwelling | None) -> List[Device]:
+        """Returns the devices an action applies to."""
+        if action.device_id is not None:
+            device = self._device_manager.get_device(action.device_id)
+            devices = [] if device is None else [device]
+        else:
+            hub = None if dwelling is None else dwelling.get_hub()
+            if hub is None:
+                return []
+            devices = [
+                device
+                for device in hub.list_devices()
+                if action.device_type is None
+                or device.get_device_type() == action.device_type
+            ]
+        where = action.where
+        if where:
+            devices = [
+                device
+                for device in devices
+                if all(device.get_state().get(k) == v for k, v in where.items())
+            ]
+        return devices
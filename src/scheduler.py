@@ -0,0 +1,259 @@
+import time
+from datetime import datetime, time as time_of_day, timedelta, timezone, tzinfo
+from enum import Enum
+from heapq import heapify, heappop, heappush
+from itertools import count
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, NamedTuple, Tuple
+
+from src.device import DeviceType
+from src.device_manager import DeviceManager
+
+DAY = 86_400  # Seconds in a day
+
+# Types whose update_state toggles, so their jobs must name the state to act on
+_TOGGLED_TYPES = frozenset({DeviceType.SWITCH, DeviceType.LOCK})
+
+
+class VirtualClock:
+    """Manually advanced clock, for running schedules without waiting."""
+
+    def __init__(self, now: float = 0.0) -> None:
+        """Initializes the clock at a time in seconds."""
+        self.now = now
+
+    def advance(self, seconds: float) -> float:
+        """Moves the clock forward and returns the new time."""
+        if seconds < 0:
+            raise ValueError("A clock cannot go back")
+        self.now += seconds
+        return self.now
+
+    def __call__(self) -> float:
+        """Returns the current time."""
+        return self.now
+
+
+class Job(NamedTuple):
+    """A scheduled update_state call."""
+
+    job_id: int
+    device_id: str
+    kwargs: Dict[str, Any]  # Passed to update_state
+    due: float  # Next run in seconds
+    interval: float | None  # Seconds between runs, None for one-shot jobs
+    weekdays: FrozenSet[int] | None  # Days it may run on, Monday is 0
+    at: time_of_day | None  # Local time of day of daily jobs
+    where: Dict[str, Any] | None  # get_state() values the device must have
+
+
+class _Job:
+    """Mutable job record, heap entries refer to it by ID."""
+
+    __slots__ = ("device_id", "kwargs", "due", "interval", "weekdays", "at", "where")
+
+    def __init__(
+        self,
+        device_id: str,
+        kwargs: Dict[str, Any],
+        due: float,
+        interval: float | None,
+        weekdays: FrozenSet[int] | None,
+        at: time_of_day | None,
+        where: Dict[str, Any] | None,
+    ) -> None:
+        """Initializes a job record."""
+        self.device_id = device_id
+        self.kwargs = kwargs
+        self.due = due
+        self.interval = interval
+        self.weekdays = weekdays
+        self.at = at
+        self.where = where
+
+
+class Scheduler:
+    """Runs one-shot and recurring update_state calls at given times.
+
+    Jobs sit in a heap ordered by due time, so a run costs time in
+    proportion to the jobs due, not to the jobs held. Cancelled jobs are
+    dropped lazily as they surface. A recurring job that fell behind runs
+    once and moves to its next occurrence after the current time, and jobs
+    whose device no longer exists are dropped when due. Daily jobs follow
+    the local time of day, so they keep their hour across DST changes.
+
+    Switch and lock updates toggle, so their jobs need a where state; a
+    job runs only while its device matches it and is skipped otherwise.
+    """
+
+    def __init__(
+        self,
+        device_manager: DeviceManager,
+        clock: Callable[[], float] = time.time,
+        tz: tzinfo = timezone.utc,
+    ) -> None:
+        """Initializes an empty schedule.
+
+        The time zone places daily times of day and decides weekdays.
+        """
+        self._device_manager = device_manager
+        self._clock = clock
+        self._tz = tz
+        self._jobs: Dict[int, _Job] = {}
+        self._heap: List[Tuple[float, int]] = []  # (due, job ID), IDs break ties
+        self._next_id = count(1).__next__
+
+    def schedule_at(
+        self,
+        device_id: str,
+        when: float,
+        kwargs: Dict[str, Any] | None = None,
+        where: Dict[str, Any] | None = None,
+    ) -> int:
+        """Schedules a single update_state call, returns the job ID."""
+        return self._add(_Job(device_id, kwargs or {}, when, None, None, None, where))
+
+    def schedule_every(
+        self,
+        device_id: str,
+        first: float,
+        interval: float,
+        kwargs: Dict[str, Any] | None = None,
+        weekdays: Iterable[int] | None = None,
+        where: Dict[str, Any] | None = None,
+    ) -> int:
+        """Schedules a call repeating every interval, returns the job ID.
+
+        With weekdays given, occurrences falling on other days are skipped.
+        """
+        if interval <= 0:
+            raise ValueError("Interval must be positive")
+        job = _Job(device_id, kwargs or {}, first, interval, None, None, where)
+        return self._add(job, weekdays)
+
+    def schedule_daily(
+        self,
+        device_id: str,
+        at: time_of_day,
+        kwargs: Dict[str, Any] | None = None,
+        weekdays: Iterable[int] | None = None,
+        where: Dict[str, Any] | None = None,
+    ) -> int:
+        """Schedules a call at a local time of day, from its next occurrence on."""
+        first = self._next_daily(at, self._clock())
+        job = _Job(device_id, kwargs or {}, first, DAY, None, at, where)
+        return self._add(job, weekdays)
+
+    def cancel(self, job_id: int) -> bool:
+        """Cancels a job, returns whether it was scheduled."""
+        if self._jobs.pop(job_id, None) is None:
+            return False
+        if len(self._heap) > 2 * len(self._jobs) + 64:
+            # Mostly cancelled entries, rebuild rather than carry them
+            self._heap = [(job.due, i) for i, job in self._jobs.items()]
+            heapify(self._heap)
+        return True
+
+    def get_job(self, job_id: int) -> Job | None:
+        """Returns a scheduled job, or None if absent."""
+        job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        return Job(
+            job_id,
+            job.device_id,
+            job.kwargs,
+            job.due,
+            job.interval,
+            job.weekdays,
+            job.at,
+            job.where,
+        )
+
+    def next_due(self) -> float | None:
+        """Returns when the earliest job is due, or None if nothing is scheduled."""
+        heap, jobs = self._heap, self._jobs
+        while heap:
+            due, job_id = heap[0]
+            job = jobs.get(job_id)
+            if job is not None and job.due == due:
+                return due
+            heappop(heap)  # Cancelled
+        return None
+
+    def run_due(self, now: float | None = None) -> int:
+        """Runs every job due by now, returns how many calls were made.
+
+        Jobs whose device does not match their where state are skipped. An
+        error raised by update_state propagates; jobs not yet run stay due
+        for the next call.
+        """
+        if now is None:
+            now = self._clock()
+        heap, jobs = self._heap, self._jobs
+        get_device = self._device_manager.get_device
+        dispatched = 0
+        while heap and heap[0][0] <= now:
+            due, job_id = heappop(heap)
+            job = jobs.get(job_id)
+            if job is None or job.due != due:
+                continue  # Cancelled
+            if job.interval is None:
+                del jobs[job_id]
+            else:
+                # Rescheduled before the call, so a failing call keeps its job
+                if job.at is None:
+                    skipped = (now - due) // job.interval + 1
+                    job.due = due + skipped * job.interval
+                else:
+                    job.due = self._next_daily(job.at, max(now, due))
+                heappush(heap, (job.due, job_id))
+                if job.weekdays is not None and (
+                    datetime.fromtimestamp(due, self._tz).weekday() not in job.weekdays
+                ):
+                    continue
+            device = get_device(job.device_id)
+            if device is None:
+                jobs.pop(job_id, None)
+                continue
+            where = job.where
+            if where:
+                state = device.get_state()
+                if any(state.get(k) != v for k, v in where.items()):
+                    continue
+            device.update_state(**job.kwargs)
+            dispatched += 1
+        return dispatched
+
+    def __len__(self) -> int:
+        """Returns the number of scheduled jobs."""
+        return len(self._jobs)
+
+    def _next_daily(self, at: time_of_day, after: float) -> float:
+        """Returns the first time after a given one the local clock reads at."""
+        day = datetime.fromtimestamp(after, self._tz).date()
+        while True:
+            due = datetime.combine(day, at, self._tz).timestamp()
+            if due > after:
+                return due
+            day += timedelta(days=1)
+
+    def _add(self, job: _Job, weekdays: Iterable[int] | None = None) -> int:
+        """Validates and stores a job, then queues its first run."""
+        if weekdays is not None:
+            job.weekdays = frozenset(weekdays)
+            if not job.weekdays or not job.weekdays <= frozenset(range(7)):
+                raise ValueError("Weekdays must be a non-empty set of 0 (Monday) to 6")
+        if job.where:
+            job.where = {
+                k: v.name if isinstance(v, Enum) else v for k, v in job.where.items()
+            }
+        else:
+            device = self._device_manager.get_device(job.device_id)
+            if device is not None and device.get_device_type() in _TOGGLED_TYPES:
+                raise ValueError(
+                    f"Device {job.device_id} toggles, jobs need a where state"
+                )
+        job_id = self._next_id()
+        self._jobs[job_id] = job
+        heappush(self._heap, (job.due, job_id))
+        return job_id
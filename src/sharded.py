@@ -0,0 +1,112 @@
+from threading import RLock
+from typing import Dict, Generic, Iterable, List, Tuple, TypeVar
+
+K = TypeVar("K")
+V = TypeVar("V")
+
+DEFAULT_SHARDS = 64
+_MISSING = object()
+
+
+class ShardedDict(Generic[K, V]):
+    """Mapping split into shards by key hash, each guarded by its own lock.
+
+    Writers to keys in different shards never wait on each other. values()
+    and items() copy one shard at a time, so they are safe while writers
+    run and see every key that was present throughout the call.
+    """
+
+    __slots__ = ("_shards", "_locks", "_mask")
+
+    def __init__(self, shards: int = DEFAULT_SHARDS) -> None:
+        """Initializes an empty mapping, shards is rounded up to a power of two."""
+        if shards < 1:
+            raise ValueError(f"shards must be positive, got {shards}")
+        count = 1 << (shards - 1).bit_length()
+        self._shards: List[Dict[K, V]] = [{} for _ in range(count)]
+        self._locks: List[RLock] = [RLock() for _ in range(count)]
+        self._mask = count - 1
+
+    def lock_for(self, key: K) -> RLock:
+        """Returns the lock of the shard holding a key, for compound updates."""
+        return self._locks[hash(key) & self._mask]
+
+    def get(self, key: K, default: V | None = None) -> V | None:
+        """Returns the value of a key, or the default if absent."""
+        index = hash(key) & self._mask
+        with self._locks[index]:
+            return self._shards[index].get(key, default)
+
+    def pop(self, key: K, default=_MISSING):
+        """Removes a key and returns its value, like dict.pop."""
+        index = hash(key) & self._mask
+        with self._locks[index]:
+            if default is _MISSING:
+                return self._shards[index].pop(key)
+            return self._shards[index].pop(key, default)
+
+    def update(self, items: Iterable[Tuple[K, V]]) -> None:
+        """Stores a batch of pairs, taking each shard lock once."""
+        mask = self._mask
+        batches: Dict[int, List[Tuple[K, V]]] = {}
+        for key, value in items:
+            batches.setdefault(hash(key) & mask, []).append((key, value))
+        for index, batch in batches.items():
+            with self._locks[index]:
+                self._shards[index].update(batch)
+
+    def keys(self) -> List[K]:
+        """Returns a snapshot of the keys."""
+        keys: List[K] = []
+        for shard, lock in zip(self._shards, self._locks):
+            with lock:
+                keys.extend(shard)
+        return keys
+
+    def values(self) -> List[V]:
+        """Returns a snapshot of the values."""
+        values: List[V] = []
+        for shard, lock in zip(self._shards, self._locks):
+            with lock:
+                values.extend(shard.values())
+        return values
+
+    def items(self) -> List[Tuple[K, V]]:
+        """Returns a snapshot of the key and value pairs."""
+        items: List[Tuple[K, V]] = []
+        for shard, lock in zip(self._shards, self._locks):
+            with lock:
+                items.extend(shard.items())
+        return items
+
+    def __getitem__(self, key: K) -> V:
+        """Returns the value of a key, raising KeyError if absent."""
+        index = hash(key) & self._mask
+        with self._locks[index]:
+            return self._shards[index][key]
+
+    def __setitem__(self, key: K, value: V) -> None:
+        """Stores the value of a key."""
+        index = hash(key) & self._mask
+        with self._locks[index]:
+            self._shards[index][key] = value
+
+    def __delitem__(self, key: K) -> None:
+        """Removes a key, raising KeyError if absent."""
+        index = hash(key) & self._mask
+        with self._locks[index]:
+            del self._shards[index][key]
+
+    def __contains__(self, key: object) -> bool:
+        """Checks whether a key is present."""
+        index = hash(key) & self._mask
+        with self._locks[index]:
+            return key in self._shards[index]
+
+    def __len__(self) -> int:
+        """Returns the number of keys, summed shard by shard."""
+        return sum(len(shard) for shard in self._shards)
+
+    def __iter__(self):
+        """Iterates over a snapshot of the keys."""
+        return iter(self.keys())
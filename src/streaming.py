@@ -0,0 +1,134 @@
+import json
+from array import array
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from bisect import bisect_right
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, NamedTuple, TextIO, Tuple
+
+from src.device import Device, DeviceObserver
+from src.dwelling import Dwelling, DwellingObserver
+
+_encode_json = json.JSONEncoder(separators=(",", ":")).encode
+
+
+class Page(NamedTuple):
+    """One page of a cursor-paginated listing."""
+
+    items: List[Any]
+    next_cursor: str | None  # Opaque, pass it back for the next page; None at the end
+
+
+def _encode_cursor(ordinal: int) -> str:
+    """Returns the opaque cursor resuming after an ordinal."""
+    return urlsafe_b64encode(ordinal.to_bytes(8, "big")).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> int:
+    """Returns the ordinal a cursor resumes after, raising ValueError if invalid."""
+    try:
+        raw = urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+    except (ValueError, TypeError):
+        raise ValueError(f"Invalid cursor: {cursor!r}") from None
+    if len(raw) != 8:
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+    return int.from_bytes(raw, "big")
+
+
+class CreationOrder(DeviceObserver, DwellingObserver):
+    """Keys in creation order, for cursors that survive creates and deletes.
+
+    Each creation appends the key with the next ordinal and cursors carry
+    the last ordinal served, so a page resumes by bisection no matter what
+    changed since: deleted keys are skipped, new ones come after everything
+    listed before, and nothing is served twice unless it was re-created.
+    Dead entries are compacted away once they outnumber live ones.
+    """
+
+    __slots__ = ("_keys", "_ordinals", "_live", "_next", "_dead")
+
+    def __init__(self, keys: Iterable[str] = ()) -> None:
+        """Initializes the order with the keys that already exist."""
+        self._keys: List[str] = []
+        self._ordinals = array("q")  # Ascending ordinal of each entry
+        self._live: Dict[str, int] = {}  # Key to the ordinal of its live entry
+        self._next = 0
+        self._dead = 0  # Entries whose key was deleted or re-created
+        for key in keys:
+            self.add(key)
+
+    def add(self, key: str) -> None:
+        """Appends a created key, superseding an earlier entry of it."""
+        if key in self._live:
+            self._dead += 1
+        self._keys.append(key)
+        self._ordinals.append(self._next)
+        self._live[key] = self._next
+        self._next += 1
+
+    def discard(self, key: str) -> None:
+        """Drops a deleted key."""
+        if self._live.pop(key, None) is None:
+            return
+        self._dead += 1
+        if self._dead > len(self._live) + 64:
+            self._compact()
+
+    def page(self, cursor: str | None, limit: int) -> Tuple[List[str], str | None]:
+        """Returns up to limit live keys after a cursor and the next cursor."""
+        if limit < 1:
+            raise ValueError("Limit must be positive")
+        keys, ordinals, live = self._keys, self._ordinals, self._live
+        position = 0
+        if cursor is not None:
+            position = bisect_right(ordinals, _decode_cursor(cursor))
+        page: List[str] = []
+        last = -1
+        end = len(keys)
+        while position < end and len(page) < limit:
+            key, ordinal = keys[position], ordinals[position]
+            if live.get(key) == ordinal:
+                page.append(key)
+                last = ordinal
+            position += 1
+        # Skip dead entries so the last page does not hand out a cursor
+        while position < end and live.get(keys[position]) != ordinals[position]:
+            position += 1
+        return page, _encode_cursor(last) if position < end else None
+
+    def on_device_created(self, device: Device) -> None:
+        """Appends a created device."""
+        self.add(device.get_device_id())
+
+    def on_device_deleted(self, device: Device) -> None:
+        """Drops a deleted device."""
+        self.discard(device.get_device_id())
+
+    def on_dwelling_created(self, dwelling: Dwelling) -> None:
+        """Appends a created dwelling."""
+        self.add(dwelling.get_dwelling_id())
+
+    def _compact(self) -> None:
+        """Rebuilds the entries without the dead ones, keeping ordinals."""
+        live = self._live
+        entries = [
+            (key, ordinal)
+            for key, ordinal in zip(self._keys, self._ordinals)
+            if live.get(key) == ordinal
+        ]
+        self._keys = [key for key, _ in entries]
+        self._ordinals = array("q", (ordinal for _, ordinal in entries))
+        self._dead = 0
+
+
+def write_jsonl(records: Iterable[Dict[str, Any]], target: str | Path | TextIO) -> int:
+    """Streams records to a JSONL file or open text file, returns how many."""
+    if isinstance(target, (str, Path)):
+        with open(target, "w", encoding="utf-8") as file:
+            return write_jsonl(records, file)
+    write = target.write
+    written = 0
+    for record in records:
+        write(_encode_json(record))
+        write("\n")
+        written += 1
+    return written
@@ -0,0 +1,333 @@
+import time
+from array import array
+from bisect import bisect_left
+from enum import Enum
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple
+
+from src.column_store import MODE_CODES
+from src.device import Device, DeviceObserver, DeviceType
+from src.device_manager import DeviceManager
+from src.devices.thermostat import THERMOSTAT_MODES, ThermostatStateRepr
+
+_CODE_OF_MODE = {mode: code for code, mode in enumerate(MODE_CODES)}
+_CODE_OF_STATE = {THERMOSTAT_MODES[mode]: code for mode, code in _CODE_OF_MODE.items()}
+
+
+class Tier(Enum):
+    """Downsampling tiers, the value is the bucket width in seconds."""
+
+    MINUTE = 60
+    HOUR = 3_600
+    DAY = 86_400
+
+
+class Samples(NamedTuple):
+    """Raw samples of a thermostat, oldest first."""
+
+    times: array  # Sample times in seconds
+    temperatures: array
+    modes: array  # Mode codes, indexing column_store.MODE_CODES
+
+
+class Aggregates(NamedTuple):
+    """Downsampled buckets of a thermostat, oldest first."""
+
+    starts: array  # Bucket start times in seconds
+    mins: array
+    means: array
+    maxes: array
+
+
+def _chronological(column: array, base: int, head: int, size: int, capacity: int):
+    """Returns the filled part of a ring, oldest entry first."""
+    if size < capacity:
+        return column[base : base + size]
+    return column[base + head : base + capacity] + column[base : base + head]
+
+
+class _TierRings:
+    """Per-device rings of closed buckets plus the bucket being filled."""
+
+    __slots__ = (
+        "width",
+        "capacity",
+        "indexes",
+        "mins",
+        "means",
+        "maxes",
+        "heads",
+        "sizes",
+        "open_index",
+        "open_min",
+        "open_max",
+        "open_sum",
+        "open_count",
+    )
+
+    def __init__(self, width: int, capacity: int) -> None:
+        """Initializes empty rings of a tier."""
+        self.width = width
+        self.capacity = capacity
+        self.indexes = array("i")  # Bucket start divided by the width
+        self.mins = array("f")
+        self.means = array("f")
+        self.maxes = array("f")
+        self.heads = array("I")  # Next write position per device
+        self.sizes = array("I")  # Closed buckets held per device
+        self.open_index = array("q")  # Bucket being filled, -1 for none
+        self.open_min = array("f")
+        self.open_max = array("f")
+        self.open_sum = array("d")
+        self.open_count = array("I")
+
+    def grow(self) -> None:
+        """Adds the rings of one more device."""
+        padding = array("f", bytes(4 * self.capacity))
+        self.indexes.extend(array("i", bytes(4 * self.capacity)))
+        self.mins.extend(padding)
+        self.means.extend(padding)
+        self.maxes.extend(padding)
+        for column in (self.heads, self.sizes, self.open_count):
+            column.append(0)
+        self.open_index.append(-1)
+        self.open_min.append(0)
+        self.open_max.append(0)
+        self.open_sum.append(0)
+
+    def reset(self, slot: int) -> None:
+        """Empties the rings of a slot for reuse."""
+        self.heads[slot] = self.sizes[slot] = self.open_count[slot] = 0
+        self.open_index[slot] = -1
+
+    def add(self, slot: int, timestamp: float, value: float) -> None:
+        """Folds a sample into the open bucket, closing it on a new bucket."""
+        index = int(timestamp // self.width)
+        if self.open_index[slot] != index:
+            if self.open_count[slot]:
+                self._close(slot)
+            self.open_index[slot] = index
+            self.open_min[slot] = self.open_max[slot] = value
+            self.open_sum[slot] = value
+            self.open_count[slot] = 1
+            return
+        if value < self.open_min[slot]:
+            self.open_min[slot] = value
+        if value > self.open_max[slot]:
+            self.open_max[slot] = value
+        self.open_sum[slot] += value
+        self.open_count[slot] += 1
+
+    def read(self, slot: int, start: float, end: float) -> Aggregates:
+        """Returns the buckets overlapping [start, end), the open one included."""
+        base = slot * self.capacity
+        head, size = self.heads[slot], self.sizes[slot]
+        indexes = _chronological(self.indexes, base, head, size, self.capacity)
+        low = bisect_left(indexes, int(start // self.width))
+        high = bisect_left(indexes, -(-end // self.width))
+        mins = _chronological(self.mins, base, head, size, self.capacity)[low:high]
+        means = _chronological(self.means, base, head, size, self.capacity)[low:high]
+        maxes = _chronological(self.maxes, base, head, size, self.capacity)[low:high]
+        starts = array("d", (index * self.width for index in indexes[low:high]))
+
+        index = self.open_index[slot]
+        if self.open_count[slot] and start < (index + 1) * self.width and (
+            index * self.width < end
+        ):
+            starts.append(index * self.width)
+            mins.append(self.open_min[slot])
+            means.append(self.open_sum[slot] / self.open_count[slot])
+            maxes.append(self.open_max[slot])
+        return Aggregates(starts, mins, means, maxes)
+
+    def _close(self, slot: int) -> None:
+        """Moves the open bucket of a slot into its ring."""
+        position = slot * self.capacity + self.heads[slot]
+        self.indexes[position] = self.open_index[slot]
+        self.mins[position] = self.open_min[slot]
+        self.means[position] = self.open_sum[slot] / self.open_count[slot]
+        self.maxes[position] = self.open_max[slot]
+        self.heads[slot] = (self.heads[slot] + 1) % self.capacity
+        if self.sizes[slot] < self.capacity:
+            self.sizes[slot] += 1
+
+
+class TelemetryStore(DeviceObserver):
+    """Fixed-size temperature and mode history of thermostats.
+
+    Each thermostat gets a ring of raw samples and rings of minute, hour
+    and day min/mean/max buckets, all packed into shared arrays, so memory
+    depends only on the number of thermostats and the ring sizes. With a
+    device manager, every thermostat state change is recorded.
+    """
+
+    def __init__(
+        self,
+        device_manager: DeviceManager | None = None,
+        samples: int = 64,
+        minutes: int = 60,
+        hours: int = 48,
+        days: int = 30,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        """Initializes an empty store holding the given number of entries."""
+        if min(samples, minutes, hours, days) < 1:
+            raise ValueError("Ring sizes must be positive")
+        self._device_manager = device_manager
+        self._clock = clock
+        self._capacity = samples
+        self._slots: Dict[str, int] = {}  # Device ID to its slot
+        self._free: List[int] = []  # Slots released by forgotten devices
+        self._times = array("d")  # Raw sample times
+        self._temperatures = array("f")  # Raw temperatures
+        self._modes = array("b")  # Raw mode codes
+        self._heads = array("I")  # Next raw write position per slot
+        self._sizes = array("I")  # Raw samples held per slot
+        self._tiers: Dict[Tier, _TierRings] = {
+            Tier.MINUTE: _TierRings(Tier.MINUTE.value, minutes),
+            Tier.HOUR: _TierRings(Tier.HOUR.value, hours),
+            Tier.DAY: _TierRings(Tier.DAY.value, days),
+        }
+        if device_manager is not None:
+            device_manager.add_observer(self)
+
+    def record(
+        self,
+        device_id: str,
+        timestamp: float,
+        temperature: float,
+        mode: ThermostatStateRepr = ThermostatStateRepr.OFF,
+    ) -> bool:
+        """Stores a sample, returns False if it is older than the latest one."""
+        slot = self._slots.get(device_id)
+        if slot is None:
+            slot = self._allocate(device_id)
+        return self._store(slot, timestamp, temperature, _CODE_OF_MODE[mode])
+
+    def sample(self, devices: Iterable[Device], timestamp: float | None = None) -> int:
+        """Records the current reading of each thermostat, returns how many."""
+        if timestamp is None:
+            timestamp = self._clock()
+        recorded = 0
+        for device in devices:
+            if device.get_device_type() is DeviceType.THERMOSTAT:
+                recorded += self._record_device(device, timestamp)
+        return recorded
+
+    def forget(self, device_id: str) -> None:
+        """Drops the history of a device and frees its slot."""
+        slot = self._slots.pop(device_id, None)
+        if slot is None:
+            return
+        self._heads[slot] = self._sizes[slot] = 0
+        for tier in self._tiers.values():
+            tier.reset(slot)
+        self._free.append(slot)
+
+    def get_samples(
+        self, device_id: str, start: float = float("-inf"), end: float = float("inf")
+    ) -> Samples:
+        """Returns the raw samples of a device taken in [start, end)."""
+        slot = self._slots.get(device_id)
+        if slot is None:
+            return Samples(array("d"), array("f"), array("b"))
+        base = slot * self._capacity
+        head, size = self._heads[slot], self._sizes[slot]
+        times = _chronological(self._times, base, head, size, self._capacity)
+        low, high = bisect_left(times, start), bisect_left(times, end)
+        capacity = self._capacity
+        temperatures = _chronological(self._temperatures, base, head, size, capacity)
+        modes = _chronological(self._modes, base, head, size, capacity)
+        return Samples(times[low:high], temperatures[low:high], modes[low:high])
+
+    def get_aggregates(
+        self,
+        device_id: str,
+        tier: Tier,
+        start: float = float("-inf"),
+        end: float = float("inf"),
+    ) -> Aggregates:
+        """Returns the buckets of a tier overlapping [start, end)."""
+        slot = self._slots.get(device_id)
+        if slot is None:
+            return Aggregates(array("d"), array("f"), array("f"), array("f"))
+        if start == float("-inf"):
+            start = -(2**62)
+        if end == float("inf"):
+            end = 2**62
+        return self._tiers[tier].read(slot, start, end)
+
+    def query(
+        self,
+        device_ids: Iterable[str],
+        start: float = float("-inf"),
+        end: float = float("inf"),
+        tier: Tier | None = None,
+    ) -> Dict[str, Samples | Aggregates]:
+        """Returns raw samples, or the buckets of a tier, for many devices."""
+        if tier is None:
+            return {i: self.get_samples(i, start, end) for i in device_ids}
+        return {i: self.get_aggregates(i, tier, start, end) for i in device_ids}
+
+    def list_device_ids(self) -> List[str]:
+        """Lists the devices with recorded history."""
+        return list(self._slots)
+
+    def close(self) -> None:
+        """Stops recording state changes of the device manager."""
+        if self._device_manager is not None:
+            self._device_manager.remove_observer(self)
+
+    def on_state_change(self, device: Device) -> None:
+        """Records the reading of a thermostat that changed."""
+        if device.get_device_type() is DeviceType.THERMOSTAT:
+            self._record_device(device, self._clock())
+
+    def on_device_deleted(self, device: Device) -> None:
+        """Drops the history of a deleted device."""
+        self.forget(device.get_device_id())
+
+    def _record_device(self, device: Device, timestamp: float) -> bool:
+        """Stores the current temperature and mode of a thermostat."""
+        device_id = device.get_device_id()
+        slot = self._slots.get(device_id)
+        if slot is None:
+            slot = self._allocate(device_id)
+        thermostat: Any = device  # A Thermostat or a columnar view of one
+        mode = _CODE_OF_STATE[thermostat.state]
+        return self._store(slot, timestamp, thermostat.get_temperature(), mode)
+
+    def _store(
+        self, slot: int, timestamp: float, temperature: float, mode: int
+    ) -> bool:
+        """Writes a sample into the raw ring and folds it into every tier."""
+        size = self._sizes[slot]
+        head = self._heads[slot]
+        base = slot * self._capacity
+        if size and timestamp < self._times[base + (head - 1) % self._capacity]:
+            return False
+        position = base + head
+        self._times[position] = timestamp
+        self._temperatures[position] = temperature
+        self._modes[position] = mode
+        self._heads[slot] = (head + 1) % self._capacity
+        if size < self._capacity:
+            self._sizes[slot] = size + 1
+        for tier in self._tiers.values():
+            tier.add(slot, timestamp, temperature)
+        return True
+
+    def _allocate(self, device_id: str) -> int:
+        """Assigns a slot to a device, reusing a freed one if possible."""
+        if self._free:
+            slot = self._free.pop()
+        else:
+            slot = len(self._heads)
+            self._times.extend(array("d", bytes(8 * self._capacity)))
+            self._temperatures.extend(array("f", bytes(4 * self._capacity)))
+            self._modes.extend(array("b", bytes(self._capacity)))
+            self._heads.append(0)
+            self._sizes.append(0)
+            for tier in self._tiers.values():
+                tier.grow()
+        self._slots[device_id] = slot
+        return slot
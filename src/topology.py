@@ -0,0 +1,64 @@
+from typing import Dict, NamedTuple
+
+from src.device import Device
+from src.dwelling import Dwelling, DwellingObserver
+from src.hub import Hub, HubObserver
+
+
+class Location(NamedTuple):
+    """Where a device sits in the topology."""
+
+    hub: Hub
+    dwelling: Dwelling
+
+
+class TopologyIndex(HubObserver, DwellingObserver):
+    """Reverse index from devices to their hub and from hubs to their dwelling."""
+
+    __slots__ = ("_hub_of_device", "_dwelling_of_hub")
+
+    def __init__(self) -> None:
+        """Initializes an empty index."""
+        self._hub_of_device: Dict[str, Hub] = {}  # Device ID to its hub
+        self._dwelling_of_hub: Dict[str, Dwelling] = {}  # Hub ID to its dwelling
+
+    def on_hub_installed(self, dwelling: Dwelling, previous: Hub | None) -> None:
+        """Starts tracking the new hub of a dwelling and drops the old one."""
+        if previous is not None:
+            self._untrack_hub(previous)
+        hub = dwelling.get_hub()
+        if hub is None:
+            return
+        self._dwelling_of_hub[hub.get_hub_id()] = dwelling
+        hub.add_observer(self)
+        for device_id in hub.get_paired_devices():
+            self._hub_of_device[device_id] = hub
+
+    def on_device_added(self, hub: Hub, device: Device) -> None:
+        """Points a device at the hub it was added to."""
+        self._hub_of_device[device.get_device_id()] = hub
+
+    def on_device_removed(self, hub: Hub, device: Device) -> None:
+        """Forgets a device, unless it has since moved to another hub."""
+        device_id = device.get_device_id()
+        if self._hub_of_device.get(device_id) is hub:
+            del self._hub_of_device[device_id]
+
+    def locate(self, device_id: str) -> Location | None:
+        """Returns the hub and dwelling of a device, or None if not installed."""
+        hub = self._hub_of_device.get(device_id)
+        if hub is None:
+            return None
+        return Location(hub, self._dwelling_of_hub[hub.get_hub_id()])
+
+    def get_dwelling_of_hub(self, hub_id: str) -> Dwelling | None:
+        """Returns the dwelling a hub is installed in, or None."""
+        return self._dwelling_of_hub.get(hub_id)
+
+    def _untrack_hub(self, hub: Hub) -> None:
+        """Forgets a hub and the devices paired to it."""
+        hub.remove_observer(self)
+        self._dwelling_of_hub.pop(hub.get_hub_id(), None)
+        for device_id in hub.get_paired_devices():
+            if self._hub_of_device.get(device_id) is hub:
+                del self._hub_of_device[device_id]
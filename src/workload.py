@@ -0,0 +1,309 @@
+import json
+import random
+import sys
+import time
+from bisect import bisect_right
+from enum import Enum
+from itertools import accumulate
+from pathlib import Path
+from statistics import median
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple
+
+from src.device import DeviceType
+from src.device_manager import DeviceManager
+from src.devices.thermostat import ThermostatStateRepr
+from src.dwelling_manager import DwellingManager
+from src.hub import Hub
+
+try:
+    import resource
+except ImportError:  # Not available on Windows, peak RSS is then reported as 0
+    resource = None  # type: ignore[assignment]
+
+# Share of each device type in a generated fleet
+DEFAULT_MIX: Dict[DeviceType, float] = {
+    DeviceType.SWITCH: 0.4,
+    DeviceType.DIMMER: 0.25,
+    DeviceType.LOCK: 0.15,
+    DeviceType.THERMOSTAT: 0.2,
+}
+
+_MIX_CYCLE = 100  # Slots of the repeating device type pattern
+_MODES = [mode.name for mode in ThermostatStateRepr]
+
+
+class CommandKind(Enum):
+    """Operations a command trace can hold."""
+
+    UPDATE = "update"  # update_state with the command kwargs
+    GET_STATE = "get_state"  # get_state of the device
+    PAIR = "pair"  # Add the device to the hub of its dwelling
+    UNPAIR = "unpair"  # Remove the device from the hub of its dwelling
+
+
+DEFAULT_COMMAND_MIX: Dict[CommandKind, float] = {
+    CommandKind.UPDATE: 0.7,
+    CommandKind.GET_STATE: 0.25,
+    CommandKind.PAIR: 0.025,
+    CommandKind.UNPAIR: 0.025,
+}
+
+
+class Command(NamedTuple):
+    """One traced operation, kept JSON-serializable."""
+
+    kind: CommandKind
+    device_id: str
+    dwelling_id: str
+    kwargs: Dict[str, Any]  # update_state kwargs, thermostat modes by name
+
+
+class ReplayReport(NamedTuple):
+    """Outcome of replaying a command trace."""
+
+    ops: int
+    errors: int  # Commands naming unknown devices or raising ValueError
+    seconds: float
+    ops_per_second: float
+    window_rates: List[float]  # Ops per second of each full window, in order
+    peak_rss_bytes: int  # Peak resident set size of the process so far
+
+    def get_sustained_rate(self) -> float:
+        """Returns the slowest window rate, or the overall rate without windows."""
+        return min(self.window_rates, default=self.ops_per_second)
+
+    def get_median_rate(self) -> float:
+        """Returns the median window rate, or the overall rate without windows."""
+        return median(self.window_rates) if self.window_rates else self.ops_per_second
+
+
+class FleetLayout:
+    """Names and device types of a synthetic fleet, derived on demand.
+
+    Dwelling i holds hub i and devices_per_dwelling devices. Device types
+    follow a seeded, shuffled pattern matching the mix, so fleets and
+    traces built from equal layouts agree without storing the fleet.
+    """
+
+    def __init__(
+        self,
+        dwellings: int,
+        devices_per_dwelling: int = 5,
+        mix: Dict[DeviceType, float] | None = None,
+        seed: int = 0,
+    ) -> None:
+        """Initializes the layout of a fleet."""
+        if dwellings < 1 or devices_per_dwelling < 1:
+            raise ValueError("A fleet needs at least one dwelling and device")
+        mix = DEFAULT_MIX if mix is None else mix
+        if any(share < 0 for share in mix.values()) or sum(mix.values()) <= 0:
+            raise ValueError("Mix shares must be non-negative and not all zero")
+        self.dwellings = dwellings
+        self.devices_per_dwelling = devices_per_dwelling
+        self._cycle = _type_cycle(mix, random.Random(seed))
+
+    def get_dwelling_id(self, dwelling: int) -> str:
+        """Returns the ID of the dwelling at an index."""
+        return f"home_{dwelling}"
+
+    def get_hub_id(self, dwelling: int) -> str:
+        """Returns the ID of the hub of the dwelling at an index."""
+        return f"hub_{dwelling}"
+
+    def get_device_id(self, dwelling: int, slot: int) -> str:
+        """Returns the ID of a device slot of a dwelling."""
+        return f"device_{dwelling}_{slot}"
+
+    def get_device_type(self, dwelling: int, slot: int) -> DeviceType:
+        """Returns the type of a device slot of a dwelling."""
+        position = dwelling * self.devices_per_dwelling + slot
+        return self._cycle[position % len(self._cycle)]
+
+    def __len__(self) -> int:
+        """Returns the number of devices of the fleet."""
+        return self.dwellings * self.devices_per_dwelling
+
+
+def _type_cycle(mix: Dict[DeviceType, float], rng: random.Random) -> List[DeviceType]:
+    """Returns a shuffled pattern of types in proportion to the mix."""
+    total = sum(mix.values())
+    exact = {t: share / total * _MIX_CYCLE for t, share in mix.items()}
+    counts = {t: int(value) for t, value in exact.items()}
+    # Largest remainders fill the slots rounding down left over
+    for device_type in sorted(exact, key=lambda t: counts[t] - exact[t])[
+        : _MIX_CYCLE - sum(counts.values())
+    ]:
+        counts[device_type] += 1
+    cycle = [t for t, n in counts.items() for _ in range(n)]
+    rng.shuffle(cycle)
+    return cycle
+
+
+def build_fleet(
+    layout: FleetLayout,
+    device_manager: DeviceManager,
+    dwelling_manager: DwellingManager,
+    occupancy: float = 0.5,
+    seed: int = 0,
+) -> int:
+    """Creates every dwelling, hub and paired device of a layout.
+
+    Returns the number of devices created. A seeded share of the dwellings
+    is set occupied.
+    """
+    rng = random.Random(seed)
+    create_device = device_manager.create_device
+    created = 0
+    for dwelling_index in range(layout.dwellings):
+        dwelling = dwelling_manager.create_dwelling(
+            layout.get_dwelling_id(dwelling_index)
+        )
+        hub = Hub(layout.get_hub_id(dwelling_index))
+        dwelling.install_hub(hub)
+        if rng.random() < occupancy:
+            dwelling.set_occupancy()
+        for slot in range(layout.devices_per_dwelling):
+            device_type = layout.get_device_type(dwelling_index, slot)
+            device_id = layout.get_device_id(dwelling_index, slot)
+            hub.add_device(create_device(device_type, device_id, device_type.value))
+            created += 1
+    return created
+
+
+def generate_trace(
+    layout: FleetLayout,
+    commands: int,
+    mix: Dict[CommandKind, float] | None = None,
+    seed: int = 0,
+) -> Iterator[Command]:
+    """Lazily yields random commands against the devices of a layout."""
+    rng = random.Random(seed)
+    mix = DEFAULT_COMMAND_MIX if mix is None else mix
+    if any(share < 0 for share in mix.values()) or sum(mix.values()) <= 0:
+        raise ValueError("Mix shares must be non-negative and not all zero")
+    kinds = list(mix)
+    bounds = list(accumulate(mix.values()))
+    total = bounds[-1]
+    per_dwelling = layout.devices_per_dwelling
+    no_kwargs: Dict[str, Any] = {}
+    for _ in range(commands):
+        kind = kinds[bisect_right(bounds, rng.random() * total)]
+        position = rng.randrange(len(layout))
+        dwelling, slot = divmod(position, per_dwelling)
+        kwargs = no_kwargs
+        if kind is CommandKind.UPDATE:
+            device_type = layout.get_device_type(dwelling, slot)
+            if device_type is DeviceType.DIMMER:
+                kwargs = {"brightness": rng.randint(0, 100)}
+            elif device_type is DeviceType.THERMOSTAT:
+                if rng.random() < 0.5:
+                    kwargs = {"temperature": rng.randint(60, 80)}
+                else:
+                    kwargs = {"mode": rng.choice(_MODES)}
+        yield Command(
+            kind,
+            layout.get_device_id(dwelling, slot),
+            layout.get_dwelling_id(dwelling),
+            kwargs,
+        )
+
+
+def write_trace(path: str | Path, commands: Iterable[Command]) -> int:
+    """Streams commands to a JSONL trace, returns how many were written."""
+    written = 0
+    encode = json.JSONEncoder(separators=(",", ":")).encode
+    with open(path, "w", encoding="utf-8") as trace:
+        for kind, device_id, dwelling_id, kwargs in commands:
+            record: Dict[str, Any] = {
+                "op": kind.value,
+                "device_id": device_id,
+                "dwelling_id": dwelling_id,
+            }
+            if kwargs:
+                record["kwargs"] = kwargs
+            trace.write(encode(record) + "\n")
+            written += 1
+    return written
+
+
+def read_trace(path: str | Path) -> Iterator[Command]:
+    """Lazily yields the commands of a JSONL trace."""
+    kinds = {kind.value: kind for kind in CommandKind}
+    decode = json.JSONDecoder().decode
+    with open(path, encoding="utf-8") as trace:
+        for line_number, line in enumerate(trace, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = decode(line)
+                yield Command(
+                    kinds[record["op"]],
+                    record["device_id"],
+                    record["dwelling_id"],
+                    record.get("kwargs", {}),
+                )
+            except (ValueError, KeyError, TypeError):
+                raise ValueError(f"Malformed trace line {line_number}") from None
+
+
+def replay(
+    commands: Iterable[Command],
+    device_manager: DeviceManager,
+    dwelling_manager: DwellingManager,
+    window: int = 100_000,
+) -> ReplayReport:
+    """Runs a command stream and reports overall and per-window throughput."""
+    if window < 1:
+        raise ValueError("Window must be positive")
+    get_device = device_manager.get_device
+    get_dwelling = dwelling_manager.get_dwelling
+    update, get_state = CommandKind.UPDATE, CommandKind.GET_STATE
+    clock = time.perf_counter
+    ops = errors = 0
+    window_rates: List[float] = []
+    start = window_start = clock()
+    for kind, device_id, dwelling_id, kwargs in commands:
+        ops += 1
+        device = get_device(device_id)
+        try:
+            if device is None:
+                errors += 1
+            elif kind is update:
+                if "mode" in kwargs:
+                    kwargs = {**kwargs, "mode": ThermostatStateRepr[kwargs["mode"]]}
+                device.update_state(**kwargs)
+            elif kind is get_state:
+                device.get_state()
+            else:
+                dwelling = get_dwelling(dwelling_id)
+                hub = None if dwelling is None else dwelling.get_hub()
+                if hub is None:
+                    errors += 1
+                elif kind is CommandKind.PAIR:
+                    hub.add_device(device)
+                else:
+                    hub.remove_device(device_id)
+        except (ValueError, KeyError):
+            errors += 1
+        if ops % window == 0:
+            now = clock()
+            window_rates.append(window / (now - window_start))
+            window_start = now
+    seconds = clock() - start
+    return ReplayReport(
+        ops,
+        errors,
+        seconds,
+        ops / seconds if seconds else 0.0,
+        window_rates,
+        get_peak_rss(),
+    )
+
+
+def get_peak_rss() -> int:
+    """Returns the peak resident set size of the process in bytes."""
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, Linux kilobytes
+    return peak if sys.platform == "darwin" else peak * 1024
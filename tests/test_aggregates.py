@@ -0,0 +1,93 @@
+import pytest
+
+from src.aggregates import GroupBy
+from src.device import DeviceType
+from src.device_manager import DeviceManager
+from src.devices.thermostat import ThermostatStateRepr
+from src.dwelling_manager import DwellingManager
+from src.hub import Hub
+
+
+@pytest.fixture(params=[False, True], ids=["objects", "columnar"])
+def device_manager(request):
+    """Fixture to create a small fleet on each backend"""
+    manager = DeviceManager(columnar=request.param)
+    for i, temperature in enumerate([68, 70, 75]):
+        manager.create_device(
+            DeviceType.THERMOSTAT, f"thermo_{i}", "T", temperature=temperature
+        )
+    manager.update_state("thermo_0", mode=ThermostatStateRepr.HEAT)
+    manager.update_state("thermo_1", mode=ThermostatStateRepr.HEAT)
+    for i, brightness in enumerate([0, 30, 55, 100]):
+        manager.create_device(
+            DeviceType.DIMMER, f"dimmer_{i}", "D", brightness=brightness
+        )
+    for i in range(4):
+        lock = manager.create_device(DeviceType.LOCK, f"lock_{i}", "L")
+        if i:
+            lock.update_state()
+    return manager
+
+
+@pytest.fixture
+def dwelling_manager(device_manager):
+    """Fixture to spread the fleet over two dwellings"""
+    dwelling_manager = DwellingManager()
+    hubs = [Hub("hub_a"), Hub("hub_b")]
+    for i, hub in enumerate(hubs):
+        dwelling_manager.create_dwelling(f"home_{i}").install_hub(hub)
+    for i, device in enumerate(sorted(device_manager.list_devices(), key=repr)):
+        hubs[i % 2].add_device(device)
+    return dwelling_manager
+
+
+class TestAggregates:
+    """Tests for grouped fleet and dwelling aggregates"""
+
+    def test_manager_summary(self, device_manager):
+        """Test summaries over the whole fleet"""
+        summary = device_manager.aggregate("temperature")[None]
+        assert summary.count == 3
+        assert summary.mean == pytest.approx(71)
+        assert (summary.min, summary.max) == (68, 75)
+
+        # Three of four locks are locked
+        assert device_manager.aggregate("locked")[None].mean == 0.75
+
+    def test_manager_by_type(self, device_manager):
+        """Test grouping an attribute shared by every type"""
+        paired = device_manager.aggregate("paired", group_by=GroupBy.TYPE)
+        assert set(paired) == {
+            DeviceType.THERMOSTAT,
+            DeviceType.DIMMER,
+            DeviceType.LOCK,
+        }
+        assert paired[DeviceType.LOCK].count == 4
+        assert paired[DeviceType.LOCK].total == 0
+        with pytest.raises(ValueError):
+            device_manager.aggregate("paired", group_by=GroupBy.HUB)
+
+    def test_histograms(self, device_manager):
+        """Test categorical and binned histograms"""
+        assert device_manager.histogram("mode")[None] == {"HEAT": 2, "OFF": 1}
+        binned = device_manager.histogram("brightness", bins=[0, 50, 100])
+        assert binned[None] == {0: 2, 50: 2}
+        with pytest.raises(ValueError):
+            device_manager.aggregate("mode")
+        with pytest.raises(ValueError):
+            device_manager.aggregate("colour")
+
+    def test_dwelling_groups(self, device_manager, dwelling_manager):
+        """Test grouping installed devices by dwelling and hub"""
+        by_dwelling = dwelling_manager.aggregate("paired")
+        assert {key: s.count for key, s in by_dwelling.items()} == {
+            "home_0": 6,
+            "home_1": 5,
+        }
+        by_hub = dwelling_manager.aggregate("paired", group_by=GroupBy.HUB)
+        assert set(by_hub) == {"hub_a", "hub_b"}
+
+        total = dwelling_manager.aggregate("brightness", group_by=None)[None]
+        assert total.total == 185
+        modes = dwelling_manager.histogram("mode", group_by=GroupBy.TYPE)
+        assert modes[DeviceType.THERMOSTAT] == {"HEAT": 2, "OFF": 1}
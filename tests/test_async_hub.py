@@ -0,0 +1,126 @@
+import asyncio
+
+import pytest
+
+from src.async_hub import AsyncHub
+from src.device import DeviceObserver, DeviceType
+from src.device_manager import DeviceManager
+from src.devices.switch import SwitchStateRepr
+from src.hub import Hub
+
+
+class Recorder(DeviceObserver):
+    """Observer recording the order in which devices change"""
+
+    def __init__(self):
+        self.changes = []
+
+    def on_state_change(self, device):
+        self.changes.append((device.get_device_id(), device.get_state()))
+
+
+@pytest.fixture
+def device_manager():
+    """Fixture to create a fresh DeviceManager for each test"""
+    return DeviceManager()
+
+
+@pytest.fixture
+def hub(device_manager):
+    """Fixture to create a hub with a dimmer, a switch and a lock paired"""
+    hub = Hub("hub_1")
+    hub.add_device(device_manager.create_device(DeviceType.DIMMER, "dimmer_1", "D"))
+    hub.add_device(device_manager.create_device(DeviceType.SWITCH, "switch_1", "S"))
+    hub.add_device(
+        device_manager.create_device(DeviceType.LOCK, "lock_1", "L", pin_code="1")
+    )
+    return hub
+
+
+class TestAsyncHub:
+    """Tests for the asyncio hub front end"""
+
+    def test_per_device_order(self, device_manager, hub):
+        """Test that commands for one device apply in submission order"""
+        recorder = Recorder()
+        device_manager.add_observer(recorder)
+
+        async def run():
+            async_hub = AsyncHub(hub, queue_size=2)
+            await async_hub.submit_many(
+                [("dimmer_1", {"brightness": level}) for level in range(10, 60, 10)]
+            )
+            assert async_hub.get_pending() == 0
+
+        asyncio.run(run())
+        levels = [state["brightness"] for _, state in recorder.changes]
+        assert levels == [10, 20, 30, 40, 50]
+
+    def test_devices_interleave(self, device_manager, hub):
+        """Test that commands for different devices run concurrently"""
+        recorder = Recorder()
+        device_manager.add_observer(recorder)
+
+        async def run():
+            async_hub = AsyncHub(hub)
+            await async_hub.submit_many(
+                [("dimmer_1", {"brightness": 10 * i}) for i in range(3)]
+                + [("switch_1", {}) for _ in range(3)]
+            )
+
+        asyncio.run(run())
+        order = [device_id for device_id, _ in recorder.changes]
+        assert order[:2] == ["dimmer_1", "switch_1"]
+        assert order.count("switch_1") == 3
+        states = [s["state"] for d, s in recorder.changes if d == "switch_1"]
+        assert states == ["ON", "OFF", "ON"]
+
+    def test_backpressure(self, hub):
+        """Test that bounded queues still let every command through"""
+
+        async def run():
+            async_hub = AsyncHub(hub, queue_size=1, max_in_flight=2)
+            await async_hub.submit_many([("switch_1", {}) for _ in range(101)])
+            await async_hub.join()
+            return async_hub
+
+        async_hub = asyncio.run(run())
+        switch = hub.get_paired_devices()["switch_1"]
+        assert switch.get_state()["state"] == SwitchStateRepr.ON.name
+        assert async_hub._lanes == {}
+
+    def test_errors(self, hub):
+        """Test that failed commands report their error without stopping the lane"""
+
+        async def run():
+            async_hub = AsyncHub(hub)
+            with pytest.raises(ValueError, match="Unknown device"):
+                await async_hub.submit("thermo_1", temperature=70)
+            results = await async_hub.submit_many(
+                [
+                    ("lock_1", {}),
+                    ("lock_1", {"pin_code": "2"}),
+                    ("lock_1", {"pin_code": "1"}),
+                ],
+                return_exceptions=True,
+            )
+            return results
+
+        results = asyncio.run(run())
+        assert results[0] is None
+        assert isinstance(results[1], ValueError)
+        assert results[2] is None
+        lock = hub.get_paired_devices()["lock_1"]
+        assert lock.get_state()["is_locked"] == "UNLOCKED"
+
+    def test_removed_device(self, hub):
+        """Test that commands for a device removed before they run fail"""
+
+        async def run():
+            async_hub = AsyncHub(hub)
+            pending = asyncio.ensure_future(async_hub.submit("switch_1"))
+            hub.remove_device("switch_1")
+            with pytest.raises(ValueError, match="Unknown device"):
+                await pending
+
+        asyncio.run(run())
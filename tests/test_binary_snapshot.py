@@ -0,0 +1,156 @@
+import pytest
+
+from src.binary_snapshot import MappedFleet, write_binary_snapshot
+from src.device import DeviceType
+from src.device_manager import DeviceManager
+from src.devices.lock import Lock
+from src.devices.switch import SwitchStateRepr
+from src.devices.thermostat import ThermostatStateRepr
+from src.dwelling_manager import DwellingManager
+from src.hub import Hub
+
+
+@pytest.fixture
+def snapshot(tmp_path):
+    """Fixture to write a small fleet snapshot and return its managers and path"""
+    device_manager = DeviceManager()
+    dwelling_manager = DwellingManager()
+    home = dwelling_manager.create_dwelling("home_1")
+    dwelling_manager.create_dwelling("home_2").set_occupancy()
+    hub = Hub("hub_1")
+    spare = Hub("hub_spare")
+    home.install_hub(hub)
+
+    switch = device_manager.create_device(DeviceType.SWITCH, "switch_1", "Light")
+    lock = device_manager.create_device(
+        DeviceType.LOCK, "lock_1", "Front Door", pin_code="1234"
+    )
+    thermo = device_manager.create_device(
+        DeviceType.THERMOSTAT, "thermo_1", "Heat", temperature=65.5
+    )
+    dimmer = device_manager.create_device(DeviceType.DIMMER, "dimmer_1", "Dimmer")
+    device_manager.create_device(DeviceType.SWITCH, "switch_2", "Light")
+    hub.add_device(switch)
+    hub.add_device(lock)
+    spare.add_device(dimmer)
+    switch.update_state()
+    lock.update_state()
+    thermo.update_state(mode=ThermostatStateRepr.COOL)
+    dimmer.update_state(brightness=20)
+
+    path = tmp_path / "fleet.snap"
+    write_binary_snapshot(
+        path, device_manager, dwelling_manager, hubs=[spare], include_secrets=True
+    )
+    return device_manager, dwelling_manager, path
+
+
+class TestBinarySnapshot:
+    """Tests for the memory-mapped fleet snapshot"""
+
+    def test_get_state_from_buffer(self, snapshot):
+        """Test that device reads match the source fleet without building objects"""
+        device_manager, _, path = snapshot
+        with MappedFleet(path) as fleet:
+            assert len(fleet) == 5
+            for device in device_manager.list_devices():
+                assert fleet.get_state(device.get_device_id()) == device.get_state()
+            assert fleet._devices == {}
+            with pytest.raises(KeyError):
+                fleet.get_state("missing")
+
+    def test_hubs_and_dwellings(self, snapshot):
+        """Test hub membership and dwelling reads from the buffer"""
+        _, _, path = snapshot
+        with MappedFleet(path) as fleet:
+            assert sorted(fleet.list_hub_devices("hub_1")) == ["lock_1", "switch_1"]
+            assert fleet.list_hub_devices("hub_spare") == ["dimmer_1"]
+            assert fleet.get_dwelling_state("home_1") == {
+                "dwelling_id": "home_1",
+                "is_occupied": False,
+                "hub_id": "hub_1",
+            }
+            assert fleet.get_dwelling_state("home_2")["is_occupied"]
+            assert fleet.get_dwelling_state("home_2")["hub_id"] is None
+            device_ids = list(fleet.list_device_ids())
+            assert device_ids == sorted(device_ids)
+
+    def test_writes_materialize_objects(self, snapshot):
+        """Test that devices are built for writes and later reads see the change"""
+        _, _, path = snapshot
+        with MappedFleet(path) as fleet:
+            switch = fleet.get_device("switch_2")
+            assert switch is not None
+            switch.update_state()
+            assert fleet.get_state("switch_2")["state"] == SwitchStateRepr.ON.name
+            assert fleet.get_device("switch_2") is switch
+
+            lock = fleet.get_device("lock_1")
+            assert lock is not None
+            with pytest.raises(ValueError):
+                lock.update_state(pin_code="0000")
+            lock.update_state(pin_code="1234")
+
+            hub = fleet.get_hub("hub_1")
+            assert hub is not None
+            assert hub.get_paired_devices()["lock_1"] is lock
+            hub.remove_device("switch_1")
+            assert fleet.list_hub_devices("hub_1") == ["lock_1"]
+
+            home = fleet.get_dwelling("home_1")
+            assert home is not None and home.get_hub() is hub
+            home.set_occupancy()
+            assert fleet.get_dwelling_state("home_1")["is_occupied"]
+            assert fleet.get_device("missing") is None
+
+    def test_load(self, snapshot):
+        """Test rebuilding full managers from the snapshot"""
+        device_manager, _, path = snapshot
+        with MappedFleet(path) as fleet:
+            switch = fleet.get_device("switch_2")
+            assert switch is not None
+            switch.update_state()
+            loaded_devices, loaded_dwellings = fleet.load()
+
+        assert len(loaded_devices.list_devices()) == 5
+        loaded_switch = loaded_devices.get_device("switch_2")
+        assert loaded_switch is not None
+        assert loaded_switch.get_state()["state"] == "ON"
+        lock = loaded_devices.get_device("lock_1")
+        assert isinstance(lock, Lock) and lock.is_pin_code()
+        location = loaded_dwellings.locate("lock_1")
+        assert location is not None
+        assert location.dwelling.get_dwelling_id() == "home_1"
+        thermo = loaded_devices.get_device("thermo_1")
+        assert thermo is not None
+        assert thermo.get_state() == device_manager.get_device("thermo_1").get_state()
+
+    def test_secrets_are_opt_in(self, snapshot, tmp_path):
+        """Test that pin codes stay out of snapshots written without secrets"""
+        device_manager, dwelling_manager, _ = snapshot
+        path = tmp_path / "plain.snap"
+        write_binary_snapshot(path, device_manager, dwelling_manager)
+        assert b"1234" not in path.read_bytes()
+        with MappedFleet(path) as fleet:
+            assert fleet.get_state("lock_1")["pin_code_set"]
+            lock = fleet.get_device("lock_1")
+            assert isinstance(lock, Lock) and not lock.is_pin_code()
+
+    def test_unsupported_values(self, snapshot, tmp_path):
+        """Test that brightness the record cannot hold raises ValueError"""
+        device_manager, dwelling_manager, _ = snapshot
+        path = tmp_path / "fleet.snap"
+        device_manager.update_state("dimmer_1", brightness=40.0)
+        write_binary_snapshot(path, device_manager, dwelling_manager)
+        with MappedFleet(path) as fleet:
+            assert fleet.get_state("dimmer_1")["brightness"] == 40
+        device_manager.update_state("dimmer_1", brightness=40.5)
+        with pytest.raises(ValueError, match="Brightness"):
+            write_binary_snapshot(path, device_manager, dwelling_manager)
+
+    def test_rejects_other_files(self, tmp_path):
+        """Test that files without the snapshot header are refused"""
+        path = tmp_path / "other.bin"
+        path.write_bytes(b"x" * 128)
+        with pytest.raises(ValueError):
+            MappedFleet(path)
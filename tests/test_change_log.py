@@ -0,0 +1,91 @@
+import pytest
+
+from src.change_log import ChangeLog
+from src.device import DeviceType
+from src.device_manager import DeviceManager
+from src.hub import Hub
+
+
+@pytest.fixture(params=[False, True], ids=["objects", "columnar"])
+def device_manager(request):
+    """Fixture to create a fresh DeviceManager of each backend"""
+    return DeviceManager(columnar=request.param)
+
+
+def ids(devices):
+    """Returns the IDs of a list of devices"""
+    return [device.get_device_id() for device in devices]
+
+
+class TestChangesSince:
+    """Tests for versioned change deltas of managers and hubs"""
+
+    def test_manager_deltas(self, device_manager):
+        """Test that each poll returns only what changed since the last one"""
+        for i in range(5):
+            device_manager.create_device(DeviceType.SWITCH, f"switch_{i}", "S")
+        first = device_manager.changes_since(0)
+        assert sorted(ids(first.changed)) == [f"switch_{i}" for i in range(5)]
+        assert first.removed == []
+
+        assert device_manager.changes_since(first.version).changed == []
+
+        device_manager.get_device("switch_3").update_state()
+        device_manager.get_device("switch_1").update_state()
+        device_manager.get_device("switch_3").update_state()
+        device_manager.create_device(DeviceType.DIMMER, "dimmer_1", "D")
+        device_manager.delete_device("switch_0")
+        second = device_manager.changes_since(first.version)
+        assert ids(second.changed) == ["switch_1", "switch_3", "dimmer_1"]
+        assert second.removed == ["switch_0"]
+
+        device_manager.create_device(DeviceType.SWITCH, "switch_0", "S")
+        third = device_manager.changes_since(second.version)
+        assert ids(third.changed) == ["switch_0"]
+        assert third.removed == []
+
+    def test_removal_horizon(self, device_manager):
+        """Test that polls older than the kept deletions are told to resync"""
+        for i in range(4):
+            device_manager.create_device(DeviceType.SWITCH, f"switch_{i}", "S")
+        log = ChangeLog(device_manager.list_devices(), max_removed=2)
+        device_manager.add_observer(log)
+        version = log.changes_since(0).version
+        device_manager.delete_device("switch_0")
+        recent = log.changes_since(version)
+        assert recent.removed == ["switch_0"] and not recent.resync
+
+        device_manager.delete_device("switch_1")
+        device_manager.delete_device("switch_2")
+        changes = log.changes_since(version)
+        assert changes.resync and changes.removed == []
+        assert ids(changes.changed) == ["switch_3"]
+        assert log.changes_since(recent.version).removed == ["switch_1", "switch_2"]
+
+    def test_unchanged_updates(self, device_manager):
+        """Test that no-op updates leave the version alone"""
+        dimmer = device_manager.create_device(DeviceType.DIMMER, "dimmer_1", "D")
+        version = device_manager.changes_since(0).version
+        dimmer.update_state()
+        assert device_manager.changes_since(version).changed == []
+
+    def test_hub_deltas(self, device_manager):
+        """Test the hub version and its membership and state deltas"""
+        hub = Hub("hub_1")
+        switch = device_manager.create_device(DeviceType.SWITCH, "switch_1", "S")
+        lock = device_manager.create_device(DeviceType.LOCK, "lock_1", "L")
+        hub.add_device(switch)
+        hub.add_device(lock)
+        version = hub.get_version()
+        assert ids(hub.changes_since(0).changed) == ["switch_1", "lock_1"]
+        assert hub.changes_since(version).changed == []
+
+        lock.update_state()
+        assert hub.get_version() > version
+        changes = hub.changes_since(version)
+        assert ids(changes.changed) == ["lock_1"]
+
+        hub.remove_device("switch_1")
+        changes = hub.changes_since(changes.version)
+        assert changes.changed == []
+        assert changes.removed == ["switch_1"]
@@ -0,0 +1,116 @@
+import pytest
+
+from src.aggregates import GroupBy
+from src.cluster import Call, FleetRouter
+from src.device import DeviceType
+
+
+@pytest.fixture(scope="module")
+def router():
+    """Fixture to start a three-shard router with four dwellings"""
+    with FleetRouter(shards=3) as router:
+        for i in range(4):
+            router.create_dwelling(f"home_{i}")
+            router.create_device(f"home_{i}", DeviceType.DIMMER, f"dimmer_{i}", "D")
+            router.create_device(
+                f"home_{i}", DeviceType.THERMOSTAT, f"thermo_{i}", "T", temperature=70
+            )
+            router.pair(f"dimmer_{i}")
+            router.update_state(f"dimmer_{i}", brightness=10 * (i + 1))
+        yield router
+
+
+class TestFleetRouter:
+    """Tests for the multi-process sharded fleet"""
+
+    def test_routing(self, router):
+        """Test that dwellings spread over shards and calls reach their devices"""
+        shards = {router.shard_of(f"home_{i}") for i in range(4)}
+        assert len(shards) > 1
+        assert router.get_state("dimmer_2")["brightness"] == 30
+        assert router.get_state("dimmer_2")["is_paired"]
+        assert not router.get_state("thermo_2")["is_paired"]
+        assert router.count_devices() == 8
+
+    def test_fan_out_query(self, router):
+        """Test that queries merge the matches of every shard"""
+        states = router.query(device_type=DeviceType.DIMMER, is_paired=True)
+        assert sorted(s["device_id"] for s in states) == [
+            f"dimmer_{i}" for i in range(4)
+        ]
+
+    def test_merged_aggregates(self, router):
+        """Test that aggregates combine across shards per group"""
+        total = router.aggregate("brightness")[None]
+        assert (total.count, total.total, total.min, total.max) == (4, 100, 10, 40)
+        assert total.mean == 25
+        by_dwelling = router.aggregate("brightness", GroupBy.DWELLING)
+        assert by_dwelling["home_3"].total == 40
+        histogram = router.histogram("temperature")
+        assert histogram == {None: {70: 4}}
+
+    def test_batch(self, router):
+        """Test that batches return results in call order with errors in place"""
+        results = router.run_batch(
+            [
+                Call("update_state", ("thermo_0", {"temperature": 65})),
+                Call("get_state", ("thermo_0",)),
+                Call("get_state", ("missing",)),
+                Call("update_state", ("dimmer_1", {"brightness": "x"})),
+                Call("get_state", ("dimmer_3",)),
+            ]
+        )
+        assert results[0] is None
+        assert results[1]["temperature"] == 65
+        assert isinstance(results[2], ValueError)
+        assert isinstance(results[3], TypeError)
+        assert results[4]["device_id"] == "dimmer_3"
+
+    def test_command_ids(self, router):
+        """Test that retried commands reach their shard once"""
+        router.create_device("home_1", DeviceType.SWITCH, "switch_1", "S")
+        router.update_state("switch_1", "cmd-1")
+        router.update_state("switch_1", "cmd-1")
+        assert router.get_state("switch_1")["state"] == "ON"
+        router.update_state("switch_1", "cmd-2")
+        assert router.get_state("switch_1")["state"] == "OFF"
+
+    def test_device_homes(self, router):
+        """Test that a device ID lives on one shard and failed creates leave none"""
+        shards = {router.shard_of(f"home_{i}"): f"home_{i}" for i in range(4)}
+        first, second = list(shards.values())[:2]
+        router.create_device(first, DeviceType.SWITCH, "switch_home", "S")
+        count = router.count_devices()
+        with pytest.raises(ValueError, match="already exists"):
+            router.create_device(second, DeviceType.SWITCH, "switch_home", "S")
+        results = router.run_batch(
+            [
+                Call("create_device", (home, DeviceType.SWITCH, "switch_new", "S", {}))
+                for home in (second, first)
+            ]
+        )
+        assert results[0] is None and isinstance(results[1], ValueError)
+        assert router.count_devices() == count + 1
+        with pytest.raises(ValueError, match="Unknown dwelling"):
+            router.create_device("nowhere", DeviceType.SWITCH, "switch_lost", "S")
+        with pytest.raises(ValueError, match="Unknown device"):
+            router.update_state("switch_lost")
+
+    def test_errors_raise(self, router):
+        """Test that single calls raise the exception of a shard failure"""
+        with pytest.raises(ValueError, match="Unknown device"):
+            router.update_state("missing")
+        with pytest.raises(ValueError, match="Unknown dwelling"):
+            router.create_device("nowhere", DeviceType.SWITCH, "s", "S")
+        with pytest.raises(ValueError):
+            router.aggregate("unknown")
+
+    def test_close(self):
+        """Test that a closed router stops its workers and rejects calls"""
+        router = FleetRouter(shards=2)
+        router.create_dwelling("home_1")
+        router.close()
+        with pytest.raises(ValueError):
+            router.count_devices()
+        with pytest.raises(ValueError):
+            FleetRouter(shards=0)
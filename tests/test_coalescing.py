@@ -0,0 +1,180 @@
+from typing import Dict
+
+import pytest
+
+from src.coalescing import CoalescerStats, CommandCoalescer
+from src.device import AnyDeviceType, DeviceObserver, DeviceType
+from src.device_manager import DeviceManager
+from src.devices.lock import LockStateRepr
+from src.devices.thermostat import ThermostatStateRepr
+from src.scheduler import VirtualClock
+
+
+class Recorder(DeviceObserver):
+    """Observer recording every state change"""
+
+    def __init__(self):
+        """Initializes an empty record"""
+        self.changes = []
+
+    def on_state_change(self, device):
+        """Records the device and its new state"""
+        self.changes.append((device.get_device_id(), device.get_state()))
+
+
+class Failing(DeviceObserver):
+    """Observer failing the state changes of one device"""
+
+    def __init__(self, device_id):
+        """Initializes the observer for a device ID"""
+        self.device_id = device_id
+
+    def on_state_change(self, device):
+        """Raises, as a broken downstream would"""
+        if device.get_device_id() == self.device_id:
+            raise RuntimeError("Downstream unavailable")
+
+
+@pytest.fixture
+def clock():
+    """Fixture to create a virtual clock"""
+    return VirtualClock()
+
+
+@pytest.fixture
+def device_manager():
+    """Fixture to create a DeviceManager with a dimmer, a thermostat and a lock"""
+    device_manager = DeviceManager()
+    device_manager.create_device(DeviceType.DIMMER, "dimmer_1", "Living")
+    device_manager.create_device(DeviceType.THERMOSTAT, "thermo_1", "Hall")
+    device_manager.create_device(DeviceType.LOCK, "lock_1", "Door")
+    return device_manager
+
+
+@pytest.fixture
+def coalescer(device_manager, clock):
+    """Fixture to create a coalescer with 100 ms windows"""
+    windows: Dict[AnyDeviceType, float] = {
+        DeviceType.DIMMER: 0.1,
+        DeviceType.THERMOSTAT: 0.1,
+    }
+    return CommandCoalescer(device_manager, windows, clock)
+
+
+class TestCommandCoalescer:
+    """Tests for per-device command coalescing"""
+
+    def test_slider_burst(self, coalescer, device_manager, clock):
+        """Test that a burst of brightness updates applies once, last value winning"""
+        recorder = Recorder()
+        device_manager.add_observer(recorder)
+        for level in range(0, 60, 2):
+            assert coalescer.submit("dimmer_1", brightness=level)
+            clock.advance(0.002)
+        assert recorder.changes == []
+        assert coalescer.next_due() == pytest.approx(0.1)
+        assert coalescer.flush_due() == 0
+        clock.advance(0.05)
+        assert coalescer.flush_due() == 1
+        assert len(recorder.changes) == 1
+        assert device_manager.get_device("dimmer_1").get_brightness() == 58
+        assert coalescer.get_stats() == CoalescerStats(30, 1, 29, 0, 0)
+        assert len(coalescer) == 0
+        assert coalescer.next_due() is None
+
+    def test_merges_attributes(self, coalescer, device_manager, clock):
+        """Test that different attributes of a device merge into one update"""
+        coalescer.submit("thermo_1", temperature=68)
+        coalescer.submit("thermo_1", mode=ThermostatStateRepr.HEAT)
+        coalescer.submit("thermo_1", temperature=70)
+        clock.advance(0.1)
+        assert coalescer.flush_due() == 1
+        state = device_manager.get_device("thermo_1").get_state()
+        assert (state["temperature"], state["mode"]) == (70, "HEAT")
+
+    def test_toggles_stay_exact(self, coalescer, device_manager):
+        """Test that toggles apply immediately, every one of them"""
+        for _ in range(3):
+            assert not coalescer.submit("lock_1")
+        state = device_manager.get_device("lock_1").get_state()
+        assert state["is_locked"] == LockStateRepr.LOCKED.name
+        assert coalescer.get_stats(DeviceType.LOCK) == CoalescerStats(3, 3, 0, 0, 0)
+        assert not coalescer.submit("dimmer_1")
+        with pytest.raises(ValueError, match="cannot be merged"):
+            CommandCoalescer(device_manager, {DeviceType.SWITCH: 0.1})
+
+    def test_order_kept(self, device_manager, clock):
+        """Test that an immediate command applies after the held one of its device"""
+        coalescer = CommandCoalescer(device_manager, {DeviceType.THERMOSTAT: 1}, clock)
+        recorder = Recorder()
+        device_manager.add_observer(recorder)
+        coalescer.submit("thermo_1", temperature=60)
+        assert not coalescer.submit("thermo_1", temperature=65, unknown=1)
+        assert [state["temperature"] for _, state in recorder.changes] == [60, 65]
+        assert coalescer.next_due() is None
+        clock.advance(1)
+        assert coalescer.flush_due() == 0
+
+    def test_deleted_devices(self, coalescer, device_manager, clock):
+        """Test that held commands of deleted devices are dropped"""
+        coalescer.submit("dimmer_1", brightness=10)
+        coalescer.submit("thermo_1", temperature=50)
+        device_manager.delete_device("dimmer_1")
+        device_manager.create_device(DeviceType.SWITCH, "thermo_1", "Reused")
+        clock.advance(0.1)
+        assert coalescer.flush_due() == 0
+        assert coalescer.get_stats().dropped == 2
+        assert device_manager.get_device("thermo_1").get_state()["state"] == "OFF"
+
+    def test_failed_apply_forgotten(self, coalescer, device_manager, clock):
+        """Test that a failing command is counted and does not block the others"""
+        for i in (2, 3):
+            device_manager.create_device(DeviceType.DIMMER, f"dimmer_{i}", "D")
+        device_manager.add_observer(Failing("dimmer_1"))
+        for i in (1, 2, 3):
+            coalescer.submit(f"dimmer_{i}", brightness=10 * i)
+        clock.advance(0.1)
+        with pytest.raises(RuntimeError):
+            coalescer.flush_due()
+        assert len(coalescer) == 2
+        assert coalescer.flush_due() == 2
+        assert [
+            device_manager.get_device(f"dimmer_{i}").get_brightness() for i in (2, 3)
+        ] == [20, 30]
+        assert coalescer.get_stats() == CoalescerStats(3, 2, 0, 0, 1)
+
+        coalescer.submit("dimmer_1", brightness=40)
+        with pytest.raises(RuntimeError):
+            coalescer.submit("dimmer_1", brightness=50, unknown=1)
+        assert len(coalescer) == 0
+        assert coalescer.next_due() is None
+
+    def test_errors(self, coalescer):
+        """Test that unknown devices and invalid values are rejected on submit"""
+        with pytest.raises(ValueError, match="Unknown device"):
+            coalescer.submit("missing", brightness=1)
+        with pytest.raises(ValueError, match="Invalid mode"):
+            coalescer.submit("thermo_1", mode="SAUNA")
+        with pytest.raises(ValueError, match="Invalid temperature"):
+            coalescer.submit("thermo_1", temperature="warm")
+        assert len(coalescer) == 0
+        coalescer.submit("dimmer_1", brightness=60)
+        for brightness in ("bright", 50.5):
+            with pytest.raises(ValueError, match="Invalid brightness"):
+                coalescer.submit("dimmer_1", brightness=brightness)
+        assert coalescer.flush() == 1
+
+    def test_flush_and_export(self, coalescer, device_manager):
+        """Test forced flushes and the Prometheus export of the counts"""
+        coalescer.submit("dimmer_1", brightness=10)
+        coalescer.submit("dimmer_1", brightness=20)
+        coalescer.submit("thermo_1", temperature=61)
+        assert coalescer.flush("dimmer_1") == 1
+        assert coalescer.flush() == 1
+        assert device_manager.get_device("thermo_1").get_temperature() == 61
+        text = coalescer.export_prometheus()
+        assert (
+            'devicemanager_coalesced_commands_total{device_type="dimmer",'
+            'outcome="absorbed"} 1' in text
+        )
+        assert 'device_type="thermostat",outcome="applied"} 1' in text
@@ -0,0 +1,153 @@
+import pytest
+
+from src.device import Device, DeviceType
+from src.device_manager import DeviceManager
+from src.devices.lock import LockStateRepr
+from src.devices.switch import SwitchStateRepr
+from src.devices.thermostat import ThermostatStateRepr
+from src.hub import Hub
+
+
+@pytest.fixture
+def device_manager():
+    """Fixture to create a fresh columnar DeviceManager for each test"""
+    return DeviceManager(columnar=True)
+
+
+class TestColumnStore:
+    """Tests for the columnar DeviceManager backend"""
+
+    def test_create_and_list(self, device_manager):
+        """Test that created views are listed and behave like devices"""
+        devices = [
+            device_manager.create_device(
+                DeviceType.SWITCH, "switch_1", "Living Room Light"
+            ),
+            device_manager.create_device(DeviceType.LOCK, "lock_1", "Front Door"),
+            device_manager.create_device(
+                DeviceType.DIMMER, "dimmer_1", "Bedroom Dimmer"
+            ),
+            device_manager.create_device(
+                DeviceType.THERMOSTAT, "thermo_1", "Main Thermostat"
+            ),
+        ]
+
+        listed_devices = device_manager.list_devices()
+        assert len(listed_devices) == 4
+        assert set(listed_devices) == set(devices)
+        assert all(isinstance(device, Device) for device in listed_devices)
+        assert devices[0].get_name() == "Living Room Light"
+        assert not devices[0].get_paired()
+
+    def test_delete_reuses_row(self, device_manager):
+        """Test that deleted rows are released and reused"""
+        switch = device_manager.create_device(
+            DeviceType.SWITCH, "switch_1", "Living Room Light"
+        )
+        device_manager.delete_device("switch_1")
+        assert len(device_manager.list_devices()) == 0
+        assert device_manager.get_device("switch_1") is None
+
+        with pytest.raises(KeyError):
+            switch.get_state()
+
+        lock = device_manager.create_device(DeviceType.LOCK, "lock_1", "Front Door")
+        assert len(device_manager.get_store()._types) == 1
+        assert device_manager.list_devices() == [lock]
+
+    def test_stale_view_of_recreated_device(self, device_manager):
+        """Test that a view fails once its device is replaced in the same row"""
+        stale = device_manager.create_device(DeviceType.SWITCH, "switch_1", "Light")
+        device_manager.delete_device("switch_1")
+        fresh = device_manager.create_device(DeviceType.SWITCH, "switch_1", "Light")
+        assert len(device_manager.get_store()._types) == 1
+        with pytest.raises(KeyError):
+            stale.update_state()
+        assert stale != fresh
+        assert fresh.get_state()["state"] == SwitchStateRepr.OFF.name
+
+    def test_float_brightness(self, device_manager):
+        """Test that whole float brightness is stored and fractions are rejected"""
+        dimmer = device_manager.create_device(
+            DeviceType.DIMMER, "dimmer_1", "Dimmer", brightness=30.0
+        )
+        dimmer.update_state(brightness=150.0)
+        assert dimmer.get_brightness() == 100
+        with pytest.raises(ValueError):
+            dimmer.update_state(brightness=40.5)
+        with pytest.raises(ValueError):
+            device_manager.create_device(
+                DeviceType.DIMMER, "dimmer_2", "Dimmer", brightness="x"
+            )
+
+    def test_state_matches_object_backend(self, device_manager):
+        """Test that views report the same state as full device objects"""
+        object_manager = DeviceManager()
+        for manager in (device_manager, object_manager):
+            switch = manager.create_device(DeviceType.SWITCH, "switch_1", "Light")
+            dimmer = manager.create_device(DeviceType.DIMMER, "dimmer_1", "Dimmer")
+            lock = manager.create_device(
+                DeviceType.LOCK, "lock_1", "Door", pin_code="1234"
+            )
+            thermo = manager.create_device(
+                DeviceType.THERMOSTAT, "thermo_1", "Thermostat", temperature=62.5
+            )
+            hub = Hub("hub_1")
+            hub.add_device(switch)
+            switch.update_state()
+            dimmer.update_state(brightness=150)
+            lock.update_state()
+            thermo.update_state(mode=ThermostatStateRepr.HEAT, temperature=70.5)
+
+        for device_id in ("switch_1", "dimmer_1", "lock_1", "thermo_1"):
+            view = device_manager.get_device(device_id)
+            device = object_manager.get_device(device_id)
+            assert device is not None
+            assert view.get_state() == device.get_state()
+            assert device_manager.get_store().get_state(device_id) == view.get_state()
+            assert repr(view) == repr(device)
+
+    def test_lock_with_incorrect_pincode(self, device_manager):
+        """Test that a locked view rejects a wrong pin code"""
+        lock = device_manager.create_device(
+            DeviceType.LOCK, "lock_1", "Front Door", pin_code="1234"
+        )
+        lock.update_state()
+
+        with pytest.raises(ValueError) as exc_info:
+            lock.update_state(pin_code="134")
+        assert str(exc_info.value) == "Incorrect PIN code"
+        assert lock.get_state()["is_locked"] == LockStateRepr.LOCKED.name
+
+        lock.update_state(pin_code="1234")
+        assert lock.get_state()["is_locked"] == LockStateRepr.UNLOCKED.name
+
+    def test_thermostat_invalid_mode(self, device_manager):
+        """Test that a thermostat view rejects unknown modes"""
+        thermo = device_manager.create_device(
+            DeviceType.THERMOSTAT, "thermo_1", "Main Thermostat"
+        )
+        with pytest.raises(ValueError):
+            thermo.update_state(mode="HEAT")
+
+    def test_count(self, device_manager):
+        """Test column scans over type, paired flag and state bit"""
+        hub = Hub("hub_1")
+        for i in range(6):
+            switch = device_manager.create_device(
+                DeviceType.SWITCH, f"switch_{i}", "Light"
+            )
+            if i % 2:
+                hub.add_device(switch)
+            if i % 3 == 0:
+                switch.update_state()
+        device_manager.create_device(DeviceType.LOCK, "lock_1", "Door")
+        store = device_manager.get_store()
+
+        assert store.count(DeviceType.SWITCH) == 6
+        assert store.count(DeviceType.SWITCH, is_paired=True) == 3
+        assert store.count(DeviceType.SWITCH, active=True) == 2
+        assert store.count(is_paired=False) == 4
+        assert device_manager.get_device("switch_0").get_state()["state"] == (
+            SwitchStateRepr.ON.name
+        )
@@ -0,0 +1,149 @@
+import asyncio
+import threading
+
+import pytest
+
+from src.async_hub import AsyncHub
+from src.dedup import DedupCache, DedupStats
+from src.device import DeviceType
+from src.device_manager import DeviceManager
+from src.devices.lock import LockStateRepr
+from src.devices.switch import SwitchStateRepr
+from src.hub import Hub
+from src.scheduler import VirtualClock
+
+
+@pytest.fixture
+def clock():
+    """Fixture to create a virtual clock"""
+    return VirtualClock()
+
+
+@pytest.fixture(params=[False, True], ids=["plain", "concurrent"])
+def device_manager(request):
+    """Fixture to create a DeviceManager with a switch and a thermostat"""
+    device_manager = DeviceManager(concurrent=request.param)
+    device_manager.create_device(DeviceType.SWITCH, "switch_1", "Light")
+    device_manager.create_device(DeviceType.THERMOSTAT, "thermo_1", "Hall")
+    return device_manager
+
+
+def switch_state(device_manager):
+    """Returns the state of the switch"""
+    return device_manager.get_device("switch_1").get_state()["state"]
+
+
+class TestDedupCache:
+    """Tests for the bounded dedup cache"""
+
+    def test_expiry(self, clock):
+        """Test that entries are forgotten once their ttl has passed"""
+        cache = DedupCache(ttl=10, clock=clock)
+        cache.put("c1", 1)
+        clock.advance(9)
+        assert cache.get("c1") == 1
+        clock.advance(1)
+        assert cache.get("c1") is None
+        cache.put("c2", 2)
+        assert len(cache) == 1
+        assert cache.get_stats() == DedupStats(hits=1, misses=1, evictions=1)
+
+    def test_capacity(self, clock):
+        """Test that the oldest entries make room beyond capacity"""
+        cache = DedupCache(capacity=3, clock=clock)
+        for i in range(10):
+            cache.put(f"c{i}", i)
+        assert len(cache) == 3
+        assert [cache.get(f"c{i}") for i in (6, 7, 8, 9)] == [None, 7, 8, 9]
+        cache.discard("c8")
+        assert cache.get("c8") is None
+        with pytest.raises(ValueError):
+            DedupCache(capacity=0)
+
+
+class TestIdempotentUpdates:
+    """Tests for command IDs on update_state paths"""
+
+    def test_retries_apply_once(self, device_manager):
+        """Test that a retried toggle is not applied again"""
+        version = device_manager.update_state("switch_1", "cmd-1")
+        assert device_manager.update_state("switch_1", "cmd-1") == version
+        assert switch_state(device_manager) == SwitchStateRepr.ON.name
+        device_manager.update_state("switch_1", "cmd-2")
+        device_manager.update_state("switch_1")
+        assert switch_state(device_manager) == SwitchStateRepr.ON.name
+        assert device_manager.get_dedup_cache().get_stats().hits == 1
+
+    def test_concurrent_first_commands(self):
+        """Test that first commands racing on several threads share one cache"""
+        device_manager = DeviceManager(concurrent=True)
+        for i in range(8):
+            device_manager.create_device(DeviceType.SWITCH, f"switch_{i}", "S")
+        cache = device_manager.get_dedup_cache()
+        barrier = threading.Barrier(8)
+
+        def worker(index):
+            barrier.wait()
+            device_manager.update_state(f"switch_{index}", f"cmd-{index}")
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for i in range(8):
+            device_manager.update_state(f"switch_{i}", f"cmd-{i}")
+        assert device_manager.get_dedup_cache() is cache
+        assert cache.get_stats().hits == 8
+        assert {
+            device.get_state()["state"] for device in device_manager.list_devices()
+        } == {SwitchStateRepr.ON.name}
+
+    def test_failures_and_conflicts(self, device_manager):
+        """Test that failed commands run again and reused IDs are rejected"""
+        with pytest.raises(ValueError, match="Invalid mode"):
+            device_manager.update_state("thermo_1", "cmd-1", mode="SAUNA")
+        device_manager.update_state("thermo_1", "cmd-1", temperature=64)
+        assert device_manager.get_device("thermo_1").get_temperature() == 64
+        with pytest.raises(ValueError, match="already used for thermo_1"):
+            device_manager.update_state("switch_1", "cmd-1")
+        with pytest.raises(ValueError, match="Unknown device"):
+            device_manager.update_state("missing", "cmd-2")
+
+    def test_async_hub_retries(self):
+        """Test that retries wait for their original, in flight or applied"""
+        device_manager = DeviceManager()
+        hub = Hub("hub_1")
+        lock = device_manager.create_device(DeviceType.LOCK, "lock_1", "L")
+        hub.add_device(lock)
+
+        async def run():
+            async_hub = AsyncHub(hub)
+            await asyncio.gather(
+                async_hub.submit("lock_1", "cmd-1"),
+                async_hub.submit("lock_1", "cmd-1"),
+            )
+            await async_hub.submit("lock_1", "cmd-1")
+            assert lock.get_state()["is_locked"] == LockStateRepr.LOCKED.name
+            with pytest.raises(ValueError, match="already used"):
+                await async_hub.submit("other", "cmd-1")
+            await async_hub.submit("lock_1", "cmd-2")
+            assert lock.get_state()["is_locked"] == LockStateRepr.UNLOCKED.name
+
+        asyncio.run(run())
+
+    def test_async_hub_failures_forgotten(self):
+        """Test that a failed command is retried rather than replayed"""
+        device_manager = DeviceManager()
+        hub = Hub("hub_1")
+        thermostat = device_manager.create_device(DeviceType.THERMOSTAT, "t_1", "T")
+        hub.add_device(thermostat)
+
+        async def run():
+            async_hub = AsyncHub(hub, dedup_cache=DedupCache(capacity=10))
+            with pytest.raises(ValueError):
+                await async_hub.submit("t_1", "cmd-1", mode="SAUNA")
+            await async_hub.submit("t_1", "cmd-1", temperature=58)
+
+        asyncio.run(run())
+        assert thermostat.get_state()["temperature"] == 58
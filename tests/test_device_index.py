@@ -0,0 +1,143 @@
+from typing import Any, Dict, List
+
+import pytest
+
+from src.device import DeviceType
+from src.device_manager import DeviceManager
+from src.devices.lock import LockStateRepr
+from src.devices.switch import SwitchStateRepr
+from src.devices.thermostat import ThermostatStateRepr
+from src.hub import Hub
+
+
+@pytest.fixture(params=[False, True], ids=["objects", "columnar"])
+def device_manager(request):
+    """Fixture to create a fresh indexed DeviceManager for each backend"""
+    return DeviceManager(columnar=request.param, indexed=True)
+
+
+@pytest.fixture
+def hub():
+    """Fixture to create a fresh Hub for each test"""
+    return Hub("hub_1")
+
+
+def ids(devices):
+    """Returns the sorted IDs of a list of devices"""
+    return sorted(device.get_device_id() for device in devices)
+
+
+class TestDeviceIndex:
+    """Tests for DeviceManager secondary indexes and query"""
+
+    def test_query_by_type_and_paired(self, device_manager, hub):
+        """Test querying unpaired locks"""
+        for i in range(3):
+            device_manager.create_device(DeviceType.LOCK, f"lock_{i}", "Door")
+        device_manager.create_device(DeviceType.SWITCH, "switch_1", "Light")
+        hub.add_device(device_manager.get_device("lock_1"))
+
+        unpaired = device_manager.query(device_type=DeviceType.LOCK, is_paired=False)
+        assert ids(unpaired) == ["lock_0", "lock_2"]
+
+        hub.remove_device("lock_1")
+        unpaired = device_manager.query(device_type=DeviceType.LOCK, is_paired=False)
+        assert ids(unpaired) == ["lock_0", "lock_1", "lock_2"]
+
+    def test_query_by_state(self, device_manager):
+        """Test querying switch and lock states and thermostat modes"""
+        device_manager.create_device(DeviceType.SWITCH, "switch_1", "Light")
+        device_manager.create_device(DeviceType.SWITCH, "switch_2", "Light")
+        device_manager.create_device(DeviceType.LOCK, "lock_1", "Door")
+        device_manager.create_device(DeviceType.THERMOSTAT, "thermo_1", "Heat")
+        device_manager.create_device(DeviceType.THERMOSTAT, "thermo_2", "Heat")
+
+        device_manager.get_device("switch_2").update_state()
+        device_manager.get_device("lock_1").update_state()
+        device_manager.get_device("thermo_1").update_state(
+            mode=ThermostatStateRepr.HEAT
+        )
+
+        assert ids(device_manager.query(state=SwitchStateRepr.ON)) == ["switch_2"]
+        assert ids(device_manager.query(state=LockStateRepr.LOCKED)) == ["lock_1"]
+        assert ids(device_manager.query(state="OFF")) == ["switch_1", "thermo_2"]
+        heating = device_manager.query(
+            device_type=DeviceType.THERMOSTAT, state=ThermostatStateRepr.HEAT
+        )
+        assert ids(heating) == ["thermo_1"]
+
+        device_manager.get_device("thermo_1").update_state(
+            mode=ThermostatStateRepr.COOL
+        )
+        assert device_manager.query(state=ThermostatStateRepr.HEAT) == []
+
+    def test_query_by_name_prefix(self, device_manager):
+        """Test the name prefix index"""
+        device_manager.create_device(DeviceType.SWITCH, "switch_1", "Kitchen Light")
+        device_manager.create_device(DeviceType.SWITCH, "switch_2", "Kitchen Fan")
+        device_manager.create_device(DeviceType.DIMMER, "dimmer_1", "Kid Room")
+        device_manager.create_device(DeviceType.LOCK, "lock_1", "Back Door")
+
+        assert ids(device_manager.query(name_prefix="Kitchen")) == [
+            "switch_1",
+            "switch_2",
+        ]
+        assert ids(device_manager.query(name_prefix="Ki")) == [
+            "dimmer_1",
+            "switch_1",
+            "switch_2",
+        ]
+
+        device_manager.delete_device("switch_2")
+        device_manager.create_device(DeviceType.LOCK, "lock_2", "Kitchen Door")
+        assert ids(device_manager.query(name_prefix="Kitchen")) == [
+            "lock_2",
+            "switch_1",
+        ]
+        assert device_manager.query(name_prefix="Garage") == []
+
+    def test_delete_removes_from_indexes(self, device_manager, hub):
+        """Test that deleted devices no longer match any filter"""
+        switch = device_manager.create_device(DeviceType.SWITCH, "switch_1", "Light")
+        hub.add_device(switch)
+        device_manager.delete_device("switch_1")
+
+        assert device_manager.query() == []
+        assert device_manager.query(is_paired=True) == []
+        assert device_manager.query(name_prefix="Li") == []
+
+    def test_deleted_device_is_no_longer_tracked(self, hub):
+        """Test that a deleted device kept by a hub stops updating the index"""
+        device_manager = DeviceManager(indexed=True)
+        switch = device_manager.create_device(DeviceType.SWITCH, "switch_1", "Light")
+        hub.add_device(switch)
+        device_manager.delete_device("switch_1")
+
+        hub.remove_device("switch_1")
+        switch.update_state()
+        assert device_manager.query(is_paired=False) == []
+        assert device_manager.query(state=SwitchStateRepr.ON) == []
+
+    def test_query_matches_scan(self, device_manager, hub):
+        """Test that indexed queries agree with an unindexed scan"""
+        scan_manager = DeviceManager()
+        for manager in (device_manager, scan_manager):
+            for i in range(12):
+                device_type = list(DeviceType)[i % 4]
+                device = manager.create_device(device_type, f"d_{i}", f"Room {i % 3}")
+                if i % 2:
+                    Hub("hub").add_device(device)
+                if i % 5 == 0:
+                    device.update_state()
+
+        filter_sets: List[Dict[str, Any]] = [
+            {"device_type": DeviceType.SWITCH},
+            {"is_paired": True},
+            {"state": "OFF", "is_paired": False},
+            {"name_prefix": "Room 1", "device_type": DeviceType.DIMMER},
+            {},
+        ]
+        for filters in filter_sets:
+            assert ids(device_manager.query(**filters)) == ids(
+                scan_manager.query(**filters)
+            )
@@ -127,3 +127,53 @@ class TestDevices:
         thermo.update_state(mode=ThermostatStateRepr.OFF)
         assert thermo.get_state()["mode"] == ThermostatStateRepr.OFF.name
         assert thermo.get_state()["temperature"] == 82.5
+
+    def test_states_are_shared(self, device_manager):
+        """Test that devices reuse the shared state instances"""
+        switch_1 = device_manager.create_device(DeviceType.SWITCH, "switch_1", "A")
+        switch_2 = device_manager.create_device(DeviceType.SWITCH, "switch_2", "B")
+        assert switch_1.state is switch_2.state
+
+        switch_1.update_state()
+        switch_2.update_state()
+        assert switch_1.state is switch_2.state
+
+        lock_1 = device_manager.create_device(DeviceType.LOCK, "lock_1", "A")
+        lock_2 = device_manager.create_device(DeviceType.LOCK, "lock_2", "B")
+        lock_1.update_state()
+        lock_2.update_state()
+        assert lock_1.state is lock_2.state
+
+        thermo_1 = device_manager.create_device(DeviceType.THERMOSTAT, "thermo_1", "A")
+        thermo_2 = device_manager.create_device(DeviceType.THERMOSTAT, "thermo_2", "B")
+        thermo_1.update_state(mode=ThermostatStateRepr.COOL)
+        thermo_2.update_state(mode=ThermostatStateRepr.COOL)
+        assert thermo_1.state is thermo_2.state
+
+    def test_devices_use_slots(self, device_manager):
+        """Test that devices and their states carry no instance dict"""
+        for device_type in DeviceType:
+            device = device_manager.create_device(device_type, "device_1", "Device")
+            assert not hasattr(device, "__dict__")
+
+        switch = device_manager.create_device(DeviceType.SWITCH, "switch_1", "A")
+        with pytest.raises(AttributeError):
+            switch.state.value = "ON"
+
+    def test_cached_state(self, device_manager):
+        """Test that get_state is cached until the device changes"""
+        dimmer = device_manager.create_device(DeviceType.DIMMER, "dimmer_1", "A")
+        first = dimmer.get_state()
+        first["brightness"] = 99
+        assert dimmer.get_state()["brightness"] == 50
+        assert dimmer._state_cache is not None
+
+        version = dimmer.get_version()
+        dimmer.update_state(brightness=10)
+        assert dimmer.get_version() > version
+        assert dimmer.get_state()["brightness"] == 10
+
+        dimmer.pair()
+        assert dimmer.get_state()["is_paired"]
+        dimmer.update_state()
+        assert dimmer.get_state()["brightness"] == 10
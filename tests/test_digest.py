@@ -0,0 +1,107 @@
+import pytest
+
+from src.device import DeviceType
+from src.device_manager import DeviceManager
+from src.digest import Divergence, FleetDigest, digest_state
+from src.dwelling_manager import DwellingManager
+from src.hub import Hub
+from src.workload import FleetLayout, build_fleet
+
+LAYOUT = FleetLayout(dwellings=40, devices_per_dwelling=5)
+
+
+def build(levels=2, fanout=4):
+    """Returns the managers and the digest of a fleet built from LAYOUT"""
+    device_manager = DeviceManager()
+    dwelling_manager = DwellingManager()
+    build_fleet(LAYOUT, device_manager, dwelling_manager)
+    digest = FleetDigest(device_manager, dwelling_manager, levels, fanout)
+    return device_manager, dwelling_manager, digest
+
+
+@pytest.fixture
+def cloud():
+    """Fixture to create the cloud side of a fleet"""
+    return build()
+
+
+@pytest.fixture
+def hub_side():
+    """Fixture to create the hub side of the same fleet"""
+    return build()
+
+
+def rebuilt(device_manager, dwelling_manager):
+    """Returns the root digest of a tree built from scratch over a fleet"""
+    fresh = FleetDigest(device_manager, dwelling_manager, 2, 4)
+    fresh.close()
+    return fresh.get_root()
+
+
+class TestFleetDigest:
+    """Tests for the incremental fleet digest"""
+
+    def test_equal_fleets_agree(self, cloud, hub_side):
+        """Test that equal fleets have equal roots and nothing to reconcile"""
+        assert cloud[2].get_root() == hub_side[2].get_root() != 0
+        assert cloud[2].reconcile(hub_side[2].get_children) == Divergence([], 1, 4)
+
+    def test_incremental_matches_rebuild(self, cloud):
+        """Test that updates, pairing and moves keep the root as a rebuild has it"""
+        device_manager, dwelling_manager, digest = cloud
+        before = digest.get_root()
+        device_manager.update_state("device_0_0")
+        assert digest.get_root() != before
+        device_manager.update_state("device_0_0")
+        assert digest.get_root() == before
+
+        hub_0 = dwelling_manager.get_dwelling("home_0").get_hub()
+        hub_1 = dwelling_manager.get_dwelling("home_1").get_hub()
+        hub_0.remove_device("device_0_1")
+        hub_1.add_device(device_manager.get_device("device_0_1"))
+        device_manager.delete_device("device_2_0")
+        dwelling_manager.get_dwelling("home_3").install_hub(Hub("hub_new"))
+        assert digest.get_root() == rebuilt(device_manager, dwelling_manager)
+        assert digest.get_hub_path("hub_3") is None
+        assert not digest.get_children(digest.get_hub_path("hub_new"))
+
+    def test_reconcile_finds_divergent_devices(self, cloud, hub_side):
+        """Test that reconciling visits only the paths to divergent devices"""
+        cloud_devices, cloud_dwellings, cloud_digest = cloud
+        hub_devices, hub_dwellings, hub_digest = hub_side
+        hub_devices.update_state("device_7_2", temperature=61)
+        hub_dwellings.get_dwelling("home_9").get_hub().remove_device("device_9_4")
+        extra = cloud_devices.create_device(DeviceType.SWITCH, "extra", "E")
+        cloud_dwellings.get_dwelling("home_9").get_hub().add_device(extra)
+        divergence = cloud_digest.reconcile(hub_digest.get_children)
+        assert divergence.device_ids == ["device_7_2", "device_9_4", "extra"]
+        assert divergence.nodes <= 9
+
+        hub_path = cloud_digest.get_hub_path("hub_7")
+        assert cloud_digest.reconcile(hub_digest.get_children, hub_path) == (
+            Divergence(["device_7_2"], 1, 5)
+        )
+        state = hub_devices.get_device("device_7_2").get_state()
+        assert hub_digest.get_children(hub_path)["device_7_2"] == digest_state(state)
+
+    def test_moves_change_the_root(self, cloud, hub_side):
+        """Test that a device moved between dwellings of one bucket is found"""
+        hub_devices, hub_dwellings, hub_digest = hub_side
+        cloud_digest = cloud[2]
+        assert hub_digest.get_dwelling_path("home_0")[:-1] == (
+            hub_digest.get_dwelling_path("home_29")[:-1]
+        )
+        hub_0 = hub_dwellings.get_dwelling("home_0").get_hub()
+        hub_29 = hub_dwellings.get_dwelling("home_29").get_hub()
+        hub_0.remove_device("device_0_0")
+        hub_29.add_device(hub_devices.get_device("device_0_0"))
+
+        assert hub_digest.get_root() != cloud_digest.get_root()
+        assert hub_digest.get_root() == rebuilt(hub_devices, hub_dwellings)
+        divergence = cloud_digest.reconcile(hub_digest.get_children)
+        assert divergence.device_ids == ["device_0_0"]
+
+    def test_bucket_bounds(self):
+        """Test that bucket levels must fit in a 32-bit hash"""
+        with pytest.raises(ValueError):
+            FleetDigest(DeviceManager(), DwellingManager(), levels=3, fanout=2048)
@@ -1,6 +1,9 @@
 import pytest
 
+from src.device import DeviceType
+from src.device_manager import DeviceManager
 from src.dwelling_manager import DwellingManager
+from src.hub import Hub
 
 
 @pytest.fixture
@@ -9,6 +12,12 @@ def dwelling_manager():
     return DwellingManager()
 
 
+@pytest.fixture
+def device_manager():
+    """Fixture to create a fresh DeviceManager for each test"""
+    return DeviceManager()
+
+
 class TestDwellingManager:
     """Test class for DwellingManager"""
 
@@ -36,3 +45,72 @@ class TestDwellingManager:
         listed_dwellings = dwelling_manager.list_dwellings()
         assert len(listed_dwellings) == 4
         assert set(listed_dwellings) == set(dwellings)
+
+    def test_locate_device(self, dwelling_manager, device_manager):
+        """Test locating a device through its hub and dwelling"""
+        home = dwelling_manager.create_dwelling("home_1")
+        hub = Hub("hub_1")
+        switch = device_manager.create_device(DeviceType.SWITCH, "switch_1", "Light")
+        lock = device_manager.create_device(DeviceType.LOCK, "lock_1", "Door")
+
+        # Devices paired before and after the hub is installed are both found
+        hub.add_device(switch)
+        home.install_hub(hub)
+        hub.add_device(lock)
+
+        assert dwelling_manager.locate("switch_1") == (hub, home)
+        location = dwelling_manager.locate("lock_1")
+        assert location.hub is hub
+        assert location.dwelling is home
+        assert dwelling_manager.locate("thermo_1") is None
+
+        hub.remove_device("switch_1")
+        assert dwelling_manager.locate("switch_1") is None
+
+    def test_locate_after_hub_replacement(self, dwelling_manager, device_manager):
+        """Test that replacing a hub moves the index to the new hub"""
+        home = dwelling_manager.create_dwelling("home_1")
+        old_hub = Hub("hub_1")
+        new_hub = Hub("hub_2")
+        switch = device_manager.create_device(DeviceType.SWITCH, "switch_1", "Light")
+        home.install_hub(old_hub)
+        old_hub.add_device(switch)
+
+        home.install_hub(new_hub)
+        assert dwelling_manager.locate("switch_1") is None
+
+        # The replaced hub is no longer tracked
+        old_hub.add_device(switch)
+        assert dwelling_manager.locate("switch_1") is None
+
+        new_hub.add_device(switch)
+        assert dwelling_manager.locate("switch_1") == (new_hub, home)
+
+    def test_device_moved_between_hubs(self, dwelling_manager, device_manager):
+        """Test that removing a moved device from its old hub keeps the new location"""
+        home_1 = dwelling_manager.create_dwelling("home_1")
+        home_2 = dwelling_manager.create_dwelling("home_2")
+        hub_1 = Hub("hub_1")
+        hub_2 = Hub("hub_2")
+        home_1.install_hub(hub_1)
+        home_2.install_hub(hub_2)
+        switch = device_manager.create_device(DeviceType.SWITCH, "switch_1", "Light")
+
+        hub_1.add_device(switch)
+        hub_2.add_device(switch)
+        hub_1.remove_device("switch_1")
+        assert dwelling_manager.locate("switch_1") == (hub_2, home_2)
+
+    def test_devices_in_dwelling(self, dwelling_manager, device_manager):
+        """Test listing the devices of a dwelling"""
+        home = dwelling_manager.create_dwelling("home_1")
+        dwelling_manager.create_dwelling("home_2")
+        hub = Hub("hub_1")
+        home.install_hub(hub)
+        switch = device_manager.create_device(DeviceType.SWITCH, "switch_1", "Light")
+        hub.add_device(switch)
+
+        assert dwelling_manager.devices_in_dwelling("home_1") == [switch]
+        assert dwelling_manager.devices_in_dwelling("home_2") == []
+        assert dwelling_manager.devices_in_dwelling("home_3") == []
+        assert dwelling_manager.get_dwelling("home_1") is home
@@ -0,0 +1,168 @@
+import pytest
+
+from src.device import DeviceType
+from src.device_manager import DeviceManager
+from src.dwelling_manager import DwellingManager
+from src.event_bus import EventBus, EventKind
+from src.hub import Hub
+
+
+class FakeClock:
+    """Manually advanced clock"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def device_manager():
+    """Fixture to create a fresh DeviceManager for each test"""
+    return DeviceManager()
+
+
+@pytest.fixture
+def dwelling_manager():
+    """Fixture to create a fresh DwellingManager for each test"""
+    return DwellingManager()
+
+
+@pytest.fixture
+def clock():
+    """Fixture to create a clock starting at zero"""
+    return FakeClock()
+
+
+class TestEventBus:
+    """Tests for the state-change event bus"""
+
+    def test_device_events(self, device_manager, dwelling_manager):
+        """Test that device lifecycle and state changes are published in order"""
+        bus = EventBus(device_manager, dwelling_manager)
+        events = []
+        bus.subscribe(events.append)
+
+        switch = device_manager.create_device(DeviceType.SWITCH, "switch_1", "S")
+        switch.update_state()
+        Hub("hub_1").add_device(switch)
+        device_manager.delete_device("switch_1")
+
+        assert [e.kind for e in events] == [
+            EventKind.CREATED,
+            EventKind.STATE,
+            EventKind.PAIR,
+            EventKind.DELETED,
+        ]
+        assert events[1].state["state"] == "ON"
+        assert events[2].state["is_paired"]
+        assert events[1].device_type is DeviceType.SWITCH
+
+    def test_filters(self, device_manager, dwelling_manager):
+        """Test filtering by kind, device type, hub and dwelling"""
+        bus = EventBus(device_manager, dwelling_manager)
+        by_type, by_hub, by_dwelling, occupancy = [], [], [], []
+        bus.subscribe(by_type.append, device_type=DeviceType.DIMMER)
+        bus.subscribe(by_hub.append, kinds=[EventKind.STATE], hub_id="hub_1")
+        bus.subscribe(by_dwelling.append, dwelling_id="home_1")
+        bus.subscribe(occupancy.append, kinds=[EventKind.OCCUPANCY])
+
+        hub = Hub("hub_1")
+        dwelling = dwelling_manager.create_dwelling("home_1")
+        dwelling.install_hub(hub)
+        dimmer = device_manager.create_device(DeviceType.DIMMER, "dimmer_1", "D")
+        switch = device_manager.create_device(DeviceType.SWITCH, "switch_1", "S")
+        hub.add_device(switch)
+        dimmer.update_state(brightness=10)
+        switch.update_state()
+        dwelling.set_occupancy()
+
+        assert [e.source_id for e in by_type] == ["dimmer_1", "dimmer_1"]
+        assert [(e.kind, e.source_id) for e in by_hub] == [
+            (EventKind.STATE, "switch_1")
+        ]
+        assert by_hub[0].dwelling_id == "home_1"
+        assert [e.kind for e in by_dwelling] == [
+            EventKind.PAIR,
+            EventKind.STATE,
+            EventKind.OCCUPANCY,
+        ]
+        assert occupancy[0].state == {"dwelling_id": "home_1", "is_occupied": True}
+        assert occupancy[0].hub_id == "hub_1"
+
+    def test_coalescing(self, device_manager, clock):
+        """Test that a burst of updates becomes one event with the final state"""
+        bus = EventBus(device_manager, coalesce_window=0.1, clock=clock)
+        events = []
+        bus.subscribe(events.append, kinds=[EventKind.STATE])
+        dimmer = device_manager.create_device(DeviceType.DIMMER, "dimmer_1", "D")
+        switch = device_manager.create_device(DeviceType.SWITCH, "switch_1", "S")
+
+        for level in range(1, 51):
+            clock.now += 0.001
+            dimmer.update_state(brightness=level)
+        switch.update_state()
+        assert events == []
+        assert bus.get_pending() == 2
+
+        clock.now += 0.1
+        bus.poll()
+        assert [(e.source_id, e.merged) for e in events] == [
+            ("dimmer_1", 50),
+            ("switch_1", 1),
+        ]
+        assert events[0].state["brightness"] == 50
+        assert events[0].timestamp == pytest.approx(0.05)
+
+    def test_overdue_window(self, device_manager, clock):
+        """Test that a change after the window closes publishes right away"""
+        bus = EventBus(device_manager, coalesce_window=0.1, clock=clock)
+        events = []
+        bus.subscribe(events.append, kinds=[EventKind.STATE])
+        dimmer = device_manager.create_device(DeviceType.DIMMER, "dimmer_1", "D")
+
+        dimmer.update_state(brightness=10)
+        clock.now = 0.2
+        dimmer.update_state(brightness=20)
+        assert [(e.state["brightness"], e.merged) for e in events] == [(20, 2)]
+        assert bus.get_pending() == 0
+
+        dimmer.update_state(brightness=30)
+        bus.flush()
+        assert [e.state["brightness"] for e in events] == [20, 30]
+
+    def test_other_events_flush_pending_state(self, device_manager, clock):
+        """Test that pairing or deleting publishes the held back state first"""
+        bus = EventBus(device_manager, coalesce_window=1.0, clock=clock)
+        events = []
+        bus.subscribe(events.append)
+        lock = device_manager.create_device(DeviceType.LOCK, "lock_1", "L")
+        lock.update_state()
+        Hub("hub_1").add_device(lock)
+        lock.update_state()
+        device_manager.delete_device("lock_1")
+
+        assert [e.kind for e in events] == [
+            EventKind.CREATED,
+            EventKind.STATE,
+            EventKind.PAIR,
+            EventKind.STATE,
+            EventKind.DELETED,
+        ]
+
+    def test_unsubscribe_and_close(self, device_manager, clock):
+        """Test that unsubscribed callbacks and closed buses publish nothing"""
+        bus = EventBus(device_manager, coalesce_window=1.0, clock=clock)
+        events, kept = [], []
+        subscription = bus.subscribe(events.append)
+        bus.subscribe(kept.append, kinds=[EventKind.STATE])
+        switch = device_manager.create_device(DeviceType.SWITCH, "switch_1", "S")
+        bus.unsubscribe(subscription)
+        switch.update_state()
+
+        bus.close()
+        assert len(kept) == 1
+        switch.update_state()
+        assert len(kept) == 1
+        assert len(events) == 1
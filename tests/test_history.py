@@ -0,0 +1,138 @@
+import pytest
+
+from src.device import DeviceType
+from src.device_manager import DeviceManager
+from src.devices.lock import LockStateRepr
+from src.devices.thermostat import ThermostatStateRepr
+from src.history import StateHistory, Transition
+from src.scheduler import VirtualClock
+
+
+@pytest.fixture
+def clock():
+    """Fixture to create a virtual clock"""
+    return VirtualClock()
+
+
+@pytest.fixture
+def device_manager():
+    """Fixture to create a DeviceManager with a lock and a thermostat"""
+    device_manager = DeviceManager()
+    device_manager.create_device(DeviceType.LOCK, "door", "Front")
+    device_manager.create_device(DeviceType.THERMOSTAT, "thermo_1", "Hall")
+    return device_manager
+
+
+def lock_state(history, at):
+    """Returns whether the door was locked at a time"""
+    return history.state_at("door", at)["is_locked"]
+
+
+def door_names(history, start, end):
+    """Returns the names of the door in its transitions over a time range"""
+    transitions = history.transitions("door", start, end)
+    return [t.state and t.state["name"] for t in transitions]
+
+
+class TestStateHistory:
+    """Tests for the bounded per-device state history"""
+
+    def test_state_at(self, device_manager, clock):
+        """Test that past states are answered from the recorded transitions"""
+        history = StateHistory(device_manager, clock=clock)
+        door = device_manager.get_device("door")
+        initial = door.get_state()
+        clock.advance(10)
+        device_manager.update_state("door")
+        locked = door.get_state()
+        clock.advance(10)
+        device_manager.update_state(
+            "thermo_1", mode=ThermostatStateRepr.HEAT, temperature=68.5
+        )
+        clock.advance(10)
+        device_manager.update_state("door")
+
+        assert history.state_at("door", -1) is None
+        assert history.state_at("door", 9.5) == initial
+        assert history.state_at("door", 10) == locked
+        assert lock_state(history, 29) == LockStateRepr.LOCKED.name
+        assert lock_state(history, 30) == LockStateRepr.UNLOCKED.name
+        thermostat = device_manager.get_device("thermo_1").get_state()
+        assert history.state_at("thermo_1", 25) == thermostat
+        assert history.state_at("missing", 25) is None
+
+    def test_transitions_and_deletion(self, device_manager, clock):
+        """Test that transitions come by half-open range and end at deletion"""
+        history = StateHistory(device_manager, clock=clock)
+        for _ in range(4):
+            clock.advance(5)
+            device_manager.update_state("door")
+        device_manager.update_state("thermo_1", temperature=72)  # Unchanged
+        clock.advance(5)
+        device_manager.delete_device("door")
+
+        assert [t.at for t in history.transitions("door", 5, 20)] == [5, 10, 15]
+        assert history.transitions("door", 25, 30) == [Transition(25, None)]
+        assert history.state_at("door", 30) is None
+        assert len(history.transitions("thermo_1", 0, 100)) == 1
+        assert history.transitions("missing", 0, 100) == []
+
+    def test_retention(self, device_manager, clock):
+        """Test that capacity and max_age bound the history of a device"""
+        history = StateHistory(device_manager, capacity=4, clock=clock)
+        for _ in range(10):
+            clock.advance(1)
+            device_manager.update_state("door")
+        assert [t.at for t in history.transitions("door", 0, 100)] == [7, 8, 9, 10]
+        assert history.state_at("door", 6.5) is None
+        assert lock_state(history, 7.5) == LockStateRepr.LOCKED.name
+
+        aged = StateHistory(device_manager, capacity=8, max_age=3, clock=clock)
+        for _ in range(10):
+            clock.advance(1)
+            device_manager.update_state("door")
+        # The entry in force at the cutoff is kept, so the cutoff stays answerable
+        assert [t.at for t in aged.transitions("door", 0, 100)] == [17, 18, 19, 20]
+        assert aged.state_at("door", 17) is not None
+        assert history.get_retained() == 4 + 1  # The thermostat has one
+        with pytest.raises(ValueError):
+            StateHistory(device_manager, capacity=0)
+
+    def test_rebuild(self, device_manager, clock):
+        """Test that a fleet rebuilt at a past time has the states of then"""
+        history = StateHistory(device_manager, clock=clock)
+        past = {
+            device.get_device_id(): device.get_state()
+            for device in device_manager.list_devices()
+        }
+        clock.advance(1)
+        device_manager.update_state("door")
+        device_manager.create_device(DeviceType.SWITCH, "switch_1", "Late")
+        device_manager.get_device("thermo_1").pair()
+
+        assert history.replay(0.5) == past
+        rebuilt = history.rebuild(0.5)
+        assert {
+            device.get_device_id(): device.get_state()
+            for device in rebuilt.list_devices()
+        } == past
+        assert set(history.replay(1)) == {"door", "thermo_1", "switch_1"}
+        thermostat = history.rebuild(1).get_device("thermo_1")
+        assert thermostat is not None and thermostat.get_state()["is_paired"]
+
+    def test_recreated_under_new_name(self, device_manager, clock):
+        """Test that past states keep the name the device had then"""
+        history = StateHistory(device_manager, clock=clock)
+        short = StateHistory(device_manager, capacity=2, clock=clock)
+        clock.advance(1)
+        device_manager.delete_device("door")
+        clock.advance(1)
+        device_manager.create_device(DeviceType.LOCK, "door", "Back")
+        for _ in range(2):
+            clock.advance(1)
+            device_manager.update_state("door")
+
+        assert door_names(history, 0, 5) == ["Front", None, "Back", "Back", "Back"]
+        assert door_names(short, 0, 5) == ["Back", "Back"]
+        door = history.rebuild(0.5).get_device("door")
+        assert door is not None and door.get_name() == "Front"
@@ -0,0 +1,171 @@
+import time
+
+import pytest
+
+from src.device import CustomDeviceType, Device, DeviceType
+from src.device_manager import DEVICE_CLASSES, DeviceManager
+from src.devices.switch import Switch
+from src.dwelling_manager import DwellingManager
+from src.hub import Hub
+from src.metrics import Metrics
+
+
+class Valve(Device):
+    """Valve driver registered while metrics are enabled"""
+
+    DEVICE_TYPE = CustomDeviceType("valve")
+
+    def update_state(self, **kwargs):
+        """Reports a state change"""
+        self._notify_state_change()
+
+    def load_state(self, state):
+        """Keeps no state of its own"""
+
+
+@pytest.fixture
+def metrics():
+    """Fixture to enable fresh Metrics for a test and disable them after"""
+    metrics = Metrics()
+    metrics.enable()
+    yield metrics
+    metrics.disable()
+
+
+@pytest.fixture
+def device_manager():
+    """Fixture to create a fresh DeviceManager for each test"""
+    return DeviceManager()
+
+
+class TestMetrics:
+    """Tests for the latency instrumentation"""
+
+    def test_counts_per_device_type(self, metrics, device_manager):
+        """Test that calls are counted per operation and device type"""
+        switch = device_manager.create_device(DeviceType.SWITCH, "switch_1", "S")
+        dimmer = device_manager.create_device(DeviceType.DIMMER, "dimmer_1", "D")
+        switch.update_state()
+        switch.update_state()
+        dimmer.update_state(brightness=10)
+        dimmer.get_state()
+        device_manager.list_devices()
+
+        snapshot = metrics.snapshot()
+        create = snapshot["DeviceManager.create_device"]
+        assert create[DeviceType.SWITCH].count == 1
+        assert create[DeviceType.DIMMER].count == 1
+        assert snapshot["Switch.update_state"][DeviceType.SWITCH].count == 2
+        assert snapshot["Dimmer.update_state"][DeviceType.DIMMER].count == 1
+        assert snapshot["Device.get_state"][DeviceType.DIMMER].count == 1
+        stats = snapshot["DeviceManager.list_devices"][None]
+        assert stats.count == 1
+        assert stats.buckets[float("inf")] == 1
+        assert stats.total_seconds > 0
+
+    def test_hubs_dwellings_and_views(self, metrics):
+        """Test that hubs, dwelling managers and columnar views are covered"""
+        devices = DeviceManager(columnar=True)
+        dwellings = DwellingManager()
+        lock = devices.create_device(DeviceType.LOCK, "lock_1", "L")
+        hub = Hub("hub_1")
+        hub.add_device(lock)
+        dwellings.create_dwelling("home_1").install_hub(hub)
+        lock.update_state()
+
+        snapshot = metrics.snapshot()
+        assert snapshot["Hub.add_device"][DeviceType.LOCK].count == 1
+        assert snapshot["DwellingManager.create_dwelling"][None].count == 1
+        assert snapshot["DeviceView.update_state"][DeviceType.LOCK].count == 1
+
+    def test_errors(self, metrics):
+        """Test that failed calls are counted as errors"""
+        with pytest.raises(ValueError):
+            DeviceManager(columnar=True).histogram("unknown")
+
+        stats = metrics.snapshot()["DeviceManager.histogram"][None]
+        assert (stats.count, stats.errors) == (1, 1)
+        assert stats.total_seconds > 0
+
+    def test_generators_timed_over_iteration(self, metrics, device_manager):
+        """Test that iter methods record their steps, not the caller's work"""
+        for i in range(3):
+            device_manager.create_device(DeviceType.SWITCH, f"switch_{i}", "S")
+        list_page = device_manager.list_page
+
+        def slow_page(*args, **kwargs):
+            """Takes a page as a slow backend would"""
+            time.sleep(0.02)
+            return list_page(*args, **kwargs)
+
+        device_manager.list_page = slow_page
+        iterator = device_manager.iter_devices(page_size=2)
+        assert "DeviceManager.iter_devices" not in metrics.snapshot()
+        for _ in iterator:
+            time.sleep(0.05)
+        stats = metrics.snapshot()["DeviceManager.iter_devices"][None]
+        assert stats.count == 1
+        assert 0.04 <= stats.total_seconds < 0.1
+
+        hub = Hub("hub_1")
+        hub.add_device(device_manager.create_device(DeviceType.LOCK, "lock_1", "L"))
+        steps = hub.iter_devices()
+        next(steps)
+        steps.close()  # type: ignore[attr-defined]  # Counts once closed
+        assert metrics.snapshot()["Hub.iter_devices"][None].count == 1
+
+    def test_drivers_wrapped_on_load(self, device_manager):
+        """Test that enabling imports no driver and wraps drivers as they load"""
+        valve = Valve.DEVICE_TYPE
+        ghost = CustomDeviceType("ghost")
+        DEVICE_CLASSES.register(ghost, "missing_driver_module:Ghost")
+        original = Valve.update_state
+        metrics = Metrics()
+        try:
+            metrics.enable()
+            DEVICE_CLASSES.register(valve, Valve)
+            device_manager.create_device(valve, "valve_1", "V").update_state()
+            assert metrics.snapshot()["Valve.update_state"][valve].count == 1
+        finally:
+            metrics.disable()
+            DEVICE_CLASSES.unregister(valve)
+            DEVICE_CLASSES.unregister(ghost)
+        assert Valve.update_state is original
+
+    def test_prometheus_export(self, metrics, device_manager):
+        """Test the Prometheus text format of the recorded metrics"""
+        device_manager.create_device(DeviceType.THERMOSTAT, "t_1", "T")
+        text = metrics.export_prometheus()
+        labels = 'operation="DeviceManager.create_device",device_type="thermostat"'
+
+        assert "# TYPE devicemanager_operation_seconds histogram" in text
+        assert f'devicemanager_operation_seconds_bucket{{{labels},le="+Inf"}} 1' in text
+        assert f"devicemanager_operation_seconds_count{{{labels}}} 1" in text
+        assert f"devicemanager_operation_errors_total{{{labels}}} 0" in text
+        assert text.endswith("\n")
+
+    def test_disable_restores_methods(self, device_manager):
+        """Test that disabling puts the original methods back"""
+        original = Switch.update_state, Device.get_state, Hub.add_device
+        metrics = Metrics()
+        metrics.enable()
+        assert Switch.update_state is not original[0]
+        metrics.disable()
+
+        assert (Switch.update_state, Device.get_state, Hub.add_device) == original
+        assert not metrics.is_enabled()
+        device_manager.create_device(DeviceType.SWITCH, "switch_1", "S")
+        assert metrics.snapshot() == {}
+
+    def test_single_enabled_instance(self, metrics):
+        """Test that a second instance cannot instrument at the same time"""
+        with pytest.raises(ValueError):
+            Metrics().enable()
+        metrics.enable()
+        assert metrics.is_enabled()
+
+    def test_reset(self, metrics, device_manager):
+        """Test that reset drops what was recorded"""
+        device_manager.list_devices()
+        metrics.reset()
+        assert metrics.snapshot() == {}
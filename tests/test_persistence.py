@@ -0,0 +1,275 @@
+import threading
+import time
+
+import pytest
+
+from src.device import DeviceType
+from src.device_manager import DeviceManager
+from src.devices.lock import Lock
+from src.devices.thermostat import ThermostatStateRepr
+from src.dwelling_manager import DwellingManager
+from src.hub import Hub
+from src.persistence import LOG_FILE, SNAPSHOT_FILE, FleetPersistence, WriteAheadLog
+
+
+@pytest.fixture
+def persistence(tmp_path):
+    """Fixture to persist a fresh pair of managers into a temporary directory"""
+    persistence = FleetPersistence(
+        tmp_path, DeviceManager(), DwellingManager(), persist_secrets=True
+    )
+    yield persistence
+    persistence.close()
+
+
+def build_fleet(persistence):
+    """Creates a small fleet and mutates it through the public APIs"""
+    device_manager = persistence.get_device_manager()
+    home = persistence.get_dwelling_manager().create_dwelling("home_1")
+    hub = Hub("hub_1")
+    switch = device_manager.create_device(DeviceType.SWITCH, "switch_1", "Light")
+    lock = device_manager.create_device(
+        DeviceType.LOCK, "lock_1", "Door", pin_code="1234"
+    )
+    thermo = device_manager.create_device(
+        DeviceType.THERMOSTAT, "thermo_1", "Heat", temperature=65
+    )
+    dimmer = device_manager.create_device(DeviceType.DIMMER, "dimmer_1", "Dimmer")
+    device_manager.create_device(DeviceType.SWITCH, "switch_2", "Gone")
+
+    hub.add_device(switch)
+    home.install_hub(hub)
+    hub.add_device(lock)
+    hub.add_device(dimmer)
+    hub.remove_device("dimmer_1")
+    home.set_occupancy()
+
+    switch.update_state()
+    lock.update_state()
+    thermo.update_state(mode=ThermostatStateRepr.HEAT, temperature=70.5)
+    dimmer.update_state(brightness=80)
+    device_manager.delete_device("switch_2")
+
+
+def fleet_state(persistence):
+    """Returns a comparable picture of the persisted fleet"""
+    devices = {
+        device.get_device_id(): device.get_state()
+        for device in persistence.get_device_manager().list_devices()
+    }
+    dwellings = {
+        dwelling.get_dwelling_id(): (
+            dwelling.get_is_occupied(),
+            sorted(dwelling.get_hub().get_paired_devices()),
+        )
+        for dwelling in persistence.get_dwelling_manager().list_dwellings()
+    }
+    return devices, dwellings
+
+
+def paired(persistence):
+    """Returns the paired status of every persisted device by ID"""
+    return {
+        device.get_device_id(): device.get_paired()
+        for device in persistence.get_device_manager().list_devices()
+    }
+
+
+class TestPersistence:
+    """Tests for the write-ahead log and snapshots"""
+
+    def test_recover_from_log(self, tmp_path, persistence):
+        """Test that replaying the log rebuilds the fleet"""
+        build_fleet(persistence)
+        expected = fleet_state(persistence)
+        persistence.close()
+
+        recovered = FleetPersistence.recover(tmp_path)
+        assert fleet_state(recovered) == expected
+        lock = recovered.get_device_manager().get_device("lock_1")
+        assert isinstance(lock, Lock) and lock.is_pin_code()
+        location = recovered.get_dwelling_manager().locate("switch_1")
+        assert location is not None and location.hub is recovered.get_hub("hub_1")
+        recovered.close()
+
+    def test_recover_from_snapshot_and_log(self, tmp_path, persistence):
+        """Test recovery from a snapshot followed by newer log records"""
+        build_fleet(persistence)
+        persistence.checkpoint()
+        assert (tmp_path / LOG_FILE).stat().st_size == 0
+
+        device_manager = persistence.get_device_manager()
+        device_manager.get_device("switch_1").update_state()
+        persistence.get_dwelling_manager().get_dwelling("home_1").reset_occupancy()
+        expected = fleet_state(persistence)
+        persistence.close()
+
+        recovered = FleetPersistence.recover(tmp_path)
+        assert fleet_state(recovered) == expected
+
+        # Mutations after recovery keep extending the same history
+        recovered.get_device_manager().update_state("switch_1")
+        expected = fleet_state(recovered)
+        recovered.close()
+        recovered = FleetPersistence.recover(tmp_path)
+        assert fleet_state(recovered) == expected
+        recovered.close()
+
+    def test_recover_into_columnar_manager(self, tmp_path, persistence):
+        """Test that a fleet can be recovered into the columnar backend"""
+        build_fleet(persistence)
+        expected = fleet_state(persistence)
+        persistence.close()
+
+        recovered = FleetPersistence.recover(
+            tmp_path, device_manager=DeviceManager(columnar=True)
+        )
+        assert fleet_state(recovered) == expected
+        recovered.close()
+
+    def test_periodic_snapshot(self, tmp_path):
+        """Test that the log is compacted every snapshot_every records"""
+        persistence = FleetPersistence(
+            tmp_path, DeviceManager(), DwellingManager(), snapshot_every=5
+        )
+        switch = persistence.get_device_manager().create_device(
+            DeviceType.SWITCH, "switch_1", "Light"
+        )
+        for _ in range(7):
+            switch.update_state()
+        persistence.close()
+
+        assert len(list(WriteAheadLog.replay(tmp_path / LOG_FILE))) == 3
+        recovered = FleetPersistence.recover(tmp_path)
+        switch = recovered.get_device_manager().get_device("switch_1")
+        assert switch is not None and switch.get_state()["state"] == "ON"
+        recovered.close()
+
+    def test_torn_tail_is_dropped(self, tmp_path, persistence):
+        """Test that a partially written last record is ignored and truncated"""
+        build_fleet(persistence)
+        expected = fleet_state(persistence)
+        persistence.close()
+        with open(tmp_path / LOG_FILE, "ab") as log:
+            log.write(b'{"op":"delete","id":"lock_1","se')
+
+        recovered = FleetPersistence.recover(tmp_path)
+        assert fleet_state(recovered) == expected
+        assert (tmp_path / LOG_FILE).read_bytes().endswith(b"\n")
+        recovered.close()
+
+    def test_group_commit(self, tmp_path):
+        """Test that records are written in groups and fsynced on the interval"""
+        now = [0.0]
+        log = WriteAheadLog(
+            tmp_path / LOG_FILE, group_size=3, fsync_interval=1.0, clock=lambda: now[0]
+        )
+        log.append({"seq": 1})
+        log.append({"seq": 2})
+        assert (tmp_path / LOG_FILE).stat().st_size == 0
+
+        log.append({"seq": 3})
+        assert len(list(WriteAheadLog.replay(tmp_path / LOG_FILE))) == 3
+        assert log._unsynced
+
+        now[0] = 2.0
+        log.append({"seq": 4})
+        log.flush()
+        assert not log._unsynced
+        log.close()
+        assert [r["seq"] for r in WriteAheadLog.replay(tmp_path / LOG_FILE)] == [
+            1,
+            2,
+            3,
+            4,
+        ]
+
+    def test_snapshot_is_atomic(self, tmp_path, persistence):
+        """Test that checkpoints leave no temporary file behind"""
+        build_fleet(persistence)
+        persistence.checkpoint()
+        names = sorted(path.name for path in tmp_path.iterdir())
+        assert names == sorted([SNAPSHOT_FILE, LOG_FILE])
+
+    def test_quiet_log_is_synced(self, tmp_path):
+        """Test that a partial group reaches disk within the fsync interval"""
+        log = WriteAheadLog(tmp_path / LOG_FILE, group_size=512, fsync_interval=0.01)
+        log.append({"seq": 1})
+        deadline = time.monotonic() + 5
+        while not (tmp_path / LOG_FILE).stat().st_size and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert [r["seq"] for r in WriteAheadLog.replay(tmp_path / LOG_FILE)] == [1]
+        log.close()
+
+    def test_secrets_are_opt_in(self, tmp_path):
+        """Test that pin codes stay out of the files unless asked for"""
+        persistence = FleetPersistence(tmp_path, DeviceManager(), DwellingManager())
+        build_fleet(persistence)
+        persistence.checkpoint()
+        persistence.get_device_manager().create_device(
+            DeviceType.LOCK, "lock_2", "Gate", pin_code="9876"
+        )
+        persistence.close()
+        for name in (SNAPSHOT_FILE, LOG_FILE):
+            contents = (tmp_path / name).read_text()
+            assert "1234" not in contents and "9876" not in contents
+
+        with pytest.raises(ValueError, match="withheld for lock_1, lock_2"):
+            FleetPersistence.recover(tmp_path)
+        pin_codes = {"lock_1": "1234", "lock_2": "9876"}
+        recovered = FleetPersistence.recover(tmp_path, pin_codes=pin_codes)
+        lock = recovered.get_device_manager().get_device("lock_2")
+        assert isinstance(lock, Lock) and lock.verify_pin_code("9876")
+        recovered.get_device_manager().delete_device("lock_2")
+        recovered.close()
+        recovered = FleetPersistence.recover(tmp_path, pin_codes={"lock_1": "1234"})
+        recovered.close()
+
+    def test_concurrent_appends(self, tmp_path):
+        """Test that observer calls from several threads log distinct, ordered seqs"""
+        persistence = FleetPersistence(
+            tmp_path,
+            DeviceManager(concurrent=True),
+            DwellingManager(),
+            snapshot_every=50,
+        )
+        device_manager = persistence.get_device_manager()
+        barrier = threading.Barrier(8)
+
+        def worker(index):
+            barrier.wait()
+            for i in range(100):
+                device_id = f"switch_{index}_{i}"
+                device_manager.create_device(DeviceType.SWITCH, device_id, "S")
+                device_manager.update_state(device_id)
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        expected = fleet_state(persistence)
+        persistence.close()
+
+        seqs = [r["seq"] for r in WriteAheadLog.replay(tmp_path / LOG_FILE)]
+        assert seqs == sorted(set(seqs))
+        recovered = FleetPersistence.recover(tmp_path)
+        assert fleet_state(recovered) == expected
+        assert len(expected[0]) == 800
+        recovered.close()
+
+    def test_pairing_through_untracked_hubs(self, tmp_path, persistence):
+        """Test that pairing done by hubs the log does not track is recovered"""
+        device_manager = persistence.get_device_manager()
+        switch = device_manager.create_device(DeviceType.SWITCH, "switch_1", "Light")
+        device_manager.create_device(DeviceType.SWITCH, "switch_2", "Fan")
+        Hub("untracked").add_device(switch)
+        persistence.close()
+
+        recovered = FleetPersistence.recover(tmp_path)
+        assert paired(recovered) == {"switch_1": True, "switch_2": False}
+        recovered.checkpoint()
+        recovered.close()
+        recovered = FleetPersistence.recover(tmp_path)
+        assert paired(recovered) == {"switch_1": True, "switch_2": False}
+        recovered.close()
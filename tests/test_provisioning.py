@@ -0,0 +1,106 @@
+import json
+
+import pytest
+
+from src.device import DeviceType
+from src.device_manager import DeviceManager, DeviceSpec
+from src.provisioning import get_schema, provision, provision_file
+
+
+@pytest.fixture
+def device_manager():
+    """Fixture to create a fresh DeviceManager for each test"""
+    return DeviceManager()
+
+
+class TestProvisioning:
+    """Tests for bulk device provisioning"""
+
+    def test_create_devices(self, device_manager):
+        """Test creating a batch of devices in one call"""
+        devices = device_manager.create_devices(
+            [
+                DeviceSpec(DeviceType.SWITCH, "switch_1", "Light", {}),
+                DeviceSpec(DeviceType.DIMMER, "dimmer_1", "Dimmer", {"brightness": 30}),
+            ]
+        )
+        assert len(devices) == 2
+        assert device_manager.list_devices() == devices
+        assert devices[1].get_state()["brightness"] == 30
+
+    def test_create_devices_columnar(self):
+        """Test creating a batch of devices in the columnar backend"""
+        device_manager = DeviceManager(columnar=True)
+        devices = device_manager.create_devices(
+            [DeviceSpec(DeviceType.LOCK, "lock_1", "Door", {"pin_code": "1234"})]
+        )
+        assert devices[0].get_state()["pin_code_set"]
+
+    def test_schema(self):
+        """Test that schemas are derived once from the constructors"""
+        assert get_schema(DeviceType.DIMMER) is get_schema(DeviceType.DIMMER)
+        assert get_schema(DeviceType.THERMOSTAT).get_fields() == ["temperature"]
+        assert get_schema(DeviceType.SWITCH).get_fields() == []
+        assert get_schema(DeviceType.DIMMER).validate({"brightness": "70"}) == {
+            "brightness": 70
+        }
+        with pytest.raises(ValueError):
+            get_schema(DeviceType.SWITCH).validate({"brightness": 70})
+        with pytest.raises(ValueError, match="Invalid value"):
+            get_schema(DeviceType.DIMMER).validate({"brightness": float("inf")})
+
+    def test_provision_jsonl(self, device_manager, tmp_path):
+        """Test that a JSONL manifest loads and reports bad rows"""
+        manifest = tmp_path / "devices.jsonl"
+        rows = [
+            {"type": "switch", "device_id": "switch_1", "name": "Light"},
+            {"type": "thermostat", "device_id": "thermo_1", "name": "T", "temperature": 68},
+            {"type": "toaster", "device_id": "toaster_1", "name": "Toaster"},
+            {"type": "dimmer", "device_id": "dimmer_1", "name": "D", "brightness": "x"},
+            {"type": "lock", "device_id": "lock_1", "name": "Door", "colour": "red"},
+        ]
+        lines = [json.dumps(row) for row in rows] + ["{not json", ""]
+        lines.append(json.dumps({"type": "lock", "device_id": "lock_2", "name": "D"}))
+        manifest.write_text("\n".join(lines))
+
+        report = provision_file(device_manager, manifest, chunk_size=1)
+
+        assert report.created == 3
+        assert [error.line for error in report.errors] == [3, 4, 5, 6]
+        assert device_manager.get_device("thermo_1").get_temperature() == 68.0
+        assert device_manager.get_device("lock_2") is not None
+
+    def test_provision_csv(self, device_manager, tmp_path):
+        """Test that a CSV manifest loads with converted kwargs"""
+        manifest = tmp_path / "devices.csv"
+        manifest.write_text(
+            "type,device_id,name,brightness\n"
+            "dimmer,dimmer_1,Bedroom,70\n"
+            "switch,switch_1,Hall,\n"
+            "switch,,Nameless,\n"
+            "switch,switch_2,Hall,5\n"
+        )
+
+        report = provision_file(device_manager, manifest)
+
+        assert report.created == 2
+        assert [error.line for error in report.errors] == [4, 5]
+        assert device_manager.get_device("dimmer_1").get_state()["brightness"] == 70
+
+    def test_provision_is_lazy(self, device_manager):
+        """Test that rows are consumed chunk by chunk from an iterator"""
+        consumed = []
+
+        def rows():
+            for i in range(5):
+                consumed.append(i)
+                yield i + 1, {"type": "switch", "device_id": f"s_{i}", "name": "S"}
+
+        report = provision(device_manager, rows(), chunk_size=2)
+        assert report.created == 5
+        assert consumed == list(range(5))
+
+    def test_unsupported_manifest(self, device_manager, tmp_path):
+        """Test that unknown manifest formats are rejected"""
+        with pytest.raises(ValueError):
+            provision_file(device_manager, tmp_path / "devices.xml")
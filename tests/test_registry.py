@@ -0,0 +1,161 @@
+import sys
+from importlib.metadata import EntryPoint
+
+import pytest
+
+from src.binary_snapshot import write_binary_snapshot
+from src.device import CustomDeviceType, DeviceType
+from src.device_manager import DEVICE_CLASSES, DeviceManager
+from src.devices.switch import Switch
+from src.dwelling_manager import DwellingManager
+from src.event_bus import EventBus
+from src.provisioning import get_schema, parse_row
+from src.registry import ENTRY_POINT_GROUP, DeviceRegistry
+
+SPRINKLER = CustomDeviceType("sprinkler")
+
+PLUGIN_SOURCE = '''
+from typing import Any, Dict
+
+from src.device import CustomDeviceType, Device
+
+
+class Sprinkler(Device):
+    """Sprinkler valve of an irrigation zone"""
+
+    __slots__ = ("_zone", "_is_open")
+
+    DEVICE_TYPE = CustomDeviceType("sprinkler")
+
+    def __init__(self, device_id: str, name: str, zone: int = 1) -> None:
+        super().__init__(device_id, name)
+        self._zone = zone
+        self._is_open = False
+
+    def update_state(self, **kwargs) -> None:
+        self._is_open = not self._is_open
+        self._notify_state_change()
+
+    def load_state(self, state: Dict[str, Any]) -> None:
+        self._is_open = state["is_open"]
+        self._notify_state_change()
+
+    def _build_state(self) -> Dict[str, Any]:
+        state = super()._build_state()
+        state.update({"zone": self._zone, "is_open": self._is_open})
+        return state
+'''
+
+
+@pytest.fixture
+def plugin(tmp_path, monkeypatch, request):
+    """Fixture to write a sprinkler driver module and return its target"""
+    module = f"sprinkler_{request.node.name.replace('[', '_').replace(']', '')}"
+    (tmp_path / f"{module}.py").write_text(PLUGIN_SOURCE)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    yield f"{module}:Sprinkler"
+    sys.modules.pop(module, None)
+
+
+@pytest.fixture
+def registered(plugin):
+    """Fixture to register the sprinkler driver in the default registry"""
+    DEVICE_CLASSES.register(SPRINKLER, plugin)
+    yield plugin
+    DEVICE_CLASSES.unregister(SPRINKLER)
+
+
+class TestDeviceRegistry:
+    """Tests for the lazy device-type registry"""
+
+    def test_builtin_types_load_lazily(self):
+        """Test that built-in drivers are resolved on first lookup"""
+        registry = DeviceRegistry()
+        assert registry.get_loaded() == {}
+        assert set(registry) == set(DeviceType)
+        assert registry[DeviceType.SWITCH] is Switch
+        assert list(registry.get_loaded()) == [DeviceType.SWITCH]
+
+    def test_config_imports_on_first_use(self, plugin):
+        """Test that configured drivers are not imported until needed"""
+        registry = DeviceRegistry()
+        registry.load_config({"sprinkler": plugin})
+        module = plugin.partition(":")[0]
+        assert SPRINKLER in registry
+        assert registry.parse("sprinkler") == SPRINKLER
+        assert module not in sys.modules
+        assert registry[SPRINKLER].__name__ == "Sprinkler"
+        assert module in sys.modules
+
+    def test_entry_points(self, plugin, monkeypatch):
+        """Test that installed entry points are scanned once on a miss"""
+        scans = []
+
+        def fake_entry_points(group):
+            scans.append(group)
+            return [EntryPoint(name="sprinkler", value=plugin, group=group)]
+
+        monkeypatch.setattr("src.registry.entry_points", fake_entry_points)
+        registry = DeviceRegistry()
+        registry[DeviceType.LOCK]
+        assert scans == []
+        assert registry.parse("sprinkler") == SPRINKLER
+        assert registry[SPRINKLER].DEVICE_TYPE == SPRINKLER
+        with pytest.raises(KeyError):
+            registry[CustomDeviceType("valve")]
+        assert scans == [ENTRY_POINT_GROUP]
+
+    def test_invalid_registrations(self, plugin):
+        """Test that bad targets, classes and types are rejected"""
+        registry = DeviceRegistry()
+        with pytest.raises(ValueError, match="expected module:Class"):
+            registry.register("valve", "valves")
+        with pytest.raises(ValueError, match="not a Device subclass"):
+            registry.register("valve", dict)
+        with pytest.raises(ValueError, match="is of type switch"):
+            registry.register(DeviceType.LOCK, Switch)
+        registry.register("valve", plugin)
+        with pytest.raises(ValueError, match="is of type sprinkler"):
+            registry[CustomDeviceType("valve")]
+        with pytest.raises(ValueError, match="Unknown device type"):
+            registry.parse("fountain")
+
+    def test_registered_types_in_managers(self, registered):
+        """Test that managers and manifests accept registered types"""
+        device_manager = DeviceManager()
+        sprinkler = device_manager.create_device(SPRINKLER, "s_1", "Lawn", zone=3)
+        sprinkler.update_state()
+        assert sprinkler.get_state()["zone"] == 3
+        assert sprinkler.get_state()["is_open"]
+        record = {"type": "sprinkler", "device_id": "s_2", "name": "Bed", "zone": "2"}
+        spec = parse_row(record)
+        assert spec.device_type == SPRINKLER
+        assert spec.kwargs == {"zone": 2}
+        assert get_schema(SPRINKLER) is get_schema(SPRINKLER)
+        assert get_schema(SPRINKLER).get_fields() == ["zone"]
+        with pytest.raises(ValueError, match="Columnar storage"):
+            DeviceManager(columnar=True).create_device(SPRINKLER, "s_3", "Pots")
+
+    def test_registered_types_in_subsystems(self, registered, tmp_path):
+        """Test that filters match registered types by value, not identity"""
+        events = []
+        for indexed in (False, True):
+            device_manager = DeviceManager(indexed=indexed)
+            bus = EventBus(device_manager)
+            bus.subscribe(events.append, device_type=CustomDeviceType("sprinkler"))
+            device_manager.create_device(SPRINKLER, "s_1", "Lawn")
+            device_manager.create_device(DeviceType.SWITCH, "switch_1", "Light")
+            device_manager.update_state("s_1")
+            found = device_manager.query(device_type=CustomDeviceType("sprinkler"))
+            assert [device.get_device_id() for device in found] == ["s_1"]
+            device_manager.delete_device("s_1")
+            assert device_manager.query(device_type=SPRINKLER) == []
+        assert [event.source_id for event in events] == ["s_1"] * 6
+        store = DeviceManager(columnar=True).get_store()
+        assert store is not None and store.count(SPRINKLER) == 0
+
+        device_manager.create_device(SPRINKLER, "s_2", "Bed")
+        with pytest.raises(ValueError, match="do not support sprinkler"):
+            write_binary_snapshot(
+                tmp_path / "fleet.snap", device_manager, DwellingManager()
+            )
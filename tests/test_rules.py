@@ -0,0 +1,183 @@
+import pytest
+
+from src.device import DeviceType
+from src.device_manager import DeviceManager
+from src.devices.lock import LockStateRepr
+from src.devices.thermostat import ThermostatStateRepr
+from src.dwelling_manager import DwellingManager
+from src.hub import Hub
+from src.rules import OCCUPANCY, Action, RulesEngine, Trigger
+
+
+@pytest.fixture
+def device_manager():
+    """Fixture to create a fresh DeviceManager for each test"""
+    return DeviceManager()
+
+
+@pytest.fixture
+def dwelling_manager():
+    """Fixture to create a fresh DwellingManager for each test"""
+    return DwellingManager()
+
+
+@pytest.fixture
+def engine(device_manager, dwelling_manager):
+    """Fixture to create a rules engine on both managers"""
+    return RulesEngine(device_manager, dwelling_manager)
+
+
+def install(device_manager, dwelling_manager, dwelling_id, devices):
+    """Creates a dwelling with a hub holding the given (type, ID) devices"""
+    hub = Hub(f"hub_{dwelling_id}")
+    dwelling = dwelling_manager.create_dwelling(dwelling_id)
+    dwelling.install_hub(hub)
+    for device_type, device_id in devices:
+        hub.add_device(device_manager.create_device(device_type, device_id, "D"))
+    return dwelling
+
+
+class TestRulesEngine:
+    """Tests for the trigger to action rules engine"""
+
+    def test_lock_turns_off_switches_in_dwelling(
+        self, engine, device_manager, dwelling_manager
+    ):
+        """Test that locking turns off only the lit switches of its dwelling"""
+        install(
+            device_manager,
+            dwelling_manager,
+            "home_1",
+            [
+                (DeviceType.LOCK, "lock_2"),
+                (DeviceType.SWITCH, "switch_1"),
+                (DeviceType.SWITCH, "switch_2"),
+            ],
+        )
+        install(device_manager, dwelling_manager, "home_2", [(DeviceType.SWITCH, "x")])
+        for device_id in ("switch_1", "x"):
+            device_manager.get_device(device_id).update_state()
+        engine.add_rule(
+            Trigger("is_locked", LockStateRepr.LOCKED, device_id="lock_2"),
+            [Action({}, device_type=DeviceType.SWITCH, where={"state": "ON"})],
+        )
+
+        device_manager.get_device("lock_2").update_state()
+        states = {
+            i: device_manager.get_device(i).get_state()["state"]
+            for i in ("switch_1", "switch_2", "x")
+        }
+        assert states == {"switch_1": "OFF", "switch_2": "OFF", "x": "ON"}
+        assert engine.get_stats().fired == 1
+
+        device_manager.get_device("lock_2").update_state()  # Unlocking
+        assert engine.get_stats().fired == 1
+
+    def test_vacancy_turns_thermostats_off(
+        self, engine, device_manager, dwelling_manager
+    ):
+        """Test that a dwelling becoming vacant sets its thermostats to OFF"""
+        dwelling = install(
+            device_manager, dwelling_manager, "home_1", [(DeviceType.THERMOSTAT, "t")]
+        )
+        thermostat = device_manager.get_device("t")
+        thermostat.update_state(mode=ThermostatStateRepr.HEAT)
+        engine.add_rule(
+            Trigger(OCCUPANCY, False),
+            [
+                Action(
+                    {"mode": ThermostatStateRepr.OFF},
+                    device_type=DeviceType.THERMOSTAT,
+                )
+            ],
+        )
+
+        dwelling.reset_occupancy()  # Already vacant
+        assert thermostat.get_state()["mode"] == "HEAT"
+        dwelling.set_occupancy()
+        dwelling.reset_occupancy()
+        assert thermostat.get_state()["mode"] == "OFF"
+
+    def test_type_trigger_scoped_to_dwelling(
+        self, engine, device_manager, dwelling_manager
+    ):
+        """Test that a device type trigger can be limited to one dwelling"""
+        install(device_manager, dwelling_manager, "home_1", [(DeviceType.DIMMER, "a")])
+        install(device_manager, dwelling_manager, "home_2", [(DeviceType.DIMMER, "b")])
+        target = device_manager.create_device(DeviceType.DIMMER, "target", "T")
+        engine.add_rule(
+            Trigger("brightness", device_type=DeviceType.DIMMER, dwelling_id="home_2"),
+            [Action({"brightness": 5}, device_id="target")],
+        )
+
+        device_manager.get_device("a").update_state(brightness=20)
+        assert target.get_brightness() != 5
+        device_manager.get_device("b").update_state(brightness=20)
+        assert target.get_brightness() == 5
+
+    def test_loop_protection(self, engine, device_manager):
+        """Test that rules triggering each other stop after one round"""
+        first = device_manager.create_device(DeviceType.SWITCH, "switch_1", "S")
+        device_manager.create_device(DeviceType.SWITCH, "switch_2", "S")
+        engine.add_rule(
+            Trigger("state", device_id="switch_1"), [Action({}, device_id="switch_2")]
+        )
+        engine.add_rule(
+            Trigger("state", device_id="switch_2"), [Action({}, device_id="switch_1")]
+        )
+
+        first.update_state()
+        stats = engine.get_stats()
+        assert (stats.fired, stats.suppressed) == (2, 1)
+        assert first.get_state()["state"] == "OFF"
+
+    def test_cascade_depth(self, device_manager, dwelling_manager):
+        """Test that chains of rules stop at the maximum depth"""
+        engine = RulesEngine(device_manager, dwelling_manager, max_depth=3)
+        for i in range(6):
+            device_manager.create_device(DeviceType.SWITCH, f"s{i}", "S")
+        for i in range(5):
+            engine.add_rule(
+                Trigger("state", device_id=f"s{i}"), [Action({}, device_id=f"s{i + 1}")]
+            )
+
+        device_manager.get_device("s0").update_state()
+        stats = engine.get_stats()
+        assert (stats.fired, stats.suppressed) == (3, 1)
+        assert device_manager.get_device("s3").get_state()["state"] == "ON"
+        assert device_manager.get_device("s4").get_state()["state"] == "OFF"
+
+    def test_failed_actions_and_removal(self, engine, device_manager):
+        """Test that failing actions are counted and removed rules stop firing"""
+        device_manager.create_device(DeviceType.THERMOSTAT, "t", "T")
+        dimmer = device_manager.create_device(DeviceType.DIMMER, "d", "D")
+        rule = engine.add_rule(
+            Trigger("brightness", device_id="d"), [Action({"mode": "bogus"}, "t")]
+        )
+
+        dimmer.update_state(brightness=10)
+        assert engine.get_stats().failed == 1
+        assert engine.remove_rule(rule.rule_id)
+        assert not engine.remove_rule(rule.rule_id)
+        dimmer.update_state(brightness=20)
+        assert engine.get_stats().fired == 1
+        assert engine.list_rules() == []
+
+    def test_removal_prunes_index(self, engine):
+        """Test that removing the last rules of a trigger leaves no empty buckets"""
+        triggers = [
+            Trigger("state", "ON", device_id=f"switch_{i}") for i in range(3)
+        ] + [
+            Trigger("brightness", device_type=DeviceType.DIMMER),
+            Trigger("brightness", 10, device_type=DeviceType.DIMMER),
+            Trigger(OCCUPANCY, False, dwelling_id="home_1"),
+        ]
+        rules = [engine.add_rule(trigger, []) for trigger in triggers * 2]
+        for rule in rules:
+            assert engine.remove_rule(rule.rule_id)
+        assert engine._by_device == engine._by_type == engine._by_dwelling == {}
+
+    def test_invalid_trigger(self, engine):
+        """Test that device triggers need a device ID or type"""
+        with pytest.raises(ValueError):
+            engine.add_rule(Trigger("state"), [])
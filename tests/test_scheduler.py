@@ -0,0 +1,151 @@
+from datetime import datetime, time, timezone
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from src.device import DeviceType
+from src.device_manager import DeviceManager
+from src.devices.lock import LockStateRepr
+from src.devices.thermostat import ThermostatStateRepr
+from src.scheduler import DAY, Scheduler, VirtualClock
+
+MONDAY = datetime(2024, 1, 1, tzinfo=timezone.utc).timestamp()  # A Monday, 00:00
+
+
+@pytest.fixture
+def device_manager():
+    """Fixture to create a device manager with a dimmer and a thermostat"""
+    manager = DeviceManager()
+    manager.create_device(DeviceType.DIMMER, "dimmer_1", "Family room")
+    manager.create_device(DeviceType.THERMOSTAT, "thermostat_1", "Hall")
+    return manager
+
+
+@pytest.fixture
+def clock():
+    """Fixture to create a virtual clock at midnight on a Monday"""
+    return VirtualClock(MONDAY)
+
+
+@pytest.fixture
+def scheduler(device_manager, clock):
+    """Fixture to create a scheduler on the virtual clock"""
+    return Scheduler(device_manager, clock)
+
+
+class TestScheduler:
+    """Tests for the timed action scheduler"""
+
+    def test_one_shot(self, scheduler, device_manager, clock):
+        """Test that a one-shot job runs once when due"""
+        job_id = scheduler.schedule_at("dimmer_1", MONDAY + 60, {"brightness": 30})
+        assert scheduler.run_due() == 0
+        assert scheduler.next_due() == MONDAY + 60
+
+        clock.advance(60)
+        assert scheduler.run_due() == 1
+        assert device_manager.get_device("dimmer_1").get_brightness() == 30
+        assert scheduler.get_job(job_id) is None
+        assert scheduler.run_due() == 0
+        assert len(scheduler) == 0
+
+    def test_order_of_due_jobs(self, scheduler, device_manager, clock):
+        """Test that due jobs run by due time, then in scheduling order"""
+        scheduler.schedule_at("dimmer_1", MONDAY + 20, {"brightness": 20})
+        scheduler.schedule_at("dimmer_1", MONDAY + 10, {"brightness": 10})
+        scheduler.schedule_at("dimmer_1", MONDAY + 20, {"brightness": 25})
+
+        assert scheduler.run_due(clock.advance(30)) == 3
+        assert device_manager.get_device("dimmer_1").get_brightness() == 25
+
+    def test_recurring(self, scheduler, clock):
+        """Test that a recurring job reschedules and does not catch up"""
+        job_id = scheduler.schedule_every("dimmer_1", MONDAY + 10, 10)
+        assert scheduler.run_due(clock.advance(10)) == 1
+        assert scheduler.get_job(job_id).due == MONDAY + 20
+
+        assert scheduler.run_due(clock.advance(95)) == 1
+        assert scheduler.get_job(job_id).due == MONDAY + 110
+
+    def test_daily_on_weekdays(self, scheduler, device_manager, clock):
+        """Test that a daily job at a time of day skips the weekend"""
+        mode = {"mode": ThermostatStateRepr.COOL}
+        scheduler.schedule_daily("thermostat_1", time(19), mode, weekdays=range(5))
+        scheduler.schedule_daily(
+            "thermostat_1", time(23), {"mode": ThermostatStateRepr.OFF}
+        )
+        assert scheduler.next_due() == MONDAY + 19 * 3600
+
+        runs = [scheduler.run_due(clock.advance(3600)) for _ in range(7 * 24)]
+        assert sum(runs) == 5 + 7
+        assert runs[19 - 1] == 1
+        assert runs[5 * 24 + 19 - 1] == 0  # Saturday
+        state = device_manager.get_device("thermostat_1").get_state()
+        assert state["mode"] == "OFF"
+
+    def test_daily_across_dst(self, device_manager):
+        """Test that a daily job keeps its local time when the offset changes"""
+        zone = ZoneInfo("America/New_York")
+        clock = VirtualClock(datetime(2024, 3, 9, 12, tzinfo=zone).timestamp())
+        scheduler = Scheduler(device_manager, clock, zone)
+        job_id = scheduler.schedule_daily("dimmer_1", time(7), {"brightness": 40})
+
+        runs = []
+        for _ in range(3):
+            due = scheduler.next_due()
+            assert due is not None
+            scheduler.run_due(due)
+            runs.append(due)
+        # Across the spring forward of March 10
+        assert [datetime.fromtimestamp(due, zone).hour for due in runs] == [7, 7, 7]
+        job = scheduler.get_job(job_id)
+        assert job is not None and job.due - runs[-1] == DAY
+
+    def test_toggled_devices(self, scheduler, device_manager, clock):
+        """Test that switch and lock jobs act only on their where state"""
+        lock = device_manager.create_device(DeviceType.LOCK, "lock_1", "Front")
+        with pytest.raises(ValueError, match="where"):
+            scheduler.schedule_every("lock_1", MONDAY + 10, 10)
+        scheduler.schedule_every(
+            "lock_1", MONDAY + 10, 10, where={"is_locked": LockStateRepr.UNLOCKED}
+        )
+        runs = [scheduler.run_due(clock.advance(10)) for _ in range(3)]
+        assert runs == [1, 0, 0]
+        assert lock.get_state()["is_locked"] == "LOCKED"
+
+    def test_cancel(self, scheduler, clock):
+        """Test that cancelled jobs never run"""
+        jobs = [scheduler.schedule_at("dimmer_1", MONDAY + i) for i in range(200)]
+        assert scheduler.cancel(jobs[0])
+        assert not scheduler.cancel(jobs[0])
+        for job_id in jobs[1:150]:
+            scheduler.cancel(job_id)
+
+        assert scheduler.next_due() == MONDAY + 150
+        assert scheduler.run_due(clock.advance(DAY)) == 50
+
+    def test_deleted_device(self, scheduler, device_manager, clock):
+        """Test that jobs of a deleted device are dropped when due"""
+        job_id = scheduler.schedule_every("dimmer_1", MONDAY + 1, 60)
+        device_manager.delete_device("dimmer_1")
+
+        assert scheduler.run_due(clock.advance(1)) == 0
+        assert scheduler.get_job(job_id) is None
+
+    def test_failing_job_is_kept(self, scheduler, clock):
+        """Test that a recurring job whose call fails stays scheduled"""
+        job_id = scheduler.schedule_every(
+            "thermostat_1", MONDAY + 1, 60, {"mode": "bogus"}
+        )
+        with pytest.raises(ValueError):
+            scheduler.run_due(clock.advance(1))
+        assert scheduler.get_job(job_id).due == MONDAY + 61
+
+    def test_invalid_arguments(self, scheduler, clock):
+        """Test that bad intervals, weekdays and clock moves are rejected"""
+        with pytest.raises(ValueError):
+            scheduler.schedule_every("dimmer_1", MONDAY, 0)
+        with pytest.raises(ValueError):
+            scheduler.schedule_every("dimmer_1", MONDAY, 60, weekdays=[7])
+        with pytest.raises(ValueError):
+            clock.advance(-1)
@@ -0,0 +1,142 @@
+import threading
+
+import pytest
+
+from src.device import DeviceObserver, DeviceType
+from src.device_manager import DeviceManager, DeviceSpec
+from src.dwelling_manager import DwellingManager
+from src.sharded import ShardedDict
+
+THREADS = 8
+
+
+class Counter(DeviceObserver):
+    """Thread-safe observer counting creations and deletions"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.live = 0
+
+    def on_device_created(self, device):
+        with self.lock:
+            self.live += 1
+
+    def on_device_deleted(self, device):
+        with self.lock:
+            self.live -= 1
+
+
+def run_threads(target, count=THREADS):
+    """Runs a target on several threads released together, returns their errors"""
+    barrier = threading.Barrier(count)
+    errors = []
+
+    def worker(index):
+        barrier.wait()
+        try:
+            target(index)
+        except Exception as error:  # pragma: no cover - reported below
+            errors.append(error)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return errors
+
+
+class TestShardedDict:
+    """Tests for the lock-striped mapping"""
+
+    def test_mapping(self):
+        """Test the dict operations across shards"""
+        mapping = ShardedDict(shards=5)
+        assert len(mapping._shards) == 8
+        mapping.update((f"key_{i}", i) for i in range(100))
+        mapping["extra"] = -1
+
+        assert len(mapping) == 101
+        assert mapping["key_7"] == 7
+        assert mapping.get("missing") is None
+        assert "extra" in mapping
+        assert sorted(mapping.values()) == [-1, *range(100)]
+        assert set(mapping) == {"extra", *(f"key_{i}" for i in range(100))}
+
+        del mapping["extra"]
+        assert mapping.pop("key_7") == 7
+        assert mapping.pop("key_7", None) is None
+        with pytest.raises(KeyError):
+            mapping.pop("key_7")
+        assert len(mapping.items()) == 99
+
+    def test_invalid_shards(self):
+        """Test that a shard count below one is rejected"""
+        with pytest.raises(ValueError):
+            ShardedDict(shards=0)
+
+
+class TestConcurrentManagers:
+    """Multi-threaded stress tests for the concurrent manager mode"""
+
+    def test_rejects_unsafe_backends(self):
+        """Test that concurrent mode refuses backends that are not thread-safe"""
+        with pytest.raises(ValueError):
+            DeviceManager(columnar=True, concurrent=True)
+        with pytest.raises(ValueError):
+            DeviceManager(indexed=True, concurrent=True)
+
+    def test_parallel_create_and_list(self):
+        """Test that listing while writers run sees consistent snapshots"""
+        manager = DeviceManager(concurrent=True)
+        per_thread = 2_000
+
+        def write(index):
+            if index == 0:
+                # One reader listing throughout the writes
+                for _ in range(50):
+                    devices = manager.list_devices()
+                    assert len({d.get_device_id() for d in devices}) == len(devices)
+                return
+            for i in range(per_thread):
+                manager.create_device(DeviceType.SWITCH, f"s_{index}_{i}", "S")
+            manager.create_devices(
+                DeviceSpec(DeviceType.DIMMER, f"d_{index}_{i}", "D", {})
+                for i in range(per_thread)
+            )
+
+        assert run_threads(write) == []
+        assert len(manager.list_devices()) == (THREADS - 1) * per_thread * 2
+        dimmer = manager.get_device("d_3_17")
+        assert dimmer is not None and dimmer.get_device_type() is DeviceType.DIMMER
+
+    def test_contended_ids(self):
+        """Test that racing creates and deletes of the same IDs stay consistent"""
+        manager = DeviceManager(concurrent=True)
+        counter = Counter()
+        manager.add_observer(counter)
+
+        def churn(index):
+            for round_ in range(300):
+                device_id = f"shared_{round_ % 16}"
+                if (index + round_) % 3:
+                    manager.create_device(DeviceType.LOCK, device_id, "L")
+                else:
+                    manager.delete_device(device_id)
+
+        assert run_threads(churn) == []
+        # Every replaced device was reported deleted exactly once
+        assert counter.live == len(manager.list_devices())
+
+    def test_parallel_dwellings(self):
+        """Test that dwellings can be created from several threads"""
+        manager = DwellingManager(concurrent=True)
+
+        def create(index):
+            for i in range(500):
+                manager.create_dwelling(f"home_{index}_{i}").set_occupancy()
+
+        assert run_threads(create) == []
+        dwellings = manager.list_dwellings()
+        assert len(dwellings) == THREADS * 500
+        assert all(dwelling.get_is_occupied() for dwelling in dwellings)
@@ -0,0 +1,145 @@
+import io
+import json
+
+import pytest
+
+from src.device import DeviceType
+from src.device_manager import DeviceManager
+from src.dwelling_manager import DwellingManager
+from src.hub import Hub
+from src.streaming import CreationOrder
+
+
+@pytest.fixture(params=[False, True], ids=["objects", "columnar"])
+def device_manager(request):
+    """Fixture to create a DeviceManager of each backend with ten switches"""
+    device_manager = DeviceManager(columnar=request.param)
+    for i in range(10):
+        device_manager.create_device(DeviceType.SWITCH, f"switch_{i}", "S")
+    return device_manager
+
+
+def ids(devices):
+    """Returns the IDs of a list of devices"""
+    return [device.get_device_id() for device in devices]
+
+
+class TestPagination:
+    """Tests for cursor-paginated and streaming listings"""
+
+    def test_pages(self, device_manager):
+        """Test that pages cover every device once in creation order"""
+        first = device_manager.list_page(limit=4)
+        assert ids(first.items) == [f"switch_{i}" for i in range(4)]
+        second = device_manager.list_page(limit=4, cursor=first.next_cursor)
+        third = device_manager.list_page(limit=4, cursor=second.next_cursor)
+        assert ids(second.items + third.items) == [f"switch_{i}" for i in range(4, 10)]
+        assert third.next_cursor is None
+
+    def test_cursor_under_changes(self, device_manager):
+        """Test that cursors skip deletions and serve later creations"""
+        first = device_manager.list_page(limit=5)
+        device_manager.delete_device("switch_2")
+        device_manager.delete_device("switch_6")
+        device_manager.create_device(DeviceType.DIMMER, "dimmer_1", "D")
+        device_manager.create_device(DeviceType.SWITCH, "switch_0", "S")
+        rest = device_manager.list_page(limit=100, cursor=first.next_cursor)
+        assert ids(rest.items) == [
+            "switch_5", "switch_7", "switch_8", "switch_9", "dimmer_1", "switch_0"
+        ]
+        assert rest.next_cursor is None
+
+    def test_last_page_without_cursor(self, device_manager):
+        """Test that trailing deletions do not leave an empty extra page"""
+        device_manager.list_page()
+        device_manager.delete_device("switch_9")
+        page = device_manager.list_page(limit=9)
+        assert len(page.items) == 9
+        assert page.next_cursor is None
+
+    def test_iter_devices(self, device_manager):
+        """Test that iteration yields every device while the fleet changes"""
+        seen = []
+        for device in device_manager.iter_devices(page_size=3):
+            seen.append(device.get_device_id())
+            if device.get_device_id() == "switch_4":
+                device_manager.delete_device("switch_7")
+                device_manager.create_device(DeviceType.LOCK, "lock_1", "L")
+        expected = [f"switch_{i}" for i in range(10) if i != 7] + ["lock_1"]
+        assert seen == expected
+
+    def test_invalid(self, device_manager):
+        """Test that bad limits and cursors raise ValueError"""
+        with pytest.raises(ValueError):
+            device_manager.list_page(limit=0)
+        with pytest.raises(ValueError, match="Invalid cursor"):
+            device_manager.list_page(cursor="not a cursor")
+        with pytest.raises(ValueError):
+            DeviceManager(concurrent=True).list_page()
+
+    def test_compaction(self):
+        """Test that compaction keeps cursors handed out before it"""
+        order = CreationOrder(f"key_{i}" for i in range(200))
+        _, cursor = order.page(None, 150)
+        for i in range(190):
+            order.discard(f"key_{i}")
+        assert order.page(cursor, 100) == ([f"key_{i}" for i in range(190, 200)], None)
+
+    def test_dwellings(self):
+        """Test that dwellings page in creation order, re-creations last"""
+        dwelling_manager = DwellingManager()
+        for i in range(5):
+            dwelling_manager.create_dwelling(f"home_{i}")
+        first = dwelling_manager.list_page(limit=2)
+        dwelling_manager.create_dwelling("home_0")
+        dwelling_manager.create_dwelling("home_3")
+        rest = dwelling_manager.list_page(cursor=first.next_cursor)
+        assert [d.get_dwelling_id() for d in first.items + rest.items] == [
+            "home_0", "home_1", "home_2", "home_4", "home_0", "home_3"
+        ]
+        assert len(list(dwelling_manager.iter_dwellings(page_size=2))) == 5
+
+
+class TestExport:
+    """Tests for streaming state exports"""
+
+    def test_export_states(self, device_manager):
+        """Test that every device state is written as one JSON line"""
+        device_manager.get_device("switch_3").update_state()
+        buffer = io.StringIO()
+        assert device_manager.export_states(buffer) == 10
+        states = [json.loads(line) for line in buffer.getvalue().splitlines()]
+        devices = device_manager.list_devices()
+        assert states == [device.get_state() for device in devices]
+        assert states[3]["state"] == "ON"
+
+    def test_export_to_path(self, device_manager, tmp_path):
+        """Test that exports open and fill a file given its path"""
+        path = tmp_path / "states.jsonl"
+        assert device_manager.export_states(path) == 10
+        assert len(path.read_text().splitlines()) == 10
+
+
+class TestHubListing:
+    """Tests for read-only hub listings"""
+
+    def test_read_only(self):
+        """Test that paired devices are exposed read-only and live"""
+        device_manager = DeviceManager()
+        hub = Hub("hub_1")
+        paired = hub.get_paired_devices()
+        hub.add_device(device_manager.create_device(DeviceType.SWITCH, "s_1", "S"))
+        assert list(paired) == ["s_1"]
+        with pytest.raises(TypeError):
+            paired["s_2"] = paired["s_1"]  # type: ignore[index]
+
+    def test_iter_during_removal(self):
+        """Test that hub iteration tolerates removals"""
+        device_manager = DeviceManager()
+        hub = Hub("hub_1")
+        for i in range(3):
+            hub.add_device(device_manager.create_device(DeviceType.LOCK, f"l_{i}", "L"))
+        assert ids(hub.iter_devices()) == ["l_0", "l_1", "l_2"]
+        for device in hub.iter_devices():
+            hub.remove_device(device.get_device_id())
+        assert hub.list_devices() == []
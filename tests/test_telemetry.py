@@ -0,0 +1,114 @@
+import pytest
+
+from src.device import DeviceType
+from src.device_manager import DeviceManager
+from src.devices.thermostat import ThermostatStateRepr
+from src.telemetry import TelemetryStore, Tier
+
+
+class FakeClock:
+    """Manually advanced clock"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def store():
+    """Fixture to create a small store with a fake clock"""
+    return TelemetryStore(samples=4, minutes=3, hours=2, days=2, clock=FakeClock())
+
+
+class TestTelemetryStore:
+    """Tests for the thermostat time-series store"""
+
+    def test_raw_ring(self, store):
+        """Test that the raw ring keeps the newest samples in order"""
+        for second in range(6):
+            store.record("thermo_1", second * 10, 70 + second, ThermostatStateRepr.HEAT)
+
+        samples = store.get_samples("thermo_1")
+        assert list(samples.times) == [20, 30, 40, 50]
+        assert list(samples.temperatures) == [72, 73, 74, 75]
+        assert set(samples.modes) == {1}
+
+        ranged = store.get_samples("thermo_1", 25, 50)
+        assert list(ranged.times) == [30, 40]
+        assert not store.record("thermo_1", 45, 60)
+        assert store.get_samples("thermo_2").times.tolist() == []
+
+    def test_downsampling(self, store):
+        """Test min/mean/max buckets of each tier, open bucket included"""
+        for second, temperature in [(0, 70), (30, 74), (59, 72), (60, 80), (130, 60)]:
+            store.record("thermo_1", second, temperature)
+
+        minutes = store.get_aggregates("thermo_1", Tier.MINUTE)
+        assert list(minutes.starts) == [0, 60, 120]
+        assert list(minutes.mins) == [70, 80, 60]
+        assert list(minutes.means) == [72, 80, 60]
+        assert list(minutes.maxes) == [74, 80, 60]
+
+        hours = store.get_aggregates("thermo_1", Tier.HOUR)
+        assert list(hours.starts) == [0]
+        assert list(hours.means) == [pytest.approx(71.2)]
+        assert list(hours.mins) == [60]
+
+        ranged = store.get_aggregates("thermo_1", Tier.MINUTE, 61, 120)
+        assert list(ranged.starts) == [60]
+
+    def test_tier_ring_wraps(self, store):
+        """Test that closed buckets beyond the ring size are dropped"""
+        for minute in range(6):
+            store.record("thermo_1", minute * 60, minute)
+        minutes = store.get_aggregates("thermo_1", Tier.MINUTE)
+        assert list(minutes.starts) == [120, 180, 240, 300]
+        assert list(minutes.means) == [2, 3, 4, 5]
+
+    def test_records_state_changes(self):
+        """Test that thermostat changes of a manager are recorded"""
+        clock = FakeClock()
+        device_manager = DeviceManager()
+        store = TelemetryStore(device_manager, clock=clock)
+        thermostat = device_manager.create_device(
+            DeviceType.THERMOSTAT, "thermo_1", "T"
+        )
+        switch = device_manager.create_device(DeviceType.SWITCH, "switch_1", "S")
+
+        thermostat.update_state(temperature=68)
+        clock.now = 5
+        thermostat.update_state(mode=ThermostatStateRepr.COOL)
+        switch.update_state()
+        assert store.list_device_ids() == ["thermo_1"]
+
+        samples = store.get_samples("thermo_1")
+        assert list(samples.times) == [0, 5]
+        assert list(samples.temperatures) == [68, 68]
+        assert list(samples.modes) == [0, 2]
+
+        assert store.sample(device_manager.list_devices(), timestamp=10) == 1
+        device_manager.delete_device("thermo_1")
+        assert store.list_device_ids() == []
+
+    def test_query_many_devices(self, store):
+        """Test range queries across devices and slot reuse"""
+        for i in range(3):
+            store.record(f"thermo_{i}", 100, 60 + i)
+        store.forget("thermo_1")
+        store.record("thermo_3", 100, 90)
+
+        result = store.query(["thermo_0", "thermo_2", "thermo_3"], tier=Tier.DAY)
+        assert {i: list(a.means) for i, a in result.items()} == {
+            "thermo_0": [60],
+            "thermo_2": [62],
+            "thermo_3": [90],
+        }
+        raw = store.query(["thermo_3"], 0, 50)
+        assert list(raw["thermo_3"].times) == []
+
+    def test_invalid_sizes(self):
+        """Test that empty rings are rejected"""
+        with pytest.raises(ValueError):
+            TelemetryStore(samples=0)
@@ -0,0 +1,114 @@
+from collections import Counter
+
+import pytest
+
+from src.device import DeviceType
+from src.device_manager import DeviceManager
+from src.dwelling_manager import DwellingManager
+from src.workload import (
+    Command,
+    CommandKind,
+    FleetLayout,
+    build_fleet,
+    generate_trace,
+    read_trace,
+    replay,
+    write_trace,
+)
+
+
+@pytest.fixture
+def layout():
+    """Fixture to create the layout of 100 dwellings with 5 devices each"""
+    return FleetLayout(100, 5, seed=1)
+
+
+@pytest.fixture
+def fleet(layout):
+    """Fixture to build the fleet of the layout"""
+    device_manager, dwelling_manager = DeviceManager(), DwellingManager()
+    build_fleet(layout, device_manager, dwelling_manager)
+    return device_manager, dwelling_manager
+
+
+class TestWorkload:
+    """Tests for the synthetic fleet generator and trace replay"""
+
+    def test_layout_mix(self):
+        """Test that device types follow the requested mix"""
+        layout = FleetLayout(20, 10, {DeviceType.LOCK: 3, DeviceType.DIMMER: 1})
+        types = Counter(
+            layout.get_device_type(dwelling, slot)
+            for dwelling in range(20)
+            for slot in range(10)
+        )
+        assert types == {DeviceType.LOCK: 150, DeviceType.DIMMER: 50}
+
+    def test_build_fleet(self, layout, fleet):
+        """Test that every dwelling gets a hub with its paired devices"""
+        device_manager, dwelling_manager = fleet
+        assert len(device_manager.list_devices()) == len(layout) == 500
+        assert len(dwelling_manager.list_dwellings()) == 100
+        devices = dwelling_manager.devices_in_dwelling("home_7")
+        assert [d.get_device_id() for d in devices] == [
+            f"device_7_{slot}" for slot in range(5)
+        ]
+        assert all(d.get_paired() for d in devices)
+        assert devices[2].get_device_type() is layout.get_device_type(7, 2)
+
+    def test_trace_is_reproducible(self, layout):
+        """Test that equal seeds give equal traces and kinds follow the mix"""
+        first = list(generate_trace(layout, 1_000, seed=3))
+        assert first == list(generate_trace(layout, 1_000, seed=3))
+        assert first != list(generate_trace(layout, 1_000, seed=4))
+        kinds = Counter(command.kind for command in first)
+        assert kinds[CommandKind.UPDATE] > kinds[CommandKind.GET_STATE]
+
+    def test_trace_round_trip(self, layout, tmp_path):
+        """Test that a written trace reads back as the same commands"""
+        path = tmp_path / "trace.jsonl"
+        commands = list(generate_trace(layout, 500))
+        assert write_trace(path, iter(commands)) == 500
+        assert list(read_trace(path)) == commands
+
+    def test_malformed_trace(self, tmp_path):
+        """Test that a malformed trace line names its line number"""
+        path = tmp_path / "trace.jsonl"
+        path.write_text('{"op": "update", "device_id": "a", "dwelling_id": "b"}\n{}\n')
+        with pytest.raises(ValueError, match="line 2"):
+            list(read_trace(path))
+
+    def test_replay(self, layout, fleet):
+        """Test that replaying a generated trace runs every command"""
+        device_manager, dwelling_manager = fleet
+        report = replay(
+            generate_trace(layout, 5_000), device_manager, dwelling_manager, 1_000
+        )
+        assert report.ops == 5_000
+        assert report.errors == 0
+        assert len(report.window_rates) == 5
+        assert report.get_sustained_rate() <= report.get_median_rate()
+        assert report.peak_rss_bytes > 0
+
+    def test_replay_errors(self, fleet):
+        """Test that unknown devices and invalid updates count as errors"""
+        device_manager, dwelling_manager = fleet
+        thermostat = next(
+            d
+            for d in device_manager.list_devices()
+            if d.get_device_type() is DeviceType.THERMOSTAT
+        )
+        commands = [
+            Command(CommandKind.UPDATE, "missing", "home_0", {}),
+            Command(
+                CommandKind.UPDATE,
+                thermostat.get_device_id(),
+                "home_0",
+                {"mode": "BOGUS"},
+            ),
+            Command(CommandKind.PAIR, "device_0_0", "missing", {}),
+            Command(CommandKind.UNPAIR, "device_0_0", "home_0", {}),
+        ]
+        report = replay(commands, device_manager, dwelling_manager)
+        assert (report.ops, report.errors) == (4, 3)
+        assert not device_manager.get_device("device_0_0").get_paired()